@@ -8,12 +8,9 @@ from datetime import datetime, timezone
 
 from app.cache.snapshot_cache import get_snapshot_signals
 from app.services.snapshot_contract import (
-    is_actionable_snapshot_row,
-    is_blocked_snapshot_row,
-    is_watchlist_snapshot_row,
-    snapshot_row_orientation,
+    classify_snapshot_row,
     snapshot_row_summary,
-    summarize_snapshot_rows,
+    summarize_classified_rows,
 )
 
 logger = logging.getLogger("stocknewsbr.market_pulse")
@@ -63,7 +60,8 @@ def market_pulse(signals=None):
             return _empty_pulse(timestamp)
 
         rows = [r for r in results if isinstance(r, dict)]
-        stats = summarize_snapshot_rows(rows)
+        classes = [classify_snapshot_row(row) for row in rows]
+        stats = summarize_classified_rows(classes)
         groups = {
             "bullish_candidates": [],
             "actionable_bullish": [],
@@ -73,30 +71,37 @@ def market_pulse(signals=None):
             "watchlist_candidates": [],
         }
 
-        for row in rows:
-            orientation = snapshot_row_orientation(row)
-            actionable = is_actionable_snapshot_row(row)
+        # Each row is classified once and summarised at most once; groups only
+        # keep their first _GROUP_SAMPLE_LIMIT rows, so later rows are not
+        # summarised for a group that is already full.
+        for row, (orientation, actionable, blocked, watchlist) in zip(rows, classes):
+            targets = []
 
             if orientation == "bullish":
-                groups["bullish_candidates"].append(snapshot_row_summary(row))
+                targets.append("bullish_candidates")
                 if actionable:
-                    groups["actionable_bullish"].append(snapshot_row_summary(row))
+                    targets.append("actionable_bullish")
 
             elif orientation == "bearish":
-                groups["bearish_candidates"].append(snapshot_row_summary(row))
+                targets.append("bearish_candidates")
                 if actionable:
-                    groups["actionable_bearish"].append(snapshot_row_summary(row))
-
-            if is_blocked_snapshot_row(row):
-                groups["blocked_signals"].append(snapshot_row_summary(row))
-
-            if is_watchlist_snapshot_row(row):
-                groups["watchlist_candidates"].append(snapshot_row_summary(row))
-
-        groups = {
-            key: value[:_GROUP_SAMPLE_LIMIT]
-            for key, value in groups.items()
-        }
+                    targets.append("actionable_bearish")
+
+            if blocked:
+                targets.append("blocked_signals")
+
+            if watchlist:
+                targets.append("watchlist_candidates")
+
+            summary = None
+            for key in targets:
+                if len(groups[key]) >= _GROUP_SAMPLE_LIMIT:
+                    continue
+                if summary is None:
+                    summary = snapshot_row_summary(row)
+                    groups[key].append(summary)
+                else:
+                    groups[key].append(dict(summary))
 
         bullish = stats["actionable_bullish"]
         bearish = stats["actionable_bearish"]
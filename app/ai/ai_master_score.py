@@ -725,13 +725,13 @@ def _signal_aligns_with_master(row: Dict[str, Any], direction: str) -> bool:
     return False
 
 
-def apply_master_scores_by_ticker(rows: Iterable[Dict[str, Any]], master_scores: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def apply_master_scores_by_ticker(rows: Iterable[Dict[str, Any]], master_scores: Iterable[Dict[str, Any]], *, in_place: bool = False) -> List[Dict[str, Any]]:
     index = master_score_index(master_scores)
     output: List[Dict[str, Any]] = []
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         master = index.get(_ticker(item))
         if not master:
             output.append(item)
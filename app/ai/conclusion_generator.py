@@ -58,7 +58,8 @@ _OMNI_TIMEOUT = float(os.getenv("OMNIROUTE_TIMEOUT", "20"))
 # ponytail: process-local dict cache -- fine for a single web worker. Move to the
 # shared snapshot cache if several workers each pay the first-miss LLM cost.
 _CACHE: dict[tuple, tuple[str, float]] = {}
-# _CACHE_LOCK guards _CACHE; _SCHED_LOCK guards _SCHEDULED. They are never held at the
+_CACHE_GENERATION = 0
+# _CACHE_LOCK guards _CACHE and _CACHE_GENERATION; _SCHED_LOCK guards _SCHEDULED. They are never held at the
 # same time, so there is no lock ordering to get wrong.
 _CACHE_LOCK = threading.Lock()
 _last_evict_at = 0.0
@@ -268,8 +269,10 @@ def _cache_put(key: tuple, text: str, now: float | None = None) -> None:
     """Store one entry under _CACHE_LOCK, keeping _CACHE within _MAX_CACHE_ENTRIES."""
     if now is None:
         now = time.time()
+    global _CACHE_GENERATION
     with _CACHE_LOCK:
         _CACHE[key] = (text, now + _TTL_SECONDS)
+        _CACHE_GENERATION += 1
         overflow = len(_CACHE) - _MAX_CACHE_ENTRIES
         if overflow <= 0:
             return
@@ -278,6 +281,12 @@ def _cache_put(key: tuple, text: str, now: float | None = None) -> None:
             _CACHE.pop(stale_key, None)
 
 
+def conclusion_cache_generation() -> int:
+    """Bumped on every cached conclusion, so bundles built without one know to rebuild."""
+    with _CACHE_LOCK:
+        return _CACHE_GENERATION
+
+
 def _evict_expired_cache(now: float | None = None, *, force: bool = True) -> int:
     """Drop expired entries from _CACHE. Returns the number of entries removed.
 
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict, Iterable, List
 
+import numpy as np
+
 from app.ai.ai_accumulation import run_accumulation
 from app.ai.ai_breakout_probability import run_breakout_probability
 from app.ai.ai_heat_map import run_heat_map
@@ -14,6 +16,7 @@ from app.ai.ai_radar import run_radar
 from app.ai.ai_smart_money import run_smart_money
 from app.ai.ai_squeeze import run_squeeze
 from app.ai.ai_specialists import build_official_ai_outputs
+from app.system.worker_profiler import profile_stage
 import math
 
 
@@ -342,32 +345,24 @@ def build_asset_features(row: Dict[str, Any]) -> Dict[str, Any]:
         "symbol_factor": _symbol_factor(symbol),
     }
 
-    price_features = _compute_price_features(base)
-    volume_features = _compute_volume_features({**base, **price_features})
-    indicator_features = _compute_indicator_features({**base, **price_features, **volume_features})
-    setup_features = _compute_setup_features(
-        {**base, **price_features, **volume_features, **indicator_features}
-    )
+    # One dict grows stage by stage; each stage reads everything computed before it.
+    features = dict(base)
+    features.update(_compute_price_features(features))
+    features.update(_compute_volume_features(features))
+    features.update(_compute_indicator_features(features))
+    features.update(_compute_setup_features(features))
 
     confidence_inputs = 0
     for key in [
         "price", "volume", "rel_volume", "vwap", "rsi", "adx", "atr_pct", "change_pct", "source_score"
     ]:
-        if safe_float(
-            {
-                **base,
-                **price_features,
-                **volume_features,
-                **indicator_features,
-                **setup_features,
-            }.get(key)
-        ) != 0:
+        if safe_float(features.get(key)) != 0:
             confidence_inputs += 1
 
     feature_confidence = safe_int(clamp((confidence_inputs / 9.0) * 100.0, 5.0, 100.0))
 
-    price = safe_float(price_features.get("price"))
-    volume = safe_float(volume_features.get("volume"))
+    price = safe_float(features.get("price"))
+    volume = safe_float(features.get("volume"))
     source_quality = str(base.get("data_quality") or base.get("quote_status") or "").strip().lower()
     if source_quality in {"priced", "real", "ok", "fresh", "confirmed"} and price > 0 and volume > 0:
         data_quality = "priced"
@@ -376,15 +371,9 @@ def build_asset_features(row: Dict[str, Any]) -> Dict[str, Any]:
     else:
         data_quality = "priced" if price > 0 and volume > 0 else "score_only"
 
-    return {
-        **base,
-        **price_features,
-        **volume_features,
-        **indicator_features,
-        **setup_features,
-        "data_quality": data_quality,
-        "feature_confidence": feature_confidence,
-    }
+    features["data_quality"] = data_quality
+    features["feature_confidence"] = feature_confidence
+    return features
 
 
 def build_feature_hub(
@@ -396,56 +385,79 @@ def build_feature_hub(
     return _add_cross_section_features(features)
 
 
-def _rank_pct(value: float, values: List[float]) -> float:
-    if not values:
-        return 50.0
-    ordered = sorted(values)
-    if len(ordered) == 1:
-        return 50.0
+def _rank_pct_column(values: np.ndarray) -> np.ndarray:
+    """Percentile rank of every value within its column: one sort, one searchsorted.
+
+    Same definition as the per-row count it replaces: (#items <= value - 1) / (n - 1),
+    scaled to 0..100, and a flat 50 for columns of one value or a single row.
+    """
+    if values.size <= 1:
+        return np.full(values.size, 50.0)
+    ordered = np.sort(values)
     if ordered[0] == ordered[-1]:
-        return 50.0
-    below_or_equal = sum(1 for item in ordered if item <= value)
-    return clamp(((below_or_equal - 1) / (len(ordered) - 1)) * 100.0)
+        return np.full(values.size, 50.0)
+    below_or_equal = np.searchsorted(ordered, values, side="right")
+    return np.clip(((below_or_equal - 1) / (values.size - 1)) * 100.0, 0.0, 100.0)
+
+
+def _feature_column(rows: List[Dict[str, Any]], key: str) -> np.ndarray:
+    return np.fromiter((safe_float(row.get(key)) for row in rows), dtype=np.float64, count=len(rows))
 
 
 def _add_cross_section_features(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    changes = [safe_float(row.get("change_pct")) for row in rows]
-    momentums = [safe_float(row.get("momentum")) for row in rows]
-    rel_volumes = [safe_float(row.get("rel_volume")) for row in rows]
-    source_scores = [safe_float(row.get("source_score")) for row in rows]
-
-    enriched: List[Dict[str, Any]] = []
-    for row in rows:
-        change = safe_float(row.get("change_pct"))
-        momentum = safe_float(row.get("momentum"))
-        rel_volume = safe_float(row.get("rel_volume"))
-        source_score = safe_float(row.get("source_score"))
-        source_rank = _rank_pct(source_score, source_scores)
-        relative_strength = (
-            _rank_pct(change, changes) * 0.30
-            + _rank_pct(momentum, momentums) * 0.22
-            + _rank_pct(rel_volume, rel_volumes) * 0.20
-            + source_rank * 0.28
-        )
-        enriched.append(
-            {
-                **row,
-                "relative_strength_score": round(clamp(relative_strength), 4),
-                "relative_weakness_score": round(clamp(100.0 - relative_strength), 4),
-                "source_score_rank": round(source_rank, 4),
-                "market_relative_change": round(change - (sum(changes) / max(1, len(changes))), 4),
-                "abnormal_move_score": round(
-                    clamp(
-                        abs(change) * 14.0
-                        + abs(momentum) * 10.0
-                        + max(rel_volume - 1.0, 0.0) * 24.0
-                        + abs(source_score - 50.0) * 0.20
-                    ),
-                    4,
-                ),
-            }
+    """Cross-sectional ranks and scores over the whole row set, computed column-wise.
+
+    Each input field is read once into a float64 column and ranked with a single sort,
+    instead of re-sorting the full list four times per row (O(n^2 log n)). Scores are
+    combined element-wise in the same operation order as the scalar formulas and
+    rounded as Python floats, so the output is identical to the row-by-row version.
+    """
+    if not rows:
+        return []
+
+    changes = _feature_column(rows, "change_pct")
+    momentums = _feature_column(rows, "momentum")
+    rel_volumes = _feature_column(rows, "rel_volume")
+    source_scores = _feature_column(rows, "source_score")
+
+    source_rank = _rank_pct_column(source_scores)
+    relative_strength = (
+        _rank_pct_column(changes) * 0.30
+        + _rank_pct_column(momentums) * 0.22
+        + _rank_pct_column(rel_volumes) * 0.20
+        + source_rank * 0.28
+    )
+    relative_weakness = np.clip(100.0 - relative_strength, 0.0, 100.0)
+    relative_strength = np.clip(relative_strength, 0.0, 100.0)
+    # Left-to-right Python sum, as before (np.sum's pairwise order rounds differently).
+    mean_change = sum(changes.tolist()) / len(rows)
+    abnormal_move = np.clip(
+        np.abs(changes) * 14.0
+        + np.abs(momentums) * 10.0
+        + np.maximum(rel_volumes - 1.0, 0.0) * 24.0
+        + np.abs(source_scores - 50.0) * 0.20,
+        0.0,
+        100.0,
+    )
+
+    return [
+        {
+            **row,
+            "relative_strength_score": round(strength, 4),
+            "relative_weakness_score": round(weakness, 4),
+            "source_score_rank": round(rank, 4),
+            "market_relative_change": round(change - mean_change, 4),
+            "abnormal_move_score": round(abnormal, 4),
+        }
+        for row, strength, weakness, rank, change, abnormal in zip(
+            rows,
+            relative_strength.tolist(),
+            relative_weakness.tolist(),
+            source_rank.tolist(),
+            changes.tolist(),
+            abnormal_move.tolist(),
         )
-    return enriched
+    ]
 
 
 def build_internal_ai_outputs_from_feature_rows(
@@ -470,52 +482,62 @@ def build_internal_ai_outputs_from_feature_rows(
     }
 
     try:
-        outputs["heat_map"] = run_heat_map(safe_feature_rows, limit=limit)
+        with profile_stage("ai_heat_map"):
+            outputs["heat_map"] = run_heat_map(safe_feature_rows, limit=limit)
     except Exception:
         outputs["heat_map"] = []
 
     try:
-        outputs["radar"] = run_radar(safe_feature_rows, limit=limit)
+        with profile_stage("ai_radar"):
+            outputs["radar"] = run_radar(safe_feature_rows, limit=limit)
     except Exception:
         outputs["radar"] = []
 
     try:
-        outputs["breakout_probability"] = run_breakout_probability(safe_feature_rows, limit=limit)
+        with profile_stage("ai_breakout_probability"):
+            outputs["breakout_probability"] = run_breakout_probability(safe_feature_rows, limit=limit)
     except Exception:
         outputs["breakout_probability"] = []
 
     try:
-        outputs["institutional_flow"] = run_institutional_flow(safe_feature_rows, limit=limit)
+        with profile_stage("ai_institutional_flow"):
+            outputs["institutional_flow"] = run_institutional_flow(safe_feature_rows, limit=limit)
     except Exception:
         outputs["institutional_flow"] = []
 
     try:
-        outputs["smart_money"] = run_smart_money(safe_feature_rows, limit=limit)
+        with profile_stage("ai_smart_money"):
+            outputs["smart_money"] = run_smart_money(safe_feature_rows, limit=limit)
     except Exception:
         outputs["smart_money"] = []
 
     try:
-        outputs["accumulation"] = run_accumulation(safe_feature_rows, limit=limit)
+        with profile_stage("ai_accumulation"):
+            outputs["accumulation"] = run_accumulation(safe_feature_rows, limit=limit)
     except Exception:
         outputs["accumulation"] = []
 
     try:
-        outputs["volatility_squeeze"] = run_squeeze(safe_feature_rows, limit=limit)
+        with profile_stage("ai_volatility_squeeze"):
+            outputs["volatility_squeeze"] = run_squeeze(safe_feature_rows, limit=limit)
     except Exception:
         outputs["volatility_squeeze"] = []
 
     try:
-        outputs["liquidity_sweep"] = run_liquidity_sweep(safe_feature_rows, limit=limit)
+        with profile_stage("ai_liquidity_sweep"):
+            outputs["liquidity_sweep"] = run_liquidity_sweep(safe_feature_rows, limit=limit)
     except Exception:
         outputs["liquidity_sweep"] = []
 
     try:
-        outputs["liquidity_map"] = run_liquidity_map(safe_feature_rows, limit=limit)
+        with profile_stage("ai_liquidity_map"):
+            outputs["liquidity_map"] = run_liquidity_map(safe_feature_rows, limit=limit)
     except Exception:
         outputs["liquidity_map"] = []
 
     try:
-        outputs["market_regime"] = run_market_regime(safe_feature_rows, limit=limit)
+        with profile_stage("ai_market_regime"):
+            outputs["market_regime"] = run_market_regime(safe_feature_rows, limit=limit)
     except Exception:
         outputs["market_regime"] = []
 
@@ -552,7 +574,8 @@ def build_internal_ai_outputs_from_feature_rows(
             merged.update(subscore_index.get(str(ticker), {}))
             master_input.append(merged)
 
-        outputs["master_score"] = run_master_score(master_input, limit=limit)
+        with profile_stage("ai_master_score"):
+            outputs["master_score"] = run_master_score(master_input, limit=limit)
     except Exception:
         outputs["master_score"] = []
 
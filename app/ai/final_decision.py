@@ -267,13 +267,14 @@ def enrich_final_decision_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     risk_rows = _risk_index(ai_tools)
     output: List[Dict[str, Any]] = []
 
     for row in safe_rows:
-        item = dict(row)
+        item = row if in_place else dict(row)
         risk_level = _risk_level(item, risk_rows.get(_ticker(item)))
         blocks = _blocking_reasons(item, risk_level)
         score = 0.0 if blocks else _score(item, risk_level, market_pulse)
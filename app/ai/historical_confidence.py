@@ -323,12 +323,13 @@ def enrich_historical_confidence_rows(
     *,
     history_rows: Iterable[Dict[str, Any]] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     history = _history_rows(history_rows)
     output: List[Dict[str, Any]] = []
     for row in safe_rows:
-        item = dict(row)
+        item = row if in_place else dict(row)
         item.update(_confidence_for_row(item, history))
         output.append(item)
 
@@ -357,6 +358,8 @@ def historical_confidence_items(rows: Iterable[Dict[str, Any]], limit: int = 50)
 def apply_historical_confidence_by_ticker(
     rows: Iterable[Dict[str, Any]],
     historical_rows: Iterable[Dict[str, Any]],
+    *,
+    in_place: bool = False,
 ) -> List[Dict[str, Any]]:
     index = {
         _ticker(row): row
@@ -377,7 +380,7 @@ def apply_historical_confidence_by_ticker(
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         historical = index.get(_ticker(item))
         if historical:
             for field in fields:
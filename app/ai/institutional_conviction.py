@@ -258,13 +258,14 @@ def enrich_institutional_conviction_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     tools_by_ticker = _tool_index(ai_tools)
     output: List[Dict[str, Any]] = []
 
     for row in safe_rows:
-        item = dict(row)
+        item = row if in_place else dict(row)
         ticker = _ticker(item)
         risk_level = _risk_level(item, tools_by_ticker.get(ticker, {}).get("risk"))
         score, factors, conflicts = _alignment_score(item, risk_level, market_pulse)
@@ -290,7 +291,7 @@ def enrich_institutional_conviction_rows(
     return output, metrics
 
 
-def apply_conviction_by_ticker(rows: Iterable[Dict[str, Any]], conviction_rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def apply_conviction_by_ticker(rows: Iterable[Dict[str, Any]], conviction_rows: Iterable[Dict[str, Any]], *, in_place: bool = False) -> List[Dict[str, Any]]:
     index = {
         _ticker(row): row
         for row in conviction_rows or []
@@ -301,7 +302,7 @@ def apply_conviction_by_ticker(rows: Iterable[Dict[str, Any]], conviction_rows:
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         conviction = index.get(_ticker(item))
         if conviction:
             for field in fields:
@@ -154,13 +154,14 @@ def enrich_institutional_priority_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     risk_rows = _risk_index(ai_tools)
     output: List[Dict[str, Any]] = []
 
     for row in safe_rows:
-        item = dict(row)
+        item = row if in_place else dict(row)
         risk_level = _risk_level(item, risk_rows.get(_ticker(item)))
         score, factors = _score_and_factors(item, risk_level, market_pulse)
         level = _level(score, _is_blocked(item))
@@ -190,7 +191,7 @@ def enrich_institutional_priority_rows(
     return output, metrics
 
 
-def apply_priority_by_ticker(rows: Iterable[Dict[str, Any]], priority_rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def apply_priority_by_ticker(rows: Iterable[Dict[str, Any]], priority_rows: Iterable[Dict[str, Any]], *, in_place: bool = False) -> List[Dict[str, Any]]:
     index = {
         _ticker(row): row
         for row in priority_rows or []
@@ -201,7 +202,7 @@ def apply_priority_by_ticker(rows: Iterable[Dict[str, Any]], priority_rows: Iter
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         priority = index.get(_ticker(item))
         if priority:
             for field in fields:
@@ -253,8 +253,9 @@ def enrich_institutional_radar_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     risk_rows = _risk_index(ai_tools)
     radar_rows = _radar_index(safe_rows)
     metrics = {"generated": len(safe_rows), "promoted": 0, "discarded": 0, "blocked": 0}
@@ -265,7 +266,7 @@ def enrich_institutional_radar_rows(
         radar_row = radar_rows.get(ticker, {})
         risk_level, risk_critical, risk_score = _risk_from_sources(row, risk_rows.get(ticker))
         blocked = _blocked_reasons(row, risk_level, risk_critical)
-        item = dict(row)
+        item = row if in_place else dict(row)
         item["radar_score"] = round(_safe_score(radar_row.get("score") or radar_row.get("radar_score"), 0.0), 2)
         item["radar_state"] = radar_row.get("state") or "inactive"
         item["radar_risk_level"] = risk_level
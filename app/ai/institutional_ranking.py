@@ -261,8 +261,9 @@ def enrich_institutional_ranking_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     risk_rows = _risk_index(ai_tools)
     metrics = {"eligible": 0, "excluded": 0, "promoted": 0, "top_ranking": 0}
     output: List[Dict[str, Any]] = []
@@ -271,7 +272,7 @@ def enrich_institutional_ranking_rows(
         ticker = _ticker(row)
         risk_level, risk_critical, risk_score = _risk_from_sources(row, risk_rows.get(ticker))
         blocked = _blocked_reasons(row, risk_level, risk_critical)
-        item = dict(row)
+        item = row if in_place else dict(row)
         item["ranking_risk_level"] = risk_level
         item["ranking_risk_score"] = risk_score
         item["ranking_excluded_reasons"] = blocked
@@ -234,14 +234,15 @@ def enrich_operational_rules_rows(
     ai_tools: Dict[str, Any] | None = None,
     market_pulse: Dict[str, Any] | None = None,
     record_metrics: bool = True,
+    in_place: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    safe_rows = [dict(row) for row in rows or [] if isinstance(row, dict)]
+    safe_rows = [row if in_place else dict(row) for row in rows or [] if isinstance(row, dict)]
     risk_rows = _risk_index(ai_tools)
     output: List[Dict[str, Any]] = []
 
     for row in safe_rows:
         ticker = _ticker(row)
-        item = dict(row)
+        item = row if in_place else dict(row)
         risk_level, risk_critical, risk_score = _risk_level(item, risk_rows.get(ticker))
         blocks = _blocked_reasons(item, risk_level, risk_critical)
         warnings = _warnings(item, risk_level, market_pulse) if not blocks else []
@@ -266,6 +267,8 @@ def enrich_operational_rules_rows(
 def apply_operational_rules_by_ticker(
     rows: Iterable[Dict[str, Any]],
     operational_rows: Iterable[Dict[str, Any]],
+    *,
+    in_place: bool = False,
 ) -> List[Dict[str, Any]]:
     index = {
         _ticker(row): row
@@ -287,7 +290,7 @@ def apply_operational_rules_by_ticker(
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         operational = index.get(_ticker(item))
         if operational:
             for field in fields:
@@ -895,13 +895,13 @@ def strategic_panel_index(rows: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str,
     return output
 
 
-def apply_strategic_panels_by_ticker(rows: Iterable[Dict[str, Any]], strategic_panels: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def apply_strategic_panels_by_ticker(rows: Iterable[Dict[str, Any]], strategic_panels: Iterable[Dict[str, Any]], *, in_place: bool = False) -> List[Dict[str, Any]]:
     index = strategic_panel_index(strategic_panels)
     output: List[Dict[str, Any]] = []
     for row in rows or []:
         if not isinstance(row, dict):
             continue
-        item = dict(row)
+        item = row if in_place else dict(row)
         t = _ticker(item)
         panel = index.get(t)
         if panel:
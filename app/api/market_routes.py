@@ -12,6 +12,7 @@ from app.ai.final_decision import ensure_final_decision_rows
 from app.ai.institutional_priority import ensure_institutional_priority_rows
 from app.ai.institutional_radar import ensure_institutional_radar_rows, institutional_radar_items
 from app.cache.snapshot_cache import get_snapshot_signals
+from app.cache.snapshot_views import get_snapshot_view, register_snapshot_view
 from app.dependencies import require_active_plan
 from app.services.quote_service import get_cached_quote_payload
 from app.services.snapshot_contract import is_actionable_snapshot_row
@@ -123,33 +124,84 @@ def get_quote(
     }
 
 
+def _top_movers_view(signals):
+    movers = []
+
+    for row in signals:
+        if not isinstance(row, dict):
+            continue
+
+        intensity = _market_mover_intensity(row)
+
+        item = dict(row)
+        item["intensity"] = intensity
+        movers.append(item)
+
+    movers.sort(key=lambda item: item["intensity"], reverse=True)
+
+    return {
+        "count": len(movers[:20]),
+        "movers": movers[:20],
+    }
+
+
+register_snapshot_view("market_top_movers", _top_movers_view)
+
+
 @router.get("/top-movers")
 def get_top_movers(current_user=Depends(require_active_plan)):
     del current_user
 
     try:
-        signals = get_snapshot_signals()
-        movers = []
+        return get_snapshot_view("market_top_movers", get_snapshot_signals())
+    except Exception as exc:
+        logger.exception("Top movers error: %s", exc)
+        raise HTTPException(status_code=500, detail="Unable to fetch movers")
 
-        for row in signals:
-            if not isinstance(row, dict):
-                continue
 
-            intensity = _market_mover_intensity(row)
+def _market_radar_view(raw_signals):
+    has_radar_contract = any(isinstance(row, dict) and ("radar_prioritization_score" in row or "radar_priority_score" in row) for row in raw_signals)
+    signals = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(raw_signals)))
+    radar_signals = institutional_radar_items(signals, limit=50)
+    if not radar_signals and not has_radar_contract:
+        radar_signals = [row for row in signals if is_actionable_snapshot_row(row)]
+    buckets = {
+        "momentum": [],
+        "liquidity_sweep": [],
+        "bearish": [],
+    }
 
-            item = dict(row)
-            item["intensity"] = intensity
-            movers.append(item)
+    for row in radar_signals:
+        if not isinstance(row, dict):
+            continue
 
-        movers.sort(key=lambda item: item["intensity"], reverse=True)
+        if not is_actionable_snapshot_row(row):
+            continue
 
-        return {
-            "count": len(movers[:20]),
-            "movers": movers[:20],
-        }
-    except Exception as exc:
-        logger.exception("Top movers error: %s", exc)
-        raise HTTPException(status_code=500, detail="Unable to fetch movers")
+        signal_name = str(row.get("signal", "")).upper()
+        events = " ".join(str(event) for event in row.get("events", []))
+        institutional = f"{row.get('radar_reason', '')} {row.get('radar_summary', '')} {row.get('radar_level', '')}"
+        haystack = f"{signal_name} {events} {institutional}".upper()
+
+        if "MOMENTUM" in haystack or row.get("radar_level"):
+            buckets["momentum"].append(row)
+
+        if "SWEEP" in haystack or "LIQUIDITY" in haystack:
+            buckets["liquidity_sweep"].append(row)
+
+        master_direction = str(row.get("master_direction") or "").upper()
+        master_score = _safe_float(row.get("master_score_raw", row.get("master_score", row.get("score"))))
+        if "BEARISH" in haystack or master_direction == "BEARISH" or master_score <= 30:
+            buckets["bearish"].append(row)
+
+    return {
+        "momentum": buckets["momentum"][:10],
+        "liquidity_sweep": buckets["liquidity_sweep"][:10],
+        "bearish": buckets["bearish"][:10],
+    }
+
+
+register_snapshot_view("market_radar_buckets", _market_radar_view)
 
 
 @router.get("/radar")
@@ -157,46 +209,7 @@ def get_market_radar(current_user=Depends(require_active_plan)):
     del current_user
 
     try:
-        raw_signals = get_snapshot_signals()
-        has_radar_contract = any(isinstance(row, dict) and ("radar_prioritization_score" in row or "radar_priority_score" in row) for row in raw_signals)
-        signals = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(raw_signals)))
-        radar_signals = institutional_radar_items(signals, limit=50)
-        if not radar_signals and not has_radar_contract:
-            radar_signals = [row for row in signals if is_actionable_snapshot_row(row)]
-        buckets = {
-            "momentum": [],
-            "liquidity_sweep": [],
-            "bearish": [],
-        }
-
-        for row in radar_signals:
-            if not isinstance(row, dict):
-                continue
-
-            if not is_actionable_snapshot_row(row):
-                continue
-
-            signal_name = str(row.get("signal", "")).upper()
-            events = " ".join(str(event) for event in row.get("events", []))
-            institutional = f"{row.get('radar_reason', '')} {row.get('radar_summary', '')} {row.get('radar_level', '')}"
-            haystack = f"{signal_name} {events} {institutional}".upper()
-
-            if "MOMENTUM" in haystack or row.get("radar_level"):
-                buckets["momentum"].append(row)
-
-            if "SWEEP" in haystack or "LIQUIDITY" in haystack:
-                buckets["liquidity_sweep"].append(row)
-
-            master_direction = str(row.get("master_direction") or "").upper()
-            master_score = _safe_float(row.get("master_score_raw", row.get("master_score", row.get("score"))))
-            if "BEARISH" in haystack or master_direction == "BEARISH" or master_score <= 30:
-                buckets["bearish"].append(row)
-
-        return {
-            "momentum": buckets["momentum"][:10],
-            "liquidity_sweep": buckets["liquidity_sweep"][:10],
-            "bearish": buckets["bearish"][:10],
-        }
+        return get_snapshot_view("market_radar_buckets", get_snapshot_signals())
     except Exception as exc:
         logger.exception("Market radar error: %s", exc)
         raise HTTPException(status_code=500, detail="Radar unavailable")
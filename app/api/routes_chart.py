@@ -6,6 +6,7 @@ from app.cache.snapshot_cache import get_snapshot_signals
 from app.dependencies import require_any_channel_access
 from app.engine.chart_signal_adapter import build_chart_signal_payload
 from app.market.market_data_loader import get_cached_chart_data
+from app.market.ohlcv import chart_rows_as_list
 from app.models import User
 from app.services.chart_overlay_service import build_chart_overlays
 from app.services.snapshot_contract import snapshot_surface_row
@@ -22,7 +23,7 @@ def _normalize_chart_ticker(value: str) -> str:
 
 
 def _load_chart_data_fast(ticker: str, interval: str):
-    cached = get_cached_chart_data(ticker, interval) or load_chart_data_cache_first(ticker, interval)
+    cached = get_cached_chart_data(ticker, interval) or chart_rows_as_list(load_chart_data_cache_first(ticker, interval))
     record_cache_access("chart", bool(cached), "app_chart")
     return cached or []
 
@@ -131,8 +131,13 @@ async def websocket_chat(websocket: WebSocket, symbol: str):
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await room_ws_manager.connect(symbol, websocket)
-    await websocket.send_json(
+    if not await room_ws_manager.connect(symbol, websocket):
+        return
+    # Every frame to this socket goes through its outbox, so the history, pongs and
+    # errors keep their order with the room broadcasts and never block on the client.
+    await room_ws_manager.send(
+        symbol,
+        websocket,
         {
             "type": "history",
             "symbol": symbol,
@@ -146,7 +151,7 @@ async def websocket_chat(websocket: WebSocket, symbol: str):
             message_type = str(payload.get("type") or "message").lower()
 
             if message_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                await room_ws_manager.send(symbol, websocket, {"type": "pong"})
                 continue
 
             text = str(payload.get("text") or "").strip()
@@ -161,10 +166,14 @@ async def websocket_chat(websocket: WebSocket, symbol: str):
             )
 
             if item is None:
-                await websocket.send_json({"type": "error", "detail": "chat_message_failed"})
+                await room_ws_manager.send(symbol, websocket, {"type": "error", "detail": "chat_message_failed"})
                 continue
             if isinstance(item, dict) and item.get("error"):
-                await websocket.send_json({"type": "error", "detail": item.get("reason", "chat_message_blocked")})
+                await room_ws_manager.send(
+                    symbol,
+                    websocket,
+                    {"type": "error", "detail": item.get("reason", "chat_message_blocked")},
+                )
                 continue
 
             await room_ws_manager.broadcast(
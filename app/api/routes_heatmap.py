@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends
+from app.cache.snapshot_cache import get_snapshot_signals
+from app.cache.snapshot_views import get_snapshot_view, register_snapshot_view
 from app.dependencies import require_channel_access
 from app.ai.market_heatmap import generate_market_heatmap
 
 router = APIRouter(dependencies=[Depends(require_channel_access("app"))])
 
+register_snapshot_view("market_heatmap", lambda signals: generate_market_heatmap(signals or []))
+
 
 @router.get("/market/heatmap")
 def market_heatmap():
 
-    return generate_market_heatmap()
+    return get_snapshot_view("market_heatmap", get_snapshot_signals())
@@ -1,3 +1,4 @@
+import hashlib
 import math
 import re
 from datetime import datetime, timedelta, timezone
@@ -9,13 +10,16 @@ from fastapi import APIRouter, Depends, Query
 
 from app.dependencies import resolve_premium_entitlement
 
-from app.cache.snapshot_cache import get_snapshot, get_snapshot_ticker
+from app.ai.conclusion_generator import conclusion_cache_generation
+from app.cache.snapshot_cache import get_snapshot, get_snapshot_generation, get_snapshot_ticker
 from app.engine.chart_signal_adapter import build_chart_signal_payload
 from app.market.market_data_loader import (
+    chart_cache_generation,
     get_display_symbol,
     previous_session_close,
     session_change,
 )
+from app.market.ohlcv import OHLCVSeries, chart_rows_as_list
 from app.services.chart_overlay_service import build_chart_overlays
 from app.services.public_ai_tools_service import build_public_ai_tools_payload
 from app.services.public_market_data_service import (
@@ -30,8 +34,9 @@ from app.services.public_market_data_service import (
     public_daily_freshness_status,
     schedule_quote_warmup,
 )
+from app.services.public_bundle_cache import cached_bundle
 from app.services.public_news_service import build_public_news_payload
-from app.services.news_service import normalize_news_locale
+from app.services.news_service import get_news_cache_info, normalize_news_locale
 from app.services.quote_service import (
     classify_quote_payload,
     empty_quote_payload,
@@ -441,6 +446,8 @@ def _is_blocked_public_symbol(symbol: str) -> bool:
 
 
 def _numeric_close_values(ohlc):
+    if isinstance(ohlc, OHLCVSeries):
+        return ohlc.close[ohlc.close > 0].tolist() if "close" in ohlc.fields else []
     closes = []
     for row in ohlc or []:
         try:
@@ -897,6 +904,8 @@ def _safe_float(value, default: float = 0.0) -> float:
 
 
 def _json_safe_payload(value):
+    if isinstance(value, OHLCVSeries):
+        value = value.to_rows()
     if isinstance(value, dict):
         return {key: _json_safe_payload(item) for key, item in value.items()}
     if isinstance(value, (list, tuple)):
@@ -1485,7 +1494,7 @@ def public_market_chart(
     return _json_safe_payload({
         "ticker": response_symbol,
         "interval": chart_interval,
-        "ohlc": ohlc,
+        "ohlc": chart_rows_as_list(ohlc),
         "series": overlays["series"],
         "markers": overlays["markers"],
         "zones": zones,
@@ -1580,7 +1589,52 @@ def public_market_bundle(
     cached_payloads = cached_price_payloads(_symbol_aliases(ticker), allow_stale=True)
     quote = _resolve_cached_quote(cached_payloads, ticker)
     record_cache_access("quote", _has_usable_quote_payload(quote), "public_bundle")
+    # Clients poll this every 3 s; while none of the bundle inputs moved, every poll
+    # gets the payload the previous one built (see app.services.public_bundle_cache).
+    entitlement = is_premium if isinstance(is_premium, bool) else None
+    return cached_bundle(
+        (ticker, chart_interval, safe_limit, locale, entitlement),
+        _bundle_input_generation(ticker, response_symbol, chart_interval, locale, quote),
+        lambda: _build_market_bundle(ticker, response_symbol, chart_interval, safe_limit, locale, quote, is_premium),
+    )
+
+
+_BUNDLE_QUOTE_IDENTITY_FIELDS = (
+    "price", "change_pct", "timestamp", "updated_at", "quote_time",
+    "market_data_updated_at", "source", "quote_status", "stale",
+)
+_BUNDLE_NEWS_IDENTITY_FIELDS = ("status", "timestamp", "checked_at", "items", "provider_status", "provider_error")
+_BUNDLE_ANALYSIS_IDENTITY_FIELDS = ("status", "updated_at", "retry_count", "started_at")
+
+
+def _bundle_input_generation(ticker: str, response_symbol: str, chart_interval: str, locale: str, quote: dict) -> str:
+    """Cheap fingerprint of every cache the bundle reads; it moves when any of them is republished."""
+    intervals = {chart_interval, _DAILY_CANDLE_INTERVAL, "@5M", "1D", "3M"}
+    warm_range = _CANDLE_INTERVAL_WARM_RANGE.get(str(chart_interval or "").upper().strip())
+    if warm_range:
+        intervals.add(warm_range)
+    news_info = get_news_cache_info(response_symbol, locale=normalize_news_locale(locale))
+    analysis = get_symbol_analysis(ticker, chart_interval)
+    inputs = (
+        tuple(quote.get(field) for field in _BUNDLE_QUOTE_IDENTITY_FIELDS) if isinstance(quote, dict) else None,
+        chart_cache_generation(_symbol_aliases(ticker), sorted(intervals)),
+        get_snapshot_generation(),
+        tuple(news_info.get(field) for field in _BUNDLE_NEWS_IDENTITY_FIELDS),
+        tuple(analysis.get(field) for field in _BUNDLE_ANALYSIS_IDENTITY_FIELDS),
+        conclusion_cache_generation(),
+    )
+    return hashlib.sha1(repr(inputs).encode("utf-8")).hexdigest()
+
 
+def _build_market_bundle(
+    ticker: str,
+    response_symbol: str,
+    chart_interval: str,
+    safe_limit: int,
+    locale: str,
+    quote: dict,
+    is_premium: bool,
+) -> dict:
     insight = public_market_insight(ticker, interval=chart_interval, is_premium=True)
     # The top card is labelled "RSI diário (D1)", so it must be computed on DAILY
     # candles. Range "1D" is one day of 5m candles -- using it here is what made the
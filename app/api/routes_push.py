@@ -4,10 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.dependencies import require_active_plan, require_internal_token
 from app.models import User
 from app.services.push_service import (
+    get_push_preferences,
     get_push_status,
     list_push_tokens_public,
     register_push_token,
     send_push_notification,
+    set_push_alerts_enabled,
     unregister_push_token,
 )
 
@@ -22,6 +24,10 @@ class PushUnregisterRequest(BaseModel):
     token: str = Field(..., min_length=16, max_length=4096)
 
 
+class PushPreferencesRequest(BaseModel):
+    alerts_enabled: bool
+
+
 class PushSendRequest(BaseModel):
     user_id: int
     title: str = Field(..., min_length=1, max_length=120)
@@ -70,6 +76,19 @@ def push_unregister(
     return unregister_push_token(current_user.id, payload.token)
 
 
+@router.get("/push/preferences")
+def push_preferences(current_user: User = Depends(require_active_plan)):
+    return get_push_preferences(current_user.id)
+
+
+@router.post("/push/preferences")
+def push_update_preferences(
+    payload: PushPreferencesRequest,
+    current_user: User = Depends(require_active_plan),
+):
+    return set_push_alerts_enabled(current_user.id, payload.alerts_enabled)
+
+
 @router.post("/push/test-send")
 def push_test_send(
     payload: PushSendRequest,
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 
 from app.cache.snapshot_cache import get_snapshot_signals
+from app.cache.snapshot_views import get_snapshot_view, register_snapshot_view
 from app.dependencies import require_channel_access
 from app.ai.final_decision import ensure_final_decision_rows
 from app.ai.institutional_priority import ensure_institutional_priority_rows
@@ -10,11 +11,10 @@ from app.services.snapshot_contract import is_actionable_snapshot_row, snapshot_
 router = APIRouter(dependencies=[Depends(require_channel_access("app"))])
 
 
-@router.get("/market/radar")
-def radar():
+def _radar_view(signals):
     data = []
 
-    rows = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(get_snapshot_signals())))
+    rows = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(signals)))
     for row in institutional_radar_items(rows, limit=50):
         if not isinstance(row, dict):
             continue
@@ -33,3 +33,11 @@ def radar():
     output = list(deduped.values())
     output.sort(key=lambda row: float(row.get("radar_prioritization_score", row.get("master_score", row.get("score", 0))) or 0), reverse=True)
     return output[:20]
+
+
+register_snapshot_view("market_radar_top20", _radar_view)
+
+
+@router.get("/market/radar")
+def radar():
+    return get_snapshot_view("market_radar_top20", get_snapshot_signals())
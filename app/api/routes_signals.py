@@ -3,10 +3,12 @@
 # =====================================================
 
 import logging
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 
-from app.cache.snapshot_cache import get_snapshot_info, get_snapshot_signals
+from app.api.routes_snapshot import projection_response
+from app.cache.snapshot_cache import get_snapshot_projection
+from app.cache.snapshot_projection import signals_tail
 from app.dependencies import require_channel_access
 
 router = APIRouter(dependencies=[Depends(require_channel_access("app"))])
@@ -19,28 +21,15 @@ logger = logging.getLogger("stocknewsbr.routes.signals")
 # =====================================================
 
 @router.get("/signals")
-def get_signals():
+def get_signals(request: Request):
 
     try:
 
-        signals = get_snapshot_signals()
-        cache_info = get_snapshot_info()
+        # {"status", "signals", "meta"} encoded once per snapshot generation; only the
+        # live meta.cache_age_seconds is rendered per request.
+        projection = get_snapshot_projection("signals")
 
-        return {
-
-            "status": "ok",
-
-            "signals": signals,
-
-            "meta": {
-
-                "total_signals": cache_info.get("signals", 0),
-                "cache_age_seconds": cache_info.get("age_seconds"),
-                "last_update": cache_info.get("timestamp")
-
-            }
-
-        }
+        return projection_response(request, projection, signals_tail(projection))
 
     except Exception:
 
@@ -1,14 +1,40 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
-from app.cache.market_snapshot_cache import get_snapshot, get_snapshot_info
+from app.cache.market_snapshot_cache import get_snapshot_info, get_snapshot_projection
+from app.cache.snapshot_projection import SnapshotProjection
 from app.dependencies import require_channel_access
 
 router = APIRouter(dependencies=[Depends(require_channel_access("app"))])
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" and "x" name the same entity.
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def projection_response(request: Request, projection: SnapshotProjection, tail: bytes = b"") -> Response:
+    """Serve pre-serialized snapshot bytes: 304 on a matching ETag, gzip when accepted.
+
+    The body is already compressed, so Content-Encoding is set here and
+    GZipMiddleware passes the response through untouched.
+    """
+    headers = {"ETag": projection.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), projection.etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(projection.gzip_body(tail), media_type="application/json", headers=headers)
+    return Response(projection.body(tail), media_type="application/json", headers=headers)
+
+
 @router.get("/market/snapshot")
-def market_snapshot():
-    return get_snapshot()
+def market_snapshot(request: Request):
+    return projection_response(request, get_snapshot_projection("snapshot"))
 
 
 @router.get("/market/snapshot/info")
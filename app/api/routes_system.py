@@ -20,6 +20,8 @@ from app.system.observability_engine import build_observability_dashboard, get_m
 from app.system.kill_switches import get_kill_switch_status
 from app.system.paper_trading import get_paper_trading_status, summarize_paper_trading_status
 from app.system.system_metrics import format_prometheus_metrics, get_metrics_snapshot, get_performance_metrics_snapshot
+from app.system.worker_pipeline import get_worker_pipeline_status
+from app.system.worker_profiler import get_worker_profile
 from app.telegram.telegram_alert_engine import get_telegram_health
 
 router = APIRouter(
@@ -317,6 +319,16 @@ def ai_worker_history(limit: int = 10):
     return {"items": get_ai_worker_history(limit=limit)}
 
 
+@router.get("/worker/profile")
+def worker_profile(limit: int = 10):
+    return get_worker_profile(limit=limit)
+
+
+@router.get("/worker/pipeline")
+def worker_pipeline_status():
+    return get_worker_pipeline_status()
+
+
 @router.get("/ai-tabs/report")
 def ai_tabs_report(refresh: bool = False):
     if refresh:
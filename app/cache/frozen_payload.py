@@ -0,0 +1,107 @@
+# =====================================================
+# FROZEN PAYLOAD
+# =====================================================
+
+"""Read-only containers for published snapshots.
+
+SnapshotCache used to deepcopy the whole snapshot (hundreds of enriched rows plus the
+AI tool sections) on every get(), get_signals(), get_by_ticker() and info() call, so
+each public request paid for a full clone it almost never mutated.
+
+A snapshot is now frozen once when it is published and readers share that reference.
+FrozenDict and FrozenList subclass dict and list, so isinstance checks, json.dumps
+and the FastAPI encoder see ordinary containers. Every in-place mutation raises
+TypeError instead of silently corrupting the shared generation.
+
+A caller that needs to edit takes an explicit copy:
+
+* `dict(row)` / `list(rows)` / `rows[:n]` -- a mutable top level over frozen children;
+* `thaw(payload)` or `copy.deepcopy(payload)` -- a fully mutable deep copy.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(
+        f"{type(self).__name__} is a shared read-only snapshot; "
+        "take a copy (dict(...), list(...) or thaw(...)) before mutating"
+    )
+
+
+class FrozenDict(dict):
+    __slots__ = ()
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    __slots__ = ()
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __iadd__ = _read_only
+    __imul__ = _read_only
+    append = _read_only
+    clear = _read_only
+    extend = _read_only
+    insert = _read_only
+    pop = _read_only
+    remove = _read_only
+    reverse = _read_only
+    sort = _read_only
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> list:
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy of `value`; already-frozen containers are reused as-is."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Fully mutable deep copy of a (possibly frozen) payload."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(thaw(item) for item in value)
+    if isinstance(value, frozenset):
+        return set(value)
+    return value
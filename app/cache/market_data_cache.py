@@ -5,6 +5,9 @@ import time
 from typing import Iterable, Optional, Tuple
 
 from app.config import SYMBOLS
+from app.market.download_scheduler import download_scheduler
+from app.market.market_data_provider import get_market_data_provider
+from app.market.market_universe import get_all_tickers
 from app.services.symbol_sanitizer import (
     crypto_provider_symbol,
     is_permanently_blocked_symbol,
@@ -15,15 +18,19 @@ from app.services.symbol_sanitizer import (
 from app.system.system_metrics import current_provider_call_source, record_external_provider_call, record_worker_stage_duration
 
 logger = logging.getLogger("stocknewsbr.market_cache")
-_YFINANCE = None
 
 CACHE_TTL = 60
 PROVIDER_FAILURE_COOLDOWN_SECONDS = 180
 
+DEFAULT_MAX_CACHE_SYMBOLS = 250
+
+# Explicit cap on the symbols kept in the cache. Unset, the cap follows the market
+# universe (never below DEFAULT_MAX_CACHE_SYMBOLS), so a full chunked round is cached
+# whole instead of being downloaded again on the next request.
 try:
-    MAX_CACHE_SYMBOLS = max(1, int(os.getenv("MARKET_DATA_MAX_CACHE_SYMBOLS", "250")))
-except (TypeError, ValueError):
-    MAX_CACHE_SYMBOLS = 250
+    MAX_CACHE_SYMBOLS: Optional[int] = max(1, int(os.environ["MARKET_DATA_MAX_CACHE_SYMBOLS"]))
+except (KeyError, TypeError, ValueError):
+    MAX_CACHE_SYMBOLS = None
 
 _cache_data = None
 _cache_key: Tuple[str, ...] = tuple()
@@ -37,12 +44,8 @@ _refresh_lock = threading.RLock()
 
 
 def _get_yfinance():
-    global _YFINANCE
-    if _YFINANCE is None:
-        import yfinance as yf_module
-
-        _YFINANCE = yf_module
-    return _YFINANCE
+    """The configured market data provider (yfinance unless MARKET_DATA_PROVIDER says otherwise)."""
+    return get_market_data_provider()
 
 
 def _normalize_tickers(tickers: Optional[Iterable[str]]) -> Tuple[str, ...]:
@@ -85,11 +88,8 @@ def _available_symbols(data) -> Optional[Tuple[str, ...]]:
     if columns is None:
         return tuple()
     if hasattr(columns, "levels"):
-        seen = []
-        for symbol in columns.get_level_values(0):
-            if symbol not in seen:
-                seen.append(symbol)
-        return tuple(seen)
+        # Ordered de-duplication; a chunked round can carry thousands of symbols.
+        return tuple(dict.fromkeys(columns.get_level_values(0)))
     return None
 
 
@@ -129,6 +129,12 @@ def _cache_satisfies(requested_key: Tuple[str, ...], now: float) -> bool:
     return set(requested_key).issubset(set(_cache_key))
 
 
+def _max_cache_symbols() -> int:
+    if MAX_CACHE_SYMBOLS is not None:
+        return MAX_CACHE_SYMBOLS
+    return max(DEFAULT_MAX_CACHE_SYMBOLS, len(get_all_tickers()))
+
+
 def _store_cache_locked(data, requested_key: Tuple[str, ...], now: float) -> None:
     """Stores a provider payload without poisoning coverage.
 
@@ -152,8 +158,9 @@ def _store_cache_locked(data, requested_key: Tuple[str, ...], now: float) -> Non
     if not present:
         return
 
-    if len(present) > MAX_CACHE_SYMBOLS:
-        capped = present[:MAX_CACHE_SYMBOLS]
+    limit = _max_cache_symbols()
+    if len(present) > limit:
+        capped = present[:limit]
         capped_data = _extract_subset(data, capped)
         if capped_data is None:
             return
@@ -223,7 +230,6 @@ def fetch_market_data(tickers: Tuple[str, ...]):
             for ticker in tickers:
                 record_external_provider_call("yfinance", "market_cache_download", duration_seconds=duration, success=False, symbol=ticker, error="empty_data")
             record_worker_stage_duration("market_download", duration, success=False)
-            _mark_provider_cooldown("empty_data")
             return None
 
         duration = time.perf_counter() - start
@@ -237,11 +243,59 @@ def fetch_market_data(tickers: Tuple[str, ...]):
         for ticker in tickers:
             record_external_provider_call("yfinance", "market_cache_download", duration_seconds=duration, success=False, symbol=ticker, error=str(exc))
         record_worker_stage_duration("market_download", duration, success=False)
-        _mark_provider_cooldown(str(exc) or "exception")
         return None
 
 
-def get_market_data(tickers=None):
+def _present_symbols(data, tickers: Tuple[str, ...]) -> Tuple[str, ...]:
+    available = _available_symbols(data)
+    if available is None:
+        return tickers if len(tickers) == 1 else tuple()
+    requested = set(tickers)
+    return tuple(symbol for symbol in available if symbol in requested)
+
+
+def _merge_chunks(frames):
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0][1]
+
+    import pandas as pd
+
+    parts = []
+    for request, data in frames:
+        if not hasattr(getattr(data, "columns", None), "levels"):
+            # A single-symbol chunk may come back with flat OHLCV columns.
+            data = pd.concat({request[0]: data}, axis=1)
+        parts.append(data)
+    return pd.concat(parts, axis=1)
+
+
+def _download_universe(requested_key: Tuple[str, ...], on_chunk=None):
+    """Chunked provider download; failures cool down their chunk, not the provider."""
+    start = time.perf_counter()
+    downloaded = download_scheduler.run(
+        requested_key,
+        # Resolved per call so the module-level fetch stays the single provider seam.
+        lambda chunk: fetch_market_data(chunk),
+        _present_symbols,
+        on_chunk,
+    )
+    record_worker_stage_duration(
+        "market_download_round", time.perf_counter() - start, success=not downloaded.all_failed
+    )
+    if downloaded.all_failed:
+        # Every chunk failed: that is the provider, not a chunk.
+        _mark_provider_cooldown("all_chunks_failed")
+    return _merge_chunks([(request, data) for request, data in downloaded.frames])
+
+
+def get_market_data(tickers=None, on_chunk=None):
+    """Provider bars for `tickers`, in yf.download(group_by="ticker") layout.
+
+    `on_chunk(symbols, data)` is called as each downloaded chunk arrives, before the
+    merged frame is returned; it is not called for answers served from the cache.
+    """
     requested_key = _normalize_tickers(tickers)
 
     if not requested_key:
@@ -261,7 +315,11 @@ def get_market_data(tickers=None):
             if _cache_satisfies(requested_key, now):
                 return _extract_subset(_cache_data, requested_key)
 
-        data = fetch_market_data(requested_key)
+        if current_provider_call_source() == "http" or _provider_in_cooldown(now):
+            # Blocked before any chunk is planned; fetch_market_data records why.
+            data = fetch_market_data(requested_key)
+        else:
+            data = _download_universe(requested_key, on_chunk)
 
         if data is None:
             with _lock:
@@ -300,6 +358,7 @@ class MarketDataCacheCompatibility:
             _last_update = 0.0
             _provider_cooldown_until = 0.0
             _last_provider_failure_log = 0.0
+        download_scheduler.reset()
 
 
 market_data_cache = MarketDataCacheCompatibility()
@@ -2,6 +2,7 @@ from app.cache.snapshot_cache import (  # noqa: F401
     get_snapshot,
     get_snapshot_by_ticker,
     get_snapshot_info,
+    get_snapshot_projection,
     get_snapshot_signals,
     update_snapshot,
 )
@@ -10,6 +11,7 @@ __all__ = [
     "get_snapshot",
     "get_snapshot_by_ticker",
     "get_snapshot_info",
+    "get_snapshot_projection",
     "get_snapshot_signals",
     "update_snapshot",
 ]
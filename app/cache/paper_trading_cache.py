@@ -1,61 +1,16 @@
 from __future__ import annotations
 
-import atexit
 import json
 import os
-import shutil
-import sys
-import tempfile
 import threading
 import time
 from pathlib import Path
 from typing import Any, Dict
 
 from app.core.atomic_io import read_json_file_consistent, write_json_file_atomic
+from app.core.test_runtime import is_test_process, runtime_scratch_root
 
 _PROJECT_ROOT = Path(__file__).resolve().parents[2]
-_TEST_RUNTIME_ROOT: Path | None = None
-_TEST_RUNTIME_CLEANUP_REGISTERED = False
-
-
-def _is_test_process() -> bool:
-    explicit = os.getenv("STOCKNEWSBR_TEST_MODE")
-    if explicit is not None:
-        return explicit.strip().lower() in {"1", "true", "yes", "on"}
-    argv = " ".join(str(arg).lower() for arg in sys.argv)
-    return (
-        "pytest" in argv
-        or (
-            "unittest" in argv
-            and ("discover" in argv or "tests" in argv or "test_" in argv)
-        )
-        or any(str(arg).lower().startswith("tests.") for arg in sys.argv)
-        or any(Path(str(arg)).name.lower().startswith("test_") for arg in sys.argv)
-    )
-
-
-def _cleanup_test_runtime_root(path: Path) -> None:
-    try:
-        shutil.rmtree(path, ignore_errors=True)
-    except Exception:
-        pass
-
-
-def _test_runtime_root() -> Path:
-    global _TEST_RUNTIME_ROOT
-    global _TEST_RUNTIME_CLEANUP_REGISTERED
-
-    if _TEST_RUNTIME_ROOT is None:
-        _TEST_RUNTIME_ROOT = (
-            Path(tempfile.gettempdir())
-            / "stocknewsbr-tests"
-            / f"paper-trading-{os.getpid()}"
-        )
-        _TEST_RUNTIME_ROOT.mkdir(parents=True, exist_ok=True)
-    if not _TEST_RUNTIME_CLEANUP_REGISTERED:
-        atexit.register(_cleanup_test_runtime_root, _TEST_RUNTIME_ROOT)
-        _TEST_RUNTIME_CLEANUP_REGISTERED = True
-    return _TEST_RUNTIME_ROOT
 
 
 def _paper_runtime_path() -> Path:
@@ -63,8 +18,8 @@ def _paper_runtime_path() -> Path:
     if configured:
         path = Path(configured)
         return path if path.is_absolute() else _PROJECT_ROOT / path
-    if _is_test_process():
-        return _test_runtime_root() / "runtime" / "cache" / "paper_trading.json"
+    if is_test_process():
+        return runtime_scratch_root("paper-trading") / "runtime" / "cache" / "paper_trading.json"
     return _PROJECT_ROOT / "runtime" / "cache" / "paper_trading.json"
 
 
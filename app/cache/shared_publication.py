@@ -0,0 +1,288 @@
+# =====================================================
+# SHARED PUBLICATION
+# Cross-process, per-key decodable segments
+# =====================================================
+
+"""Cross-process publication of one generation of a cache file, decodable per key.
+
+The worker writes runtime/cache/snapshot.json and market_quotes.json, and every
+uvicorn worker process re-parsed the whole document whenever its mtime moved: with N
+API processes each publish became N full parses, even when a request only needed a
+handful of quotes or the snapshot's last-good copy had not changed at all.
+
+Next to the file, the writer now publishes the same generation as a segment on a
+shared-memory filesystem (/dev/shm): every top-level key is JSON-encoded separately
+and laid out back to back behind a small header, followed by an offsets index:
+
+    header  <8s I Q d Q Q>  magic, format, generation, published_at, index offset, index length
+    blobs   key 1 | key 2 | ...
+    index   {"source": [mtime_ns, size], "keys": {key: [offset, length]}}
+
+Readers mmap the segment and decode only the keys they ask for. A segment is written
+to a temporary name and renamed into place, so a reader holding the previous mapping
+keeps a consistent view and the next stat() picks up the new one.
+
+The segment records the (mtime_ns, size) of the file it was published with. A reader
+only trusts it while that still matches the file, so anything that writes the file
+without publishing (an older process, a test fixture, an operator) is picked up through
+the file path as before. Where no shared-memory directory is available (Windows, a
+read-only /dev/shm, SHARED_PUBLICATION_DIR=off) publish() is a no-op and every read
+falls back to the file.
+
+multiprocessing.shared_memory was the other candidate. Independent uvicorn processes
+would have to discover the current block by name, a named block cannot be swapped
+atomically, and before Python 3.13 every attaching process registers the block with
+its resource tracker, which unlinks it when that reader exits. A renamed file on tmpfs
+is the same memory without those hazards. Segments a process published are unlinked at
+its exit; readers then use the file until the next publish.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+logger = logging.getLogger("stocknewsbr.shared_publication")
+
+_MAGIC = b"SNBRSHM1"
+_FORMAT = 1
+_HEADER = struct.Struct("<8sIQdQQ")
+_DEFAULT_DIR = "/dev/shm/stocknewsbr"
+_DISABLED = {"", "0", "off", "false", "no", "none"}
+
+_published_paths: set = set()
+_published_lock = threading.Lock()
+_cleanup_registered = False
+
+
+def shared_publication_dir() -> Optional[Path]:
+    """Directory segments live in, or None when shared memory is not available."""
+    configured = os.getenv("SHARED_PUBLICATION_DIR")
+    if configured is not None:
+        if configured.strip().lower() in _DISABLED:
+            return None
+        return Path(configured)
+    if os.name == "nt" or not os.path.isdir("/dev/shm"):
+        return None
+    return Path(_DEFAULT_DIR)
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _unlink_published() -> None:
+    with _published_lock:
+        paths = list(_published_paths)
+        _published_paths.clear()
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _remember_published(path: Path) -> None:
+    global _cleanup_registered
+    with _published_lock:
+        _published_paths.add(str(path))
+        if not _cleanup_registered:
+            atexit.register(_unlink_published)
+            _cleanup_registered = True
+
+
+class SharedSegment:
+    """One mapped generation; keys are decoded on demand."""
+
+    __slots__ = ("generation", "published_at", "source", "_map", "_keys")
+
+    def __init__(self, buffer: mmap.mmap):
+        magic, version, generation, published_at, index_offset, index_length = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _FORMAT:
+            raise ValueError("not a shared publication segment")
+        index = json.loads(buffer[index_offset:index_offset + index_length])
+        self.generation = int(generation)
+        self.published_at = float(published_at)
+        source = index.get("source")
+        self.source = tuple(source) if isinstance(source, list) else None
+        self._keys: Dict[str, Tuple[int, int]] = {key: (int(span[0]), int(span[1])) for key, span in index["keys"].items()}
+        # Closed when the last SharedSegment referencing it goes away, never under a reader.
+        self._map = buffer
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def keys(self) -> Iterable[str]:
+        return self._keys.keys()
+
+    def raw(self, key: str) -> Optional[bytes]:
+        span = self._keys.get(key)
+        if span is None:
+            return None
+        offset, length = span
+        return self._map[offset:offset + length]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raw = self.raw(key)
+        return default if raw is None else json.loads(raw)
+
+
+class SharedPublication:
+    """Publishes and maps the segment that mirrors one cache file."""
+
+    def __init__(self, source: Path, directory: Optional[Path] = None):
+        self.source = Path(source)
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._mapped_key: Optional[Tuple[int, int, int]] = None
+        self._segment: Optional[SharedSegment] = None
+        self._generation = 0
+
+    def segment_path(self) -> Optional[Path]:
+        directory = self._directory if self._directory is not None else shared_publication_dir()
+        if directory is None:
+            return None
+        # The file's absolute path names the segment, so test and production caches never meet.
+        digest = hashlib.sha1(str(self.source.resolve()).encode("utf-8")).hexdigest()[:16]
+        return Path(directory) / f"{self.source.stem}-{digest}.seg"
+
+    # -------------------------------------------------
+    # WRITE
+    # -------------------------------------------------
+
+    def publish(self, entries: Mapping[str, Any], source_signature: Optional[Tuple[int, int]] = None) -> bool:
+        """Publish `entries` as the segment for the file's current content.
+
+        Call it after the file itself was replaced; `source_signature` defaults to the
+        file's current (mtime_ns, size). Returns False when shared memory is unavailable
+        or the write failed -- readers keep using the file.
+        """
+        path = self.segment_path()
+        if path is None:
+            return False
+        signature = source_signature or file_signature(self.source)
+        if signature is None:
+            return False
+
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._generation = max(self._generation + 1, time.time_ns())
+                generation = self._generation
+            offset = _HEADER.size
+            spans = {}
+            blobs = []
+            for key, value in entries.items():
+                blob = value if isinstance(value, bytes) else _encode(value)
+                spans[str(key)] = [offset, len(blob)]
+                blobs.append(blob)
+                offset += len(blob)
+            index = _encode({"source": list(signature), "keys": spans})
+            header = _HEADER.pack(_MAGIC, _FORMAT, generation, time.time(), offset, len(index))
+            with open(tmp, "wb") as handle:
+                handle.write(header)
+                for blob in blobs:
+                    handle.write(blob)
+                handle.write(index)
+            os.replace(tmp, path)
+        except Exception as exc:
+            logger.warning("Shared publication failed | path=%s | error=%s", path, exc)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        _remember_published(path)
+        return True
+
+    def unlink(self) -> None:
+        path = self.segment_path()
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._mapped_key = None
+            self._segment = None
+
+    # -------------------------------------------------
+    # READ
+    # -------------------------------------------------
+
+    def segment(self, expected_source: Optional[Tuple[int, int]] = None) -> Optional[SharedSegment]:
+        """The current segment, or None when there is none or it does not match the file.
+
+        `expected_source` is the file signature the caller is about to trust; it defaults
+        to the file's current (mtime_ns, size).
+        """
+        path = self.segment_path()
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        mapped_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            segment = self._segment if self._mapped_key == mapped_key else None
+        if segment is None:
+            segment = self._map(path)
+            if segment is None:
+                return None
+            with self._lock:
+                self._mapped_key = mapped_key
+                self._segment = segment
+
+        expected = expected_source if expected_source is not None else file_signature(self.source)
+        if expected is None or segment.source != tuple(expected):
+            return None
+        return segment
+
+    @staticmethod
+    def _map(path: Path) -> Optional[SharedSegment]:
+        try:
+            with open(path, "rb") as handle:
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return SharedSegment(buffer)
+        except Exception as exc:
+            logger.warning("Shared publication segment unreadable | path=%s | error=%s", path, exc)
+            buffer.close()
+            return None
+
+
+_PUBLICATIONS: Dict[str, SharedPublication] = {}
+_PUBLICATIONS_LOCK = threading.Lock()
+
+
+def shared_publication(source: Path) -> SharedPublication:
+    """Process-wide publication for the cache file `source`."""
+    key = str(Path(source).resolve())
+    with _PUBLICATIONS_LOCK:
+        publication = _PUBLICATIONS.get(key)
+        if publication is None:
+            publication = SharedPublication(source)
+            _PUBLICATIONS[key] = publication
+        return publication
@@ -4,15 +4,14 @@ import json
 import os
 import logging
 import hashlib
-import atexit
-import shutil
-import sys
-import tempfile
-from copy import deepcopy
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from app.cache.frozen_payload import FrozenDict, freeze
+from app.cache.shared_publication import SharedPublication
+from app.cache.snapshot_projection import PROJECTIONS, SnapshotProjection
 from app.core.atomic_io import read_json_file_consistent, write_json_file_atomic
+from app.core.test_runtime import is_test_process, runtime_scratch_root
 from app.services.snapshot_contract import (
     attach_decision_envelope,
     summarize_snapshot_rows,
@@ -39,8 +38,6 @@ from app.system.system_metrics import (
 
 logger = logging.getLogger("stocknewsbr.snapshot_cache")
 _PROJECT_ROOT = Path(__file__).resolve().parents[2]
-_TEST_RUNTIME_ROOT: Path | None = None
-_TEST_RUNTIME_CLEANUP_REGISTERED = False
 
 
 def _project_runtime_path(env_name: str, default_relative: str) -> Path:
@@ -55,54 +52,11 @@ def _project_runtime_path(env_name: str, default_relative: str) -> Path:
     return _PROJECT_ROOT / default_relative
 
 
-def _is_test_process() -> bool:
-    explicit = os.getenv("STOCKNEWSBR_TEST_MODE")
-    if explicit is not None:
-        return explicit.strip().lower() in {"1", "true", "yes", "on"}
-    if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("PYTEST_VERSION"):
-        return True
-    argv = " ".join(str(arg).lower() for arg in sys.argv)
-    return (
-        "pytest" in argv
-        or (
-            "unittest" in argv
-            and ("discover" in argv or "tests" in argv or "test_" in argv)
-        )
-        or ("discover" in argv and "tests" in argv)
-        or any(str(arg).lower().startswith("tests.") for arg in sys.argv)
-        or any(Path(str(arg)).name.lower().startswith("test_") for arg in sys.argv)
-    )
-
-
-def _cleanup_test_runtime_root(path: Path) -> None:
-    try:
-        shutil.rmtree(path, ignore_errors=True)
-    except Exception:
-        pass
-
-
-def _test_runtime_root() -> Path:
-    global _TEST_RUNTIME_ROOT
-    global _TEST_RUNTIME_CLEANUP_REGISTERED
-
-    if _TEST_RUNTIME_ROOT is None:
-        _TEST_RUNTIME_ROOT = (
-            Path(tempfile.gettempdir())
-            / "stocknewsbr-tests"
-            / f"snapshot-cache-{os.getpid()}"
-        )
-        _TEST_RUNTIME_ROOT.mkdir(parents=True, exist_ok=True)
-    if not _TEST_RUNTIME_CLEANUP_REGISTERED:
-        atexit.register(_cleanup_test_runtime_root, _TEST_RUNTIME_ROOT)
-        _TEST_RUNTIME_CLEANUP_REGISTERED = True
-    return _TEST_RUNTIME_ROOT
-
-
 def _snapshot_runtime_path(env_name: str, default_relative: str) -> Path:
     if os.getenv(env_name):
         return _project_runtime_path(env_name, default_relative)
-    if _is_test_process():
-        return _test_runtime_root() / "runtime" / "cache" / Path(default_relative).name
+    if is_test_process():
+        return runtime_scratch_root("snapshot-cache") / "runtime" / "cache" / Path(default_relative).name
     return _project_runtime_path(env_name, default_relative)
 
 
@@ -143,9 +97,9 @@ SNAPSHOT_DISK_WRITE_MIN_INTERVAL_SECONDS = _env_float(
 
 class SnapshotCache:
     def __init__(self):
-        self._payload: Dict[str, Any] = self._empty_payload()
+        self._payload: Dict[str, Any] = freeze(self._empty_payload())
         self._timestamp: float = 0.0
-        self._last_good_payload: Dict[str, Any] = self._empty_payload()
+        self._last_good_payload: Dict[str, Any] = freeze(self._empty_payload())
         self._last_good_timestamp: float = 0.0
         self._disk_mtime: float = 0.0
         self._last_disk_write_at: float = 0.0
@@ -155,9 +109,15 @@ class SnapshotCache:
         self._lock = threading.RLock()
         self._disk_write_lock = threading.Lock()
         self._write_epoch = 0
+        # Bumped whenever _payload is replaced; keys the pre-serialized projections.
+        self._generation = 0
+        self._projections: Dict[str, SnapshotProjection] = {}
+        self._projection_lock = threading.Lock()
+        self._publish_listeners: List[Callable[[int], None]] = []
         self._storage_path = _snapshot_runtime_path(
             "SNAPSHOT_CACHE_FILE", "runtime/cache/snapshot.json"
         )
+        self._shared: Optional[SharedPublication] = None
 
     @staticmethod
     def _parse_timestamp(val: Any) -> float:
@@ -337,25 +297,26 @@ class SnapshotCache:
             return False
         return True
 
-    def _clone_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        try:
-            return deepcopy(payload)
-        except Exception:
-            try:
-                return json.loads(json.dumps(payload, ensure_ascii=False, default=str))
-            except Exception:
-                return self._empty_payload()
-
     def _ensure_storage_dir(self):
         self._storage_path.parent.mkdir(parents=True, exist_ok=True)
 
+    def _shared_publication(self) -> SharedPublication:
+        # Tests repoint _storage_path; the segment always mirrors the current file.
+        shared = self._shared
+        if shared is None or shared.source != self._storage_path:
+            shared = self._shared = SharedPublication(self._storage_path)
+        return shared
+
     def _write_to_disk_payload(self, payload: Dict[str, Any]) -> tuple[bool, float]:
         try:
             self._ensure_storage_dir()
             write_json_file_atomic(self._storage_path, payload, ensure_ascii=False)
-            return True, self._storage_path.stat().st_mtime
+            stat = self._storage_path.stat()
         except Exception:
             return False, 0.0
+        # API processes read the envelope back key by key from shared memory.
+        self._shared_publication().publish(payload, (stat.st_mtime_ns, stat.st_size))
+        return True, stat.st_mtime
 
     def _write_to_disk(self, payload: Dict[str, Any]) -> tuple[bool, float]:
         return self._write_to_disk_payload(payload)
@@ -387,42 +348,60 @@ class SnapshotCache:
                     )
                 return
 
-            file_mtime = self._storage_path.stat().st_mtime
+            file_stat = self._storage_path.stat()
+            file_mtime = file_stat.st_mtime
             should_reload = file_mtime > self._disk_mtime or (
                 self._disk_mtime <= 0.0 and self._timestamp == 0.0 and file_mtime > 0
             )
             if not should_reload:
                 return
 
-            raw, stable_mtime, _stable_size = read_json_file_consistent(
-                self._storage_path,
-                lambda: {},
+            segment = self._shared_publication().segment(
+                (file_stat.st_mtime_ns, file_stat.st_size)
             )
-            if not isinstance(raw, dict):
-                raise ValueError(
-                    f"Invalid snapshot cache schema: expected dict, got {type(raw).__name__}"
-                )
-
-            if "payload" in raw:
-                payload_data = raw.get("payload")
-                last_good_data = raw.get("last_good_payload")
-                timestamp = self._parse_timestamp(raw.get("timestamp"))
+            if segment is not None and "payload" in segment:
+                # Published by the writer with this exact file: decode only what moved.
+                stable_mtime = file_mtime
+                payload_data = segment.get("payload")
+                timestamp = self._parse_timestamp(segment.get("timestamp"))
                 last_good_timestamp = self._parse_timestamp(
-                    raw.get("last_good_timestamp")
+                    segment.get("last_good_timestamp")
+                )
+                last_good_data = (
+                    segment.get("last_good_payload")
+                    if last_good_timestamp > self._last_good_timestamp
+                    else None
                 )
             else:
-                if "signals" not in raw and not any(
-                    k in raw for k in ("generated_at", "as_of", "updated_at")
-                ):
+                raw, stable_mtime, _stable_size = read_json_file_consistent(
+                    self._storage_path,
+                    lambda: {},
+                )
+                if not isinstance(raw, dict):
                     raise ValueError(
-                        "Invalid snapshot cache schema: missing envelope or legacy markers"
+                        f"Invalid snapshot cache schema: expected dict, got {type(raw).__name__}"
                     )
-                payload_data = raw
-                last_good_data = None
-                timestamp = self._parse_timestamp(
-                    raw.get("generated_at") or raw.get("as_of") or raw.get("updated_at")
-                )
-                last_good_timestamp = 0.0
+
+                if "payload" in raw:
+                    payload_data = raw.get("payload")
+                    last_good_data = raw.get("last_good_payload")
+                    timestamp = self._parse_timestamp(raw.get("timestamp"))
+                    last_good_timestamp = self._parse_timestamp(
+                        raw.get("last_good_timestamp")
+                    )
+                else:
+                    if "signals" not in raw and not any(
+                        k in raw for k in ("generated_at", "as_of", "updated_at")
+                    ):
+                        raise ValueError(
+                            "Invalid snapshot cache schema: missing envelope or legacy markers"
+                        )
+                    payload_data = raw
+                    last_good_data = None
+                    timestamp = self._parse_timestamp(
+                        raw.get("generated_at") or raw.get("as_of") or raw.get("updated_at")
+                    )
+                    last_good_timestamp = 0.0
 
             payload = self._normalize_payload(payload_data)
 
@@ -441,7 +420,8 @@ class SnapshotCache:
                     or self._timestamp
                 )
                 if timestamp > mem_ts or self._timestamp == 0.0:
-                    self._payload = payload
+                    self._payload = freeze(payload)
+                    self._generation += 1
                     self._timestamp = (
                         timestamp if timestamp > 0 else (stable_mtime or file_mtime)
                     )
@@ -449,7 +429,7 @@ class SnapshotCache:
                 if last_good_data is not None:
                     last_good_payload = self._normalize_payload(last_good_data)
                     if last_good_timestamp > self._last_good_timestamp:
-                        self._last_good_payload = last_good_payload
+                        self._last_good_payload = freeze(last_good_payload)
                         self._last_good_timestamp = last_good_timestamp
 
                 self._disk_mtime = stable_mtime or file_mtime
@@ -493,11 +473,13 @@ class SnapshotCache:
         return bool(incoming_at) and incoming_at < current_at
 
     def update(self, data: Any):
-        normalized = self._clone_payload(self._normalize_payload(data))
+        # _normalize_payload() rebuilds the top level and freeze() copies every nested
+        # container, so the published generation never aliases the caller's data.
+        normalized = self._normalize_payload(data)
         now = time.time()
         normalized["updated_at"] = now
         normalized.setdefault("generated_at", now)
-        normalized = attach_go_live_status(normalized, now=now)
+        normalized = freeze(attach_go_live_status(normalized, now=now))
         signature = self._payload_signature(normalized)
 
         disk_payload = None
@@ -512,6 +494,7 @@ class SnapshotCache:
                 previous_payload = self._payload
                 previous_timestamp = self._timestamp
                 self._payload = normalized
+                self._generation += 1
                 self._timestamp = now
                 cache_timestamp = self._timestamp
                 if self._is_promotable_last_good(self._payload):
@@ -520,14 +503,11 @@ class SnapshotCache:
                         self._last_good_signature = signature
                     else:
                         # Preserve historical last_good by creating fresh clone with updated timestamps
-                        # Since we only mutate top-level keys, a shallow copy is safe
-                        self._last_good_payload = dict(self._payload)
-                        self._last_good_payload["updated_at"] = self._payload.get(
-                            "updated_at"
-                        )
-                        self._last_good_payload["generated_at"] = self._payload.get(
-                            "generated_at"
-                        )
+                        # Since we only replace top-level keys, a shallow copy is safe
+                        last_good = dict(self._payload)
+                        last_good["updated_at"] = self._payload.get("updated_at")
+                        last_good["generated_at"] = self._payload.get("generated_at")
+                        self._last_good_payload = FrozenDict(last_good)
                         self._last_good_signature = signature
                     self._last_good_timestamp = self._timestamp
                 elif not self._payload.get("signals") and self._is_promotable_last_good(
@@ -553,13 +533,19 @@ class SnapshotCache:
                     disk_ts_ref = self._timestamp
                     disk_last_good_ts_ref = self._last_good_timestamp
                     write_epoch = self._write_epoch
+                published_generation = self._generation
+                listeners = list(self._publish_listeners)
+
+            # Listeners hear about the new generation before the disk write, not after it.
+            self._notify_publish_listeners(listeners, published_generation)
 
             if should_write:
+                # Both payloads are frozen, so the writer serializes them without a copy.
                 disk_payload = {
                     "timestamp": disk_ts_ref,
-                    "payload": self._clone_payload(disk_payload_ref),
+                    "payload": disk_payload_ref,
                     "last_good_timestamp": disk_last_good_ts_ref,
-                    "last_good_payload": self._clone_payload(disk_last_good_ref),
+                    "last_good_payload": disk_last_good_ref,
                 }
 
             if disk_payload is not None:
@@ -583,8 +569,7 @@ class SnapshotCache:
         start = time.perf_counter()
         self._load_from_disk_if_needed()
         with self._lock:
-            payload_ref = self._payload
-        payload = self._clone_payload(payload_ref)
+            payload = self._payload
         record_cache_lookup(
             "snapshot", time.perf_counter() - start, len(payload.get("signals", []))
         )
@@ -594,8 +579,7 @@ class SnapshotCache:
         start = time.perf_counter()
         self._load_from_disk_if_needed()
         with self._lock:
-            signals_ref = self._payload.get("signals", [])
-        signals = self._clone_payload({"signals": signals_ref}).get("signals", [])
+            signals = self._payload.get("signals", [])
         record_cache_lookup(
             "snapshot_signals", time.perf_counter() - start, len(signals)
         )
@@ -609,8 +593,7 @@ class SnapshotCache:
         start = time.perf_counter()
         self._load_from_disk_if_needed()
         with self._lock:
-            by_ticker_ref = self._payload.get("by_ticker", {})
-        payload = self._clone_payload(by_ticker_ref)
+            payload = self._payload.get("by_ticker", {})
         record_cache_lookup(
             "snapshot_by_ticker", time.perf_counter() - start, len(payload)
         )
@@ -630,19 +613,80 @@ class SnapshotCache:
                 return None
             size = len(by_ticker)
 
-            row_ref = None
             for ticker in tickers or []:
                 canonical_ticker = canonical_symbol(ticker)
                 row = by_ticker.get(canonical_ticker) or by_ticker.get(ticker)
                 if isinstance(row, dict):
-                    row_ref = row
+                    result = row
                     break
-        if row_ref is not None:
-            result = self._clone_payload(row_ref)
 
         record_cache_lookup("snapshot_by_ticker", time.perf_counter() - start, size)
         return result
 
+    def generation(self) -> int:
+        """Identity of the published payload; moves on every publish, disk reload or clear."""
+        self._load_from_disk_if_needed()
+        with self._lock:
+            return self._generation
+
+    def published(self) -> Tuple[int, Dict[str, Any]]:
+        """(generation, payload) of the current publication, read together."""
+        self._load_from_disk_if_needed()
+        with self._lock:
+            return self._generation, self._payload
+
+    def add_publish_listener(self, callback: Callable[[int], None]) -> None:
+        """Call `callback(generation)` after every update() that publishes a payload.
+
+        It runs on the publishing thread, so it must only hand off (set an event,
+        schedule a task). Publications loaded from disk written by another process do
+        not fire it; those only show up in generation().
+        """
+        with self._lock:
+            if callback not in self._publish_listeners:
+                self._publish_listeners.append(callback)
+
+    def remove_publish_listener(self, callback: Callable[[int], None]) -> None:
+        with self._lock:
+            if callback in self._publish_listeners:
+                self._publish_listeners.remove(callback)
+
+    @staticmethod
+    def _notify_publish_listeners(listeners: List[Callable[[int], None]], generation: int) -> None:
+        for callback in listeners:
+            try:
+                callback(generation)
+            except Exception as exc:
+                logger.warning("Snapshot publish listener failed: %s", exc)
+
+    def projection(self, name: str) -> SnapshotProjection:
+        """Pre-serialized `name` projection (see snapshot_projection.PROJECTIONS).
+
+        Built at most once per generation: the first reader after a publish encodes it
+        while concurrent readers wait for that build instead of repeating it.
+        """
+        start = time.perf_counter()
+        self._load_from_disk_if_needed()
+        with self._lock:
+            generation = self._generation
+            cached = self._projections.get(name)
+        if cached is None or cached.generation != generation:
+            with self._projection_lock:
+                with self._lock:
+                    generation = self._generation
+                    payload = self._payload
+                    timestamp = self._timestamp
+                    cached = self._projections.get(name)
+                if cached is None or cached.generation != generation:
+                    cached = PROJECTIONS[name](generation, payload, timestamp)
+                    with self._lock:
+                        if self._generation == generation:
+                            self._projections[name] = cached
+        record_cache_lookup(
+            f"snapshot_projection_{name}", time.perf_counter() - start, len(cached.head)
+        )
+        return cached
+
     def info(self) -> Dict[str, Any]:
         start = time.perf_counter()
         self._load_from_disk_if_needed()
@@ -655,7 +699,7 @@ class SnapshotCache:
             last_good_source = self._last_good_payload.get("source")
             last_good_generated_at = self._last_good_payload.get("generated_at")
 
-        payload = self._clone_payload(payload_ref)
+        payload = payload_ref
 
         age_seconds = None
 
@@ -716,9 +760,10 @@ class SnapshotCache:
         with self._disk_write_lock:
             with self._lock:
                 self._write_epoch += 1
-                self._payload = self._empty_payload()
+                self._payload = freeze(self._empty_payload())
+                self._generation += 1
                 self._timestamp = 0.0
-                self._last_good_payload = self._empty_payload()
+                self._last_good_payload = freeze(self._empty_payload())
                 self._last_good_timestamp = 0.0
                 previous_disk_mtime = self._disk_mtime
                 self._last_disk_write_at = 0.0
@@ -753,7 +798,8 @@ class SnapshotCache:
             payload_ref = self._last_good_payload
             lg_ts = self._last_good_timestamp or None
 
-        payload = self._clone_payload(payload_ref)
+        # Shallow top level so the timestamp can be attached; rows stay shared and frozen.
+        payload = dict(payload_ref)
         payload["last_good_timestamp"] = lg_ts
         record_cache_lookup(
             "snapshot_last_good",
@@ -778,15 +824,12 @@ class SnapshotCache:
                 return None
             size = len(by_ticker)
 
-            row_ref = None
             for ticker in tickers or []:
                 canonical_ticker = canonical_symbol(ticker)
                 row = by_ticker.get(canonical_ticker) or by_ticker.get(ticker)
                 if isinstance(row, dict):
-                    row_ref = row
+                    result = row
                     break
-        if row_ref is not None:
-            result = self._clone_payload(row_ref)
 
         record_cache_lookup(
             "snapshot_last_good_by_ticker", time.perf_counter() - start, size
@@ -821,6 +864,18 @@ def get_snapshot_info() -> Dict[str, Any]:
     return snapshot_cache.info()
 
 
+def get_snapshot_generation() -> int:
+    return snapshot_cache.generation()
+
+
+def get_published_snapshot() -> Tuple[int, Dict[str, Any]]:
+    return snapshot_cache.published()
+
+
+def get_snapshot_projection(name: str) -> SnapshotProjection:
+    return snapshot_cache.projection(name)
+
+
 def get_last_good_snapshot() -> Dict[str, Any]:
     return snapshot_cache.get_last_good()
 
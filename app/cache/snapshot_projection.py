@@ -0,0 +1,103 @@
+# =====================================================
+# SNAPSHOT PROJECTIONS
+# =====================================================
+
+"""Pre-serialized public projections of one snapshot generation.
+
+/market/snapshot and /signals used to run jsonable_encoder + json.dumps over the
+whole snapshot on every request, and GZipMiddleware then compressed the same
+megabyte again. The snapshot only changes once per SCAN_INTERVAL (~20 s), so each
+projection is now encoded and gzip-compressed once per generation and the routes
+write the cached bytes out directly, answering If-None-Match with 304.
+
+A projection may end in a short per-request tail (e.g. /signals' live
+`cache_age_seconds`). The head is compressed once and the deflate state is kept, so
+gzipping a request's tail costs a compressor copy plus a few bytes, not a full
+recompression. Projections with a tail get a weak ETag: the head identifies the
+generation and the tail only carries what drifts with wall-clock time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import zlib
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+
+# zlib level 6 is what GZipMiddleware uses; paid once per generation, not per request.
+GZIP_LEVEL = 6
+_GZIP_WBITS = 31
+
+
+def encode_json(value: Any) -> bytes:
+    """Same bytes FastAPI's default JSONResponse would render for `value`."""
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class SnapshotProjection:
+    """Encoded head of one projection, plus its gzip stream up to that point."""
+
+    __slots__ = ("name", "generation", "etag", "head", "timestamp", "_gzip_head", "_compressor", "_gzip_closed")
+
+    def __init__(self, name: str, generation: int, head: bytes, *, timestamp: float = 0.0, weak: bool = False):
+        self.name = name
+        self.generation = generation
+        self.head = head
+        self.timestamp = timestamp
+        digest = hashlib.sha1(head).hexdigest()[:20]
+        self.etag = f'W/"{digest}"' if weak else f'"{digest}"'
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, _GZIP_WBITS)
+        self._gzip_head = compressor.compress(head)
+        self._compressor = compressor
+        # Tail-less projections are served whole; close their gzip stream up front.
+        self._gzip_closed = None if weak else self._gzip_head + compressor.copy().flush()
+
+    def body(self, tail: bytes = b"") -> bytes:
+        return self.head + tail if tail else self.head
+
+    def gzip_body(self, tail: bytes = b"") -> bytes:
+        if not tail and self._gzip_closed is not None:
+            return self._gzip_closed
+        compressor = self._compressor.copy()
+        return self._gzip_head + compressor.compress(tail) + compressor.flush()
+
+
+def _snapshot_projection(generation: int, payload: Dict[str, Any], timestamp: float) -> SnapshotProjection:
+    return SnapshotProjection("snapshot", generation, encode_json(payload), timestamp=timestamp)
+
+
+def _signals_projection(generation: int, payload: Dict[str, Any], timestamp: float) -> SnapshotProjection:
+    signals = payload.get("signals", [])
+    meta = {"total_signals": len(signals), "last_update": timestamp or None}
+    # The meta object stays open so signals_tail() can append the live cache age.
+    head = (
+        b'{"status":"ok","signals":'
+        + encode_json(signals)
+        + b',"meta":'
+        + encode_json(meta)[:-1]
+        + b',"cache_age_seconds":'
+    )
+    return SnapshotProjection("signals", generation, head, timestamp=timestamp, weak=True)
+
+
+def signals_tail(projection: SnapshotProjection, now: float | None = None) -> bytes:
+    """Closing bytes of the /signals body: the age SnapshotCache.info() would report."""
+    age = None
+    if projection.timestamp:
+        age = max(0, int((time.time() if now is None else now) - projection.timestamp))
+    return (b"null" if age is None else str(age).encode("ascii")) + b"}}"
+
+
+PROJECTIONS: Dict[str, Callable[[int, Dict[str, Any], float], SnapshotProjection]] = {
+    "snapshot": _snapshot_projection,
+    "signals": _signals_projection,
+}
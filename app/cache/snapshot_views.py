@@ -0,0 +1,125 @@
+# =====================================================
+# SNAPSHOT DERIVED VIEWS
+# =====================================================
+
+"""Derived views of one snapshot generation, built once and shared by every reader.
+
+/market/radar ran ensure_institutional_radar_rows, ensure_institutional_priority_rows
+and ensure_final_decision_rows over every snapshot signal, then deduped and sorted,
+on each request; /market/heatmap regrouped the whole signal list the same way. The
+snapshot only changes once per scan, so every request between two publishes
+recomputed the same answer.
+
+A route now registers a pure builder for its view and reads it through
+`get_snapshot_view(name, source)`. `source` is what the builder consumes (normally
+`get_snapshot_signals()`). The result is frozen and cached under the snapshot
+generation together with the identity of that source. The first reader after a
+publish builds it lazily; concurrent readers of the same view wait for that build
+instead of repeating it. A source that is not the published one (a route handed
+other rows) is never answered from the cache of another source.
+
+Build time, build count and hit/miss counts per view are recorded in system_metrics
+(`snapshot_view_*` in /metrics).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.cache.frozen_payload import freeze
+from app.cache.snapshot_cache import get_snapshot_generation
+from app.system.system_metrics import record_snapshot_view_build, record_snapshot_view_read
+
+logger = logging.getLogger("stocknewsbr.snapshot_views")
+
+_UNSET = object()
+
+
+class SnapshotView:
+    """One registered view: its builder and the (generation, source, value) last built."""
+
+    __slots__ = ("name", "builder", "lock", "entry")
+
+    def __init__(self, name: str, builder: Callable[[Any], Any]):
+        self.name = name
+        self.builder = builder
+        self.lock = threading.Lock()
+        # Replaced as a whole, so a lock-free reader never pairs one key with another value.
+        self.entry: Tuple[Optional[int], Any, Any] = (None, _UNSET, None)
+
+    def lookup(self, generation: int, source: Any) -> Any:
+        cached_generation, cached_source, value = self.entry
+        if cached_generation == generation and cached_source is source:
+            return value
+        return _UNSET
+
+
+class SnapshotViewRegistry:
+
+    def __init__(self, generation: Optional[Callable[[], int]] = None):
+        self._generation = generation or get_snapshot_generation
+        self._lock = threading.Lock()
+        self._views: Dict[str, SnapshotView] = {}
+
+    def register(self, name: str, builder: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Register `builder(source) -> value` as view `name`; returns the builder."""
+        with self._lock:
+            self._views[name] = SnapshotView(name, builder)
+        return builder
+
+    def get(self, name: str, source: Any) -> Any:
+        """Frozen `name` view of `source`, built at most once per snapshot generation."""
+        view = self._views[name]
+        generation = self._generation()
+        value = view.lookup(generation, source)
+        if value is _UNSET:
+            with view.lock:
+                value = view.lookup(generation, source)
+                if value is _UNSET:
+                    value = self._build(view, generation, source)
+                    record_snapshot_view_read(name, hit=False)
+                    return value
+        record_snapshot_view_read(name, hit=True)
+        return value
+
+    @staticmethod
+    def _build(view: SnapshotView, generation: int, source: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            value = freeze(view.builder(source))
+        except Exception:
+            record_snapshot_view_build(view.name, time.perf_counter() - start, generation, success=False)
+            logger.warning("Snapshot view %s failed to build for generation %s", view.name, generation)
+            raise
+        record_snapshot_view_build(view.name, time.perf_counter() - start, generation)
+        view.entry = (generation, source, value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            views = list(self._views.values()) if name is None else [self._views[name]]
+        for view in views:
+            with view.lock:
+                view.entry = (None, _UNSET, None)
+
+    def names(self):
+        with self._lock:
+            return sorted(self._views)
+
+
+snapshot_views = SnapshotViewRegistry()
+
+
+def register_snapshot_view(name: str, builder: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return snapshot_views.register(name, builder)
+
+
+def get_snapshot_view(name: str, source: Any) -> Any:
+    return snapshot_views.get(name, source)
+
+
+def reset_snapshot_views() -> None:
+    snapshot_views.invalidate()
@@ -0,0 +1,171 @@
+# =====================================================
+# SINGLE FLIGHT
+# One in-flight provider call per key
+# =====================================================
+
+"""Coalesces concurrent calls for the same key into one execution.
+
+get_chart_data, get_price_snapshots and the news fetch checked their cache, missed,
+and called the provider. Every caller that arrived before the first call populated
+the cache made its own provider call for the same symbol: a popular symbol opened by
+many clients, or requested at the same time by symbol_hydration, chart_warmup and
+news_warmup, turned into a burst of identical requests.
+
+A SingleFlight keeps one Flight per in-flight key, usually flight_key(kind, symbol,
+interval, period). The first caller leads and runs the call. Callers that arrive
+while it runs wait on the same Flight and get its result, or its exception. A waiter
+gives up after the flight's timeout with FlightTimeout, and the caller decides what
+to serve instead. Nothing is cached: once the flight lands the key is free, and the
+next miss starts a new flight.
+
+Outcomes (leader, coalesced, timeout, error) are counted per flight name in
+system_metrics as single_flight_calls_total.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.system.system_metrics import record_single_flight
+
+logger = logging.getLogger("stocknewsbr.single_flight")
+
+SINGLE_FLIGHT_TIMEOUT_SECONDS = max(0.1, float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "30") or 30))
+
+
+class FlightTimeout(TimeoutError):
+    """A waiter gave up on a flight that was still running."""
+
+
+def flight_key(kind: str, symbol: str, interval: Optional[str] = None, period: Optional[str] = None) -> Tuple:
+    return (str(kind), str(symbol or "").upper().strip(), interval, period)
+
+
+class Flight:
+    """One in-flight call; followers block in wait() until the leader finishes it."""
+
+    __slots__ = ("key", "started_at", "waiters", "_done", "_value", "_error")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.started_at = time.monotonic()
+        self.waiters = 0
+        self._done = threading.Event()
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        if not self._done.wait(timeout):
+            raise FlightTimeout(f"flight {self.key!r} still running after {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class SingleFlight:
+    """Registry of in-flight keys for one kind of call."""
+
+    def __init__(self, name: str, timeout: float = SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.name = name
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    # -------------------------------------------------
+    # SINGLE KEY
+    # -------------------------------------------------
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run `fn` once for all concurrent callers of `key` and return its result."""
+        owned, joined = self.claim((key,))
+        if joined:
+            return self.wait(joined[key], timeout)
+        flight = owned[key]
+        try:
+            value = fn()
+        except BaseException as exc:
+            self.fail(flight, exc)
+            raise
+        self.resolve(flight, value)
+        return value
+
+    # -------------------------------------------------
+    # MANY KEYS
+    # -------------------------------------------------
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Flight], Dict[Hashable, Flight]]:
+        """Split `keys` into flights this caller now leads and flights already running.
+
+        The caller must resolve() or fail() every flight it leads, typically after one
+        batched call, and may wait() on the others.
+        """
+        owned: Dict[Hashable, Flight] = {}
+        joined: Dict[Hashable, Flight] = {}
+        with self._lock:
+            for key in keys:
+                if key in owned or key in joined:
+                    continue
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = Flight(key)
+                    self._flights[key] = flight
+                    owned[key] = flight
+                else:
+                    flight.waiters += 1
+                    joined[key] = flight
+        for _ in owned:
+            record_single_flight(self.name, "leader")
+        return owned, joined
+
+    def resolve(self, flight: Flight, value: Any) -> None:
+        flight._value = value
+        self._finish(flight)
+
+    def fail(self, flight: Flight, error: BaseException) -> None:
+        flight._error = error
+        self._finish(flight)
+        record_single_flight(self.name, "error")
+
+    def wait(self, flight: Flight, timeout: Optional[float] = None) -> Any:
+        """Result of a flight another caller leads; raises its error or FlightTimeout."""
+        started = time.perf_counter()
+        try:
+            value = flight.result(self.timeout if timeout is None else timeout)
+        except FlightTimeout:
+            record_single_flight(self.name, "timeout", time.perf_counter() - started)
+            logger.warning("Single flight %s timed out waiting for %r", self.name, flight.key)
+            raise
+        record_single_flight(self.name, "coalesced", time.perf_counter() - started)
+        return value
+
+    def _finish(self, flight: Flight) -> None:
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight._done.set()
+
+
+_REGISTRY: Dict[str, SingleFlight] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def single_flight(name: str, timeout: float = SINGLE_FLIGHT_TIMEOUT_SECONDS) -> SingleFlight:
+    """Process-wide SingleFlight for `name`."""
+    with _REGISTRY_LOCK:
+        flights = _REGISTRY.get(name)
+        if flights is None:
+            flights = SingleFlight(name, timeout=timeout)
+            _REGISTRY[name] = flights
+        return flights
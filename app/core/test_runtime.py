@@ -0,0 +1,66 @@
+# =====================================================
+# TEST RUNTIME
+# Per-process scratch directory for state files under tests
+# =====================================================
+
+"""Keeps state files written during a test run out of the working tree.
+
+Caches, queues and registries that persist to runtime/ resolve their file in
+three steps: an explicit env override, then runtime_scratch_root(name) when
+is_test_process(), then the production default under the project root. Each name
+gets its own directory under <tmp>/stocknewsbr-tests, suffixed with the pid so
+parallel runs and spawned subprocesses never share files, and removed when the
+process exits.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict
+
+# The module name matches test_*.py; keep pytest from collecting it from the repo root.
+__test__ = False
+
+_roots: Dict[str, Path] = {}
+_roots_lock = threading.Lock()
+
+
+def is_test_process() -> bool:
+    explicit = os.getenv("STOCKNEWSBR_TEST_MODE")
+    if explicit is not None:
+        return explicit.strip().lower() in {"1", "true", "yes", "on"}
+    if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("PYTEST_VERSION"):
+        return True
+    argv = " ".join(str(arg).lower() for arg in sys.argv)
+    return (
+        "pytest" in argv
+        or ("unittest" in argv and ("discover" in argv or "tests" in argv or "test_" in argv))
+        or ("discover" in argv and "tests" in argv)
+        or any(str(arg).lower().startswith("tests.") for arg in sys.argv)
+        or any(Path(str(arg)).name.lower().startswith("test_") for arg in sys.argv)
+    )
+
+
+def _cleanup(path: Path) -> None:
+    try:
+        shutil.rmtree(path, ignore_errors=True)
+    except Exception:
+        pass
+
+
+def runtime_scratch_root(name: str) -> Path:
+    """Scratch directory for `name` in this process, created on first use."""
+    with _roots_lock:
+        root = _roots.get(name)
+        if root is None:
+            root = Path(tempfile.gettempdir()) / "stocknewsbr-tests" / f"{name}-{os.getpid()}"
+            _roots[name] = root
+            atexit.register(_cleanup, root)
+        root.mkdir(parents=True, exist_ok=True)
+        return root
@@ -2,11 +2,13 @@ import logging
 import os
 import threading
 import time
+from types import MappingProxyType
 from typing import Dict
 
 import pandas as pd
 
 from app.cache.market_data_cache import get_market_data
+from app.engine.store.market_memory_store import market_memory_store
 from app.market.market_data_loader import get_cached_chart_data
 from app.market.market_store import market_store
 from app.market.market_universe import get_all_tickers
@@ -15,7 +17,14 @@ logger = logging.getLogger("stocknewsbr.market.pool")
 
 WARM_POOL_TTL = max(5, int(os.getenv("WARM_POOL_TTL", "30")))
 
+# Published pools are never mutated (a refresh rebinds _pool), so readers get a
+# read-only view of the same dict instead of a copy per call. Downloads are also
+# appended straight into market_memory_store, and each published frame is linked
+# to its row there: engine stages read linked frames' bars as zero-copy views.
 _pool: Dict[str, object] = {}
+# ticker -> (rows key, frame): persistent chart frames are rebuilt only when the
+# cached chart rows move.
+_chart_frames: Dict[str, tuple] = {}
 _last_update = 0.0
 _last_empty_log = 0.0
 _lock = threading.RLock()
@@ -56,6 +65,29 @@ def _build_pool(data, tickers):
     return pool
 
 
+def _published(pool):
+    return MappingProxyType(pool)
+
+
+def _ingest_download(data, pool):
+    # The store takes the bars from the download itself; the pool's frames are
+    # only linked to the rows they match.
+    try:
+        market_memory_store.ingest_download(data, list(pool))
+        for ticker, frame in pool.items():
+            market_memory_store.link(ticker, frame)
+    except Exception as exc:
+        logger.warning("Market memory store ingest failed: %s", exc)
+
+
+def _chart_rows_key(rows):
+    try:
+        first, last = rows[0], rows[-1]
+        return (len(rows), first.get("time"), last.get("time"), last.get("close"), last.get("volume"))
+    except Exception:
+        return None
+
+
 def _build_persistent_chart_pool(tickers, existing_pool=None):
     pool = {}
     existing = set(existing_pool or {})
@@ -68,6 +100,12 @@ def _build_persistent_chart_pool(tickers, existing_pool=None):
         if not rows:
             continue
 
+        rows_key = _chart_rows_key(rows)
+        cached = _chart_frames.get(ticker)
+        if rows_key is not None and cached is not None and cached[0] == rows_key:
+            pool[ticker] = cached[1]
+            continue
+
         try:
             frame = pd.DataFrame(rows).rename(
                 columns={
@@ -88,6 +126,8 @@ def _build_persistent_chart_pool(tickers, existing_pool=None):
 
         frame.attrs["market_data_source"] = "persistent_chart_cache"
         pool[ticker] = frame
+        if rows_key is not None:
+            _chart_frames[ticker] = (rows_key, frame)
 
     return pool
 
@@ -110,16 +150,40 @@ def _update_pool_locked(force_refresh: bool = False):
 
     with _lock:
         if _pool and not force_refresh and now - _last_update < WARM_POOL_TTL:
-            return dict(_pool)
+            return _published(_pool)
 
     tickers = get_all_tickers()
 
     if not tickers:
         return {}
 
-    data = get_market_data(tickers)
+    # Symbols that left the universe give their rows in the store back.
+    universe = set(tickers)
+    dropped = [symbol for symbol in market_memory_store.symbols() if symbol not in universe]
+    if dropped:
+        market_memory_store.remove(dropped)
+        logger.info("Market memory store dropped %d symbols no longer in the universe", len(dropped))
+
+    streamed = {}
+
+    def merge_chunk(symbols, data):
+        # Chunks land while the rest of the universe is still downloading: their bars
+        # go into the store and the published pool right away.
+        global _pool
+        chunk_pool = _build_pool(data, list(symbols))
+        if not chunk_pool:
+            return
+        _ingest_download(data, chunk_pool)
+        streamed.update(chunk_pool)
+        with _lock:
+            _pool = {**_pool, **chunk_pool}
+
+    data = get_market_data(tickers, on_chunk=merge_chunk)
     now = time.time()
-    new_pool = _build_pool(data, tickers)
+    # Frames already split out of streamed chunks are reused rather than sliced again
+    # out of the merged universe frame.
+    built = _build_pool(data, [ticker for ticker in tickers if ticker not in streamed])
+    new_pool = {ticker: streamed.get(ticker, built.get(ticker)) for ticker in tickers if ticker in streamed or ticker in built}
     cached_pool = _build_persistent_chart_pool(tickers, new_pool)
     if cached_pool:
         logger.info("Warm data pool using fresh persistent chart cache for %d symbols", len(cached_pool))
@@ -131,10 +195,16 @@ def _update_pool_locked(force_refresh: bool = False):
             _last_empty_log = now
 
         with _lock:
-            return dict(_pool)
+            return _published(_pool)
+
+    try:
+        _ingest_download(data, built)
+        market_memory_store.ingest_pool(cached_pool)
+    except Exception as exc:
+        logger.warning("Market memory store ingest failed: %s", exc)
 
     with _lock:
-        _pool = dict(new_pool)
+        _pool = new_pool
         _last_update = now
         try:
             market_store.update(_pool)
@@ -142,30 +212,32 @@ def _update_pool_locked(force_refresh: bool = False):
             # Mission 31F: persistence failure must not drop the freshly
             # built in-memory snapshot. The error is logged, not masked.
             logger.warning("Warm data pool persistence failed: %s", exc)
-        return dict(_pool)
+        return _published(_pool)
 
 
 def get_market_pool(force_refresh: bool = False):
+    """Read-only view of the current pool (shared, never copied)."""
+    global _pool
     global _last_update
 
     now = time.time()
 
     with _lock:
         if _pool and not force_refresh and now - _last_update < WARM_POOL_TTL:
-            return dict(_pool)
+            return _published(_pool)
 
     if not force_refresh:
         with _refresh_lock:
             now = time.time()
             with _lock:
                 if _pool and now - _last_update < WARM_POOL_TTL:
-                    return dict(_pool)
+                    return _published(_pool)
 
             cached_store = market_store.get()
             if cached_store:
                 with _lock:
-                    _pool.update(cached_store)
+                    _pool = {**_pool, **cached_store}
                     _last_update = now
-                    return dict(_pool)
+                    return _published(_pool)
 
     return update_pool(force_refresh=force_refresh)
@@ -210,6 +210,27 @@ def _sanitize_array(arr: np.ndarray, name: str, ticker: str) -> np.ndarray:
     return arr
 
 
+def ticker_arrays(ticker, df):
+    """Sanitized float32 close/volume windows of one pool frame, or None when it is too short to score."""
+
+    return sanitized_window(ticker, df.Close.values[-200:], df.Volume.values[-200:])
+
+
+def sanitized_window(ticker, close, volume):
+    """Sanitized float32 copies of the last 200 close/volume values (None under 120 bars)."""
+
+    close = close[-200:]
+    volume = volume[-200:]
+
+    if len(close) < 120:
+        return None
+
+    close = _sanitize_array(close.astype(np.float32), "price", ticker)
+    volume = _sanitize_array(volume.astype(np.float32), "volume", ticker)
+
+    return close, volume
+
+
 def build_matrices(pool):
 
     tickers = []
@@ -221,14 +242,12 @@ def build_matrices(pool):
 
         try:
 
-            close = df.Close.values[-200:]
-            volume = df.Volume.values[-200:]
+            arrays = ticker_arrays(ticker, df)
 
-            if len(close) < 120:
+            if arrays is None:
                 continue
 
-            close = _sanitize_array(close.astype(np.float32), "price", ticker)
-            volume = _sanitize_array(volume.astype(np.float32), "volume", ticker)
+            close, volume = arrays
 
             tickers.append(ticker)
             prices.append(close)
@@ -254,54 +273,65 @@ def build_matrices(pool):
 # ENGINE RUNNER
 # =====================================================
 
-def run_engine(pool: Dict[str, object] | None = None):
+def engine_row(ticker, core, price_row, volume_row):
+    """Ranked row of one symbol from its compute_core outputs (in compute_core order)."""
 
-    try:
-        if pool is None:
-            pool = get_market_pool()
+    momentum, trend, volatility, smart_money, breakout, score = core
+    market_fields = _market_fields_from_matrices(price_row, volume_row)
 
-        if not pool:
-            return []
+    return {
 
-        tickers, price_matrix, volume_matrix = build_matrices(pool)
+        "ticker": ticker,
+        "symbol": ticker,
+        "score": float(score),
+        "momentum": float(momentum),
+        "trend": float(trend),
+        "volatility": float(volatility),
+        "smart_money": bool(smart_money),
+        "breakout": bool(breakout),
+        **market_fields,
 
-        if price_matrix is None:
-            return []
+    }
 
-        momentum, trend, volatility, smart_money, breakout, scores = compute_core(
-            price_matrix,
-            volume_matrix
-        )
 
-        idx = np.where(scores > 15)[0]
+def rank_rows(scores, row_for):
+    """Top 200 rows scoring above 15, best first; `row_for(i)` builds the row of index i."""
 
-        if idx.size == 0:
-            return []
+    idx = np.where(scores > 15)[0]
 
-        sorted_idx = idx[np.argsort(scores[idx])[::-1]]
+    if idx.size == 0:
+        return []
 
-        top_idx = sorted_idx[:200]
+    sorted_idx = idx[np.argsort(scores[idx])[::-1]]
 
-        results = []
+    return [row_for(i) for i in sorted_idx[:200]]
 
-        for i in top_idx:
-            market_fields = _market_fields_from_matrices(price_matrix[i], volume_matrix[i])
 
-            results.append({
+def run_engine(pool: Dict[str, object] | None = None, incremental=None):
+    """Rank the pool. With `incremental` (an incremental_scanner.IncrementalEngine) only
+    symbols whose bars changed since its previous cycle are recomputed."""
 
-                "ticker": tickers[i],
-                "symbol": tickers[i],
-                "score": float(scores[i]),
-                "momentum": float(momentum[i]),
-                "trend": float(trend[i]),
-                "volatility": float(volatility[i]),
-                "smart_money": bool(smart_money[i]),
-                "breakout": bool(breakout[i]),
-                **market_fields,
+    try:
+        if pool is None:
+            pool = get_market_pool()
 
-            })
+        if not pool:
+            return []
 
-        return results
+        if incremental is not None:
+            return incremental.rank(pool)
+
+        tickers, price_matrix, volume_matrix = build_matrices(pool)
+
+        if price_matrix is None:
+            return []
+
+        core = compute_core(price_matrix, volume_matrix)
+
+        return rank_rows(
+            core[5],
+            lambda i: engine_row(tickers[i], [column[i] for column in core], price_matrix[i], volume_matrix[i]),
+        )
 
     except Exception as e:
 
@@ -6,7 +6,16 @@
 # =====================================================
 
 import logging
+import os
+import threading
 import time
+import zlib
+
+import numpy as np
+
+from app.engine.core.engine_v36 import compute_core, engine_row, rank_rows, sanitized_window, ticker_arrays
+from app.engine.store.market_memory_store import market_memory_store
+from app.system.system_metrics import record_cache_access, record_engine_incremental_cycle
 
 logger = logging.getLogger("stocknewsbr.engine.incremental")
 
@@ -18,6 +27,9 @@ logger = logging.getLogger("stocknewsbr.engine.incremental")
 PRICE_EPSILON = 1e-9
 MAX_CACHE_SIZE = 5000
 
+# Bars hashed into a frame fingerprint: the engine never reads more than the last 200.
+FINGERPRINT_WINDOW = 200
+
 
 class IncrementalScanner:
 
@@ -114,4 +126,213 @@ class IncrementalScanner:
 
         except Exception as e:
 
-            logger.error(f"Incremental cleanup error: {e}")
\ No newline at end of file
+            logger.error(f"Incremental cleanup error: {e}")
+
+
+# =====================================================
+# FRAME FINGERPRINT
+# =====================================================
+
+def frame_fingerprint(frame):
+    """Content identity of the bars the engine reads from one pool frame.
+
+    Length, columns, last bar stamp and a CRC of the last FINGERPRINT_WINDOW rows. The
+    warm pool hands out new DataFrame objects on every refresh even when nothing
+    moved, so identity has to come from the data. The rows are read through
+    `frame.values` (one view of the float block for pool frames): boxing each column
+    as a Series would cost more than the compute_core row it is meant to save.
+    Returns None when the frame cannot be fingerprinted; such symbols are simply
+    recomputed every cycle.
+    """
+
+    try:
+
+        size = len(frame)
+
+        if size == 0:
+            return None
+
+        values = frame.values[-FINGERPRINT_WINDOW:]
+
+        if values.dtype.kind not in "biuf":
+            values = values.astype(np.float64)
+
+        crc = zlib.crc32(np.ascontiguousarray(values).tobytes())
+        source = getattr(frame, "attrs", {}).get("market_data_source")
+
+        return (size, tuple(frame.columns), frame.index[-1], source, crc)
+
+    except Exception:
+
+        return None
+
+
+# =====================================================
+# INCREMENTAL ENGINE
+# =====================================================
+
+ENGINE_INCREMENTAL = str(os.getenv("ENGINE_INCREMENTAL", "1") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class _SymbolState:
+
+    __slots__ = ("fingerprint", "close", "volume", "core", "row", "market_fields")
+
+    def __init__(self, fingerprint, arrays):
+
+        self.fingerprint = fingerprint
+        self.close, self.volume = arrays if arrays is not None else (None, None)
+        self.core = None
+        self.row = None
+        self.market_fields = None
+
+
+class IncrementalEngine:
+    """Engine V36 ranking that only recomputes symbols whose bars changed.
+
+    run_engine() used to rebuild the price/volume matrices from the whole warm pool,
+    re-sanitize every ticker and re-run compute_core for all of them on every cycle,
+    then re-derive the pandas market fields of every ranked row, although between two
+    cycles most symbols have no new bar. This keeps, per pool symbol, the sanitized
+    close/volume window, its compute_core outputs, its ranked row and its enriched
+    market fields, all keyed by frame_fingerprint(). A cycle fingerprints the pool,
+    batches only new/changed symbols through compute_core, and ranks the merged
+    scores exactly like run_engine() (compute_core rows depend on nothing but their
+    own bars, so the result is identical to a full rebuild over the same bars).
+
+    The process-wide instance reads symbols that the warm pool appended into
+    market_memory_store straight from its ring buffers, so an engine cycle builds no
+    per-ticker slices; the store version replaces the frame fingerprint.
+    """
+
+    def __init__(self, store=None):
+
+        # Symbols resident in `store` (a MarketMemoryStore) are read from its zero-copy
+        # views and fingerprinted by their store version; others from their frames.
+        self._store = store
+        self._lock = threading.Lock()
+        self._symbols = {}
+        # id(frame) -> (ticker, frame) of the last ranked pool, for enrichment lookups.
+        self._frames = {}
+        self.last_cycle = {"symbols": 0, "recomputed": 0, "reused": 0, "skipped": 0, "ranked": 0}
+
+    # =================================================
+    # RANK
+    # =================================================
+
+    def rank(self, pool):
+
+        start = time.perf_counter()
+
+        with self._lock:
+
+            symbols = {}
+            frames = {}
+            pending = []
+
+            store = self._store
+
+            for ticker, df in (pool or {}).items():
+
+                version = store.version(ticker) if store is not None else None
+                fingerprint = ("store", version) if version is not None else frame_fingerprint(df)
+                previous = self._symbols.get(ticker)
+                frames[id(df)] = (ticker, df)
+
+                if fingerprint is not None and previous is not None and previous.fingerprint == fingerprint:
+                    symbols[ticker] = previous
+                    continue
+
+                try:
+                    if version is not None:
+                        arrays = sanitized_window(ticker, store.view(ticker, "Close", 200), store.view(ticker, "Volume", 200))
+                    else:
+                        arrays = ticker_arrays(ticker, df)
+                except Exception:
+                    arrays = None
+
+                state = _SymbolState(fingerprint, arrays)
+                symbols[ticker] = state
+
+                if arrays is not None:
+                    pending.append((ticker, state))
+
+            if pending:
+                self._compute(pending)
+
+            self._symbols = symbols
+            self._frames = frames
+
+            scored = [(ticker, state) for ticker, state in symbols.items() if state.core is not None]
+            scores = np.asarray([state.core[5] for _ticker, state in scored], dtype=np.float32)
+            ranked = rank_rows(scores, lambda i: self._row(*scored[i]))
+
+            recomputed = len(pending)
+            reused = len(scored) - recomputed
+            self.last_cycle = {
+                "symbols": len(symbols),
+                "recomputed": recomputed,
+                "reused": reused,
+                "skipped": len(symbols) - recomputed - reused,
+                "ranked": len(ranked),
+            }
+
+        record_engine_incremental_cycle(recomputed, reused, len(ranked), time.perf_counter() - start)
+
+        return ranked
+
+    def _compute(self, pending):
+
+        min_len = min(len(state.close) for _ticker, state in pending)
+        price_matrix = np.asarray([state.close[-min_len:] for _ticker, state in pending], dtype=np.float32, order="C")
+        volume_matrix = np.asarray([state.volume[-min_len:] for _ticker, state in pending], dtype=np.float32, order="C")
+
+        core = compute_core(price_matrix, volume_matrix)
+
+        for i, (_ticker, state) in enumerate(pending):
+            state.core = [column[i] for column in core]
+
+    @staticmethod
+    def _row(ticker, state):
+
+        if state.row is None:
+            state.row = engine_row(ticker, state.core, state.close, state.volume)
+
+        return dict(state.row)
+
+    # =================================================
+    # ENRICHMENT CACHE
+    # =================================================
+
+    def market_fields(self, frame, compute):
+        """`compute(frame)`, reused while the frame's symbol keeps its fingerprint."""
+
+        with self._lock:
+            ticker, known = self._frames.get(id(frame), (None, None))
+            state = self._symbols.get(ticker) if known is frame else None
+
+        if state is None or state.fingerprint is None:
+            record_cache_access("engine_market_fields", False, "untracked")
+            return compute(frame)
+
+        cached = state.market_fields
+
+        if cached is not None:
+            record_cache_access("engine_market_fields", True, "fingerprint")
+            return cached[0]
+
+        fields = compute(frame)
+        state.market_fields = (fields,)
+        record_cache_access("engine_market_fields", False, "compute")
+
+        return fields
+
+    def reset(self):
+
+        with self._lock:
+            self._symbols = {}
+            self._frames = {}
+            self.last_cycle = {"symbols": 0, "recomputed": 0, "reused": 0, "skipped": 0, "ranked": 0}
+
+
+incremental_engine = IncrementalEngine(store=market_memory_store)
@@ -4,7 +4,8 @@
 
 import asyncio
 import logging
-import yfinance as yf
+
+from app.market.market_data_provider import get_market_data_provider
 
 logger = logging.getLogger("stocknewsbr.market.loader")
 
@@ -17,7 +18,7 @@ async def fetch_symbol(symbol):
 
         df = await loop.run_in_executor(
             None,
-            lambda: yf.download(
+            lambda: get_market_data_provider().download(
                 symbol,
                 period="5d",
                 interval="5m",
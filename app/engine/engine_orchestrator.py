@@ -6,16 +6,24 @@ import logging
 import os
 import time
 
+from functools import partial
+
+import numpy as np
+
 from app.cache.signal_cache import get_all_signals, update_signals
 from app.data.warm_data_pool import get_market_pool
 from app.engine.core.engine_v36 import run_engine as run_engine_v36
+from app.engine.core.incremental_scanner import ENGINE_INCREMENTAL, incremental_engine
 from app.engine.core.vector_scanner_engine import vector_scanner_engine
 from app.engine.events.price_event_engine import detect_price_events
+from app.engine.indicators import indicator_kernels as kernels
 from app.engine.matrix.build_market_matrices import build_market_matrices
 from app.engine.matrix.feature_matrix_engine import feature_matrix_engine
 from app.engine.ranking.ranking_engine_v2 import build_ranking
+from app.engine.store.market_memory_store import market_memory_store
 from app.system.observability_engine import record_cycle
-from app.system.system_metrics import record_signal_quality_coverage, record_worker_stage_duration
+from app.system.system_metrics import record_signal_quality_coverage
+from app.system.worker_profiler import profile_stage
 
 logger = logging.getLogger("stocknewsbr.engine.orchestrator")
 
@@ -36,6 +44,9 @@ def _env_int(name: str, default: int, minimum: int) -> int:
 
 EVENT_SCAN_SYMBOLS = _env_int("EVENT_SCAN_SYMBOLS", 80, 20)
 MARKET_POOL_SOURCE = "warm_market_pool"
+MARKET_FIELDS_WINDOW = 20
+_KERNEL_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+_KERNEL_REQUIRED = ("High", "Low", "Close", "Volume")
 
 
 def _safe_run(fn, *args, **kwargs):
@@ -228,20 +239,18 @@ def _compute_vwap(data):
         return None
 
 
-def _enrich_row_with_market_data(row, frame):
-    item = dict(row)
+def _market_fields_from_frame(frame):
+    """Market fields of the frame's latest bar, or None when it only supports a score."""
     data, close, latest = _latest_market_row(frame)
 
     if data is None or close is None or latest is None:
-        item.setdefault("data_quality", "score_only")
-        return item
+        return None
 
     price = _frame_value(latest, "Close")
     volume = _frame_value(latest, "Volume")
 
     if price is None or price <= 0 or volume is None or volume <= 0:
-        item.setdefault("data_quality", "score_only")
-        return item
+        return None
 
     prev_close = _safe_float(close.iloc[-2] if len(close) >= 2 else price, price)
     avg_volume = None
@@ -281,15 +290,141 @@ def _enrich_row_with_market_data(row, frame):
     if vwap is not None:
         market_fields["vwap"] = round(vwap, 6)
 
-    return {**item, **{key: value for key, value in market_fields.items() if value is not None}}
+    return {key: value for key, value in market_fields.items() if value is not None}
+
+
+def _market_fields_batch(frames, symbols=None, store=None):
+    """_market_fields_from_frame for many frames in one indicator kernel pass.
+
+    Returns {id(frame): (frame, fields)} for the frames the kernels reproduce exactly:
+    OHLCV columns only, at least MARKET_FIELDS_WINDOW bars once empty bars are
+    dropped, and no gap in High/Low/Close/Volume. Other frames are left out for
+    _market_fields_from_frame.
+
+    With a MarketMemoryStore and the pool symbol of each frame (`symbols`, aligned
+    with `frames`), a frame linked to its store row is read as the row's last
+    MARKET_FIELDS_WINDOW bars, the only ones the kernels use; its gap check covers
+    those bars.
+    """
+    eligible = []
+    for position, frame in enumerate(frames):
+        try:
+            columns = list(getattr(frame, "columns", []))
+            if not set(_KERNEL_REQUIRED).issubset(columns) or not set(columns).issubset(_KERNEL_COLUMNS):
+                continue
+            symbol = symbols[position] if symbols is not None else None
+            resident = store.frame_bars(symbol, frame, MARKET_FIELDS_WINDOW) if store is not None and symbol else None
+            if resident is not None:
+                # A linked frame has no empty bars, so its length is its bar count.
+                if len(frame) < MARKET_FIELDS_WINDOW or np.isnan(resident[1:]).any():
+                    continue
+                eligible.append((frame, resident.T, frame.index[-1], len(frame)))
+                continue
+            if columns == list(_KERNEL_COLUMNS):
+                values = frame.to_numpy(dtype="float64", na_value=np.nan)
+            else:
+                values = frame.reindex(columns=list(_KERNEL_COLUMNS)).to_numpy(dtype="float64", na_value=np.nan)
+            present = ~np.isnan(values).all(axis=1)
+            bars = values[present]
+            if len(bars) < MARKET_FIELDS_WINDOW or np.isnan(bars[:, 1:]).any():
+                continue
+            eligible.append((frame, bars, frame.index[present][-1], len(bars)))
+        except Exception:
+            continue
+
+    if not eligible:
+        return {}
+
+    width = max(len(bars) for _frame, bars, _stamp, _points in eligible)
+    open_, high, low, close, volume = (
+        kernels.stack_right_aligned([bars[:, column] for _frame, bars, _stamp, _points in eligible], width)
+        for column in range(5)
+    )
+    price = close[:, -1]
+    prev_close = close[:, -2]
+    last_volume, avg_volume, rel_volume = kernels.relative_volume(volume, MARKET_FIELDS_WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(prev_close != 0, (price - prev_close) / prev_close * 100.0, 0.0)
+    vwap = kernels.vwap(high, low, close, volume, MARKET_FIELDS_WINDOW)
+
+    batch = {}
+    columns = zip(
+        *(
+            series.tolist()
+            for series in (
+                price, prev_close, last_volume, avg_volume, rel_volume, change_pct,
+                open_[:, -1], high[:, -1], low[:, -1], vwap,
+            )
+        )
+    )
+    for (frame, _bars, stamp, points), values in zip(eligible, columns):
+        last_price, previous, last_vol, average_vol, relative_vol, change, opened, highest, lowest, vwap_value = values
+        if last_price <= 0 or last_vol <= 0:
+            batch[id(frame)] = (frame, None)
+            continue
+        market_source = getattr(frame, "attrs", {}).get("market_data_source", MARKET_POOL_SOURCE)
+        market_fields = {
+            "price": round(last_price, 6),
+            "close": round(last_price, 6),
+            "prev_close": round(previous, 6),
+            "volume": _int_if_whole(last_vol),
+            "avg_volume": int(average_vol),
+            "rel_volume": round(relative_vol, 4),
+            "change_pct": round(change, 4),
+            "data_quality": "priced",
+            "price_source": market_source,
+            "volume_source": market_source,
+            "market_data_points": points,
+            "market_data_updated_at": _market_stamp(stamp),
+        }
+        for target, value in (("open", opened), ("high", highest), ("low", lowest), ("vwap", vwap_value)):
+            if value == value:
+                market_fields[target] = round(value, 6)
+        batch[id(frame)] = (frame, market_fields)
+    return batch
+
+
+class _MarketFieldsBatch:
+    """Market fields for the frames of one enrichment pass, computed together on first use."""
+
+    def __init__(self, frames, symbols=None, store=None):
+        self._frames = frames
+        self._symbols = symbols
+        self._store = store
+        self._fields = None
+
+    def __call__(self, frame):
+        if self._fields is None:
+            self._fields = _market_fields_batch(self._frames, self._symbols, self._store)
+        known, fields = self._fields.get(id(frame), (None, None))
+        if known is frame:
+            return fields
+        return _market_fields_from_frame(frame)
+
+
+def _enrich_row_with_market_data(row, frame, market_fields=_market_fields_from_frame):
+    item = dict(row)
+    fields = market_fields(frame)
+
+    if fields is None:
+        item.setdefault("data_quality", "score_only")
+        return item
+
+    return {**item, **fields}
 
 
-def _enrich_ranked_with_market_data(ranked, pool):
+def _enrich_ranked_with_market_data(ranked, pool, market_fields=None, cache=None, store=None):
+    """Attach market fields from each row's pool frame.
+
+    Without an explicit `market_fields`, the frames of the pass are computed together
+    (_MarketFieldsBatch), reading frames linked in `store` from its rows;
+    `cache(frame, compute)`, when given, wraps that compute.
+    """
     if not ranked:
         return []
 
     lookup = _pool_lookup(pool)
-    enriched = []
+    pairs = []
 
     for row in ranked:
         if not isinstance(row, dict):
@@ -299,14 +434,28 @@ def _enrich_ranked_with_market_data(ranked, pool):
         frame = lookup.get(str(ticker or "").upper().strip())
         if frame is None:
             frame = lookup.get(_normalize_ticker(ticker))
+        pairs.append((row, frame))
+
+    if market_fields is None:
+        frames = [frame for _row, frame in pairs if frame is not None]
+        symbols = None
+        if store is not None:
+            keys = {id(frame): key for key, frame in (pool or {}).items()}
+            symbols = [keys.get(id(frame)) for frame in frames]
+        market_fields = _MarketFieldsBatch(frames, symbols, store)
+        if cache is not None:
+            market_fields = partial(cache, compute=market_fields)
+
+    enriched = []
 
+    for row, frame in pairs:
         if frame is None:
             item = dict(row)
             item.setdefault("data_quality", "score_only")
             enriched.append(item)
             continue
 
-        enriched.append(_enrich_row_with_market_data(row, frame))
+        enriched.append(_enrich_row_with_market_data(row, frame, market_fields))
 
     return enriched
 
@@ -315,23 +464,25 @@ def run_engine():
     start = time.perf_counter()
 
     try:
-        pool_start = time.perf_counter()
-        pool = _safe_run(get_market_pool)
-        record_worker_stage_duration("market_pool", time.perf_counter() - pool_start, success=bool(pool))
+        with profile_stage("market_pool") as stage:
+            pool = _safe_run(get_market_pool)
+            stage["ok"] = bool(pool)
 
         if not pool:
             record_cycle(time.perf_counter() - start, 0)
             return []
 
         ranked = []
-        ranking_start = time.perf_counter()
 
-        if ENGINE_MODE in ("AUTO", "V36"):
-            ranked = _safe_run(run_engine_v36, pool) or []
+        incremental = ENGINE_INCREMENTAL and ENGINE_MODE in ("AUTO", "V36")
 
-        if not ranked:
-            ranked = _run_legacy(pool)
-        record_worker_stage_duration("ranking", time.perf_counter() - ranking_start, success=bool(ranked))
+        with profile_stage("ranking") as stage:
+            if ENGINE_MODE in ("AUTO", "V36"):
+                ranked = _safe_run(run_engine_v36, pool, incremental=incremental_engine if incremental else None) or []
+
+            if not ranked:
+                ranked = _run_legacy(pool)
+            stage["ok"] = bool(ranked)
 
         if not ranked:
             cached = get_all_signals()
@@ -347,14 +498,20 @@ def run_engine():
             record_cycle(time.perf_counter() - start, 0)
             return []
 
-        event_start = time.perf_counter()
-        events_result = _safe_run(detect_price_events, pool, ranked, EVENT_SCAN_SYMBOLS)
+        with profile_stage("event_detection") as stage:
+            events_result = _safe_run(detect_price_events, pool, ranked, EVENT_SCAN_SYMBOLS, store=market_memory_store)
+            stage["ok"] = events_result is not None
         events = events_result if events_result is not None else []
-        record_worker_stage_duration("event_detection", time.perf_counter() - event_start, success=events_result is not None)
         attached = _safe_run(_attach_events, ranked, events)
         if attached is not None:
             ranked = attached
-        enriched = _safe_run(_enrich_ranked_with_market_data, ranked, pool)
+        enriched = _safe_run(
+            _enrich_ranked_with_market_data,
+            ranked,
+            pool,
+            cache=incremental_engine.market_fields if incremental else None,
+            store=market_memory_store,
+        )
         if enriched is not None:
             ranked = enriched
         _safe_run(record_signal_quality_coverage, ranked, source="signal_cache")
@@ -364,9 +521,11 @@ def run_engine():
         _safe_run(record_cycle, elapsed, len(ranked))
 
         logger.info(
-            "Engine cycle completed | signals=%s | time=%.4fs",
+            "Engine cycle completed | signals=%s | time=%.4fs | recomputed=%s | reused=%s",
             len(ranked),
             elapsed,
+            incremental_engine.last_cycle.get("recomputed") if incremental else "all",
+            incremental_engine.last_cycle.get("reused") if incremental else 0,
         )
 
         return ranked
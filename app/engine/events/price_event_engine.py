@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from datetime import time as dtime
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Mapping
 from zoneinfo import ZoneInfo
 
+import numpy as np
 import pandas as pd
 
+from app.engine.indicators import indicator_kernels as kernels
+
 
 B3_TIMEZONE = ZoneInfo("America/Sao_Paulo")
 B3_OPEN = dtime(10, 0)
@@ -13,6 +16,7 @@ B3_CLOSE = dtime(17, 55)
 FRAME_LOOKBACK = 96
 EVENT_SCAN_BARS = 18
 DEFAULT_MAX_EVENT_SYMBOLS = 80
+FRAME_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
 
 
 def _safe_float(value, default: float = 0.0) -> float:
@@ -122,7 +126,66 @@ def _prepare_frame(frame) -> pd.DataFrame:
     return df.dropna(subset=["ema9", "ema21", "breakout_high", "breakdown_low"])
 
 
-def _event_payload(symbol: str, row, event_type: str, strength: float, reason: str) -> dict:
+def _prepare_bars(entries: List[tuple]) -> List[List[tuple]]:
+    """_prepare_frame for (index, (5, n) OHLCV array) entries, without building frames.
+
+    For each entry, (stamp, row) pairs for the bars the scan reads: the same filters
+    and indicators as the frame path, computed only for the last EVENT_SCAN_BARS
+    usable bars. The EMAs of every entry come from one kernel pass over their
+    right-aligned closes.
+    """
+    prepared = []
+    for index, bars in entries:
+        open_, high, low, close, volume = bars
+        keep = ~(np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(close))
+        if int(keep.sum()) < 24:
+            prepared.append(None)
+            continue
+        prepared.append((index[keep], high[keep], low[keep], close[keep], np.nan_to_num(volume[keep], nan=0.0)))
+
+    closes = [item[3] for item in prepared if item is not None]
+    if not closes:
+        return [[] for _entry in entries]
+    width = max(len(close) for close in closes)
+    matrix = kernels.stack_right_aligned(closes, width)
+    ema9_rows, ema21_rows = kernels.ema(matrix, 9), kernels.ema(matrix, 21)
+
+    results: List[List[tuple]] = []
+    matrix_row = 0
+    for item in prepared:
+        if item is None:
+            results.append([])
+            continue
+        index, high, low, close, volume = item
+        ema9 = ema9_rows[matrix_row, width - len(close):]
+        ema21 = ema21_rows[matrix_row, width - len(close):]
+        matrix_row += 1
+
+        # The 12-bar breakout levels need five earlier bars.
+        first = max(5, len(close) - EVENT_SCAN_BARS)
+        rows = []
+        for position, stamp in zip(range(first, len(close)), index[first:]):
+            volume_avg = volume[max(0, position - 19):position + 1].mean()
+            rows.append(
+                (
+                    stamp,
+                    {
+                        "close": close[position],
+                        "ema9": ema9[position],
+                        "ema21": ema21[position],
+                        # The frame path's zero average turns into NA, which the scan reads as 1.0.
+                        "rel_volume": volume[position] / volume_avg if volume_avg != 0 else 1.0,
+                        "breakout_high": high[max(0, position - 12):position].max(),
+                        "breakdown_low": low[max(0, position - 12):position].min(),
+                        "close_pct_change": (close[position] / close[position - 1] - 1) * 100,
+                    },
+                )
+            )
+        results.append(rows)
+    return results
+
+
+def _event_payload(symbol: str, stamp, row, event_type: str, strength: float, reason: str) -> dict:
     price = _safe_float(row.get("close"))
     change_pct = _safe_float(row.get("close_pct_change"))
 
@@ -132,7 +195,7 @@ def _event_payload(symbol: str, row, event_type: str, strength: float, reason: s
         "type": event_type,
         "side": "buy" if event_type in {"BUY", "COVER"} else "sell",
         "price": round(price, 4),
-        "time": str(row.name),
+        "time": str(stamp),
         "change": round(change_pct / 100.0, 6),
         "change_pct": round(change_pct, 4),
         "strength": int(max(1, min(round(strength), 100))),
@@ -147,6 +210,13 @@ def _scan_frame(symbol: str, frame: pd.DataFrame, ranked_row: dict | None = None
     if df.empty:
         return []
 
+    return _scan_rows(symbol, list(df.tail(EVENT_SCAN_BARS).iterrows()), ranked_row)
+
+
+def _scan_rows(symbol: str, rows: List[tuple], ranked_row: dict | None = None) -> List[dict]:
+    if not rows:
+        return []
+
     score = _safe_float((ranked_row or {}).get("score"))
     trend = str((ranked_row or {}).get("trend") or "").lower()
     prefer_long = score >= 55 or trend in {"alta", "up", "bullish", "bull"}
@@ -155,7 +225,7 @@ def _scan_frame(symbol: str, frame: pd.DataFrame, ranked_row: dict | None = None
     events: List[dict] = []
     position = None
 
-    for _, row in df.tail(EVENT_SCAN_BARS).iterrows():
+    for stamp, row in rows:
         volume_rel = _safe_float(row.get("rel_volume"), 1.0)
         ema9 = _safe_float(row.get("ema9"))
         ema21 = _safe_float(row.get("ema21"))
@@ -180,37 +250,43 @@ def _scan_frame(symbol: str, frame: pd.DataFrame, ranked_row: dict | None = None
         short_exit = position == "short" and (close > ema21 or ema9 > ema21)
 
         if bullish_breakout and position != "long" and (prefer_long or not prefer_short):
-            if _is_regular_session(symbol, row.name):
+            if _is_regular_session(symbol, stamp):
                 strength = 55 + min(35, (volume_rel - 1.0) * 22) + min(10, score / 20)
-                events.append(_event_payload(symbol, row, "BUY", strength, "breakout_with_volume"))
+                events.append(_event_payload(symbol, stamp, row, "BUY", strength, "breakout_with_volume"))
                 position = "long"
             continue
 
         if bearish_breakdown and position != "short" and (prefer_short or not prefer_long):
-            if _is_regular_session(symbol, row.name):
+            if _is_regular_session(symbol, stamp):
                 strength = 55 + min(35, (volume_rel - 1.0) * 22) + min(10, (100 - score) / 20)
-                events.append(_event_payload(symbol, row, "SHORT", strength, "breakdown_with_volume"))
+                events.append(_event_payload(symbol, stamp, row, "SHORT", strength, "breakdown_with_volume"))
                 position = "short"
             continue
 
-        if long_exit and _is_regular_session(symbol, row.name):
-            events.append(_event_payload(symbol, row, "SELL", 52, "trend_loss"))
+        if long_exit and _is_regular_session(symbol, stamp):
+            events.append(_event_payload(symbol, stamp, row, "SELL", 52, "trend_loss"))
             position = None
             continue
 
-        if short_exit and _is_regular_session(symbol, row.name):
-            events.append(_event_payload(symbol, row, "COVER", 52, "trend_loss"))
+        if short_exit and _is_regular_session(symbol, stamp):
+            events.append(_event_payload(symbol, stamp, row, "COVER", 52, "trend_loss"))
             position = None
 
     return events[-6:]
 
 
 def detect_price_events(
-    pool: Dict[str, object],
+    pool: Mapping[str, object],
     ranked_rows: Iterable[dict] | None = None,
     max_symbols: int = DEFAULT_MAX_EVENT_SYMBOLS,
+    store=None,
 ) -> List[dict]:
-    if not isinstance(pool, dict) or not pool:
+    """Price events of the ranked symbols (of the whole pool without ranked rows).
+
+    A frame linked to its row in `store` (a MarketMemoryStore) is scanned from the
+    row's last FRAME_LOOKBACK bars instead of being sliced and recomputed in pandas.
+    """
+    if not isinstance(pool, Mapping) or not pool:
         return []
 
     ranked_lookup = _build_ranked_lookup(ranked_rows)
@@ -242,7 +318,19 @@ def detect_price_events(
     if max_symbols > 0:
         candidate_symbols = candidate_symbols[:max_symbols]
 
-    for symbol, frame, ranked_row in candidate_symbols:
-        events.extend(_scan_frame(symbol, frame, ranked_row))
+    resident = {}
+    if store is not None:
+        for position, (symbol, frame, _ranked_row) in enumerate(candidate_symbols):
+            if set(FRAME_COLUMNS).issubset(getattr(frame, "columns", ())):
+                bars = store.frame_bars(symbol, frame, FRAME_LOOKBACK)
+                if bars is not None:
+                    resident[position] = (frame.index[-bars.shape[1]:], bars)
+    prepared = dict(zip(resident, _prepare_bars(list(resident.values())))) if resident else {}
+
+    for position, (symbol, frame, ranked_row) in enumerate(candidate_symbols):
+        if position in prepared:
+            events.extend(_scan_rows(symbol, prepared[position], ranked_row))
+        else:
+            events.extend(_scan_frame(symbol, frame, ranked_row))
 
     return events
@@ -0,0 +1,413 @@
+# =====================================================
+# FEATURE SEED
+# Per-ticker snapshot indicators, serial or on a process pool
+# =====================================================
+
+"""Per-ticker indicator seed for snapshot rows, as a pure function of OHLCV arrays.
+
+market_snapshot_engine._enrich_signal_rows computed RSI, MACD, ATR, EMA and the
+Bollinger/Keltner widths with pandas one ticker at a time on the worker thread. That
+is CPU-bound Python holding the GIL the API handlers and the other background threads
+share, and it grows linearly with the universe.
+
+compute_feature_seed(ticker, index, values) does that work from the last
+FEATURE_SEED_BARS bars of one frame, packed by pack_frame() into its index and a
+(bars, 5) float array of Open/High/Low/Close/Volume. It touches no module state, so
+the same function runs in the calling thread or in a worker process.
+
+FeatureSeedPool runs it on a persistent ProcessPoolExecutor once a stage has at least
+SNAPSHOT_ENRICH_MIN_TICKERS tickers to enrich; below that, process start-up and
+pickling cost more than they save. Jobs are cut into contiguous batches and mapped in
+order, so results come back in job order whatever order the workers finish in. The
+workers are started with forkserver (spawn where forkserver is unavailable), never
+fork: the engine process has threads, and a forked child can inherit one of their
+locks held. Each job pickles about 3 KB, so shared-memory input would not pay for
+its bookkeeping. SNAPSHOT_ENRICH_PROCESSES=0 keeps enrichment serial.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.engine.indicators import indicator_kernels as kernels
+from app.engine.indicators.vector_indicator_engine import compute_rsi
+
+logger = logging.getLogger("stocknewsbr.feature_seed")
+
+FEATURE_SEED_BARS = 80
+OHLCV_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+# Default: one process per spare CPU, up to four; a single-CPU host stays serial.
+SNAPSHOT_ENRICH_PROCESSES = max(
+    0, int(os.getenv("SNAPSHOT_ENRICH_PROCESSES", "") or min(4, (os.cpu_count() or 1) - 1))
+)
+SNAPSHOT_ENRICH_MIN_TICKERS = max(1, int(os.getenv("SNAPSHOT_ENRICH_MIN_TICKERS", "200") or 200))
+
+# (ticker, index, values); index and values are None when the frame had no bars.
+PackedFrame = Tuple[str, Optional[pd.Index], Optional[np.ndarray]]
+# (features, error): features is None when the frame is too short to seed.
+SeedResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+def _latest_or_default(series, default: float = 0.0) -> float:
+    try:
+        if series is None or len(series) == 0:
+            return default
+        value = series.iloc[-1]
+        if pd.isna(value):
+            return default
+        return float(value)
+    except Exception:
+        return default
+
+
+def _macd_snapshot(close):
+    try:
+        if close is None or len(close) < 26:
+            return 0.0, 0.0, 0.0
+        ema12 = close.ewm(span=12, adjust=False).mean()
+        ema26 = close.ewm(span=26, adjust=False).mean()
+        macd_series = ema12 - ema26
+        signal_series = macd_series.ewm(span=9, adjust=False).mean()
+        macd_value = _latest_or_default(macd_series, 0.0)
+        signal_value = _latest_or_default(signal_series, 0.0)
+        return macd_value, signal_value, macd_value - signal_value
+    except Exception:
+        return 0.0, 0.0, 0.0
+
+
+def _float_or(value, default: float) -> float:
+    try:
+        return default if value is None else float(value)
+    except Exception:
+        return default
+
+
+def pack_frame(ticker: str, frame) -> PackedFrame:
+    """The last FEATURE_SEED_BARS bars of `frame` as (ticker, index, OHLCV array)."""
+    if frame is None or frame.empty:
+        return ticker, None, None
+    tail = frame.tail(FEATURE_SEED_BARS)
+    values = tail.reindex(columns=list(OHLCV_COLUMNS)).to_numpy(dtype="float64", na_value=np.nan)
+    return ticker, tail.index, values
+
+
+def pack_bars(ticker: str, frame, bars: np.ndarray) -> PackedFrame:
+    """pack_frame for a frame whose last n bars are given as a (5, n) OHLCV array.
+
+    The array is a market_memory_store view of the frame's row; only the index
+    slice comes from the frame.
+    """
+    return ticker, frame.index[-bars.shape[1]:], bars.T
+
+
+def compute_feature_seed(ticker: str, index, values) -> Optional[Dict[str, Any]]:
+    """Indicator fields for one ticker, or None with fewer than 20 usable bars.
+
+    The returned "trend" is the 20-bar trend; callers keep the signal's own trend
+    when it has one.
+    """
+    if values is None or len(values) == 0:
+        return None
+
+    data = pd.DataFrame(values, index=index, columns=list(OHLCV_COLUMNS)).dropna(how="all")
+    if len(data) < 20:
+        return None
+
+    close = data["Close"].astype(float).dropna()
+    high = data["High"].astype(float).dropna()
+    low = data["Low"].astype(float).dropna()
+    open_ = data["Open"].astype(float).dropna()
+    volume = data["Volume"].astype(float).fillna(0.0)
+
+    if len(close) < 20:
+        return None
+
+    market_data_updated_at = None
+    try:
+        last_index = close.index[-1]
+        if hasattr(last_index, "isoformat"):
+            market_data_updated_at = last_index.isoformat()
+        elif last_index is not None:
+            market_data_updated_at = str(last_index)
+    except Exception:
+        market_data_updated_at = None
+
+    price = _latest_or_default(close)
+    prev_close = _latest_or_default(close.iloc[:-1], price)
+    open_price = _latest_or_default(open_, price)
+    high_price = _latest_or_default(high, price)
+    low_price = _latest_or_default(low, price)
+    last_volume = _latest_or_default(volume, 0.0)
+    avg_volume = float(volume.tail(20).mean()) if len(volume) >= 20 else float(volume.mean())
+    rel_volume = (last_volume / avg_volume) if avg_volume > 0 else 0.0
+    change_pct = ((price - prev_close) / prev_close * 100.0) if prev_close else 0.0
+    macd_value, macd_signal_value, macd_histogram = _macd_snapshot(close)
+
+    typical_price = (high.tail(20) + low.tail(20) + close.tail(20)) / 3.0
+    typical_volume = volume.tail(20)
+    volume_sum = float(typical_volume.sum())
+    vwap = float((typical_price * typical_volume).sum() / volume_sum) if volume_sum > 0 else price
+
+    rsi = _latest_or_default(compute_rsi(close), 50.0)
+
+    prev_close_series = close.shift(1).fillna(close)
+    true_range = pd.concat(
+        [
+            (high - low).abs(),
+            (high - prev_close_series).abs(),
+            (low - prev_close_series).abs(),
+        ],
+        axis=1,
+    ).max(axis=1)
+    atr = float(true_range.tail(14).mean()) if len(true_range) >= 14 else float(true_range.mean())
+    atr_pct = (atr / price * 100.0) if price > 0 else 0.0
+
+    ema20 = close.ewm(span=20, adjust=False).mean()
+    mid20 = _latest_or_default(ema20, price)
+    std20 = float(close.tail(20).std()) if len(close) >= 20 else 0.0
+    bb_width = ((4.0 * std20) / mid20) if mid20 > 0 else 0.0
+    kc_width = ((4.0 * atr) / mid20) if mid20 > 0 else 0.0
+
+    five_back = _float_or(close.iloc[-6], price) if len(close) >= 6 else prev_close
+    twenty_back = _float_or(close.iloc[-21], price) if len(close) >= 21 else prev_close
+    momentum = ((price - five_back) / five_back * 100.0) if five_back else 0.0
+    trend_20 = ((price - twenty_back) / twenty_back * 100.0) if twenty_back else 0.0
+
+    recent_returns = close.pct_change().dropna().tail(14)
+    positive_days = int((recent_returns > 0).sum()) if len(recent_returns) else 0
+    directional_persistence = (positive_days / max(1, len(recent_returns)))
+    adx_proxy = 10.0 + abs(trend_20) * 2.6 + max(rel_volume - 1.0, 0.0) * 8.0 + directional_persistence * 18.0
+    adx_proxy = max(10.0, min(45.0, adx_proxy))
+
+    return {
+        "ticker": ticker,
+        "symbol": ticker,
+        "price": round(price, 6),
+        "prev_close": round(prev_close, 6),
+        "open": round(open_price, 6),
+        "high": round(high_price, 6),
+        "low": round(low_price, 6),
+        "volume": int(last_volume),
+        "avg_volume": int(avg_volume),
+        "rel_volume": round(rel_volume, 4),
+        "vwap": round(vwap, 6),
+        "rsi": round(rsi, 4),
+        "macd": round(macd_value, 6),
+        "macd_signal": round(macd_signal_value, 6),
+        "macd_histogram": round(macd_histogram, 6),
+        "adx": round(adx_proxy, 4),
+        "atr_pct": round(atr_pct, 4),
+        "bb_width": round(bb_width, 6),
+        "kc_width": round(kc_width, 6),
+        "momentum": round(momentum, 4),
+        "change_pct": round(change_pct, 4),
+        "data_quality": "priced" if price > 0 and last_volume > 0 else "score_only",
+        "market_data_updated_at": market_data_updated_at,
+        "last_bar_at": market_data_updated_at,
+        "feature_confidence": 92,
+        "trend": trend_20,
+    }
+
+
+def _bar_stamp(value) -> Optional[str]:
+    try:
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def compute_feature_seeds(packed: Sequence[PackedFrame]) -> List[Optional[Dict[str, Any]]]:
+    """compute_feature_seed for every packed frame, vectorised across tickers.
+
+    Frames whose Open/High/Low/Close have no gaps once empty bars are dropped (nearly
+    all of them) go through indicator_kernels in one pass over a (tickers x bars)
+    matrix; the others take compute_feature_seed. Both give the same fields.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(packed)
+    positions: List[int] = []
+    tickers: List[str] = []
+    stamps: List[Optional[str]] = []
+    rows: List[np.ndarray] = []
+    for position, (ticker, index, values) in enumerate(packed):
+        if values is None or len(values) == 0:
+            continue
+        present = ~np.isnan(values).all(axis=1)
+        bars = values[present]
+        if len(bars) < 20:
+            continue
+        if np.isnan(bars[:, :4]).any():
+            results[position] = compute_feature_seed(ticker, index, values)
+            continue
+        bars = bars.copy()
+        bars[np.isnan(bars[:, 4]), 4] = 0.0
+        positions.append(position)
+        tickers.append(ticker)
+        stamps.append(_bar_stamp(index[present][-1]))
+        rows.append(bars)
+
+    if not rows:
+        return results
+
+    width = max(len(bars) for bars in rows)
+    open_, high, low, close, volume = (
+        kernels.stack_right_aligned([bars[:, column] for bars in rows], width) for column in range(5)
+    )
+    lengths = np.array([len(bars) for bars in rows])
+
+    price = close[:, -1]
+    prev_close = close[:, -2]
+    last_volume, avg_volume, rel_volume = kernels.relative_volume(volume, 20)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(prev_close != 0, (price - prev_close) / prev_close * 100.0, 0.0)
+
+    macd_line, macd_signal, macd_histogram = (
+        np.where(lengths >= 26, series[:, -1], 0.0) for series in kernels.macd(close)
+    )
+    vwap = kernels.vwap(high, low, close, volume, 20)
+    vwap = np.where(np.isnan(vwap), price, vwap)
+    rsi = kernels.rsi(close)[:, -1]
+    rsi = np.where(np.isnan(rsi), 50.0, rsi)
+
+    atr = kernels.atr(high, low, close, 14)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where(price > 0, atr / price * 100.0, 0.0)
+    bb_width, kc_width = kernels.band_widths(close, atr, 20)
+
+    five_back = close[:, -6]
+    twenty_back = np.where(lengths >= 21, close[:, -min(21, width)], prev_close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        momentum = np.where(five_back != 0, (price - five_back) / five_back * 100.0, 0.0)
+        trend_20 = np.where(twenty_back != 0, (price - twenty_back) / twenty_back * 100.0, 0.0)
+        returns = close[:, 1:] / close[:, :-1] - 1
+    directional_persistence = (returns[:, -14:] > 0).sum(axis=1) / 14
+    adx_proxy = 10.0 + np.abs(trend_20) * 2.6 + np.maximum(rel_volume - 1.0, 0.0) * 8.0 + directional_persistence * 18.0
+    adx_proxy = np.clip(adx_proxy, 10.0, 45.0)
+
+    columns = zip(
+        *(
+            series.tolist()
+            for series in (
+                price, prev_close, open_[:, -1], high[:, -1], low[:, -1], last_volume, avg_volume, rel_volume,
+                vwap, rsi, macd_line, macd_signal, macd_histogram, adx_proxy, atr_pct, bb_width, kc_width,
+                momentum, change_pct, trend_20,
+            )
+        )
+    )
+    for position, ticker, stamp, values in zip(positions, tickers, stamps, columns):
+        (
+            last_price, previous, opened, highest, lowest, last_vol, average_vol, relative_vol,
+            vwap_value, rsi_value, macd_value, signal_value, histogram_value, adx_value, atr_value,
+            bb_value, kc_value, momentum_value, change_value, trend_value,
+        ) = values
+        results[position] = {
+            "ticker": ticker,
+            "symbol": ticker,
+            "price": round(last_price, 6),
+            "prev_close": round(previous, 6),
+            "open": round(opened, 6),
+            "high": round(highest, 6),
+            "low": round(lowest, 6),
+            "volume": int(last_vol),
+            "avg_volume": int(average_vol),
+            "rel_volume": round(relative_vol, 4),
+            "vwap": round(vwap_value, 6),
+            "rsi": round(rsi_value, 4),
+            "macd": round(macd_value, 6),
+            "macd_signal": round(signal_value, 6),
+            "macd_histogram": round(histogram_value, 6),
+            "adx": round(adx_value, 4),
+            "atr_pct": round(atr_value, 4),
+            "bb_width": round(bb_value, 6),
+            "kc_width": round(kc_value, 6),
+            "momentum": round(momentum_value, 4),
+            "change_pct": round(change_value, 4),
+            "data_quality": "priced" if last_price > 0 and last_vol > 0 else "score_only",
+            "market_data_updated_at": stamp,
+            "last_bar_at": stamp,
+            "feature_confidence": 92,
+            "trend": trend_value,
+        }
+    return results
+
+
+def compute_feature_seed_batch(batch: Sequence[PackedFrame]) -> List[SeedResult]:
+    """Seed results for a batch; a failing ticker reports its error and the rest go on."""
+    try:
+        return [(features, None) for features in compute_feature_seeds(batch)]
+    except Exception:
+        logger.exception("Vectorised feature seed failed; seeding the batch one ticker at a time")
+    results: List[SeedResult] = []
+    for ticker, index, values in batch:
+        try:
+            results.append((compute_feature_seed(ticker, index, values), None))
+        except Exception as exc:
+            results.append((None, f"{type(exc).__name__}: {exc}"))
+    return results
+
+
+def _start_method() -> str:
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class FeatureSeedPool:
+    """Persistent process pool for compute_feature_seed_batch, created on first use."""
+
+    def __init__(self, processes: int = SNAPSHOT_ENRICH_PROCESSES, min_tickers: int = SNAPSHOT_ENRICH_MIN_TICKERS):
+        self.processes = max(0, int(processes))
+        self.min_tickers = max(1, int(min_tickers))
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def should_use(self, jobs: int) -> bool:
+        return self.processes > 0 and jobs >= self.min_tickers
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(_start_method()),
+                )
+            return self._executor
+
+    def compute(self, packed: Sequence[PackedFrame]) -> List[SeedResult]:
+        """Seed results for `packed`, in the same order."""
+        if not packed:
+            return []
+        executor = self._get_executor()
+        # A few batches per process evens out uneven frames without paying a
+        # round trip per ticker.
+        size = max(1, math.ceil(len(packed) / (self.processes * 4)))
+        batches = [packed[start:start + size] for start in range(0, len(packed), size)]
+        results: List[SeedResult] = []
+        try:
+            for part in executor.map(compute_feature_seed_batch, batches):
+                results.extend(part)
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+feature_seed_pool = FeatureSeedPool()
+atexit.register(feature_seed_pool.shutdown)
@@ -0,0 +1,237 @@
+# =====================================================
+# INDICATOR KERNELS
+# EMA, Wilder RSI, MACD, ATR, bands, VWAP and RVOL over
+# (symbols x bars) matrices
+# =====================================================
+
+"""Indicator kernels over 2-D (symbols x bars) float64 matrices.
+
+The snapshot seed and the engine's market fields built a pandas Series per ticker and
+ran .ewm(), .diff(), .tail().mean() and friends on each one, so every cycle paid the
+pandas per-call overhead once per indicator per ticker. These kernels take every
+symbol at once: row i is one symbol's bars, oldest first, right-aligned so the last
+column is the latest bar, and left-padded with NaN when its history is shorter than
+the matrix. stack_right_aligned() builds that layout.
+
+Rows must be contiguous: NaN only as left padding, never between two bars. Callers
+drop empty bars first and keep rows with interior gaps on their pandas path.
+
+The recursive smoothers (ema, wilder_rma) repeat the arithmetic pandas' ewm(adjust=
+False) performs, including its normalisation step, so results match the pandas
+implementations to the last bit rather than to a tolerance. Window reductions
+(tail_mean, tail_std) follow pandas' nanmean/nanstd formulas; on a full window they
+are identical, and on a partial one they can differ in the last bit only.
+
+With numba installed, the recursive loop is JIT-compiled; otherwise it runs
+column-wise in NumPy, one vectorised step per bar across all symbols.
+INDICATOR_KERNELS_NUMBA=0 forces the NumPy path.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except (ImportError, ModuleNotFoundError):  # pragma: no cover - optional dependency fallback
+    njit = None
+
+RSI_PERIOD = 14
+NUMBA_ENABLED = njit is not None and os.getenv("INDICATOR_KERNELS_NUMBA", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def stack_right_aligned(rows: Sequence[np.ndarray], bars: Optional[int] = None) -> np.ndarray:
+    """One float64 matrix from 1-D rows, right-aligned and left-padded with NaN."""
+    width = bars if bars is not None else max((len(row) for row in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan, dtype=np.float64)
+    for position, row in enumerate(rows):
+        row = np.asarray(row, dtype=np.float64)[-width:] if width else ()
+        if len(row):
+            matrix[position, width - len(row):] = row
+    return matrix
+
+
+def _alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    # pandas turns span and alpha into a centre of mass and back; going the same way
+    # keeps alpha bit-identical to what ewm() uses.
+    com = (span - 1) / 2.0 if span is not None else 1.0 / alpha - 1.0
+    return 1.0 / (1.0 + com)
+
+
+# -------------------------------------------------
+# RECURSIVE SMOOTHING
+# -------------------------------------------------
+
+def _ewm_rows(values, alpha, out):
+    keep = 1.0 - alpha
+    norm = keep + alpha
+    for row in range(values.shape[0]):
+        weighted = np.nan
+        for column in range(values.shape[1]):
+            current = values[row, column]
+            if weighted != weighted:
+                weighted = current
+            elif current == current and weighted != current:
+                weighted = (keep * weighted + alpha * current) / norm
+            out[row, column] = weighted
+    return out
+
+
+_ewm_rows_jit = njit(cache=True)(_ewm_rows) if NUMBA_ENABLED else None
+
+
+def _ewm_columns(values: np.ndarray, alpha: float) -> np.ndarray:
+    out = np.empty_like(values)
+    if values.shape[1] == 0:
+        return out
+    keep = 1.0 - alpha
+    norm = keep + alpha
+    weighted = values[:, 0].copy()
+    out[:, 0] = weighted
+    for column in range(1, values.shape[1]):
+        current = values[:, column]
+        blended = (keep * weighted + alpha * current) / norm
+        step = np.where(np.isnan(current) | (weighted == current), weighted, blended)
+        weighted = np.where(np.isnan(weighted), current, step)
+        out[:, column] = weighted
+    return out
+
+
+def ewm_mean(values: np.ndarray, alpha: float) -> np.ndarray:
+    """ewm(alpha=alpha, adjust=False).mean() for every row, seeded at its first bar."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if _ewm_rows_jit is not None:
+        return _ewm_rows_jit(values, alpha, np.empty_like(values))
+    return _ewm_columns(values, alpha)
+
+
+def ema(values: np.ndarray, span: float) -> np.ndarray:
+    return ewm_mean(values, _alpha(span=span))
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), values.shape[1])
+
+
+def wilder_rma(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's RMA: seeded with the mean of each row's first `period` values.
+
+    Rows with fewer than `period` values are all NaN, as in
+    vector_indicator_engine._wilder_rma.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    seeded = np.full_like(values, np.nan)
+    seed_column = _first_valid(values) + period - 1
+    rows = np.flatnonzero(seed_column < values.shape[1])
+    if len(rows):
+        window = seed_column[rows, None] - period + 1 + np.arange(period)
+        seeds = np.take_along_axis(values[rows], window, axis=1).sum(axis=1) / period
+        after = np.arange(values.shape[1]) > seed_column[rows, None]
+        seeded[rows] = np.where(after, values[rows], np.nan)
+        seeded[rows, seed_column[rows]] = seeds
+    return ewm_mean(seeded, _alpha(alpha=1.0 / period))
+
+
+# -------------------------------------------------
+# INDICATORS
+# -------------------------------------------------
+
+def _shift_right(values: np.ndarray) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Wilder RSI per bar, NaN where undefined (short history or no movement)."""
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.diff(close, axis=1)
+    gain = np.maximum(delta, 0.0)
+    loss = -np.minimum(delta, 0.0)
+    avg_gain = wilder_rma(gain, period)
+    avg_loss = wilder_rma(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - (100 / (1 + avg_gain / (avg_loss + 1e-12)))
+    values[(avg_gain <= 0) & (avg_loss <= 0)] = np.nan
+    out = np.full_like(close, np.nan)
+    out[:, 1:] = values
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(macd, signal, histogram) matrices."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = _shift_right(close)
+    prev_close = np.where(np.isnan(prev_close), close, prev_close)
+    return np.maximum(
+        np.maximum(np.abs(high - low), np.abs(high - prev_close)),
+        np.abs(low - prev_close),
+    )
+
+
+def tail_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of each row's last `window` values (fewer when the row is shorter)."""
+    block = values[:, -window:]
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, block, 0.0).sum(axis=1) / count
+
+
+def tail_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Sample standard deviation of each row's last `window` values."""
+    block = values[:, -window:]
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, block, 0.0).sum(axis=1) / count
+        squares = np.where(valid, (mean[:, None] - block) ** 2, 0.0).sum(axis=1)
+        variance = squares / (count - ddof)
+    return np.where(count > ddof, np.sqrt(variance), np.nan)
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Latest simple-average true range over `period` bars, per row."""
+    return tail_mean(true_range(high, low, close), period)
+
+
+def band_widths(close: np.ndarray, atr_values: np.ndarray, window: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    """Latest (Bollinger, Keltner) widths around the `window`-bar EMA, as a share of it.
+
+    Both bands are two deviations (two standard deviations, two ATRs) either side.
+    """
+    mid = ema(close, window)[:, -1]
+    std = tail_std(close, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bollinger = np.where(mid > 0, (4.0 * std) / mid, 0.0)
+        keltner = np.where(mid > 0, (4.0 * atr_values) / mid, 0.0)
+    return bollinger, keltner
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, window: int = 20) -> np.ndarray:
+    """Latest volume-weighted typical price over `window` bars; NaN without volume."""
+    typical = ((high[:, -window:] + low[:, -window:] + close[:, -window:]) / 3.0)
+    weights = volume[:, -window:]
+    valid = ~(np.isnan(typical) | np.isnan(weights))
+    volume_sum = np.where(valid, weights, 0.0).sum(axis=1)
+    weighted = np.where(valid, typical * weights, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(volume_sum > 0, weighted / volume_sum, np.nan)
+
+
+def relative_volume(volume: np.ndarray, window: int = 20) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(last volume, `window`-bar average volume, last / average) per row."""
+    last = volume[:, -1]
+    average = tail_mean(volume, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(average > 0, last / average, 0.0)
+    return last, average, ratio
@@ -3,48 +3,25 @@
 # =====================================================
 
 import logging
+import time
 from datetime import datetime, timezone
 
-import pandas as pd
-
 from app.ai.feature_hub import build_ai_payload_bundle
-from app.ai.ai_market_pulse import market_pulse as build_market_pulse
-from app.ai.ai_master_score import apply_master_scores_by_ticker, run_master_score
-from app.ai.final_decision import enrich_final_decision_rows, final_decision_items
-from app.ai.historical_confidence import (
-    apply_historical_confidence_by_ticker,
-    enrich_historical_confidence_rows,
-    historical_confidence_items,
-)
-from app.ai.institutional_conviction import (
-    apply_conviction_by_ticker,
-    conviction_items,
-    enrich_institutional_conviction_rows,
-)
-from app.ai.institutional_priority import (
-    apply_priority_by_ticker,
-    enrich_institutional_priority_rows,
-    priority_items,
-)
-from app.ai.operational_rules import (
-    apply_operational_rules_by_ticker,
-    enrich_operational_rules_rows,
-)
-from app.ai.institutional_radar import enrich_institutional_radar_rows, institutional_radar_items
-from app.ai.institutional_ranking import enrich_institutional_ranking_rows, institutional_ranking_items
-from app.ai.strategic_panel import apply_strategic_panels_by_ticker, build_strategic_panels
-from app.ai.institutional_auditor import (
-    apply_audit_to_ai_tools,
-    audit_index,
-    audit_market_rows,
-    summarize_audits,
-)
+from app.ai.final_decision import final_decision_items
+from app.ai.historical_confidence import historical_confidence_items
+from app.ai.institutional_conviction import conviction_items
+from app.ai.institutional_priority import priority_items
+from app.ai.institutional_radar import institutional_radar_items
+from app.ai.institutional_ranking import institutional_ranking_items
+from app.ai.institutional_auditor import summarize_audits
 from app.ai.trade_decision import summarize_trade_decision
 from app.cache.signal_cache import get_all_signals
 from app.cache.snapshot_cache import get_last_good_snapshot, get_snapshot, update_snapshot
 from app.data.warm_data_pool import get_market_pool
 from app.engine.engine_orchestrator import run_engine
-from app.engine.indicators.vector_indicator_engine import compute_rsi
+from app.engine.feature_seed import FEATURE_SEED_BARS, compute_feature_seed_batch, feature_seed_pool, pack_bars, pack_frame
+from app.engine.snapshot_pipeline import SnapshotWorkingSet, run_snapshot_stages
+from app.engine.store.market_memory_store import market_memory_store
 from app.services.snapshot_contract import attach_decision_envelope
 from app.services.snapshot_contract import is_actionable_snapshot_row as _contract_is_actionable_snapshot_row
 from app.services.snapshot_contract import coerce_data_quality, data_quality_label, data_quality_score
@@ -59,7 +36,9 @@ from app.system.system_metrics import (
     record_institutional_consistency_metrics,
     record_master_score_metrics,
     record_signal_quality_coverage,
+    record_worker_stage_duration,
 )
+from app.system.worker_profiler import profile_stage
 
 logger = logging.getLogger("stocknewsbr.snapshot_engine")
 AI_INPUT_LIMIT = 80
@@ -218,14 +197,6 @@ def _is_actionable_snapshot_row(row) -> bool:
     return _contract_is_actionable_snapshot_row(row)
 
 
-def _apply_master_scores_to_ai_tools(ai_tools, master_score_rows):
-    output = {}
-    for tool, rows in (ai_tools or {}).items():
-        safe_rows = rows if isinstance(rows, list) else []
-        output[tool] = apply_master_scores_by_ticker(safe_rows, master_score_rows)
-    return output
-
-
 def _apply_data_quality(row):
     item = dict(row)
     if _has_positive_value(item, "price", "close", "last_price") and _has_positive_value(item, "volume", "last_volume"):
@@ -242,57 +213,6 @@ def _apply_data_quality(row):
     return item
 
 
-def _ensure_operational_block_reason(row):
-    item = dict(row)
-    if str(item.get("operational_status") or "").upper().strip() != "BLOCKED":
-        return item
-    reason = item.get("operational_block_reason")
-    if isinstance(reason, str) and reason.strip():
-        return item
-    blocks = item.get("operational_blocks")
-    if isinstance(blocks, str) and blocks.strip():
-        item["operational_block_reason"] = blocks.strip()
-        return item
-    if isinstance(blocks, (list, tuple, set)):
-        joined = "; ".join(str(value).strip() for value in blocks if str(value or "").strip())
-        if joined:
-            item["operational_block_reason"] = joined
-            return item
-    summary = item.get("operational_summary")
-    if isinstance(summary, str) and summary.strip():
-        item["operational_block_reason"] = summary.strip()
-        return item
-    item["operational_block_reason"] = "Auditor aprovou a consistencia dos dados, mas as regras operacionais bloquearam a execucao."
-    return item
-
-
-def _latest_or_default(series, default: float = 0.0) -> float:
-    try:
-        if series is None or len(series) == 0:
-            return default
-        value = series.iloc[-1]
-        if pd.isna(value):
-            return default
-        return float(value)
-    except Exception:
-        return default
-
-
-def _macd_snapshot(close):
-    try:
-        if close is None or len(close) < 26:
-            return 0.0, 0.0, 0.0
-        ema12 = close.ewm(span=12, adjust=False).mean()
-        ema26 = close.ewm(span=26, adjust=False).mean()
-        macd_series = ema12 - ema26
-        signal_series = macd_series.ewm(span=9, adjust=False).mean()
-        macd_value = _latest_or_default(macd_series, 0.0)
-        signal_value = _latest_or_default(signal_series, 0.0)
-        return macd_value, signal_value, macd_value - signal_value
-    except Exception:
-        return 0.0, 0.0, 0.0
-
-
 def _has_canonical_snapshot_fields(row) -> bool:
     if not isinstance(row, dict):
         return False
@@ -303,117 +223,59 @@ def _has_canonical_snapshot_fields(row) -> bool:
     return _FEATURE_SEED_FIELDS.issubset(row.keys())
 
 
-def _build_feature_seed(ticker: str, frame, signal_row):
-    if frame is None or frame.empty:
+def _merge_feature_seed(signal_row, features):
+    if not features:
         return dict(signal_row)
+    enriched = dict(signal_row)
+    enriched.update(features)
+    enriched["trend"] = signal_row.get("trend", features["trend"])
+    return enriched
 
-    try:
-        data = frame.tail(80).copy().dropna(how="all")
-
-        if len(data) < 20:
-            return dict(signal_row)
 
-        close = data["Close"].astype(float).dropna()
-        high = data["High"].astype(float).dropna()
-        low = data["Low"].astype(float).dropna()
-        open_ = data["Open"].astype(float).dropna()
-        volume = data["Volume"].astype(float).fillna(0.0)
+def _pack_job(ticker, frame, symbol=None):
+    try:
+        # A pool frame linked to its store row is packed from the row's bars.
+        bars = market_memory_store.frame_bars(symbol, frame, FEATURE_SEED_BARS) if symbol else None
+        if bars is not None:
+            return pack_bars(ticker, frame, bars)
+        return pack_frame(ticker, frame)
+    except Exception:
+        logger.exception("Snapshot feature enrichment failed for %s", ticker)
+        return ticker, None, None
 
-        if len(close) < 20:
-            return dict(signal_row)
 
-        market_data_updated_at = None
+def _build_feature_seed(ticker: str, frame, signal_row):
+    return _build_feature_seeds([(ticker, frame, signal_row)])[0]
+
+
+def _build_feature_seeds(jobs, symbols=None):
+    """Feature seeds for (ticker, frame, row) jobs, in job order.
+
+    The indicators are computed for all jobs at once with the vectorised kernels.
+    Large stages run that on the feature seed process pool; a pool failure falls back
+    to computing the whole stage here. `symbols` maps id(frame) to the frame's pool
+    key, under which market_memory_store keeps its bars.
+    """
+    start = time.perf_counter()
+    symbols = symbols or {}
+    packed = [_pack_job(ticker, frame, symbols.get(id(frame))) for ticker, frame, _row in jobs]
+    results = None
+    if feature_seed_pool.should_use(len(jobs)):
         try:
-            last_index = close.index[-1]
-            if hasattr(last_index, "isoformat"):
-                market_data_updated_at = last_index.isoformat()
-            elif last_index is not None:
-                market_data_updated_at = str(last_index)
-        except Exception:
-            market_data_updated_at = None
-
-        price = _latest_or_default(close)
-        prev_close = _latest_or_default(close.iloc[:-1], price)
-        open_price = _latest_or_default(open_, price)
-        high_price = _latest_or_default(high, price)
-        low_price = _latest_or_default(low, price)
-        last_volume = _latest_or_default(volume, 0.0)
-        avg_volume = float(volume.tail(20).mean()) if len(volume) >= 20 else float(volume.mean())
-        rel_volume = (last_volume / avg_volume) if avg_volume > 0 else 0.0
-        change_pct = ((price - prev_close) / prev_close * 100.0) if prev_close else 0.0
-        macd_value, macd_signal_value, macd_histogram = _macd_snapshot(close)
-
-        typical_price = (high.tail(20) + low.tail(20) + close.tail(20)) / 3.0
-        typical_volume = volume.tail(20)
-        volume_sum = float(typical_volume.sum())
-        vwap = float((typical_price * typical_volume).sum() / volume_sum) if volume_sum > 0 else price
-
-        rsi = _latest_or_default(compute_rsi(close), 50.0)
-
-        prev_close_series = close.shift(1).fillna(close)
-        true_range = pd.concat(
-            [
-                (high - low).abs(),
-                (high - prev_close_series).abs(),
-                (low - prev_close_series).abs(),
-            ],
-            axis=1,
-        ).max(axis=1)
-        atr = float(true_range.tail(14).mean()) if len(true_range) >= 14 else float(true_range.mean())
-        atr_pct = (atr / price * 100.0) if price > 0 else 0.0
-
-        ema20 = close.ewm(span=20, adjust=False).mean()
-        mid20 = _latest_or_default(ema20, price)
-        std20 = float(close.tail(20).std()) if len(close) >= 20 else 0.0
-        bb_width = ((4.0 * std20) / mid20) if mid20 > 0 else 0.0
-        kc_width = ((4.0 * atr) / mid20) if mid20 > 0 else 0.0
-
-        five_back = _safe_float(close.iloc[-6], price) if len(close) >= 6 else prev_close
-        twenty_back = _safe_float(close.iloc[-21], price) if len(close) >= 21 else prev_close
-        momentum = ((price - five_back) / five_back * 100.0) if five_back else 0.0
-        trend_20 = ((price - twenty_back) / twenty_back * 100.0) if twenty_back else 0.0
-
-        recent_returns = close.pct_change().dropna().tail(14)
-        positive_days = int((recent_returns > 0).sum()) if len(recent_returns) else 0
-        directional_persistence = (positive_days / max(1, len(recent_returns)))
-        adx_proxy = 10.0 + abs(trend_20) * 2.6 + max(rel_volume - 1.0, 0.0) * 8.0 + directional_persistence * 18.0
-        adx_proxy = max(10.0, min(45.0, adx_proxy))
-
-        enriched = dict(signal_row)
-        enriched.update(
-            {
-                "ticker": ticker,
-                "symbol": ticker,
-                "price": round(price, 6),
-                "prev_close": round(prev_close, 6),
-                "open": round(open_price, 6),
-                "high": round(high_price, 6),
-                "low": round(low_price, 6),
-                "volume": int(last_volume),
-                "avg_volume": int(avg_volume),
-                "rel_volume": round(rel_volume, 4),
-                "vwap": round(vwap, 6),
-                "rsi": round(rsi, 4),
-                "macd": round(macd_value, 6),
-                "macd_signal": round(macd_signal_value, 6),
-                "macd_histogram": round(macd_histogram, 6),
-                "adx": round(adx_proxy, 4),
-                "atr_pct": round(atr_pct, 4),
-                "bb_width": round(bb_width, 6),
-                "kc_width": round(kc_width, 6),
-                "momentum": round(momentum, 4),
-                "change_pct": round(change_pct, 4),
-                "data_quality": "priced" if price > 0 and last_volume > 0 else "score_only",
-                "market_data_updated_at": market_data_updated_at,
-                "last_bar_at": market_data_updated_at,
-                "feature_confidence": 92,
-                "trend": signal_row.get("trend", trend_20),
-            }
-        )
-        return enriched
-    except Exception:
-        logger.exception("Snapshot feature enrichment failed for %s", ticker)
-        return dict(signal_row)
+            results = feature_seed_pool.compute(packed)
+        except Exception as exc:
+            logger.warning("Snapshot enrichment pool failed, enriching serially: %s", exc)
+    if results is None:
+        results = compute_feature_seed_batch(packed)
+
+    seeds = []
+    for (ticker, _frame, row), (features, error) in zip(jobs, results):
+        if error:
+            logger.error("Snapshot feature enrichment failed for %s: %s", ticker, error)
+        seeds.append(_merge_feature_seed(row, features))
+    if len(jobs) > 1:
+        record_worker_stage_duration("snapshot_enrich", time.perf_counter() - start)
+    return seeds
 
 
 def _enrich_signal_rows(signals):
@@ -430,6 +292,8 @@ def _enrich_signal_rows(signals):
         return [_apply_data_quality(row) for row in rows]
 
     enriched = []
+    positions = []
+    jobs = []
     pool_keys = {str(key).upper().strip(): value for key, value in pool.items()}
 
     for row in rows:
@@ -447,7 +311,13 @@ def _enrich_signal_rows(signals):
             enriched.append(_apply_data_quality(row))
             continue
 
-        enriched.append(_build_feature_seed(ticker or _normalize_pool_key(ticker), frame, row))
+        positions.append(len(enriched))
+        enriched.append(None)
+        jobs.append((ticker or _normalize_pool_key(ticker), frame, row))
+
+    symbols = {id(frame): key for key, frame in pool.items()}
+    for position, seed in zip(positions, _build_feature_seeds(jobs, symbols)):
+        enriched[position] = seed
 
     return enriched
 
@@ -489,11 +359,12 @@ def build_snapshot_payload(signals, source: str = "engine", stale: bool = False)
 
     ai_bundle: dict[str, object] = {}
     try:
-        ai_bundle = build_ai_payload_bundle(
-            top_signals=ai_input_rows,
-            ranking=ai_input_rows,
-            limit=AI_OUTPUT_LIMIT,
-        )
+        with profile_stage("snapshot_ai_tools"):
+            ai_bundle = build_ai_payload_bundle(
+                top_signals=ai_input_rows,
+                ranking=ai_input_rows,
+                limit=AI_OUTPUT_LIMIT,
+            )
         ai_tools = ai_bundle.get("ai_tools") if isinstance(ai_bundle, dict) else {}
     except Exception:
         logger.exception("Snapshot AI payload build failed")
@@ -522,80 +393,33 @@ def build_snapshot_payload(signals, source: str = "engine", stale: bool = False)
                 row["last_confirmed_at"] = generated_at
                 row["freshness_status"] = "READY"
 
-    pre_audit_pulse = build_market_pulse(normalized)
     snapshot_context = {
         "schema_version": SNAPSHOT_SCHEMA_VERSION,
         "source": source,
         "stale": bool(stale),
         "generated_at": generated_at,
     }
-    normalized = audit_market_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=pre_audit_pulse,
-        snapshot_context=snapshot_context,
-    )
-    audits = audit_index(normalized)
-    ai_tools = apply_audit_to_ai_tools(ai_tools, audits)
-    post_audit_pulse = build_market_pulse(normalized)
-    contract_limit = max(AI_OUTPUT_LIMIT, len(normalized))
-    master_score_rows = run_master_score(
-        normalized,
-        limit=contract_limit,
-        ai_tools=ai_tools,
-        market_pulse=post_audit_pulse,
-    )
-    normalized = apply_master_scores_by_ticker(normalized, master_score_rows)
-    ai_tools = _apply_master_scores_to_ai_tools(ai_tools, master_score_rows)
-    strategic_panel_rows = build_strategic_panels(
-        master_score_rows,
-        ai_tools=ai_tools,
-        limit=contract_limit,
-    )
-    master_score_rows = apply_strategic_panels_by_ticker(master_score_rows, strategic_panel_rows)
-    normalized = apply_strategic_panels_by_ticker(normalized, strategic_panel_rows)
-    final_market_pulse = build_market_pulse(normalized)
-    normalized, radar_metrics = enrich_institutional_radar_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
-    )
-    institutional_radar = institutional_radar_items(normalized, limit=AI_OUTPUT_LIMIT)
-    normalized, ranking_metrics = enrich_institutional_ranking_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
-    )
-    normalized, historical_confidence_metrics = enrich_historical_confidence_rows(normalized)
-    master_score_rows = apply_historical_confidence_by_ticker(master_score_rows, normalized)
-    strategic_panel_rows = apply_historical_confidence_by_ticker(strategic_panel_rows, normalized)
-    normalized, operational_rules_metrics = enrich_operational_rules_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
-    )
-    normalized = [_ensure_operational_block_reason(row) for row in normalized]
-    master_score_rows = apply_operational_rules_by_ticker(master_score_rows, normalized)
-    strategic_panel_rows = apply_operational_rules_by_ticker(strategic_panel_rows, normalized)
-    normalized, conviction_metrics = enrich_institutional_conviction_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
-    )
-    master_score_rows = apply_conviction_by_ticker(master_score_rows, normalized)
-    strategic_panel_rows = apply_conviction_by_ticker(strategic_panel_rows, normalized)
-    normalized, priority_metrics = enrich_institutional_priority_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
-    )
-    master_score_rows = apply_priority_by_ticker(master_score_rows, normalized)
-    strategic_panel_rows = apply_priority_by_ticker(strategic_panel_rows, normalized)
-    normalized, final_decision_metrics = enrich_final_decision_rows(
-        normalized,
-        ai_tools=ai_tools,
-        market_pulse=final_market_pulse,
+    working_set = run_snapshot_stages(
+        SnapshotWorkingSet(
+            normalized,
+            ai_tools=ai_tools,
+            snapshot_context=snapshot_context,
+            output_limit=AI_OUTPUT_LIMIT,
+        )
     )
+    normalized = working_set.rows
+    ai_tools = working_set.ai_tools
+    master_score_rows = working_set.master_score_rows
+    strategic_panel_rows = working_set.strategic_panel_rows
+    final_market_pulse = working_set.market_pulse
+    radar_metrics = working_set.metrics["radar"]
+    ranking_metrics = working_set.metrics["ranking"]
+    historical_confidence_metrics = working_set.metrics["historical_confidence"]
+    operational_rules_metrics = working_set.metrics["operational_rules"]
+    conviction_metrics = working_set.metrics["conviction"]
+    priority_metrics = working_set.metrics["priority"]
+    final_decision_metrics = working_set.metrics["final_decision"]
+    # Publication: rows leave the working set as copies carrying their decision envelope.
     normalized = [
         attach_decision_envelope(
             row,
@@ -0,0 +1,407 @@
+# =====================================================
+# SNAPSHOT ENRICHMENT PIPELINE
+# Fused institutional passes over one owned working set
+# =====================================================
+
+"""The institutional enrichment chain of build_snapshot_payload as declared stages.
+
+build_snapshot_payload used to chain the auditor, Score Mestre, the strategic
+panels and seven institutional passes (radar, ranking, historical confidence,
+operational rules, conviction, priority, final decision) by hand. Every pass
+copied every row twice ({**row} / dict(row) for its input and again for its
+output), and the master score and strategic panel side lists were copied again
+for each pass that re-applied its fields onto them.
+
+Here each pass is an EnrichmentStage that declares the row fields it reads from
+earlier stages and the row fields it writes. The stages run over one
+SnapshotWorkingSet:
+
+* the auditor stage copies the rows once; from then on the working set owns
+  them and every later stage mutates them in place (the enrich_* and apply_*
+  functions take in_place=True). The caller copies again only when it publishes
+  rows (attach_decision_envelope, the *_items lists);
+* the market pulse is a stage too. It is recomputed only where the rows it
+  classifies have changed: before the auditor, after the auditor, and after the
+  strategic panels. That last pulse is shared by the six institutional passes
+  and published with the snapshot, as before;
+* every stage is timed and reports how many rows it copied, in
+  SnapshotWorkingSet.profile and as the profiled worker stage snapshot_<stage>
+  (see app.system.worker_profiler).
+
+SNAPSHOT_PIPELINE_IN_PLACE=0 makes every stage copy its rows again, which is
+the previous behaviour and the baseline scripts/benchmark_snapshot_pipeline.py
+compares against.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from app.ai.ai_market_pulse import market_pulse as build_market_pulse
+from app.ai.ai_master_score import MASTER_CONTRACT_FIELDS, apply_master_scores_by_ticker, run_master_score
+from app.ai.final_decision import enrich_final_decision_rows
+from app.ai.historical_confidence import apply_historical_confidence_by_ticker, enrich_historical_confidence_rows
+from app.ai.institutional_auditor import apply_audit_to_ai_tools, audit_index, audit_market_rows
+from app.ai.institutional_conviction import apply_conviction_by_ticker, enrich_institutional_conviction_rows
+from app.ai.institutional_priority import apply_priority_by_ticker, enrich_institutional_priority_rows
+from app.ai.institutional_radar import enrich_institutional_radar_rows
+from app.ai.institutional_ranking import enrich_institutional_ranking_rows
+from app.ai.operational_rules import apply_operational_rules_by_ticker, enrich_operational_rules_rows
+from app.ai.strategic_panel import apply_strategic_panels_by_ticker, build_strategic_panels
+from app.system.worker_profiler import profile_stage
+
+logger = logging.getLogger("stocknewsbr.snapshot_pipeline")
+
+SNAPSHOT_PIPELINE_IN_PLACE = os.getenv("SNAPSHOT_PIPELINE_IN_PLACE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+# Any field of the row: the market pulse classifies rows through the decision envelope.
+WHOLE_ROW = frozenset({"*"})
+
+GATE_FIELDS = frozenset(
+    {"blocked_reasons", "decision_ready", "can_trade", "decision_state", "operational_message", "no_trade_reasons"}
+)
+AUDIT_FIELDS = frozenset(
+    {
+        "audit_status", "auditor_status", "audit_score", "auditor_score", "audit_confidence", "audit_reason",
+        "audit_blocks", "audit_warnings", "audit_summary", "auditor_summary", "auditor_approved",
+        "blocked_by_auditor", "conflict_detected", "conflict_level", "auditor", "institutional_auditor",
+    }
+)
+MASTER_FIELDS = frozenset(MASTER_CONTRACT_FIELDS)
+PANEL_FIELDS = frozenset({"strategic_panel", "strategic_panel_summary", "recommended_action"})
+RADAR_FIELDS = frozenset(
+    {
+        "radar_score", "radar_state", "radar_risk_level", "radar_risk_score", "radar_blocked_reasons",
+        "radar_no_trade_now", "radar_prioritization_score", "radar_priority_score", "radar_priority",
+        "radar_level", "radar_reason", "radar_summary", "radar_discarded",
+    }
+)
+RANKING_FIELDS = frozenset(
+    {
+        "ranking_risk_level", "ranking_risk_score", "ranking_excluded_reasons", "ranking_eligible",
+        "ranking_opportunity_score", "ranking_classification", "ranking_reason", "ranking_summary",
+        "ranking_observation_only",
+    }
+)
+HISTORICAL_FIELDS = frozenset(
+    {
+        "historical_confidence_score", "historical_confidence_label", "historical_sample_size",
+        "historical_win_rate", "historical_context_match", "historical_reason", "historical_warning",
+        "historical_result_stats",
+    }
+)
+OPERATIONAL_FIELDS = frozenset(
+    {
+        "operational_status", "operational_visual_status", "operational_ready", "operational_score",
+        "operational_blocks", "operational_warnings", "operational_summary", "operational_risk_level",
+        "operational_risk_score", "operational_block_reason",
+    }
+)
+CONVICTION_FIELDS = frozenset(
+    {"conviction_score", "conviction_level", "conviction_factors", "conviction_conflicts", "conviction_summary"}
+)
+PRIORITY_FIELDS = frozenset(
+    {"priority_score", "priority_level", "priority_rank", "priority_factors", "priority_summary", "priority_risk_level"}
+)
+FINAL_DECISION_FIELDS = frozenset(
+    {
+        "final_decision", "final_decision_score", "final_decision_reason", "final_decision_blocks",
+        "final_decision_confidence", "final_decision_summary", "final_decision_risk_level",
+    }
+)
+
+_OPERATIONAL_BLOCK_FALLBACK = (
+    "Auditor aprovou a consistencia dos dados, mas as regras operacionais bloquearam a execucao."
+)
+
+
+@dataclass(frozen=True)
+class EnrichmentStage:
+    """One pass of the pipeline and the row fields it depends on and produces."""
+
+    name: str
+    run: Callable[["SnapshotWorkingSet"], None]
+    reads: FrozenSet[str] = frozenset()
+    writes: FrozenSet[str] = frozenset()
+
+
+class SnapshotWorkingSet:
+    """The rows one snapshot build owns, with the side lists and aggregates the stages share."""
+
+    def __init__(
+        self,
+        rows: List[Dict[str, Any]],
+        *,
+        ai_tools: Optional[Dict[str, Any]] = None,
+        snapshot_context: Optional[Dict[str, Any]] = None,
+        output_limit: int = 20,
+        in_place: Optional[bool] = None,
+    ):
+        self.rows = rows
+        self.ai_tools = ai_tools if isinstance(ai_tools, dict) else {}
+        self.snapshot_context = snapshot_context or {}
+        self.output_limit = output_limit
+        self.in_place = SNAPSHOT_PIPELINE_IN_PLACE if in_place is None else bool(in_place)
+        self.market_pulse: Dict[str, Any] = {}
+        self.master_score_rows: List[Dict[str, Any]] = []
+        self.strategic_panel_rows: List[Dict[str, Any]] = []
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.profile: List[Dict[str, Any]] = []
+
+    @property
+    def contract_limit(self) -> int:
+        return max(self.output_limit, len(self.rows))
+
+
+# -------------------------------------------------
+# STAGES
+# -------------------------------------------------
+
+def _market_pulse(working_set: SnapshotWorkingSet) -> None:
+    working_set.market_pulse = build_market_pulse(working_set.rows)
+
+
+def _audit(working_set: SnapshotWorkingSet) -> None:
+    # The auditor always copies: its output is the working set the later stages own.
+    working_set.rows = audit_market_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        snapshot_context=working_set.snapshot_context,
+    )
+    working_set.ai_tools = apply_audit_to_ai_tools(working_set.ai_tools, audit_index(working_set.rows))
+
+
+def _apply_master_scores_to_ai_tools(ai_tools, master_score_rows):
+    output = {}
+    for tool, rows in (ai_tools or {}).items():
+        safe_rows = rows if isinstance(rows, list) else []
+        output[tool] = apply_master_scores_by_ticker(safe_rows, master_score_rows)
+    return output
+
+
+def _master_score(working_set: SnapshotWorkingSet) -> None:
+    working_set.master_score_rows = run_master_score(
+        working_set.rows,
+        limit=working_set.contract_limit,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+    )
+    working_set.rows = apply_master_scores_by_ticker(
+        working_set.rows, working_set.master_score_rows, in_place=working_set.in_place
+    )
+    working_set.ai_tools = _apply_master_scores_to_ai_tools(working_set.ai_tools, working_set.master_score_rows)
+
+
+def _strategic_panels(working_set: SnapshotWorkingSet) -> None:
+    working_set.strategic_panel_rows = build_strategic_panels(
+        working_set.master_score_rows,
+        ai_tools=working_set.ai_tools,
+        limit=working_set.contract_limit,
+    )
+    working_set.master_score_rows = apply_strategic_panels_by_ticker(
+        working_set.master_score_rows, working_set.strategic_panel_rows, in_place=working_set.in_place
+    )
+    working_set.rows = apply_strategic_panels_by_ticker(
+        working_set.rows, working_set.strategic_panel_rows, in_place=working_set.in_place
+    )
+
+
+def _radar(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["radar"] = enrich_institutional_radar_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+
+
+def _ranking(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["ranking"] = enrich_institutional_ranking_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+
+
+def _apply_to_side_lists(working_set: SnapshotWorkingSet, apply: Callable[..., List[Dict[str, Any]]]) -> None:
+    working_set.master_score_rows = apply(working_set.master_score_rows, working_set.rows, in_place=working_set.in_place)
+    working_set.strategic_panel_rows = apply(
+        working_set.strategic_panel_rows, working_set.rows, in_place=working_set.in_place
+    )
+
+
+def _historical_confidence(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["historical_confidence"] = enrich_historical_confidence_rows(
+        working_set.rows, in_place=working_set.in_place
+    )
+    _apply_to_side_lists(working_set, apply_historical_confidence_by_ticker)
+
+
+def ensure_operational_block_reason(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Give a BLOCKED row an operational_block_reason; updates and returns `item`."""
+    if str(item.get("operational_status") or "").upper().strip() != "BLOCKED":
+        return item
+    reason = item.get("operational_block_reason")
+    if isinstance(reason, str) and reason.strip():
+        return item
+    blocks = item.get("operational_blocks")
+    if isinstance(blocks, str) and blocks.strip():
+        item["operational_block_reason"] = blocks.strip()
+        return item
+    if isinstance(blocks, (list, tuple, set)):
+        joined = "; ".join(str(value).strip() for value in blocks if str(value or "").strip())
+        if joined:
+            item["operational_block_reason"] = joined
+            return item
+    summary = item.get("operational_summary")
+    if isinstance(summary, str) and summary.strip():
+        item["operational_block_reason"] = summary.strip()
+        return item
+    item["operational_block_reason"] = _OPERATIONAL_BLOCK_FALLBACK
+    return item
+
+
+def _operational_rules(working_set: SnapshotWorkingSet) -> None:
+    rows, working_set.metrics["operational_rules"] = enrich_operational_rules_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+    working_set.rows = [
+        ensure_operational_block_reason(row if working_set.in_place else dict(row)) for row in rows
+    ]
+    _apply_to_side_lists(working_set, apply_operational_rules_by_ticker)
+
+
+def _conviction(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["conviction"] = enrich_institutional_conviction_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+    _apply_to_side_lists(working_set, apply_conviction_by_ticker)
+
+
+def _priority(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["priority"] = enrich_institutional_priority_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+    _apply_to_side_lists(working_set, apply_priority_by_ticker)
+
+
+def _final_decision(working_set: SnapshotWorkingSet) -> None:
+    working_set.rows, working_set.metrics["final_decision"] = enrich_final_decision_rows(
+        working_set.rows,
+        ai_tools=working_set.ai_tools,
+        market_pulse=working_set.market_pulse,
+        in_place=working_set.in_place,
+    )
+
+
+_SCORED = AUDIT_FIELDS | MASTER_FIELDS | PANEL_FIELDS
+
+SNAPSHOT_STAGES = (
+    EnrichmentStage("pre_audit_pulse", _market_pulse, reads=WHOLE_ROW),
+    EnrichmentStage("audit", _audit, writes=AUDIT_FIELDS | GATE_FIELDS),
+    EnrichmentStage("post_audit_pulse", _market_pulse, reads=WHOLE_ROW),
+    EnrichmentStage("master_score", _master_score, reads=AUDIT_FIELDS, writes=MASTER_FIELDS | GATE_FIELDS),
+    EnrichmentStage("strategic_panels", _strategic_panels, reads=AUDIT_FIELDS | MASTER_FIELDS, writes=PANEL_FIELDS),
+    EnrichmentStage("market_pulse", _market_pulse, reads=WHOLE_ROW),
+    EnrichmentStage("radar", _radar, reads=_SCORED, writes=RADAR_FIELDS),
+    EnrichmentStage("ranking", _ranking, reads=_SCORED | RADAR_FIELDS, writes=RANKING_FIELDS),
+    EnrichmentStage(
+        "historical_confidence",
+        _historical_confidence,
+        reads=MASTER_FIELDS | RADAR_FIELDS | RANKING_FIELDS,
+        writes=HISTORICAL_FIELDS,
+    ),
+    EnrichmentStage(
+        "operational_rules",
+        _operational_rules,
+        reads=_SCORED | RADAR_FIELDS | RANKING_FIELDS | HISTORICAL_FIELDS,
+        writes=OPERATIONAL_FIELDS,
+    ),
+    EnrichmentStage(
+        "conviction",
+        _conviction,
+        reads=MASTER_FIELDS | RADAR_FIELDS | RANKING_FIELDS | HISTORICAL_FIELDS | OPERATIONAL_FIELDS,
+        writes=CONVICTION_FIELDS,
+    ),
+    EnrichmentStage(
+        "priority",
+        _priority,
+        reads=_SCORED | RADAR_FIELDS | RANKING_FIELDS | HISTORICAL_FIELDS | OPERATIONAL_FIELDS | CONVICTION_FIELDS,
+        writes=PRIORITY_FIELDS,
+    ),
+    EnrichmentStage(
+        "final_decision",
+        _final_decision,
+        reads=_SCORED | RADAR_FIELDS | RANKING_FIELDS | HISTORICAL_FIELDS | OPERATIONAL_FIELDS | CONVICTION_FIELDS
+        | PRIORITY_FIELDS,
+        writes=FINAL_DECISION_FIELDS,
+    ),
+)
+
+
+# -------------------------------------------------
+# RUNNER
+# -------------------------------------------------
+
+def _undeclared_writes(stage: EnrichmentStage, before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> set:
+    changed = set()
+    for old, new in zip(before, after):
+        for key in set(old) | set(new):
+            if key not in old or key not in new or old[key] is not new[key] and old[key] != new[key]:
+                changed.add(key)
+    return changed - stage.writes
+
+
+def run_snapshot_stages(
+    working_set: SnapshotWorkingSet,
+    stages=SNAPSHOT_STAGES,
+    *,
+    check_writes: bool = False,
+) -> SnapshotWorkingSet:
+    """Run `stages` over `working_set` in order and return it.
+
+    With check_writes, every stage's row changes are compared with its declared
+    writes and a ValueError names any undeclared field. That check copies the rows
+    before each stage, so it is meant for tests.
+    """
+    for stage in stages:
+        previous = {id(row) for row in working_set.rows}
+        before = [dict(row) for row in working_set.rows] if check_writes else None
+        blocks = sys.getallocatedblocks()
+        with profile_stage(f"snapshot_{stage.name}") as span:
+            stage.run(working_set)
+        working_set.profile.append(
+            {
+                "stage": stage.name,
+                "seconds": span["wall_seconds"],
+                "rows": len(working_set.rows),
+                "row_copies": sum(1 for row in working_set.rows if id(row) not in previous),
+                "allocated_blocks": sys.getallocatedblocks() - blocks,
+            }
+        )
+        if before is not None:
+            undeclared = _undeclared_writes(stage, before, working_set.rows)
+            if undeclared:
+                raise ValueError(f"stage {stage.name} wrote undeclared fields: {sorted(undeclared)}")
+
+    logger.debug(
+        "Snapshot enrichment | rows=%s | %s",
+        len(working_set.rows),
+        " ".join(f"{entry['stage']}={entry['seconds'] * 1000:.1f}ms" for entry in working_set.profile),
+    )
+    return working_set
@@ -1,188 +1,470 @@
 # =====================================================
-# MEMORY COLUMNAR MARKET STORE (V36 OPTIMIZED)
+# MEMORY COLUMNAR MARKET STORE
+# Resident OHLCV ring buffers
 # =====================================================
 
-import numpy as np
+"""Resident, preallocated OHLCV ring buffers that engine stages read as zero-copy views.
+
+The warm pool used to be the only copy of market history: a dict of per-ticker
+DataFrames rebuilt on every refresh and copied by every get_market_pool() call (and
+again by MarketStore.update()), and each engine stage sliced those frames per ticker.
+This store keeps one preallocated float64 block of shape
+(OHLCV, symbols, 2 * MARKET_MEMORY_BARS) plus int64 bar stamps and per-symbol valid
+lengths. A refresh appends into it, straight from the provider's download
+(ingest_download) or from a frame (ingest_frame): bars newer than the resident last
+bar are written, resident bars the refresh carries with other values (a split or dividend
+adjustment, a corrected print) are rewritten in place, and when the refresh's stamps
+no longer line up with the resident ones (a backfilled or dropped bar) the symbol's
+row is reseeded from the resident bars older than the refresh plus the refresh.
+
+Each symbol's row is a double-written ring: bar k goes to slot k % W and k % W + W,
+so the last `length` bars always sit contiguously in [end - length, end) and
+`view()` hands them out without copying. A view of n bars stays valid while fewer
+than W - n further bars are appended, which is why the window is wider than the 200
+bars the engine reads. Views are read-only. remove() and clear() move the kept
+rows into a fresh block instead of compacting the old one, so a view handed out
+before keeps showing the bars it was taken from rather than another symbol's.
+
+`version(symbol)` takes a new store-wide value whenever a symbol's bars change, so
+consumers (the incremental engine) can tell unchanged symbols apart without hashing
+anything.
+
+The warm pool still publishes per-symbol frames for the API and persistence. Each
+one is linked to its row (link()) once the row holds exactly its last bars, until
+the row next changes, and frame_bars(symbol, frame) hands engine stages (market
+fields, feature seeds, event detection) the resident bars in place of that frame;
+a frame that is not linked (built elsewhere, or superseded) is read as before.
+"""
+
 import logging
+import os
 import threading
-from typing import Dict, List, Optional
-
-logger = logging.getLogger("stocknewsbr.engine.memory_store")
-
-# Thread safety
-_store_lock = threading.RLock()
-
-# Internal store
-_store: Dict[str, Optional[np.ndarray]] = {
-    "tickers": [],
-    "price_matrix": None,
-    "volume_matrix": None,
-}
-
-
-# -----------------------------------------------------
-# INITIALIZE STORE
-# -----------------------------------------------------
-def initialize_store(
-    tickers: List[str],
-    price_matrix: np.ndarray,
-    volume_matrix: np.ndarray
-) -> None:
-    """
-    Initialize the columnar market store.
-
-    Parameters
-    ----------
-    tickers : list[str]
-    price_matrix : np.ndarray
-    volume_matrix : np.ndarray
-    """
-
-    try:
-
-        if price_matrix is None or volume_matrix is None:
-            logger.error("Cannot initialize store with None matrices")
-            return
-
-        if price_matrix.shape != volume_matrix.shape:
-            logger.error("Price and volume matrices shape mismatch")
-            return
-
-        with _store_lock:
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
 
-            _store["tickers"] = list(tickers)
-
-            # ensure contiguous arrays (faster for numpy operations)
-            _store["price_matrix"] = np.ascontiguousarray(
-                price_matrix, dtype=np.float64
-            )
-
-            _store["volume_matrix"] = np.ascontiguousarray(
-                volume_matrix, dtype=np.float64
-            )
-
-        logger.info(
-            "Market memory store initialized | assets=%s | history=%s",
-            len(tickers),
-            price_matrix.shape[1],
-        )
-
-    except Exception as e:
-        logger.exception("Memory store initialization failed: %s", e)
-
-
-# -----------------------------------------------------
-# GET STORE
-# -----------------------------------------------------
-def get_store() -> Dict[str, Optional[np.ndarray]]:
-    """
-    Returns the internal store reference (zero-copy).
-    """
-
-    return _store
-
-
-# -----------------------------------------------------
-# GET MATRICES
-# -----------------------------------------------------
-def get_matrices():
-    """
-    Fast access to matrices (used by engine/scanners).
-    """
-
-    return _store["price_matrix"], _store["volume_matrix"]
-
-
-# -----------------------------------------------------
-# UPDATE LAST COLUMN
-# -----------------------------------------------------
-def update_last_prices(
-    prices: np.ndarray,
-    volumes: np.ndarray
-) -> None:
-    """
-    Shift matrices and append new prices/volumes.
-
-    Parameters
-    ----------
-    prices : np.ndarray
-    volumes : np.ndarray
-    """
-
-    try:
+import numpy as np
 
-        with _store_lock:
+logger = logging.getLogger("stocknewsbr.engine.memory_store")
 
-            price_matrix = _store.get("price_matrix")
-            volume_matrix = _store.get("volume_matrix")
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+FIELD_INDEX = {name: index for index, name in enumerate(FIELDS)}
 
-            if price_matrix is None or volume_matrix is None:
-                logger.warning("Market store not initialized")
-                return
+MARKET_MEMORY_BARS = max(32, int(os.getenv("MARKET_MEMORY_BARS", "256") or 256))
+MARKET_MEMORY_SYMBOLS = max(16, int(os.getenv("MARKET_MEMORY_SYMBOLS", "1024") or 1024))
 
-            if prices is None or volumes is None:
-                logger.warning("Received None prices/volumes")
-                return
 
-            if len(prices) != price_matrix.shape[0]:
-                logger.error("Price vector size mismatch")
-                return
+def _sorted_unique(stamps: np.ndarray, values: np.ndarray):
+    """Bars in stamp order with one bar per stamp (the last one given wins)."""
 
-            if len(volumes) != volume_matrix.shape[0]:
-                logger.error("Volume vector size mismatch")
-                return
+    if stamps.size < 2 or bool(np.all(np.diff(stamps) > 0)):
+        return stamps, values
+    order = np.argsort(stamps, kind="stable")
+    stamps, values = stamps[order], values[order]
+    last = np.append(stamps[1:] != stamps[:-1], True)
+    return stamps[last], values[last]
 
-            # shift matrices left (O(1) view operation)
-            price_matrix[:, :-1] = price_matrix[:, 1:]
-            volume_matrix[:, :-1] = volume_matrix[:, 1:]
 
-            # append latest values
-            price_matrix[:, -1] = prices
-            volume_matrix[:, -1] = volumes
+def index_stamps(index) -> np.ndarray:
+    """int64 UTC nanosecond stamps of a DatetimeIndex (naive stamps are taken as UTC)."""
 
-    except Exception as e:
-        logger.exception("Memory store update error: %s", e)
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return np.asarray(index, dtype="datetime64[ns]").astype(np.int64)
 
 
-# -----------------------------------------------------
-# GET TICKER INDEX
-# -----------------------------------------------------
-def get_ticker_index(ticker: str) -> Optional[int]:
-    """
-    Fast lookup for ticker index.
-    """
+def frame_columns(frame):
+    """(stamps int64 ns, values float64 (n, 5)) of a pool DataFrame, or None."""
 
     try:
-        tickers = _store.get("tickers")
-
-        if ticker not in tickers:
+        columns = getattr(frame, "columns", ())
+        if "Close" not in columns or len(frame) == 0:
             return None
 
-        return tickers.index(ticker)
+        values = np.full((len(frame), len(FIELDS)), np.nan, dtype=np.float64)
+        for index, name in enumerate(FIELDS):
+            if name in columns:
+                values[:, index] = np.asarray(frame[name].values, dtype=np.float64)
 
+        return index_stamps(frame.index), values
     except Exception:
         return None
 
 
-# -----------------------------------------------------
-# STORE STATUS
-# -----------------------------------------------------
-def store_status() -> Dict[str, int]:
-    """
-    Returns store metadata for monitoring.
-    """
-
-    try:
-
-        price_matrix = _store.get("price_matrix")
-
-        if price_matrix is None:
-            return {"assets": 0, "history": 0}
+def download_columns(data, symbols: Iterable[str]) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """(symbol, stamps, values) for each symbol of a provider download.
 
-        return {
-            "assets": price_matrix.shape[0],
-            "history": price_matrix.shape[1],
-        }
+    `data` is what yf.download returns: (symbol, field) columns grouped by ticker,
+    or plain field columns for a single symbol. It is converted to one float64
+    matrix once and each symbol's columns are picked out of it, leaving out bars
+    with no OHLCV value, so no per-symbol frame is built.
+    """
 
-    except Exception:
-        return {"assets": 0, "history": 0}
\ No newline at end of file
+    symbols = list(symbols or ())
+    columns = getattr(data, "columns", None)
+    if columns is None or not symbols or len(data) == 0:
+        return []
+
+    if hasattr(columns, "levels"):
+        position = {key: column for column, key in enumerate(columns)}
+        picks = {symbol: [position.get((symbol, name)) for name in FIELDS] for symbol in symbols}
+    elif len(symbols) == 1:
+        position = {key: column for column, key in enumerate(columns)}
+        picks = {symbols[0]: [position.get(name) for name in FIELDS]}
+    else:
+        return []
+
+    stamps = index_stamps(data.index)
+    matrix = data.to_numpy(dtype=np.float64, na_value=np.nan)
+    found = []
+    for symbol, columns_of in picks.items():
+        if columns_of[FIELD_INDEX["Close"]] is None:
+            continue
+        values = np.full((len(stamps), len(FIELDS)), np.nan, dtype=np.float64)
+        for field, column in enumerate(columns_of):
+            if column is not None:
+                values[:, field] = matrix[:, column]
+        present = ~np.isnan(values).all(axis=1)
+        if present.any():
+            found.append((symbol, stamps[present], values[present]))
+    return found
+
+
+class MarketMemoryStore:
+
+    def __init__(self, window: int = MARKET_MEMORY_BARS, capacity: int = MARKET_MEMORY_SYMBOLS):
+
+        self.window = max(2, int(window))
+        self._capacity = max(1, int(capacity))
+        self._lock = threading.RLock()
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._clock = 0
+        self._allocate(self._capacity)
+
+    def _allocate(self, capacity: int):
+
+        width = 2 * self.window
+        self._bars = np.full((len(FIELDS), capacity, width), np.nan, dtype=np.float64)
+        self._stamps = np.zeros((capacity, width), dtype=np.int64)
+        self._written = np.zeros(capacity, dtype=np.int64)
+        self._versions = np.zeros(capacity, dtype=np.int64)
+        self._sources: List[Optional[str]] = [None] * capacity
+        # Weak reference to the frame whose last bars the row holds (see link()).
+        self._frames: List[Optional[weakref.ref]] = [None] * capacity
+
+    def _reallocate_locked(self, symbols: List[str], capacity: int):
+        """Move the rows of `symbols` into a fresh block; the old one is left as it was."""
+
+        old_bars, old_stamps, old_written, old_versions = self._bars, self._stamps, self._written, self._versions
+        old_sources, old_frames = self._sources, self._frames
+        rows = np.asarray([self._index[symbol] for symbol in symbols], dtype=np.int64)
+        used = len(symbols)
+        self._allocate(max(capacity, used, 1))
+        self._bars[:, :used] = old_bars[:, rows]
+        self._stamps[:used] = old_stamps[rows]
+        self._written[:used] = old_written[rows]
+        self._versions[:used] = old_versions[rows]
+        self._sources[:used] = [old_sources[row] for row in rows]
+        self._frames[:used] = [old_frames[row] for row in rows]
+        self._symbols = list(symbols)
+        self._index = {symbol: row for row, symbol in enumerate(self._symbols)}
+
+    def _grow_locked(self):
+
+        self._reallocate_locked(self._symbols, self._bars.shape[1] * 2)
+        logger.info("Market memory store grown | capacity=%s", self._bars.shape[1])
+
+    def _next_version_locked(self) -> int:
+
+        # Store-wide, so a version is never repeated after clear()/remove().
+        self._clock += 1
+        return self._clock
+
+    def _row_locked(self, symbol: str) -> int:
+
+        row = self._index.get(symbol)
+        if row is None:
+            if len(self._symbols) >= self._bars.shape[1]:
+                self._grow_locked()
+            row = len(self._symbols)
+            self._symbols.append(symbol)
+            self._index[symbol] = row
+        return row
+
+    # -------------------------------------------------
+    # WRITE
+    # -------------------------------------------------
+
+    def append(self, symbol: str, stamps, values, source: Optional[str] = None) -> int:
+        """Merge a refresh into the symbol's row; returns bars written or revised."""
+
+        stamps = np.asarray(stamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if stamps.size == 0 or values.shape != (stamps.size, len(FIELDS)):
+            return 0
+        stamps, values = _sorted_unique(stamps, values)
+
+        window = self.window
+        with self._lock:
+            row = self._row_locked(str(symbol))
+            written = int(self._written[row])
+            changed = 0
+
+            if written:
+                length = min(written, window)
+                end = (written - 1) % window + window + 1
+                resident = self._stamps[row, end - length:end]
+                older = stamps <= resident[-1]
+                # Bars before a full window are gone from the row and cannot be revised.
+                overlap = older & (stamps >= resident[0]) if length == window else older
+                if overlap.any():
+                    overlap_stamps = stamps[overlap]
+                    first = int(np.searchsorted(resident, overlap_stamps[0]))
+                    if np.array_equal(resident[first:], overlap_stamps):
+                        changed += self._revise_locked(row, end - length + first, end, values[overlap])
+                    else:
+                        # Backfilled or dropped bars: rebuild the row from the resident
+                        # bars older than the refresh, then the refresh itself.
+                        keep = resident < stamps[0]
+                        kept_values = self._bars[:, row, end - length:end][:, keep].T
+                        stamps = np.concatenate((resident[keep], stamps))
+                        values = np.concatenate((kept_values, values))
+                        written = 0
+                if written:
+                    stamps, values = stamps[~older], values[~older]
+
+            stamps, values = stamps[-window:], values[-window:]
+            if stamps.size:
+                slots = (written + np.arange(stamps.size)) % window
+                for offset in (0, window):
+                    self._bars[:, row, slots + offset] = values.T
+                    self._stamps[row, slots + offset] = stamps
+                written += stamps.size
+                changed += stamps.size
+
+            self._written[row] = written
+            if source is not None:
+                self._sources[row] = source
+            if changed:
+                self._versions[row] = self._next_version_locked()
+                self._frames[row] = None
+
+        return changed
+
+    def _revise_locked(self, row: int, start: int, end: int, values: np.ndarray) -> int:
+        """Rewrite the resident bars in slots [start, end) that differ from `values`."""
+
+        current = self._bars[:, row, start:end]
+        incoming = values.T
+        same = (current == incoming) | (np.isnan(current) & np.isnan(incoming))
+        differs = np.nonzero(~same.all(axis=0))[0]
+        if differs.size == 0:
+            return 0
+        slots = start + differs
+        twins = np.where(slots >= self.window, slots - self.window, slots + self.window)
+        for target in (slots, twins):
+            self._bars[:, row, target] = incoming[:, differs]
+        return int(differs.size)
+
+    def ingest_frame(self, symbol: str, frame) -> int:
+
+        columns = frame_columns(frame)
+        if columns is None:
+            return 0
+        source = getattr(frame, "attrs", {}).get("market_data_source")
+        written = self.append(symbol, *columns, source=source)
+        if not np.isnan(columns[1]).all(axis=1).any():
+            self.link(symbol, frame)
+        return written
+
+    def ingest_download(self, data, symbols: Iterable[str]) -> Dict[str, int]:
+        """Append a provider download for `symbols`; returns {symbol: bars written}."""
+
+        source = getattr(data, "attrs", {}).get("market_data_source")
+        written = {}
+        for symbol, stamps, values in download_columns(data, symbols):
+            try:
+                written[symbol] = self.append(symbol, stamps, values, source=source)
+            except Exception as exc:
+                logger.warning("Market memory store ingest failed for %s: %s", symbol, exc)
+        return written
+
+    def ingest_pool(self, pool) -> Dict[str, int]:
+        """Append every frame of a freshly downloaded pool; returns {symbol: bars written}."""
+
+        written = {}
+        for symbol, frame in (pool or {}).items():
+            try:
+                written[symbol] = self.ingest_frame(symbol, frame)
+            except Exception as exc:
+                logger.warning("Market memory store ingest failed for %s: %s", symbol, exc)
+        return written
+
+    def remove(self, symbols: Iterable[str]) -> int:
+        """Forget symbols; returns how many were resident.
+
+        The kept rows move to a fresh block sized for them (never below the initial
+        capacity), so memory follows the universe down as well as up, and views
+        handed out earlier keep their bars. Kept symbols keep their versions.
+        """
+
+        drop = set(symbols or ())
+        with self._lock:
+            keep = [symbol for symbol in self._symbols if symbol not in drop]
+            removed = len(self._symbols) - len(keep)
+            if removed:
+                self._reallocate_locked(keep, self._capacity)
+        return removed
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._reallocate_locked([], self._capacity)
+
+    def link(self, symbol: str, frame) -> bool:
+        """Let frame_bars() stand in for `frame` while the symbol's row is unchanged.
+
+        The frame must have no empty bars (the pool drops them). It is linked only
+        when its last bars carry exactly the resident stamps, none of them empty;
+        a frame is never copied or kept alive by the store.
+        """
+
+        try:
+            bars = len(frame)
+            index = frame.index
+        except Exception:
+            return False
+        with self._lock:
+            row = self._index.get(symbol)
+            if row is None:
+                return False
+            self._frames[row] = None
+            bounds = self._bounds_locked(symbol, bars)
+            if bounds is None:
+                return False
+            row, start, end = bounds
+            try:
+                stamps = index_stamps(index[start - end:])
+            except Exception:
+                return False
+            if not np.array_equal(stamps, self._stamps[row, start:end]):
+                return False
+            if np.isnan(self._bars[:, row, start:end]).all(axis=0).any():
+                return False
+            self._frames[row] = weakref.ref(frame)
+            return True
+
+    # -------------------------------------------------
+    # READ (zero-copy)
+    # -------------------------------------------------
+
+    def _bounds_locked(self, symbol: str, bars: Optional[int]):
+
+        row = self._index.get(symbol)
+        if row is None:
+            return None
+        written = int(self._written[row])
+        length = min(written, self.window)
+        if bars is not None:
+            length = min(length, max(0, int(bars)))
+        if written == 0 or length == 0:
+            return None
+        end = (written - 1) % self.window + self.window + 1
+        return row, end - length, end
+
+    def view(self, symbol: str, field: str = "Close", bars: Optional[int] = None) -> Optional[np.ndarray]:
+        """Read-only view of the last `bars` values of one field (oldest first)."""
+
+        with self._lock:
+            bounds = self._bounds_locked(symbol, bars)
+            if bounds is None:
+                return None
+            row, start, end = bounds
+            result = self._bars[FIELD_INDEX[field], row, start:end]
+        result.flags.writeable = False
+        return result
+
+    def bars(self, symbol: str, bars: Optional[int] = None) -> Optional[np.ndarray]:
+        """Read-only (5, n) view of the last `bars` OHLCV bars."""
+
+        with self._lock:
+            bounds = self._bounds_locked(symbol, bars)
+            if bounds is None:
+                return None
+            row, start, end = bounds
+            result = self._bars[:, row, start:end]
+        result.flags.writeable = False
+        return result
+
+    def frame_bars(self, symbol: str, frame, bars: Optional[int] = None) -> Optional[np.ndarray]:
+        """Read-only (5, n) view of the last `bars` bars of a linked frame, or None.
+
+        n is capped by the frame's length, so the view holds exactly the frame's last
+        n rows; None when `frame` is not the one linked to the symbol's current bars.
+        """
+
+        with self._lock:
+            row = self._index.get(symbol)
+            if row is None:
+                return None
+            linked = self._frames[row]
+            if linked is None or linked() is not frame:
+                return None
+            length = len(frame) if bars is None else min(len(frame), max(0, int(bars)))
+            if length == 0 or length > min(int(self._written[row]), self.window):
+                return None
+            row, start, end = self._bounds_locked(symbol, length)
+            result = self._bars[:, row, start:end]
+        result.flags.writeable = False
+        return result
+
+    def stamps(self, symbol: str, bars: Optional[int] = None) -> Optional[np.ndarray]:
+
+        with self._lock:
+            bounds = self._bounds_locked(symbol, bars)
+            if bounds is None:
+                return None
+            row, start, end = bounds
+            result = self._stamps[row, start:end]
+        result.flags.writeable = False
+        return result
+
+    def length(self, symbol: str) -> int:
+
+        with self._lock:
+            row = self._index.get(symbol)
+            return 0 if row is None else int(min(self._written[row], self.window))
+
+    def version(self, symbol: str) -> Optional[int]:
+
+        with self._lock:
+            row = self._index.get(symbol)
+            return None if row is None else int(self._versions[row])
+
+    def source(self, symbol: str) -> Optional[str]:
+
+        with self._lock:
+            row = self._index.get(symbol)
+            return None if row is None else self._sources[row]
+
+    def __contains__(self, symbol) -> bool:
+
+        return symbol in self._index
+
+    def symbols(self) -> List[str]:
+
+        with self._lock:
+            return list(self._symbols)
+
+    def stats(self) -> Dict[str, int]:
+
+        with self._lock:
+            return {
+                "symbols": len(self._symbols),
+                "capacity": int(self._bars.shape[1]),
+                "window": self.window,
+                "bytes": int(self._bars.nbytes + self._stamps.nbytes),
+            }
+
+
+market_memory_store = MarketMemoryStore()
@@ -9,6 +9,7 @@ if TYPE_CHECKING:
 
 from app.ai.trade_decision import evaluate_trade_coherence
 from app.market.market_universe import B3_CORE, B3_EXTENDED, BDRS, CRYPTO
+from app.market.ohlcv import OHLCV_FIELDS, OHLCVSeries
 
 logger = logging.getLogger("stocknewsbr.trend_breakout_signal_engine")
 _PANDAS = None
@@ -607,6 +608,15 @@ def _infer_profile(symbol: str) -> str:
 
 def _build_ohlc_frame(ohlc: List[Dict[str, Any]]) -> pd.DataFrame:
     pd = _get_pandas()
+    if isinstance(ohlc, OHLCVSeries):
+        # Columns straight from the cached series; same absent-field/NaN handling as _safe_float.
+        frame = pd.DataFrame(
+            {"time": list(ohlc.labels), **{name: ohlc.column(name) for name in OHLCV_FIELDS}}
+        )
+        if frame.empty:
+            return frame
+        return frame.dropna(subset=["open", "high", "low", "close"]).reset_index(drop=True)
+
     rows: List[Dict[str, Any]] = []
 
     for row in ohlc or []:
@@ -0,0 +1,276 @@
+# =====================================================
+# CHART CACHE STORE
+# =====================================================
+
+"""Per-key on-disk store for cached chart rows.
+
+runtime/cache/market_charts.json held every `symbol:interval` series in one document, so
+each chart write re-read, merged and rewrote ~20 MB and each reader re-parsed all of it
+whenever another process moved the mtime. This store keeps one SQLite row per key:
+
+* a write touches only its own row (an upsert inside a short transaction);
+* a lookup decodes only the requested key -- `timestamp()` answers "has this moved?"
+  from the primary key without touching any rows payload;
+* retention and the entry cap run incrementally off the `timestamp` index, a bounded
+  batch per write, instead of filtering the whole mapping on every rewrite.
+
+Plain OHLCV series are stored in their columnar form (see app.market.ohlcv) and come
+back as OHLCVSeries. The database is opened in WAL mode so API workers keep reading
+while the worker writes. The legacy JSON file, when present, is imported once on first
+open and left in place.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from threading import RLock
+from typing import Callable, Iterable, Optional
+
+from app.market.ohlcv import OHLCVSeries
+
+logger = logging.getLogger("stocknewsbr.chart_cache_store")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS charts ("
+    " key TEXT PRIMARY KEY,"
+    " timestamp REAL NOT NULL,"
+    " rows TEXT NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS charts_timestamp_idx ON charts(timestamp)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)",
+)
+# Upper bound on rows a single prune pass deletes, so a write never pays for a backlog.
+_PRUNE_BATCH = 64
+
+_STORES: dict[str, "ChartCacheStore"] = {}
+_STORES_LOCK = RLock()
+
+
+def _encode_rows(rows) -> str:
+    # Columnar series are stored as columns; plain row lists (tagged fallbacks, legacy
+    # imports) keep the row layout so no field is lost.
+    payload = rows.to_columns() if isinstance(rows, OHLCVSeries) else rows
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode_rows(raw):
+    try:
+        rows = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(rows, dict):
+        return OHLCVSeries.from_columns(rows)
+    return rows if isinstance(rows, list) else None
+
+
+class ChartCacheStore:
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None):
+        self.path = Path(path)
+        self.legacy_json = Path(legacy_json) if legacy_json else None
+        self._lock = RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._conn = conn
+        self._import_legacy_json(conn)
+        return conn
+
+    def _import_legacy_json(self, conn: sqlite3.Connection) -> None:
+        if self.legacy_json is None:
+            return
+        imported = conn.execute("SELECT value FROM meta WHERE name = 'legacy_json_imported'").fetchone()
+        if imported is not None:
+            return
+        charts: dict = {}
+        if self.legacy_json.exists():
+            try:
+                payload = json.loads(self.legacy_json.read_text(encoding="utf-8"))
+                charts = payload.get("charts", payload) if isinstance(payload, dict) else {}
+            except (OSError, ValueError) as exc:
+                logger.warning("Legacy chart cache import skipped: %s", exc)
+        records = []
+        for key, value in (charts.items() if isinstance(charts, dict) else ()):
+            if not isinstance(key, str) or not isinstance(value, dict):
+                continue
+            rows = value.get("rows")
+            if not isinstance(rows, list):
+                continue
+            try:
+                timestamp = float(value.get("timestamp") or 0)
+            except (TypeError, ValueError):
+                continue
+            records.append((key, timestamp, _encode_rows(OHLCVSeries.from_rows(rows) or rows)))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another process may have imported first.
+            if conn.execute("SELECT 1 FROM meta WHERE name = 'legacy_json_imported'").fetchone() is None:
+                conn.executemany(
+                    "INSERT INTO charts(key, timestamp, rows) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET timestamp = excluded.timestamp, rows = excluded.rows "
+                    "WHERE excluded.timestamp > charts.timestamp",
+                    records,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta(name, value) VALUES ('legacy_json_imported', ?)",
+                    (str(time.time()),),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def timestamp(self, key: str) -> Optional[float]:
+        with self._lock:
+            row = self._connection().execute("SELECT timestamp FROM charts WHERE key = ?", (key,)).fetchone()
+        return float(row[0]) if row else None
+
+    def timestamps(self, keys: Iterable[str]) -> dict[str, float]:
+        keys = [key for key in keys if key]
+        found: dict[str, float] = {}
+        with self._lock:
+            conn = self._connection()
+            # Chunked to stay under SQLITE_MAX_VARIABLE_NUMBER on old builds.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, timestamp in conn.execute(
+                    f"SELECT key, timestamp FROM charts WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = float(timestamp)
+        return found
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection().execute("SELECT timestamp, rows FROM charts WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        rows = _decode_rows(row[1])
+        if rows is None:
+            return None
+        return {"timestamp": float(row[0]), "rows": rows}
+
+    def put_many(self, entries: dict) -> int:
+        """Upsert `{key: {"timestamp", "rows"}}`; an older entry never replaces a newer one."""
+        records = []
+        for key, value in entries.items():
+            if not key or not isinstance(value, dict) or not isinstance(value.get("rows"), (list, OHLCVSeries)):
+                continue
+            try:
+                timestamp = float(value.get("timestamp") or 0)
+            except (TypeError, ValueError):
+                continue
+            records.append((key, timestamp, _encode_rows(value["rows"])))
+        if not records:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO charts(key, timestamp, rows) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET timestamp = excluded.timestamp, rows = excluded.rows "
+                    "WHERE excluded.timestamp >= charts.timestamp",
+                    records,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(records)
+
+    def put(self, key: str, timestamp: float, rows) -> int:
+        return self.put_many({key: {"timestamp": timestamp, "rows": rows}})
+
+    def delete(self, keys: Iterable[str]) -> int:
+        keys = [key for key in keys if key]
+        if not keys:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.executemany("DELETE FROM charts WHERE key = ?", [(key,) for key in keys])
+            return conn.total_changes - before
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._connection().execute("SELECT key FROM charts")]
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._connection().execute("SELECT COUNT(*) FROM charts").fetchone()[0])
+
+    def prune(
+        self,
+        retention_seconds: float,
+        max_entries: int,
+        is_live: Callable[[str], bool] = lambda key: False,
+        batch: int = _PRUNE_BATCH,
+    ) -> int:
+        """Drop at most `batch` expired/over-cap keys, oldest first; live keys are skipped.
+
+        Same policy as market_data_loader._prune_chart_entries(), applied a slice at a
+        time off the timestamp index so a single write never rescans the whole store.
+        """
+        cutoff = time.time() - float(retention_seconds)
+        with self._lock:
+            conn = self._connection()
+            doomed = [
+                key
+                for (key,) in conn.execute(
+                    "SELECT key FROM charts WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+                    (cutoff, batch * 2),
+                )
+                if not is_live(key)
+            ][:batch]
+            overflow = self.count() - len(doomed) - max(1, int(max_entries))
+            if overflow > 0:
+                seen = set(doomed)
+                for (key,) in conn.execute(
+                    "SELECT key FROM charts ORDER BY timestamp LIMIT ?",
+                    (len(seen) + overflow + batch,),
+                ):
+                    if overflow <= 0 or len(doomed) >= batch * 2:
+                        break
+                    if key in seen or is_live(key):
+                        continue
+                    doomed.append(key)
+                    seen.add(key)
+                    overflow -= 1
+            return self.delete(doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def chart_cache_store(path: Path, legacy_json: Optional[Path] = None) -> ChartCacheStore:
+    """Process-wide store for `path`; one connection per database file."""
+    key = str(Path(path).resolve())
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = ChartCacheStore(path, legacy_json=legacy_json)
+            _STORES[key] = store
+        return store
+
+
+def reset_chart_cache_stores() -> None:
+    """Close every open store. Exists so tests are not stuck with process state."""
+    with _STORES_LOCK:
+        for store in _STORES.values():
+            store.close()
+        _STORES.clear()
@@ -0,0 +1,273 @@
+# =====================================================
+# MARKET DOWNLOAD SCHEDULER
+# Chunked, concurrent provider downloads
+# =====================================================
+
+"""Splits a symbol universe into chunks and downloads them with bounded concurrency.
+
+market_data_cache.get_market_data() used to send the whole universe to one
+yf.download() call. A universe of thousands of symbols became one slow request, and
+any failure (a timeout, one bad chunk of the response) put every symbol behind the
+global 180 s provider cooldown.
+
+The scheduler cuts the universe into fixed chunks of MARKET_DOWNLOAD_CHUNK_SIZE
+symbols, in universe order, so a chunk keeps its identity from one round to the next.
+It runs them on at most MARKET_DOWNLOAD_WORKERS threads and hands each result to the
+caller as it arrives. yfinance itself takes one download at a time (its results live in
+module globals, see market_data_provider), so with that provider the chunks overlap only
+in the caller's per-chunk work; the replay provider downloads them concurrently.
+Failures back off where they happened:
+
+* a chunk whose download fails (None or an exception) is skipped for an exponentially
+  growing cooldown, starting at MARKET_DOWNLOAD_CHUNK_COOLDOWN seconds;
+* a symbol missing from an otherwise successful chunk is retried on the next round,
+  and only after MARKET_DOWNLOAD_SYMBOL_MISSES consecutive misses is it left out of
+  its chunk for a growing cooldown.
+
+Both cooldowns are capped at MARKET_DOWNLOAD_MAX_COOLDOWN. One success clears a
+chunk's or a symbol's history.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("stocknewsbr.market.download_scheduler")
+
+MARKET_DOWNLOAD_CHUNK_SIZE = max(1, int(os.getenv("MARKET_DOWNLOAD_CHUNK_SIZE", "100") or 100))
+MARKET_DOWNLOAD_WORKERS = max(1, int(os.getenv("MARKET_DOWNLOAD_WORKERS", "4") or 4))
+MARKET_DOWNLOAD_CHUNK_COOLDOWN = max(1.0, float(os.getenv("MARKET_DOWNLOAD_CHUNK_COOLDOWN", "30") or 30))
+MARKET_DOWNLOAD_SYMBOL_COOLDOWN = max(1.0, float(os.getenv("MARKET_DOWNLOAD_SYMBOL_COOLDOWN", "60") or 60))
+MARKET_DOWNLOAD_MAX_COOLDOWN = max(1.0, float(os.getenv("MARKET_DOWNLOAD_MAX_COOLDOWN", "900") or 900))
+MARKET_DOWNLOAD_SYMBOL_MISSES = max(1, int(os.getenv("MARKET_DOWNLOAD_SYMBOL_MISSES", "2") or 2))
+
+Chunk = Tuple[str, ...]
+
+
+class _Backoff:
+
+    __slots__ = ("failures", "until", "reason")
+
+    def __init__(self):
+        self.failures = 0
+        self.until = 0.0
+        self.reason = ""
+
+
+class DownloadRound:
+    """Outcome of one scheduled download: per-chunk frames plus counters."""
+
+    def __init__(self):
+        self.frames: List[Tuple[Chunk, object]] = []
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.skipped_chunks = 0
+        self.symbols = 0
+        self.cooled_symbols = 0
+        self.missing_symbols = 0
+        self.seconds = 0.0
+
+    @property
+    def all_failed(self) -> bool:
+        return self.chunks > 0 and self.failed_chunks == self.chunks
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "chunks": self.chunks,
+            "failed_chunks": self.failed_chunks,
+            "skipped_chunks": self.skipped_chunks,
+            "symbols": self.symbols,
+            "cooled_symbols": self.cooled_symbols,
+            "missing_symbols": self.missing_symbols,
+            "seconds": round(self.seconds, 4),
+        }
+
+
+class DownloadScheduler:
+
+    def __init__(
+        self,
+        chunk_size: int = MARKET_DOWNLOAD_CHUNK_SIZE,
+        max_workers: int = MARKET_DOWNLOAD_WORKERS,
+        chunk_cooldown: float = MARKET_DOWNLOAD_CHUNK_COOLDOWN,
+        symbol_cooldown: float = MARKET_DOWNLOAD_SYMBOL_COOLDOWN,
+        max_cooldown: float = MARKET_DOWNLOAD_MAX_COOLDOWN,
+        symbol_misses: int = MARKET_DOWNLOAD_SYMBOL_MISSES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_workers = max(1, int(max_workers))
+        self.chunk_cooldown = float(chunk_cooldown)
+        self.symbol_cooldown = float(symbol_cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.symbol_misses = max(1, int(symbol_misses))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._chunks: Dict[Chunk, _Backoff] = {}
+        self._symbols: Dict[str, _Backoff] = {}
+        self.last_round: Dict[str, float] = {}
+
+    # -------------------------------------------------
+    # BACKOFF STATE
+    # -------------------------------------------------
+
+    def _cooldown_for(self, base: float, failures: int) -> float:
+        return min(self.max_cooldown, base * (2 ** max(0, failures - 1)))
+
+    def _chunk_failed(self, chunk: Chunk, reason: str) -> None:
+        with self._lock:
+            state = self._chunks.setdefault(chunk, _Backoff())
+            state.failures += 1
+            state.until = self._clock() + self._cooldown_for(self.chunk_cooldown, state.failures)
+            state.reason = reason
+
+    def _chunk_succeeded(self, chunk: Chunk, present: Iterable[str], missing: Iterable[str]) -> None:
+        now = self._clock()
+        with self._lock:
+            self._chunks.pop(chunk, None)
+            for symbol in present:
+                self._symbols.pop(symbol, None)
+            for symbol in missing:
+                state = self._symbols.setdefault(symbol, _Backoff())
+                state.failures += 1
+                state.reason = "missing_from_chunk"
+                if state.failures >= self.symbol_misses:
+                    misses = state.failures - self.symbol_misses + 1
+                    state.until = now + self._cooldown_for(self.symbol_cooldown, misses)
+
+    def chunk_in_cooldown(self, chunk: Chunk) -> bool:
+        with self._lock:
+            state = self._chunks.get(tuple(chunk))
+            return state is not None and state.until > self._clock()
+
+    def symbol_in_cooldown(self, symbol: str) -> bool:
+        with self._lock:
+            state = self._symbols.get(symbol)
+            return state is not None and state.until > self._clock()
+
+    def cooldowns(self) -> Dict[str, Dict]:
+        now = self._clock()
+        with self._lock:
+            return {
+                "chunks": {
+                    f"{chunk[0]}..{chunk[-1]}": {"failures": state.failures, "remaining": round(state.until - now, 1), "reason": state.reason}
+                    for chunk, state in self._chunks.items()
+                    if state.until > now
+                },
+                "symbols": {
+                    symbol: {"failures": state.failures, "remaining": round(state.until - now, 1)}
+                    for symbol, state in self._symbols.items()
+                    if state.until > now
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._chunks.clear()
+            self._symbols.clear()
+            self.last_round = {}
+
+    # -------------------------------------------------
+    # SCHEDULING
+    # -------------------------------------------------
+
+    def plan(self, symbols: Sequence[str], round_: Optional[DownloadRound] = None) -> List[Tuple[Chunk, Chunk]]:
+        """(chunk, symbols to request) pairs for the chunks not cooling down."""
+
+        now = self._clock()
+        planned = []
+        with self._lock:
+            for start in range(0, len(symbols), self.chunk_size):
+                chunk = tuple(symbols[start:start + self.chunk_size])
+                state = self._chunks.get(chunk)
+                if state is not None and state.until > now:
+                    if round_ is not None:
+                        round_.skipped_chunks += 1
+                    continue
+                request = tuple(
+                    symbol for symbol in chunk
+                    if not (symbol in self._symbols and self._symbols[symbol].until > now)
+                )
+                if round_ is not None:
+                    round_.cooled_symbols += len(chunk) - len(request)
+                if request:
+                    planned.append((chunk, request))
+        return planned
+
+    def run(
+        self,
+        symbols: Sequence[str],
+        fetch: Callable[[Chunk], object],
+        present_symbols: Callable[[object, Chunk], Iterable[str]],
+        on_chunk: Optional[Callable[[Chunk, object], None]] = None,
+    ) -> DownloadRound:
+        """Download `symbols` chunk by chunk.
+
+        `fetch(request)` returns the provider payload for one chunk (None on failure);
+        `present_symbols(payload, request)` says which requested symbols it holds.
+        `on_chunk(request, payload)` runs on the calling thread as each chunk lands.
+        Frames come back in universe order whatever order they completed in.
+        """
+
+        start = time.perf_counter()
+        round_ = DownloadRound()
+        round_.symbols = len(symbols)
+        planned = self.plan(symbols, round_)
+        round_.chunks = len(planned)
+        landed: Dict[Chunk, object] = {}
+
+        def settle(chunk: Chunk, request: Chunk, payload, error: Optional[BaseException]):
+            if error is not None or payload is None:
+                round_.failed_chunks += 1
+                self._chunk_failed(chunk, str(error or "empty_data")[:120])
+                return
+            present = set(present_symbols(payload, request))
+            missing = [symbol for symbol in request if symbol not in present]
+            round_.missing_symbols += len(missing)
+            self._chunk_succeeded(chunk, present, missing)
+            landed[chunk] = payload
+            if on_chunk is not None:
+                try:
+                    on_chunk(request, payload)
+                except Exception as exc:
+                    logger.warning("Market download chunk consumer failed: %s", exc)
+
+        if len(planned) <= 1 or self.max_workers == 1:
+            for chunk, request in planned:
+                try:
+                    payload, error = fetch(request), None
+                except Exception as exc:
+                    payload, error = None, exc
+                settle(chunk, request, payload, error)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(planned)),
+                thread_name_prefix="market-download",
+            ) as executor:
+                # Each chunk runs in a copy of the caller's context, so provider call
+                # sources (and the HTTP provider guard) follow the work into the pool.
+                futures = {
+                    executor.submit(contextvars.copy_context().run, fetch, request): (chunk, request)
+                    for chunk, request in planned
+                }
+                for future in as_completed(futures):
+                    chunk, request = futures[future]
+                    try:
+                        payload, error = future.result(), None
+                    except Exception as exc:
+                        payload, error = None, exc
+                    settle(chunk, request, payload, error)
+
+        round_.frames = [(chunk, landed[chunk]) for chunk, _request in planned if chunk in landed]
+        round_.seconds = time.perf_counter() - start
+        self.last_round = round_.as_dict()
+        if round_.failed_chunks or round_.skipped_chunks:
+            logger.info("Market download round | %s", self.last_round)
+        return round_
+
+
+download_scheduler = DownloadScheduler()
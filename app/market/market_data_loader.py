@@ -21,6 +21,11 @@ if TYPE_CHECKING:
 
 from zoneinfo import ZoneInfo
 
+from app.cache.shared_publication import shared_publication
+from app.core.single_flight import FlightTimeout, flight_key, single_flight
+from app.market.chart_cache_store import ChartCacheStore, chart_cache_store
+from app.market.market_data_provider import get_market_data_provider
+from app.market.ohlcv import OHLCVSeries, chart_rows_as_list
 from app.system.system_metrics import (
     current_provider_call_source,
     record_cache_lookup,
@@ -44,7 +49,6 @@ from app.services.symbol_registry import (
 )
 
 logger = logging.getLogger("stocknewsbr.market_data_loader")
-_YFINANCE = None
 _PRICE_CACHE_TTL_SECONDS = max(30, int(os.getenv("PRICE_CACHE_TTL_SECONDS", "30")))
 _CHART_CACHE_TTL_SECONDS = int(os.getenv("CHART_CACHE_TTL_SECONDS", "1800"))
 _PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -69,14 +73,13 @@ _CHART_CACHE_PERSIST_LOCK = RLock()
 _PRICE_CACHE_LOADED = False
 _PRICE_CACHE_MTIME = 0.0
 _PRICE_CACHE_INCLUDE_STALE = False
-_CHART_CACHE_LOADED = False
-_CHART_CACHE_MTIME = 0.0
 # Retention for the persisted chart cache. Fourteen days matches
 # _CHART_RETENTION_SECONDS in public_market_data_service, which decides how long a
-# direct read will still accept an entry -- keeping anything older is dead weight
-# every reparse has to pay for. The cap bounds the file even if every entry is fresh.
+# direct read will still accept an entry -- keeping anything older is dead weight.
+# The cap bounds the store even if every entry is fresh.
 _CHART_CACHE_RETENTION_SECONDS = int(os.getenv("MARKET_CHARTS_RETENTION_SECONDS", str(60 * 60 * 24 * 14)))
 _CHART_CACHE_MAX_ENTRIES = max(1, int(os.getenv("MARKET_CHARTS_MAX_ENTRIES", "2048")))
+_CHART_RESIDENT_MAX_ENTRIES = 2048
 _SYMBOL_FAILURE_COOLDOWN_SECONDS = 180
 # BRFS3/JBSS3 removed: they now canonicalize to live successors (MBRF3 / JBSS32).
 _PERMANENT_PROVIDER_BLOCKLIST = {
@@ -488,12 +491,8 @@ _BDR_PROXY_SYMBOLS = {
 
 
 def _get_yfinance():
-    global _YFINANCE
-    if _YFINANCE is None:
-        import yfinance as yf_module
-
-        _YFINANCE = yf_module
-    return _YFINANCE
+    """The configured market data provider (yfinance unless MARKET_DATA_PROVIDER says otherwise)."""
+    return get_market_data_provider()
 
 
 def _network_provider_allowed() -> bool:
@@ -871,6 +870,8 @@ def _persist_price_cache():
                 json.dumps(final_payload, ensure_ascii=False, separators=(",", ":")),
                 encoding="utf-8",
             )
+            # rename keeps mtime and size, so this identifies exactly what we publish.
+            written = tmp.stat()
             for attempt in range(3):
                 try:
                     os.replace(tmp, _PRICE_CACHE_FILE)
@@ -880,6 +881,12 @@ def _persist_price_cache():
                         raise
                     time.sleep(0.05 * (attempt + 1))
 
+            # API processes look quotes up per key from shared memory instead of
+            # re-parsing the whole file.
+            shared_publication(_PRICE_CACHE_FILE).publish(
+                final_payload, (written.st_mtime_ns, written.st_size)
+            )
+
             # Clear dirty flags only after successful disk write
             with _PRICE_SNAPSHOT_CACHE_LOCK:
                 for key, value in _PRICE_SNAPSHOT_CACHE.items():
@@ -894,57 +901,49 @@ def _persist_price_cache():
         logger.warning("Failed to persist market quote cache: %s", exc)
 
 
-def _load_chart_cache_once(force: bool = False):
-    global _CHART_CACHE_LOADED, _CHART_CACHE_MTIME
-    try:
-        if not _CHART_CACHE_FILE.exists():
-            return
-        file_mtime = _CHART_CACHE_FILE.stat().st_mtime
-        with _PRICE_SNAPSHOT_CACHE_LOCK:
-            # The mtime guard is unconditional: `force` skips the _LOADED short-circuit for
-            # callers that rewrote the file themselves, never the freshness check. A cache
-            # miss used to force a full reload here to catch a concurrent writer, but when
-            # the file has not moved that reload rebuilds a bit-identical dict. Since
-            # _persist_chart_cache() merges disk into memory without pruning, this file only
-            # ever grows (18.2 MB observed), so each wasted parse cost ~3 s -- and a miss
-            # never becomes a hit, so it repeated on every request. With six chart lookups
-            # per /public/market/bundle call the endpoint reached 15-28 s and every loopback
-            # client gave up first. A real writer still moves the mtime and is picked up.
-            if _CHART_CACHE_LOADED and file_mtime <= float(_CHART_CACHE_MTIME or 0):
-                return
+def _chart_store() -> ChartCacheStore:
+    """The per-key chart store that sits beside the (legacy) JSON cache path.
 
-        try:
-            payload = json.loads(_CHART_CACHE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            payload = {}
-        charts = payload.get("charts", payload) if isinstance(payload, dict) else {}
-        if not isinstance(charts, dict):
-            charts = {}
-
-        normalized = {}
-        for key, value in charts.items():
-            if not isinstance(key, str) or not isinstance(value, dict):
-                continue
-            rows = value.get("rows")
-            timestamp = value.get("timestamp")
-            if not isinstance(rows, list):
-                continue
-            try:
-                parsed_timestamp = float(timestamp or 0)
-            except (TypeError, ValueError):
-                parsed_timestamp = 0.0
-            normalized[key] = {
-                "timestamp": parsed_timestamp,
-                "rows": [dict(row) for row in rows if isinstance(row, dict)],
-            }
+    Derived from _CHART_CACHE_FILE on every call so an override of that path -- the env
+    var in deployment, a monkeypatch in tests -- moves the store with it.
+    """
+    return chart_cache_store(_CHART_CACHE_FILE.with_suffix(".sqlite3"), legacy_json=_CHART_CACHE_FILE)
 
-        with _PRICE_SNAPSHOT_CACHE_LOCK:
-            _CHART_DATA_CACHE.clear()
-            _CHART_DATA_CACHE.update(normalized)
-            _CHART_CACHE_LOADED = True
-            _CHART_CACHE_MTIME = file_mtime
+
+def _resident_chart_entry(cache_key: str) -> Optional[dict]:
+    """Return the newest entry for one key, reading only that key from disk.
+
+    The resident copy is reused while the store holds nothing newer; a newer row written
+    by another process replaces it. Unrelated symbols are never decoded -- the freshness
+    probe is a primary-key lookup on the timestamp column.
+    """
+    with _PRICE_SNAPSHOT_CACHE_LOCK:
+        resident = _CHART_DATA_CACHE.get(cache_key)
+    try:
+        store = _chart_store()
+        disk_timestamp = store.timestamp(cache_key)
+        if disk_timestamp is None:
+            return resident
+        resident_timestamp = float((resident or {}).get("timestamp") or 0)
+        if resident is not None and disk_timestamp <= resident_timestamp:
+            return resident
+        entry = store.get(cache_key)
     except Exception as exc:
-        logger.warning("Failed to load market chart cache: %s", exc)
+        logger.warning("Failed to load market chart cache entry %s: %s", cache_key, exc)
+        return resident
+    if entry is None:
+        return resident
+    if not isinstance(entry["rows"], OHLCVSeries):
+        rows = [row for row in entry["rows"] if isinstance(row, dict)]
+        entry["rows"] = OHLCVSeries.from_rows(rows) or rows
+    with _PRICE_SNAPSHOT_CACHE_LOCK:
+        current = _CHART_DATA_CACHE.get(cache_key)
+        if current is not None and float(current.get("timestamp") or 0) >= entry["timestamp"]:
+            return current
+        if cache_key not in _CHART_DATA_CACHE and len(_CHART_DATA_CACHE) >= _CHART_RESIDENT_MAX_ENTRIES:
+            _CHART_DATA_CACHE.pop(next(iter(_CHART_DATA_CACHE)))
+        _CHART_DATA_CACHE[cache_key] = entry
+    return entry
 
 
 def _prune_chart_entries(charts: dict) -> dict:
@@ -954,7 +953,8 @@ def _prune_chart_entries(charts: dict) -> dict:
     grew: 18.2 MB observed, then 20.1 MB hours later. Every reparse pays for that size,
     which is what pushed /public/market/bundle past the loopback client timeout. This is
     the same retention `symbol_hydration._prune_dead_pending` already applies to the
-    analysis cache.
+    analysis cache. The on-disk store applies the identical policy incrementally through
+    ChartCacheStore.prune(); this whole-mapping form remains for in-memory callers.
 
     Kept: anything currently resident in _CHART_DATA_CACHE (a live run owns it, regardless
     of age), and any structurally valid entry younger than _CHART_CACHE_RETENTION_SECONDS.
@@ -974,7 +974,7 @@ def _prune_chart_entries(charts: dict) -> dict:
         if not isinstance(key, str) or not isinstance(value, dict):
             continue
         rows = value.get("rows")
-        if not isinstance(rows, list):
+        if not isinstance(rows, (list, OHLCVSeries)):
             continue
         try:
             timestamp = float(value.get("timestamp") or 0)
@@ -1002,48 +1002,50 @@ def _prune_chart_entries(charts: dict) -> dict:
     return survivors
 
 
-def _persist_chart_cache():
-    global _CHART_CACHE_MTIME
+def _prune_chart_store(store: ChartCacheStore) -> None:
+    with _PRICE_SNAPSHOT_CACHE_LOCK:
+        live_keys = set(_CHART_DATA_CACHE)
+    store.prune(
+        _CHART_CACHE_RETENTION_SECONDS,
+        _CHART_CACHE_MAX_ENTRIES,
+        is_live=live_keys.__contains__,
+    )
+
+
+def _persist_chart_entries(entries: dict) -> None:
+    """Write the given `{key: entry}` rows to the store, then prune a bounded slice."""
+    if not entries:
+        return
     try:
-        _CHART_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
         with _CHART_CACHE_PERSIST_LOCK:
-            disk_payload = {}
-            if _CHART_CACHE_FILE.exists():
-                try:
-                    raw = json.loads(_CHART_CACHE_FILE.read_text(encoding="utf-8"))
-                    if isinstance(raw, dict) and isinstance(raw.get("charts"), dict):
-                        disk_payload = raw["charts"]
-                except Exception:
-                    pass
+            store = _chart_store()
+            store.put_many(entries)
+            _prune_chart_store(store)
+    except Exception as exc:
+        logger.warning("Failed to persist market chart cache: %s", exc)
 
-            with _PRICE_SNAPSHOT_CACHE_LOCK:
-                payload_to_merge = dict(_CHART_DATA_CACHE)
 
-            final_charts = dict(disk_payload)
-            final_charts.update(payload_to_merge)
-            payload = {"charts": _prune_chart_entries(final_charts)}
+def _persist_chart_cache():
+    """Flush resident chart entries that are newer than their stored row.
 
-            tmp = _CHART_CACHE_FILE.with_name(
-                f"{_CHART_CACHE_FILE.stem}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
-            )
-            tmp.write_text(
-                json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
-                encoding="utf-8",
-            )
-            for attempt in range(3):
-                try:
-                    os.replace(tmp, _CHART_CACHE_FILE)
-                    break
-                except PermissionError:
-                    if attempt >= 2:
-                        raise
-                    time.sleep(0.05 * (attempt + 1))
-            try:
-                _CHART_CACHE_MTIME = _CHART_CACHE_FILE.stat().st_mtime
-            except Exception:
-                pass
+    Batch callers (chart warmup, the offline fixture) cache with persist=False and flush
+    once here. Only keys whose resident timestamp moved past the stored one are written;
+    every other key in the store is left untouched.
+    """
+    with _PRICE_SNAPSHOT_CACHE_LOCK:
+        resident = {key: value for key, value in _CHART_DATA_CACHE.items() if isinstance(value, dict)}
+    if not resident:
+        return
+    try:
+        stored = _chart_store().timestamps(resident)
     except Exception as exc:
         logger.warning("Failed to persist market chart cache: %s", exc)
+        return
+    _persist_chart_entries({
+        key: value
+        for key, value in resident.items()
+        if float(value.get("timestamp") or 0) > stored.get(key, float("-inf"))
+    })
 
 
 def _chart_cache_key(symbol: str, interval: str) -> str:
@@ -1051,37 +1053,64 @@ def _chart_cache_key(symbol: str, interval: str) -> str:
     return f"{key}:{str(interval or '1D').upper()}" if key else ""
 
 
-def get_cached_chart_data(symbol: str, interval: str = "1D", allow_stale: bool = False):
+def _cached_chart_rows(symbol: str, interval: str, allow_stale: bool):
     start = time.perf_counter()
     cache_key = _chart_cache_key(symbol, interval)
     if not cache_key:
         mark_symbol_cooldown(symbol, reason="invalid_symbol")
         record_cache_lookup("chart", time.perf_counter() - start, len(_CHART_DATA_CACHE))
         return None
-    _load_chart_cache_once()
-    with _PRICE_SNAPSHOT_CACHE_LOCK:
-        cached = _CHART_DATA_CACHE.get(cache_key)
-    if not cached:
-        _load_chart_cache_once(force=True)
-        with _PRICE_SNAPSHOT_CACHE_LOCK:
-            cached = _CHART_DATA_CACHE.get(cache_key)
+    cached = _resident_chart_entry(cache_key)
     if not cached:
         record_cache_lookup("chart", time.perf_counter() - start, len(_CHART_DATA_CACHE))
         return None
 
     age = time.time() - float(cached.get("timestamp") or 0)
-    if age > _CHART_CACHE_TTL_SECONDS:
-        _load_chart_cache_once(force=True)
-        with _PRICE_SNAPSHOT_CACHE_LOCK:
-            cached = _CHART_DATA_CACHE.get(cache_key)
-        age = time.time() - float((cached or {}).get("timestamp") or 0)
-    if not cached or (age > _CHART_CACHE_TTL_SECONDS and not allow_stale):
+    if age > _CHART_CACHE_TTL_SECONDS and not allow_stale:
         record_cache_lookup("chart", time.perf_counter() - start, len(_CHART_DATA_CACHE))
         return None
 
     rows = cached.get("rows")
     record_cache_lookup("chart", time.perf_counter() - start, len(_CHART_DATA_CACHE))
-    return [dict(row) for row in rows] if isinstance(rows, list) else None
+    return rows if isinstance(rows, (list, OHLCVSeries)) else None
+
+
+def chart_cache_generation(symbols, intervals) -> tuple:
+    """Timestamps of every cached `symbol:interval` entry, resident and on disk.
+
+    Cheap enough to call per request (one indexed store query, no rows decoded); it
+    moves whenever any of those charts is rewritten, so callers can key derived
+    responses on it instead of re-reading the charts.
+    """
+    keys = [key for key in (_chart_cache_key(symbol, interval) for symbol in symbols for interval in intervals) if key]
+    with _PRICE_SNAPSHOT_CACHE_LOCK:
+        resident = {key: (_CHART_DATA_CACHE.get(key) or {}).get("timestamp") for key in keys}
+    try:
+        stored = _chart_store().timestamps(keys)
+    except Exception as exc:
+        logger.debug("Chart cache generation probe failed: %s", exc)
+        stored = {}
+    return tuple((key, resident.get(key), stored.get(key)) for key in keys)
+
+
+def get_cached_chart_series(symbol: str, interval: str = "1D", allow_stale: bool = False):
+    """Cached candles without the per-row copy.
+
+    Plain OHLCV charts come back as the shared, read-only OHLCVSeries the cache holds;
+    charts that do not fit that shape come back as a copied list of row dicts. Both
+    iterate as row dicts, so callers that only read rows need not care which they got.
+    """
+    rows = _cached_chart_rows(symbol, interval, allow_stale)
+    if rows is None or isinstance(rows, OHLCVSeries):
+        return rows
+    return [dict(row) for row in rows]
+
+
+def get_cached_chart_data(symbol: str, interval: str = "1D", allow_stale: bool = False):
+    rows = _cached_chart_rows(symbol, interval, allow_stale)
+    if rows is None:
+        return None
+    return chart_rows_as_list(rows) if isinstance(rows, OHLCVSeries) else [dict(row) for row in rows]
 
 
 def _cache_chart_data(symbol: str, interval: str, rows: list, persist: bool = True):
@@ -1093,14 +1122,15 @@ def _cache_chart_data(symbol: str, interval: str, rows: list, persist: bool = Tr
         if not cache_key:
             mark_symbol_cooldown(symbol, reason="invalid_symbol")
             return rows
-        if cache_key not in _CHART_DATA_CACHE and len(_CHART_DATA_CACHE) >= 2048:
+        if cache_key not in _CHART_DATA_CACHE and len(_CHART_DATA_CACHE) >= _CHART_RESIDENT_MAX_ENTRIES:
             _CHART_DATA_CACHE.pop(next(iter(_CHART_DATA_CACHE)))
-        _CHART_DATA_CACHE[cache_key] = {
+        entry = {
             "timestamp": time.time(),
-            "rows": [dict(row) for row in rows],
+            "rows": OHLCVSeries.from_rows(rows) or [dict(row) for row in rows],
         }
+        _CHART_DATA_CACHE[cache_key] = entry
     if persist:
-        _persist_chart_cache()
+        _persist_chart_entries({cache_key: entry})
     return rows
 
 
@@ -1274,145 +1304,76 @@ def get_ticker_frame(
     return _extract_single_ticker_frame(data, normalized_symbol)
 
 
-def get_chart_data(symbol: str, interval: str = "1D"):
-    if not sanitize_market_symbol(symbol, allow_provider_symbols=True):
-        _mark_symbol_failure(symbol, error="invalid_symbol")
-        return []
-    normalized_interval = str(interval or "1D").upper()
-    min_rows_map = {
-        "1D": 12,
-        "1W": 18,
-        "1M": 18,
-        "3M": 30,
-        "6M": 40,
-        "YTD": 40,
-        "1Y": 60,
-        "ALL": 60,
-    }
-    # "@<candle>" asks for a real candle size (RSI must follow the interval the user
-    # sees), not a range label. RSI-14 needs period+1 closes, so demand a bit more.
-    min_rows = (
-        8 * 24 * 12
-        if normalized_interval == "@5M" and crypto_provider_symbol(symbol)
-        else 20
-        if normalized_interval.startswith("@")
-        else min_rows_map.get(normalized_interval, 12)
-    )
-
-    cached = get_cached_chart_data(symbol, interval)
-    if cached and len(cached) >= min_rows:
-        return cached
-
-    if not _network_provider_allowed():
-        _record_blocked_http_provider(symbol, "chart")
-        if cached:
-            return cached
-        return get_cached_chart_data(symbol, interval, allow_stale=True) or []
-
-    interval_map = {
-        # 5d of 5m candles first: a single trading day ("1d","5m") is only ~14 bars early
-        # in a session, one short of the period+1 that RSI(14) needs, so the indicator went
-        # blank until ~75min in. 5d gives ~345 bars. Visual chart is a TradingView embed, so
-        # this widening feeds RSI/score, not the drawn chart. Old combos kept as fallbacks.
-        "1D": [("5d", "5m"), ("1d", "5m"), ("5d", "30m")],
-        "1W": [("5d", "30m"), ("1mo", "1d")],
-        # TIMEFRAME_TO_TRADING_VIEW draws the 1M range with 60m candles, so the RSI
-        # must use 60m too -- daily candles here made the chip disagree with the chart.
-        "1M": [("1mo", "1h"), ("1mo", "1d"), ("3mo", "1d")],
-        "3M": [("3mo", "1d"), ("6mo", "1d")],
-        "6M": [("6mo", "1d"), ("1y", "1d")],
-        "YTD": [("ytd", "1d"), ("1y", "1d")],
-        "1Y": [("1y", "1d"), ("2y", "1wk")],
-        "ALL": [("5y", "1wk"), ("2y", "1d"), ("1y", "1d")],
-        # Explicit candle sizes ("@" namespace so "@1M" = one minute never collides
-        # with the "1M" = one month range label). Periods respect yfinance limits.
-        "@1M": [("5d", "1m")],
-        # One month provides enough 24x7 history to compare the current UTC
-        # five-minute bucket with previous days. The route remains cache-only;
-        # only chart workers call this provider path.
-        "@5M": [("1mo", "5m")],
-        "@15M": [("1mo", "15m")],
-        "@30M": [("1mo", "30m")],
-        "@1H": [("3mo", "1h")],
-        "@1D": [("1y", "1d")],
-        "@1WK": [("5y", "1wk")],
-    }
-
-    frame = None
-    for period, yf_interval in interval_map.get(normalized_interval, [("1d", "5m"), ("5d", "30m")]):
-        # TradingView shows equities unadjusted for dividends by default; adjusted
-        # closes shift the deltas whenever an ex-dividend date lands in the window,
-        # so the indicator series must not be auto-adjusted. Quotes/snapshots keep
-        # the adjusted default (batch_download / get_ticker_frame are shared).
-        frame = get_ticker_frame(symbol, period=period, interval=yf_interval, auto_adjust=False)
-        if frame is not None and not frame.empty:
-            try:
-                candidate_rows = frame.dropna(subset=["Close"]) if hasattr(frame, "dropna") else frame
-            except Exception:
-                candidate_rows = frame
-            if candidate_rows is not None and len(candidate_rows) >= min_rows:
-                frame = candidate_rows
-                break
-            frame = candidate_rows
-        if frame is not None and not frame.empty and len(frame) >= min_rows:
-            break
-
-    if frame is None or frame.empty:
-        return []
+_CHART_MIN_ROWS = {
+    "1D": 12,
+    "1W": 18,
+    "1M": 18,
+    "3M": 30,
+    "6M": 40,
+    "YTD": 40,
+    "1Y": 60,
+    "ALL": 60,
+}
 
-    try:
-        frame = frame.dropna(subset=["Close"])
-    except Exception:
-        pass
+_CHART_FETCH_PLANS = {
+    # 5d of 5m candles first: a single trading day ("1d","5m") is only ~14 bars early
+    # in a session, one short of the period+1 that RSI(14) needs, so the indicator went
+    # blank until ~75min in. 5d gives ~345 bars. Visual chart is a TradingView embed, so
+    # this widening feeds RSI/score, not the drawn chart. Old combos kept as fallbacks.
+    "1D": [("5d", "5m"), ("1d", "5m"), ("5d", "30m")],
+    "1W": [("5d", "30m"), ("1mo", "1d")],
+    # TIMEFRAME_TO_TRADING_VIEW draws the 1M range with 60m candles, so the RSI
+    # must use 60m too -- daily candles here made the chip disagree with the chart.
+    "1M": [("1mo", "1h"), ("1mo", "1d"), ("3mo", "1d")],
+    "3M": [("3mo", "1d"), ("6mo", "1d")],
+    "6M": [("6mo", "1d"), ("1y", "1d")],
+    "YTD": [("ytd", "1d"), ("1y", "1d")],
+    "1Y": [("1y", "1d"), ("2y", "1wk")],
+    "ALL": [("5y", "1wk"), ("2y", "1d"), ("1y", "1d")],
+    # Explicit candle sizes ("@" namespace so "@1M" = one minute never collides
+    # with the "1M" = one month range label). Periods respect yfinance limits.
+    "@1M": [("5d", "1m")],
+    # One month provides enough 24x7 history to compare the current UTC
+    # five-minute bucket with previous days. The route remains cache-only;
+    # only chart workers call this provider path.
+    "@5M": [("1mo", "5m")],
+    "@15M": [("1mo", "15m")],
+    "@30M": [("1mo", "30m")],
+    "@1H": [("3mo", "1h")],
+    "@1D": [("1y", "1d")],
+    "@1WK": [("5y", "1wk")],
+}
 
-    if frame is None or frame.empty:
-        return []
+# Concurrent misses for the same symbol share one provider fetch.
+_CHART_FLIGHTS = single_flight("chart")
+_QUOTE_FLIGHTS = single_flight("quote")
 
-    rows = []
 
-    row_limit = 9000 if normalized_interval == "@5M" else 240
-    for index, row in frame.tail(row_limit).iterrows():
-        close = float(row.get("Close", 0) or 0)
-        if close <= 0:
-            continue
+def _chart_min_rows(symbol: str, normalized_interval: str) -> int:
+    # "@<candle>" asks for a real candle size (RSI must follow the interval the user
+    # sees), not a range label. RSI-14 needs period+1 closes, so demand a bit more.
+    if normalized_interval == "@5M" and crypto_provider_symbol(symbol):
+        return 8 * 24 * 12
+    if normalized_interval.startswith("@"):
+        return 20
+    return _CHART_MIN_ROWS.get(normalized_interval, 12)
 
-        rows.append(
-            {
-                "time": str(index),
-                "open": float(row.get("Open", 0) or close),
-                "high": float(row.get("High", 0) or close),
-                "low": float(row.get("Low", 0) or close),
-                "close": close,
-                "volume": float(row.get("Volume", 0) or 0),
-            }
-        )
 
-    return _cache_chart_data(symbol, interval, rows)
+def get_chart_data(symbol: str, interval: str = "1D"):
+    return _load_chart_data(symbol, interval, persist=True)
 
 
 def _get_chart_data_no_persist(symbol: str, interval: str = "1D") -> list:
     """Fetch and cache chart data without persisting to disk. For batch warmup."""
+    return _load_chart_data(symbol, interval, persist=False)
+
+
+def _load_chart_data(symbol: str, interval: str, persist: bool) -> list:
     if not sanitize_market_symbol(symbol, allow_provider_symbols=True):
         _mark_symbol_failure(symbol, error="invalid_symbol")
         return []
     normalized_interval = str(interval or "1D").upper()
-    min_rows_map = {
-        "1D": 12,
-        "1W": 18,
-        "1M": 18,
-        "3M": 30,
-        "6M": 40,
-        "YTD": 40,
-        "1Y": 60,
-        "ALL": 60,
-    }
-    min_rows = (
-        8 * 24 * 12
-        if normalized_interval == "@5M" and crypto_provider_symbol(symbol)
-        else 20
-        if normalized_interval.startswith("@")
-        else min_rows_map.get(normalized_interval, 12)
-    )
+    min_rows = _chart_min_rows(symbol, normalized_interval)
 
     cached = get_cached_chart_data(symbol, interval)
     if cached and len(cached) >= min_rows:
@@ -1424,26 +1385,28 @@ def _get_chart_data_no_persist(symbol: str, interval: str = "1D") -> list:
             return cached
         return get_cached_chart_data(symbol, interval, allow_stale=True) or []
 
-    interval_map = {
-        "1D": [("5d", "5m"), ("1d", "5m"), ("5d", "30m")],
-        "1W": [("5d", "30m"), ("1mo", "1d")],
-        "1M": [("1mo", "1h"), ("1mo", "1d"), ("3mo", "1d")],
-        "3M": [("3mo", "1d"), ("6mo", "1d")],
-        "6M": [("6mo", "1d"), ("1y", "1d")],
-        "YTD": [("ytd", "1d"), ("1y", "1d")],
-        "1Y": [("1y", "1d"), ("2y", "1wk")],
-        "ALL": [("5y", "1wk"), ("2y", "1d"), ("1y", "1d")],
-        "@1M": [("5d", "1m")],
-        "@5M": [("1mo", "5m")],
-        "@15M": [("1mo", "15m")],
-        "@30M": [("1mo", "30m")],
-        "@1H": [("3mo", "1h")],
-        "@1D": [("1y", "1d")],
-        "@1WK": [("5y", "1wk")],
-    }
+    def fetch():
+        rows = _fetch_chart_rows(symbol, normalized_interval, min_rows)
+        # The leader decides persistence for everyone on the flight; warmups that lead
+        # flush their resident entries in bulk through _persist_chart_cache().
+        if persist:
+            return _cache_chart_data(symbol, interval, rows)
+        return _cache_chart_data(symbol, interval, rows, persist=False)
+
+    try:
+        rows = _CHART_FLIGHTS.do(flight_key("chart", _cache_key(symbol) or symbol, normalized_interval), fetch)
+    except FlightTimeout:
+        return get_cached_chart_data(symbol, interval, allow_stale=True) or []
+    return [dict(row) for row in rows] if rows else []
+
 
+def _fetch_chart_rows(symbol: str, normalized_interval: str, min_rows: int) -> list:
     frame = None
-    for period, yf_interval in interval_map.get(normalized_interval, [("1d", "5m"), ("5d", "30m")]):
+    for period, yf_interval in _CHART_FETCH_PLANS.get(normalized_interval, [("1d", "5m"), ("5d", "30m")]):
+        # TradingView shows equities unadjusted for dividends by default; adjusted
+        # closes shift the deltas whenever an ex-dividend date lands in the window,
+        # so the indicator series must not be auto-adjusted. Quotes/snapshots keep
+        # the adjusted default (batch_download / get_ticker_frame are shared).
         frame = get_ticker_frame(symbol, period=period, interval=yf_interval, auto_adjust=False)
         if frame is not None and not frame.empty:
             try:
@@ -1487,7 +1450,7 @@ def _get_chart_data_no_persist(symbol: str, interval: str = "1D") -> list:
             }
         )
 
-    return _cache_chart_data(symbol, interval, rows, persist=False)
+    return rows
 
 
 def _session_day(stamp, timezone_name: str | None = None):
@@ -1550,15 +1513,20 @@ def _previous_daily_close(symbol: str, current_day, timezone_name: str | None =
     """
     if not current_day:
         return None
-    _load_chart_cache_once()
-    with _PRICE_SNAPSHOT_CACHE_LOCK:
-        entries = [_CHART_DATA_CACHE.get(_chart_cache_key(symbol, interval) or "") for interval in ("3M", "6M", "1Y")]
+    entries = []
+    for interval in ("3M", "6M", "1Y"):
+        cache_key = _chart_cache_key(symbol, interval)
+        entries.append(_resident_chart_entry(cache_key) if cache_key else None)
     for entry in entries:
         rows = (entry or {}).get("rows")
-        if not isinstance(rows, list) or len(rows) < 2:
+        if not isinstance(rows, (list, OHLCVSeries)) or len(rows) < 2:
             continue
-        stamps = [row.get("time") for row in rows if isinstance(row, dict)]
-        closes = [row.get("close") for row in rows if isinstance(row, dict)]
+        if isinstance(rows, OHLCVSeries):
+            stamps = list(rows.labels)
+            closes = rows.close.tolist() if "close" in rows.fields else [None] * len(rows)
+        else:
+            stamps = [row.get("time") for row in rows if isinstance(row, dict)]
+            closes = [row.get("close") for row in rows if isinstance(row, dict)]
         if _session_day(stamps[-1], timezone_name) != current_day:
             continue
         close = previous_session_close(stamps, closes, timezone_name)
@@ -1960,8 +1928,6 @@ def get_price_snapshots(symbols: List[str], *, force_refresh: bool = False):
         unique_symbols.append(display_symbol)
 
     payloads = {}
-    cache_changed = False
-
     cached_payloads = {} if force_refresh else get_cached_price_snapshots(unique_symbols)
     missing_symbols = []
     for symbol in unique_symbols:
@@ -1974,6 +1940,41 @@ def get_price_snapshots(symbols: List[str], *, force_refresh: bool = False):
     if not missing_symbols:
         return payloads
 
+    # Symbols another caller is already fetching are waited on rather than downloaded
+    # again; this call only downloads the ones it leads.
+    keys = {symbol: flight_key("quote", symbol, "30m", "5d") for symbol in missing_symbols}
+    owned, joined = _QUOTE_FLIGHTS.claim(keys.values())
+    leading = [symbol for symbol in missing_symbols if keys[symbol] in owned]
+    if leading:
+        try:
+            fetched = _refresh_price_snapshots(leading)
+        except BaseException as exc:
+            for flight in owned.values():
+                _QUOTE_FLIGHTS.fail(flight, exc)
+            raise
+        for symbol in leading:
+            _QUOTE_FLIGHTS.resolve(owned[keys[symbol]], fetched.get(symbol))
+        payloads.update(fetched)
+
+    deadline = time.monotonic() + _QUOTE_FLIGHTS.timeout
+    for symbol in missing_symbols:
+        flight = joined.get(keys[symbol])
+        if flight is None:
+            continue
+        try:
+            payload = _QUOTE_FLIGHTS.wait(flight, max(0.0, deadline - time.monotonic()))
+        except FlightTimeout:
+            payload = _get_cached_price_payload(symbol, allow_stale=True)
+        if payload:
+            payloads[symbol] = dict(payload)
+
+    return payloads
+
+
+def _refresh_price_snapshots(missing_symbols: List[str]) -> dict:
+    """Download quotes for cache misses, caching each payload; stale cache as fallback."""
+    payloads = {}
+    cache_changed = False
     direct_symbols = []
     proxy_symbol_by_display = {}
     proxy_download_symbols = []
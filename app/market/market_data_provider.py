@@ -0,0 +1,580 @@
+# =====================================================
+# MARKET DATA PROVIDER
+# yfinance + offline replay
+# =====================================================
+
+"""The market data provider every fetch path goes through.
+
+market_data_cache, market_data_loader (chart history, price snapshots, fast_info),
+poll_service's earnings calendar, news_service and the backtest engine each imported
+yfinance and called it directly, so nothing upstream of the provider could run
+without network access: no load test, no reproducible benchmark of a full cycle.
+
+MarketDataProvider is the surface those paths already used -- ``download()`` in
+yf.download() layout and ``Ticker(symbol)`` exposing ``fast_info``, ``info``,
+``calendar`` and ``news`` -- so yfinance stays the default implementation unchanged
+and the existing test doubles keep satisfying it. get_market_data_provider() returns
+the configured one:
+
+* ``MARKET_DATA_PROVIDER=yfinance`` (default) -- yfinance, imported on first use;
+* ``MARKET_DATA_PROVIDER=replay`` -- ReplayProvider over ``MARKET_REPLAY_DIR``.
+
+ReplayProvider serves OHLCV from local fixtures, ``<SYMBOL>.csv`` or
+``<SYMBOL>.parquet`` (a time column plus Open/High/Low/Close/Volume), and falls back
+to a deterministic synthetic series seeded by the symbol when a symbol has no fixture.
+A replay cursor starts inside the last session and advances at
+``MARKET_REPLAY_SPEED`` times wall-clock (0 freezes it); only bars up to the cursor
+are visible, and bars are shifted by whole days so the cursor's session reads as
+today. ``MARKET_REPLAY_LATENCY`` seconds are slept on every provider call.
+Optional ``calendar.json`` and ``news.json`` in the fixture directory map symbols to
+yfinance-shaped calendars and news items.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Protocol, runtime_checkable
+
+logger = logging.getLogger("stocknewsbr.market.provider")
+
+MARKET_DATA_PROVIDER = (os.getenv("MARKET_DATA_PROVIDER", "yfinance") or "yfinance").strip().lower()
+
+# yf.download() collects its results in module globals (shared._DFS, _ERRORS,
+# _TRACEBACKS) that every call resets, so two overlapping calls in one process
+# corrupt each other's frames. Process-wide because those globals are.
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+_TIME_COLUMNS = ("time", "datetime", "date", "timestamp")
+# B3's regular session (10:00-17:55 BRT) in UTC, in 5-minute bars.
+_SESSION_OPEN = timedelta(hours=13)
+_BAR = timedelta(minutes=5)
+_BARS_PER_SESSION = 96
+_DAY_NS = 86_400 * 1_000_000_000
+_RESAMPLE_RULES = {
+    "1m": None,
+    "2m": None,
+    "5m": None,
+    "15m": "15min",
+    "30m": "30min",
+    "60m": "60min",
+    "90m": "90min",
+    "1h": "60min",
+    "1d": "1D",
+    "5d": "5D",
+    "1wk": "W-FRI",
+    "1mo": "MS",
+    "3mo": "QS",
+}
+_DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+# Synthetic series kept per symbol: about 30 KB each at the default sizes.
+_SYNTHETIC_CACHE_LIMIT = 4096
+
+
+@runtime_checkable
+class TickerData(Protocol):
+    """Per-symbol lookups, named as on yfinance.Ticker."""
+
+    fast_info: Mapping[str, Any]
+    info: Mapping[str, Any]
+    calendar: Mapping[str, Any]
+    news: List[Dict[str, Any]]
+
+
+@runtime_checkable
+class MarketDataProvider(Protocol):
+    """Bars, quotes, chart history and calendars for the market fetch paths.
+
+    ``download`` follows yf.download(): ``group_by="ticker"`` returns columns
+    (symbol, field), otherwise (field, symbol); None or an empty frame means no data.
+    """
+
+    name: str
+
+    def download(self, tickers: Any, period: str = "1mo", interval: str = "1d", **options: Any) -> Any:
+        ...
+
+    def Ticker(self, symbol: str) -> TickerData:
+        ...
+
+
+# =====================================================
+# YFINANCE
+# =====================================================
+
+
+class YFinanceProvider:
+    """yfinance behind the provider protocol; the module is imported on first use."""
+
+    name = "yfinance"
+
+    def __init__(self):
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def module(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    import yfinance as yf_module
+
+                    self._module = yf_module
+        return self._module
+
+    @property
+    def available(self) -> bool:
+        try:
+            self.module
+        except Exception:
+            return False
+        return True
+
+    def download(self, tickers: Any, period: str = "1mo", interval: str = "1d", **options: Any) -> Any:
+        module = self.module
+        with _YF_DOWNLOAD_LOCK:
+            return module.download(tickers=tickers, period=period, interval=interval, **options)
+
+    def Ticker(self, symbol: str):
+        return self.module.Ticker(symbol)
+
+
+# =====================================================
+# REPLAY
+# =====================================================
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default)) or default))
+    except ValueError:
+        return default
+
+
+def _symbols(tickers: Any) -> List[str]:
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    return list(dict.fromkeys(str(ticker) for ticker in tickers or () if ticker))
+
+
+def _session_days(end: datetime, count: int) -> List[datetime]:
+    days = []
+    day = datetime(end.year, end.month, end.day, tzinfo=timezone.utc)
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+class _ReplayTicker:
+
+    def __init__(self, provider: "ReplayProvider", symbol: str):
+        self._provider = provider
+        self.symbol = symbol
+
+    @property
+    def fast_info(self) -> Dict[str, Any]:
+        return self._provider.quote(self.symbol)
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        quote = self._provider.quote(self.symbol)
+        if not quote:
+            return {}
+        return {
+            "regularMarketPrice": quote["regular_market_price"],
+            "regularMarketPreviousClose": quote["regular_market_previous_close"],
+            "regularMarketVolume": quote["regular_market_volume"],
+            "averageVolume10days": quote["ten_day_average_volume"],
+            "regularMarketTime": quote["regular_market_time"],
+            "marketState": "REGULAR",
+            "currency": quote["currency"],
+        }
+
+    @property
+    def calendar(self) -> Dict[str, Any]:
+        return dict(self._provider.document("calendar.json").get(self.symbol) or {})
+
+    @property
+    def news(self) -> List[Dict[str, Any]]:
+        return list(self._provider.document("news.json").get(self.symbol) or [])
+
+
+class ReplayProvider:
+    """Deterministic offline provider over recorded or synthetic OHLCV."""
+
+    name = "replay"
+    available = True
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        speed: float = 1.0,
+        latency: float = 0.0,
+        start: Optional[datetime] = None,
+        synthetic: bool = True,
+        seed: int = 0,
+        sessions: int = 260,
+        intraday_sessions: int = 5,
+        end: Optional[datetime] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.speed = max(0.0, float(speed))
+        self.latency = max(0.0, float(latency))
+        self.synthetic = bool(synthetic)
+        self.seed = int(seed)
+        self.sessions = max(2, int(sessions))
+        self.intraday_sessions = max(1, min(int(intraday_sessions), self.sessions))
+        self._clock = clock
+        # The synthetic calendar ends on a fixed day so every run sees the same bars.
+        self._end = (end or datetime(2026, 1, 30, tzinfo=timezone.utc)).astimezone(timezone.utc)
+        last_session = _session_days(self._end, 1)[0]
+        self._start = start.astimezone(timezone.utc) if start else last_session + _SESSION_OPEN + 59 * _BAR
+        self._started_at = clock()
+        self._lock = threading.Lock()
+        self._fixtures: Dict[str, tuple] = {}
+        self._series: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._documents: Dict[str, tuple] = {}
+        self.calls: Dict[str, int] = {"download": 0, "ticker": 0}
+
+    @classmethod
+    def from_env(cls) -> "ReplayProvider":
+        directory = os.getenv("MARKET_REPLAY_DIR") or None
+        start = os.getenv("MARKET_REPLAY_START") or None
+        return cls(
+            directory=Path(directory) if directory else None,
+            speed=_float_env("MARKET_REPLAY_SPEED", 1.0),
+            latency=_float_env("MARKET_REPLAY_LATENCY", 0.0),
+            start=datetime.fromisoformat(start) if start else None,
+            synthetic=(os.getenv("MARKET_REPLAY_SYNTHETIC", "1") or "1").strip().lower() not in {"0", "false", "no", "off"},
+            seed=int(os.getenv("MARKET_REPLAY_SEED", "0") or 0),
+        )
+
+    # -------------------------------------------------
+    # CURSOR
+    # -------------------------------------------------
+
+    def cursor(self) -> datetime:
+        """Replay time: the start position advanced by speed x elapsed wall-clock."""
+        elapsed = max(0.0, self._clock() - self._started_at) * self.speed
+        return self._start + timedelta(seconds=elapsed)
+
+    def _sleep(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # -------------------------------------------------
+    # SOURCES
+    # -------------------------------------------------
+
+    def _fixture_path(self, symbol: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        for suffix in (".parquet", ".csv"):
+            path = self.directory / f"{symbol}{suffix}"
+            if path.is_file():
+                return path
+        return None
+
+    def _load_fixture(self, path: Path):
+        import pandas as pd
+
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._fixtures.get(str(path))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        frame = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+        columns = {str(column).lower(): column for column in frame.columns}
+        time_column = next((columns[name] for name in _TIME_COLUMNS if name in columns), None)
+        if time_column is not None:
+            frame = frame.set_index(time_column)
+        frame.index = pd.to_datetime(frame.index, utc=True)
+        frame = frame.rename(columns={columns[field.lower()]: field for field in _FIELDS if field.lower() in columns})
+        frame = frame[[field for field in _FIELDS if field in frame.columns]].astype(float).sort_index()
+        with self._lock:
+            self._fixtures[str(path)] = (key, frame)
+        return frame
+
+    def _synthetic(self, symbol: str):
+        """Seeded random walk: (5-minute bars of the last sessions, daily bars of all)."""
+        key = (symbol, self.seed)
+        with self._lock:
+            cached = self._series.get(key)
+            if cached is not None:
+                self._series.move_to_end(key)
+                return cached
+
+        import numpy as np
+        import pandas as pd
+
+        rng = np.random.default_rng((zlib.crc32(symbol.encode("utf-8")) ^ self.seed) & 0xFFFFFFFF)
+        days = np.array([day.replace(tzinfo=None) for day in _session_days(self._end, self.sessions)], dtype="datetime64[ns]")
+        price = float(rng.uniform(5.0, 150.0))
+        base_volume = float(rng.uniform(2e4, 2e6))
+
+        history = len(days) - self.intraday_sessions
+        closes = price * np.exp(np.cumsum(rng.normal(0.0004, 0.018, history)))
+        opens = np.concatenate([[price], closes[:-1]])
+        spread = np.abs(rng.normal(0.0, 0.01, history)) * closes
+        daily = np.column_stack([
+            opens,
+            np.maximum(opens, closes) + spread,
+            np.maximum(0.01, np.minimum(opens, closes) - spread),
+            closes,
+            np.round(base_volume * rng.lognormal(0.0, 0.35, history)),
+        ])
+
+        count = self.intraday_sessions * _BARS_PER_SESSION
+        bar_closes = float(closes[-1]) * np.exp(np.cumsum(rng.normal(0.0, 0.0018, count)))
+        bar_opens = np.concatenate([[float(closes[-1])], bar_closes[:-1]])
+        bar_spread = np.abs(rng.normal(0.0, 0.0008, count)) * bar_closes
+        intraday = np.column_stack([
+            bar_opens,
+            np.maximum(bar_opens, bar_closes) + bar_spread,
+            np.maximum(0.01, np.minimum(bar_opens, bar_closes) - bar_spread),
+            bar_closes,
+            np.round(base_volume / _BARS_PER_SESSION * rng.lognormal(0.0, 0.5, count)),
+        ])
+        # The intraday sessions also appear as daily bars, aggregated session by session.
+        sessions = intraday.reshape(self.intraday_sessions, _BARS_PER_SESSION, 5)
+        session_bars = np.column_stack([
+            sessions[:, 0, 0],
+            sessions[:, :, 1].max(axis=1),
+            sessions[:, :, 2].min(axis=1),
+            sessions[:, -1, 3],
+            sessions[:, :, 4].sum(axis=1),
+        ])
+
+        offsets = (np.arange(_BARS_PER_SESSION) * _BAR + _SESSION_OPEN) // timedelta(microseconds=1)
+        bar_times = (days[history:, None] + offsets.astype("timedelta64[us]")).ravel()
+        series = (
+            pd.DataFrame(intraday, index=pd.DatetimeIndex(bar_times, tz="UTC"), columns=list(_FIELDS)),
+            pd.DataFrame(np.vstack([daily, session_bars]), index=pd.DatetimeIndex(days, tz="UTC"), columns=list(_FIELDS)),
+        )
+        with self._lock:
+            self._series[key] = series
+            while len(self._series) > _SYNTHETIC_CACHE_LIMIT:
+                self._series.popitem(last=False)
+        return series
+
+    def bars(self, symbol: str, period: str = "1d", interval: str = "5m", as_of: Optional[datetime] = None):
+        """Visible bars of `symbol` for one yf-style (period, interval), or None."""
+        import pandas as pd
+
+        interval = str(interval or "1d").lower()
+        cursor = pd.Timestamp(as_of or self.cursor())
+        rule = _RESAMPLE_RULES.get(interval)
+        path = self._fixture_path(symbol)
+        if path is not None:
+            try:
+                frame = self._load_fixture(path)
+            except Exception as exc:
+                logger.warning("Replay fixture unreadable | path=%s | error=%s", path, exc)
+                return None
+            frame = frame.iloc[: frame.index.searchsorted(cursor, side="right")]
+        elif self.synthetic:
+            intraday, daily = self._synthetic(symbol)
+            frame = intraday.iloc[: intraday.index.searchsorted(cursor, side="right")]
+            if interval in _DAILY_INTERVALS:
+                # Finished sessions come from the daily series; the cursor's own session
+                # is aggregated from its visible bars, never from bars still ahead.
+                session = cursor.normalize()
+                today = frame.iloc[frame.index.searchsorted(session):]
+                frame = daily.iloc[: daily.index.searchsorted(session)]
+                if not today.empty:
+                    frame = pd.concat([frame, _resample(today, "1D")])
+                if rule == "1D":
+                    rule = None
+        else:
+            return None
+        if frame is None or frame.empty:
+            return None
+
+        frame = _window(frame, period)
+        if rule:
+            frame = _resample(frame, rule)
+        if frame.empty:
+            return None
+
+        # Shift by whole days so the replayed session reads as today and intraday
+        # times keep their place in the session.
+        shift = (pd.Timestamp(datetime.now(timezone.utc)).normalize() - cursor.normalize()).days * _DAY_NS
+        frame = frame.copy(deep=False)
+        frame.index = pd.DatetimeIndex((frame.index.asi8 + shift).view("datetime64[ns]"), tz="UTC")
+        return frame
+
+    def document(self, name: str) -> Dict[str, Any]:
+        if self.directory is None:
+            return {}
+        path = self.directory / name
+        try:
+            stat = path.stat()
+        except OSError:
+            return {}
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._documents.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            document = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Replay document unreadable | path=%s | error=%s", path, exc)
+            document = {}
+        if not isinstance(document, dict):
+            document = {}
+        with self._lock:
+            self._documents[name] = (key, document)
+        return document
+
+    # -------------------------------------------------
+    # PROVIDER SURFACE
+    # -------------------------------------------------
+
+    def download(self, tickers: Any, period: str = "1mo", interval: str = "1d", **options: Any) -> Any:
+        import pandas as pd
+
+        self._sleep("download")
+        symbols = _symbols(tickers)
+        frames = {}
+        for symbol in symbols:
+            frame = self.bars(symbol, period=period, interval=interval)
+            if frame is not None:
+                frames[symbol] = frame
+        if not frames:
+            return pd.DataFrame()
+
+        by_ticker = options.get("group_by") == "ticker"
+        if not by_ticker and len(symbols) == 1:
+            return next(iter(frames.values()))
+        data = pd.concat(frames, axis=1)
+        if not by_ticker:
+            data = data.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return data
+
+    def Ticker(self, symbol: str) -> _ReplayTicker:
+        self._sleep("ticker")
+        return _ReplayTicker(self, str(symbol))
+
+    def quote(self, symbol: str) -> Dict[str, Any]:
+        """fast_info-shaped quote from the visible 5-minute bars."""
+        intraday = self.bars(symbol, period="5d", interval="5m")
+        if intraday is None or intraday.empty:
+            return {}
+        sessions = intraday.index.normalize()
+        today = intraday[sessions == sessions[-1]]
+        earlier = intraday[sessions < sessions[-1]]
+        daily = self.bars(symbol, period="1mo", interval="1d")
+        last = float(today["Close"].iloc[-1])
+        previous = float(earlier["Close"].iloc[-1]) if not earlier.empty else float(today["Open"].iloc[0])
+        average = float(daily["Volume"].tail(10).mean()) if daily is not None and not daily.empty else None
+        volume = float(today["Volume"].sum())
+        return {
+            "last_price": last,
+            "regular_market_price": last,
+            "previous_close": previous,
+            "regular_market_previous_close": previous,
+            "day_high": float(today["High"].max()),
+            "day_low": float(today["Low"].min()),
+            "last_volume": volume,
+            "regular_market_volume": volume,
+            "ten_day_average_volume": average,
+            "regular_market_time": int(today.index[-1].timestamp()),
+            "currency": "BRL" if symbol.endswith(".SA") else "USD",
+        }
+
+
+def _window(frame, period: str):
+    """Rows of `frame` inside a yf-style period ending at its last row."""
+    import numpy as np
+
+    period = str(period or "max").lower()
+    if period == "max" or frame.empty:
+        return frame
+    stamps = frame.index.asi8
+    if period == "ytd":
+        year = datetime.fromtimestamp(stamps[-1] / 1e9, timezone.utc).year
+        january = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+        return frame.iloc[np.searchsorted(stamps, january):]
+    unit = period.lstrip("0123456789")
+    try:
+        count = int(period[: len(period) - len(unit)] or 1)
+    except ValueError:
+        return frame
+    if unit == "d":
+        # Trading days, as yfinance counts them.
+        days = stamps // _DAY_NS
+        distinct = days[np.concatenate([[True], days[1:] != days[:-1]])]
+        return frame.iloc[np.searchsorted(days, distinct[max(0, len(distinct) - count)]):]
+    span = {"wk": 7, "mo": 30, "y": 365}.get(unit)
+    if span is None:
+        return frame
+    return frame.iloc[np.searchsorted(stamps, stamps[-1] - span * count * _DAY_NS, side="right"):]
+
+
+def _resample(frame, rule: str):
+    aggregated = frame.resample(rule).agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    )
+    return aggregated.dropna(subset=["Close"])
+
+
+# =====================================================
+# SELECTION
+# =====================================================
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def _provider_from_env() -> MarketDataProvider:
+    configured = (os.getenv("MARKET_DATA_PROVIDER", MARKET_DATA_PROVIDER) or "yfinance").strip().lower()
+    if configured == "replay":
+        provider = ReplayProvider.from_env()
+        logger.info("Market data provider | replay | dir=%s | speed=%s", provider.directory, provider.speed)
+        return provider
+    if configured != "yfinance":
+        logger.warning("Unknown MARKET_DATA_PROVIDER=%s, using yfinance", configured)
+    return YFinanceProvider()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _provider_from_env()
+    return _provider
+
+
+def set_market_data_provider(provider: Optional[MarketDataProvider]) -> Optional[MarketDataProvider]:
+    """Install `provider` process-wide (None re-reads the environment); returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
+
+
+__all__ = [
+    "MarketDataProvider",
+    "ReplayProvider",
+    "TickerData",
+    "YFinanceProvider",
+    "get_market_data_provider",
+    "set_market_data_provider",
+]
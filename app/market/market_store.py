@@ -4,6 +4,7 @@
 
 import threading
 import logging
+from types import MappingProxyType
 
 logger = logging.getLogger("stocknewsbr.market.store")
 
@@ -22,8 +23,9 @@ class MarketStore:
 
         try:
 
+            # Pools are published once and never mutated; keep the reference.
             with self._lock:
-                self._pool = dict(pool)
+                self._pool = pool
 
         except Exception as e:
 
@@ -34,7 +36,7 @@ class MarketStore:
         try:
 
             with self._lock:
-                return dict(self._pool)
+                return MappingProxyType(self._pool)
 
         except Exception:
 
@@ -0,0 +1,216 @@
+# =====================================================
+# OHLCV SERIES
+# =====================================================
+
+"""Columnar, read-only container for cached chart candles.
+
+A cached chart used to be a list of per-bar dicts, copied dict-by-dict on every cache
+hit. The @5M interval alone holds up to 9000 bars and /public/market/bundle loads
+several series per request, so most of that work was allocating dicts nobody mutates.
+
+OHLCVSeries keeps the same candles as parallel float64 columns plus an int64 epoch
+column; a field that arrived as integers in every row (volume, usually) is handed back
+as ints. Indicator code reads the columns directly; everything else still sees a
+`Sequence` of row dicts, built lazily per access, so existing `for row in rows:
+row.get("close")` consumers keep working unchanged. Slices are views over the same
+buffers. Nothing here is ever mutated after construction, so a series is shared
+between readers without copying.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+# Epoch placeholder for a bar whose label does not parse as a timestamp.
+MISSING_EPOCH = np.iinfo(np.int64).min
+_ROW_KEYS = frozenset(("time", *OHLCV_FIELDS))
+
+
+def _parse_epoch(label: str) -> int:
+    try:
+        stamp = datetime.fromisoformat(label.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return MISSING_EPOCH
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    try:
+        return int(stamp.timestamp())
+    except (OverflowError, OSError, ValueError):
+        return MISSING_EPOCH
+
+
+class OHLCVSeries(Sequence):
+    """Parallel OHLCV columns; `labels` keeps each bar's original `time` for the row view."""
+
+    __slots__ = ("labels", "time", "open", "high", "low", "close", "volume", "fields", "integral")
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        time: np.ndarray,
+        columns: dict[str, np.ndarray],
+        fields: tuple[str, ...] = OHLCV_FIELDS,
+        integral: frozenset = frozenset(),
+    ):
+        self.labels = labels
+        self.time = time
+        self.fields = fields
+        # Fields whose source values were all ints; the row view returns them as ints.
+        self.integral = integral
+        for name in OHLCV_FIELDS:
+            column = columns.get(name)
+            if column is None:
+                column = np.full(len(labels), np.nan, dtype=np.float64)
+            column.flags.writeable = False
+            setattr(self, name, column)
+        self.time.flags.writeable = False
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> Optional["OHLCVSeries"]:
+        """Build a series from plain candle dicts, or None when the rows do not fit.
+
+        Only rows that carry a string `time`, numeric OHLCV values and no other keys are
+        representable losslessly; anything else (quote fallbacks, tagged sources, mixed
+        key sets) stays a list so no field is ever dropped on the way through the cache.
+        """
+        if isinstance(rows, OHLCVSeries):
+            return rows
+        rows = list(rows or [])
+        if not rows:
+            return None
+        first = rows[0]
+        if not isinstance(first, dict) or "time" not in first or "close" not in first:
+            return None
+        keys = set(first)
+        if not keys <= _ROW_KEYS:
+            return None
+        fields = tuple(name for name in OHLCV_FIELDS if name in keys)
+        labels: list[str] = []
+        values: dict[str, list[float]] = {name: [] for name in fields}
+        integral = set(fields)
+        for row in rows:
+            if not isinstance(row, dict) or row.keys() != keys:
+                return None
+            label = row["time"]
+            if not isinstance(label, str):
+                return None
+            labels.append(label)
+            for name in fields:
+                value = row[name]
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return None
+                if not isinstance(value, int):
+                    integral.discard(name)
+                values[name].append(float(value))
+        epochs = np.fromiter((_parse_epoch(label) for label in labels), dtype=np.int64, count=len(labels))
+        columns = {name: np.asarray(column, dtype=np.float64) for name, column in values.items()}
+        return cls(tuple(labels), epochs, columns, fields, frozenset(integral))
+
+    @classmethod
+    def from_columns(cls, payload: dict) -> Optional["OHLCVSeries"]:
+        """Inverse of to_columns(); None for anything malformed."""
+        if not isinstance(payload, dict):
+            return None
+        labels = payload.get("time")
+        fields = tuple(name for name in OHLCV_FIELDS if name in payload)
+        if not isinstance(labels, list) or "close" not in fields:
+            return None
+        try:
+            columns = {name: np.asarray(payload[name], dtype=np.float64) for name in fields}
+        except (TypeError, ValueError):
+            return None
+        if any(column.shape != (len(labels),) for column in columns.values()):
+            return None
+        integral = frozenset(
+            name
+            for name in fields
+            if all(isinstance(value, int) and not isinstance(value, bool) for value in payload[name])
+        )
+        labels = tuple(str(label) for label in labels)
+        epochs = np.fromiter((_parse_epoch(label) for label in labels), dtype=np.int64, count=len(labels))
+        return cls(labels, epochs, columns, fields, integral)
+
+    def to_columns(self) -> dict:
+        """JSON-ready columnar form used by the on-disk chart store."""
+        payload: dict = {"time": list(self.labels)}
+        for name in self.fields:
+            cast = int if name in self.integral else float
+            payload[name] = [None if not math.isfinite(value) else cast(value) for value in getattr(self, name).tolist()]
+        return payload
+
+    def _row(self, index: int) -> dict:
+        row: dict = {"time": self.labels[index]}
+        for name in self.fields:
+            value = float(getattr(self, name)[index])
+            row[name] = int(value) if name in self.integral else value
+        return row
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return OHLCVSeries(
+                self.labels[index],
+                self.time[index],
+                {name: getattr(self, name)[index] for name in OHLCV_FIELDS},
+                self.fields,
+                self.integral,
+            )
+        size = len(self.labels)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("OHLCVSeries index out of range")
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[dict]:
+        for index in range(len(self.labels)):
+            yield self._row(index)
+
+    def __reversed__(self) -> Iterator[dict]:
+        for index in range(len(self.labels) - 1, -1, -1):
+            yield self._row(index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OHLCVSeries):
+            return self.to_rows() == other.to_rows()
+        if isinstance(other, list):
+            return self.to_rows() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"OHLCVSeries(bars={len(self)}, fields={self.fields})"
+
+    def column(self, name: str, missing: float = 0.0) -> np.ndarray:
+        """`name` column, or `missing` everywhere when the rows never carried that field.
+
+        Mirrors the row-view idiom `float(row.get(name, 0) or 0)`: an absent field reads as
+        `missing`, while a NaN stored in a present field stays NaN.
+        """
+        if name in self.fields:
+            return getattr(self, name)
+        return np.full(len(self.labels), missing, dtype=np.float64)
+
+    def to_rows(self) -> list[dict]:
+        """Materialise the row-dict view, for JSON responses and legacy list callers."""
+        return [self._row(index) for index in range(len(self.labels))]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.time.nbytes + sum(getattr(self, name).nbytes for name in self.fields))
+
+
+def chart_rows_as_list(rows) -> list:
+    """Row-dict list for `rows`, whichever representation the cache handed out."""
+    if isinstance(rows, OHLCVSeries):
+        return rows.to_rows()
+    return list(rows or [])
@@ -5,6 +5,7 @@ from collections import defaultdict
 from typing import Any, Dict, Iterable, List, Mapping, Sequence
 
 from app.engine.trend_breakout_signal_engine import build_trend_breakout_payload
+from app.market.market_data_provider import get_market_data_provider
 
 logger = logging.getLogger("stocknewsbr.backtest")
 
@@ -645,10 +646,9 @@ def backtest_portfolio(tickers):
         return {}
 
     try:
-        import yfinance as yf
         import pandas as pd
 
-        data = yf.download(
+        data = get_market_data_provider().download(
             tickers=tickers,
             period="1y",
             interval="1d",
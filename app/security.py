@@ -16,6 +16,7 @@ from sqlalchemy.orm import Session
 from app.core.settings import get_secret_key, session_cookie_name
 from app.database import get_db
 from app.models import User, UserSession
+from app.services import session_cache
 
 logger = logging.getLogger("stocknewsbr.security")
 
@@ -149,6 +150,14 @@ def resolve_token_user(
     if user is None:
         raise fallback_exception
 
+    now = datetime.utcnow()
+
+    # A session validated a moment ago skips its row lookup; revocations
+    # reach the cache through session_cache.invalidate_sessions.
+    if session_cache.lookup_session(db, user.id, session_id):
+        session_cache.touch_session(db, user.id, session_id, now)
+        return user
+
     session = (
         db.query(UserSession)
         .filter(UserSession.user_id == user.id)
@@ -167,16 +176,19 @@ def resolve_token_user(
             )
         raise fallback_exception
 
-    now = datetime.utcnow()
-
     if session.expires_at is not None and session.expires_at < now:
         session.revoked_at = now
         session.revoked_reason = "session_expired"
         db.add(session)
         raise fallback_exception
 
-    session.last_seen_at = now
-    db.add(session)
+    session_cache.remember_session(db, user.id, session_id, session.expires_at)
+
+    # last_seen_at goes out in the next batched flush instead of turning this
+    # request into a write; without an engine bind it is written here.
+    if not session_cache.touch_session(db, user.id, session_id, now):
+        session.last_seen_at = now
+        db.add(session)
 
     return user
 
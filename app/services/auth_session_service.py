@@ -21,6 +21,7 @@ from app.core.settings import (
 from app.models import LoginChallenge, TelegramLinkToken, User, UserSession
 from app.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
 from app.services import auth_audit_service as auth_audit
+from app.services import session_cache
 from app.services.access_service import PAID_PLANS, has_channel_access, link_telegram_account, refresh_user_access, utcnow
 
 
@@ -551,6 +552,7 @@ def create_user_session(
         .values(revoked_at=now, revoked_reason=SESSION_REPLACED_REASON)
         .execution_options(synchronize_session=False)
     )
+    session_cache.invalidate_sessions(db, user.id)
 
     session = UserSession(
         user_id=user.id,
@@ -620,6 +622,7 @@ def revoke_session(
         .values(revoked_at=utcnow(), revoked_reason=reason)
         .execution_options(synchronize_session=False)
     )
+    session_cache.invalidate_sessions(db, user_id, session_id)
     return int(result.rowcount or 0) > 0
 
 
@@ -641,6 +644,7 @@ def revoke_all_sessions(
     result = db.execute(
         query.values(revoked_at=utcnow(), revoked_reason=reason).execution_options(synchronize_session=False)
     )
+    session_cache.invalidate_sessions(db, user_id)
     return int(result.rowcount or 0)
 
 
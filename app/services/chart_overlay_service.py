@@ -1,5 +1,6 @@
 from typing import Iterable, List
 
+from app.market.ohlcv import OHLCVSeries
 from app.services.symbol_registry import canonical_symbol
 
 
@@ -373,10 +374,18 @@ def _count_marker_sides(markers: list[dict]) -> tuple[int, int]:
 def build_chart_overlays(ticker: str, ohlc: list, signals: list, interval: str = "1D"):
     ticker = canonical_symbol(ticker)
     normalized_interval = str(interval or "1D").upper().strip()
-    close_prices = [float(row.get("close", 0) or 0) for row in ohlc]
-    high_prices = [float(row.get("high", 0) or 0) for row in ohlc]
-    low_prices = [float(row.get("low", 0) or 0) for row in ohlc]
-    volume_values = [float(row.get("volume", 0) or 0) for row in ohlc]
+    if isinstance(ohlc, OHLCVSeries):
+        close_prices = ohlc.column("close").tolist()
+        high_prices = ohlc.column("high").tolist()
+        low_prices = ohlc.column("low").tolist()
+        volume_values = ohlc.column("volume").tolist()
+        times = ohlc.labels
+    else:
+        close_prices = [float(row.get("close", 0) or 0) for row in ohlc]
+        high_prices = [float(row.get("high", 0) or 0) for row in ohlc]
+        low_prices = [float(row.get("low", 0) or 0) for row in ohlc]
+        volume_values = [float(row.get("volume", 0) or 0) for row in ohlc]
+        times = [row.get("time") for row in ohlc]
 
     ema9 = _ema(close_prices, 9)
     ema21 = _ema(close_prices, 21)
@@ -389,10 +398,10 @@ def build_chart_overlays(ticker: str, ohlc: list, signals: list, interval: str =
     bearish_markers = 0
     latest_signal = "NEUTRAL"
 
-    for index, row in enumerate(ohlc):
+    for index, time_label in enumerate(times):
         series.append(
             {
-                "time": row.get("time"),
+                "time": time_label,
                 "close": close_prices[index],
                 "ema9": ema9[index] if index < len(ema9) else None,
                 "ema21": ema21[index] if index < len(ema21) else None,
@@ -17,11 +17,12 @@ from typing import Any
 from zoneinfo import ZoneInfo
 
 from app.core.atomic_io import interprocess_file_lock, read_json_file_consistent, write_json_file_atomic
+from app.core.single_flight import FlightTimeout, single_flight
+from app.market.market_data_provider import get_market_data_provider
 from app.services.symbol_registry import canonical_symbol, canonical_symbol_aliases, provider_symbol
 from app.system.system_metrics import record_cache_access, record_cache_lookup, record_external_provider_call, record_worker_stage_duration
 
 logger = logging.getLogger("stocknewsbr.news")
-_YFINANCE = None
 
 _CACHE_LOCK = threading.Lock()
 _PERSIST_LOCK = threading.Lock()
@@ -35,6 +36,7 @@ _NEWS_MAX_CLUSTER_CANDIDATES = 12
 _NEWS_CACHE: dict[str, dict[str, Any]] = {}
 _NEWS_PROVIDER_STATUS: dict[str, dict[str, Any]] = {}
 _REQUEST_LOCKS: dict[str, threading.Lock] = {}
+_NEWS_FLIGHTS = single_flight("news")
 _PROJECT_ROOT = Path(__file__).resolve().parents[2]
 _TICKER_NEWS_ALIASES = {
     "F": ("ford", "ford motor", "ford motor company"),
@@ -181,14 +183,9 @@ def _latest_news_cache_entry_locked(ticker: str, *, exclude_locale: str | None =
 
 
 def _get_yfinance():
-    global _YFINANCE
-    if _YFINANCE is None:
-        try:  # pragma: no cover - optional dependency.
-            import yfinance as yf_module
-        except Exception:  # pragma: no cover - optional dependency.
-            yf_module = False
-        _YFINANCE = yf_module
-    return _YFINANCE or None
+    """The configured market data provider, or None when its dependency is missing."""
+    provider = get_market_data_provider()
+    return provider if getattr(provider, "available", True) else None
 
 
 def _load_news_cache_once() -> None:
@@ -2185,92 +2182,102 @@ def get_symbol_news(
             return copy.deepcopy(localized_entry["items"][:limit])
 
     request_lock = _get_request_lock(normalized_ticker)
-    with request_lock:
-        with _CACHE_LOCK:
-            cached = _get_news_cache_entry_locked(normalized_ticker, content_locale)
-            if is_fresh(cached):
-                return copy.deepcopy(list(cached.get("items", []))[:limit])
-            alternate = _latest_news_cache_entry_locked(normalized_ticker, exclude_locale=content_locale)
-            if is_fresh(alternate):
-                localized_entry = _localized_cache_entry(alternate, normalized_ticker, content_locale)
-                _set_news_cache_entry_locked(normalized_ticker, content_locale, localized_entry)
-                return copy.deepcopy(localized_entry["items"][:limit])
-
-        raw_items: list[dict[str, Any]] = []
-        fetched_from = normalized_ticker
-        attempted_candidates = _news_ticker_candidates(normalized_ticker)
-        for candidate in attempted_candidates:
-            raw_items = _fetch_yfinance_news(candidate)
-            if raw_items:
-                fetched_from = candidate
-                if candidate != normalized_ticker:
-                    logger.info("News service resolved %s via candidate %s", normalized_ticker, candidate)
-                break
-        items, filter_report = build_symbol_news_with_report(
-            normalized_ticker,
-            raw_items,
-            limit=limit,
-            locale=content_locale,
-        )
-        provider_meta = _latest_news_provider_status(
-            fetched_from if raw_items else (attempted_candidates[-1] if attempted_candidates else normalized_ticker)
-        )
-        cache_status = "ok"
-        fallback_used = False
 
-        if not items:
-            stale_items: list[dict[str, Any]] | None = None
+    def fetch() -> list[dict[str, Any]]:
+        with request_lock:
             with _CACHE_LOCK:
                 cached = _get_news_cache_entry_locked(normalized_ticker, content_locale)
-                if not cached or not cached.get("items"):
-                    alternate = _latest_news_cache_entry_locked(normalized_ticker, exclude_locale=content_locale)
-                    cached = _localized_cache_entry(alternate, normalized_ticker, content_locale) if alternate and alternate.get("items") else None
-                if cached and cached.get("items"):
-                    logger.info("News service using stale cache for %s after empty provider response", normalized_ticker)
-                    fallback_used = True
-                    cache_status = "stale_fallback"
-                    fallback_entry = copy.deepcopy(cached)
-                    fallback_entry["checked_at"] = now
-                    fallback_entry["status"] = cache_status
-                    fallback_entry["fallback_used"] = True
-                    fallback_entry["fetched_from"] = "stale_cache"
-                    fallback_entry["provider"] = "yfinance"
-                    fallback_entry["provider_status"] = provider_meta.get("status")
-                    fallback_entry["provider_error"] = provider_meta.get("error")
-                    fallback_entry["attempted_candidates"] = attempted_candidates
-                    _set_news_cache_entry_locked(normalized_ticker, content_locale, fallback_entry)
-                    stale_items = copy.deepcopy(list(fallback_entry.get("items", []))[:limit])
-            if stale_items is not None:
-                _persist_news_cache()
-                return stale_items
-            cache_status = "empty"
-
-        intelligence_report = build_news_intelligence_report(normalized_ticker, items, locale=content_locale)
+                if is_fresh(cached):
+                    return copy.deepcopy(list(cached.get("items", []))[:limit])
+                alternate = _latest_news_cache_entry_locked(normalized_ticker, exclude_locale=content_locale)
+                if is_fresh(alternate):
+                    localized_entry = _localized_cache_entry(alternate, normalized_ticker, content_locale)
+                    _set_news_cache_entry_locked(normalized_ticker, content_locale, localized_entry)
+                    return copy.deepcopy(localized_entry["items"][:limit])
+
+            raw_items: list[dict[str, Any]] = []
+            fetched_from = normalized_ticker
+            attempted_candidates = _news_ticker_candidates(normalized_ticker)
+            for candidate in attempted_candidates:
+                raw_items = _fetch_yfinance_news(candidate)
+                if raw_items:
+                    fetched_from = candidate
+                    if candidate != normalized_ticker:
+                        logger.info("News service resolved %s via candidate %s", normalized_ticker, candidate)
+                    break
+            items, filter_report = build_symbol_news_with_report(
+                normalized_ticker,
+                raw_items,
+                limit=limit,
+                locale=content_locale,
+            )
+            provider_meta = _latest_news_provider_status(
+                fetched_from if raw_items else (attempted_candidates[-1] if attempted_candidates else normalized_ticker)
+            )
+            cache_status = "ok"
+            fallback_used = False
+
+            if not items:
+                stale_items: list[dict[str, Any]] | None = None
+                with _CACHE_LOCK:
+                    cached = _get_news_cache_entry_locked(normalized_ticker, content_locale)
+                    if not cached or not cached.get("items"):
+                        alternate = _latest_news_cache_entry_locked(normalized_ticker, exclude_locale=content_locale)
+                        cached = _localized_cache_entry(alternate, normalized_ticker, content_locale) if alternate and alternate.get("items") else None
+                    if cached and cached.get("items"):
+                        logger.info("News service using stale cache for %s after empty provider response", normalized_ticker)
+                        fallback_used = True
+                        cache_status = "stale_fallback"
+                        fallback_entry = copy.deepcopy(cached)
+                        fallback_entry["checked_at"] = now
+                        fallback_entry["status"] = cache_status
+                        fallback_entry["fallback_used"] = True
+                        fallback_entry["fetched_from"] = "stale_cache"
+                        fallback_entry["provider"] = "yfinance"
+                        fallback_entry["provider_status"] = provider_meta.get("status")
+                        fallback_entry["provider_error"] = provider_meta.get("error")
+                        fallback_entry["attempted_candidates"] = attempted_candidates
+                        _set_news_cache_entry_locked(normalized_ticker, content_locale, fallback_entry)
+                        stale_items = copy.deepcopy(list(fallback_entry.get("items", []))[:limit])
+                if stale_items is not None:
+                    _persist_news_cache()
+                    return stale_items
+                cache_status = "empty"
+
+            intelligence_report = build_news_intelligence_report(normalized_ticker, items, locale=content_locale)
 
-        with _CACHE_LOCK:
-            cache_entry = {
-                "timestamp": now,
-                "checked_at": now,
-                "locale": content_locale,
-                "items": copy.deepcopy(items),
-                "raw_count": len(raw_items),
-                "status": cache_status,
-                "fallback_used": fallback_used,
-                "fetched_from": fetched_from if raw_items else "cache_or_empty",
-                "provider": "yfinance",
-                "provider_status": provider_meta.get("status"),
-                "provider_error": provider_meta.get("error"),
-                "attempted_candidates": attempted_candidates,
-                "filter_report": filter_report,
-                "discard_reasons": filter_report.get("discard_reasons", {}),
-                "discard_reason": filter_report.get("reason"),
-                "report": intelligence_report,
-            }
-            _set_news_cache_entry_locked(normalized_ticker, content_locale, cache_entry)
+            with _CACHE_LOCK:
+                cache_entry = {
+                    "timestamp": now,
+                    "checked_at": now,
+                    "locale": content_locale,
+                    "items": copy.deepcopy(items),
+                    "raw_count": len(raw_items),
+                    "status": cache_status,
+                    "fallback_used": fallback_used,
+                    "fetched_from": fetched_from if raw_items else "cache_or_empty",
+                    "provider": "yfinance",
+                    "provider_status": provider_meta.get("status"),
+                    "provider_error": provider_meta.get("error"),
+                    "attempted_candidates": attempted_candidates,
+                    "filter_report": filter_report,
+                    "discard_reasons": filter_report.get("discard_reasons", {}),
+                    "discard_reason": filter_report.get("reason"),
+                    "report": intelligence_report,
+                }
+                _set_news_cache_entry_locked(normalized_ticker, content_locale, cache_entry)
 
-        _persist_news_cache()
+            _persist_news_cache()
 
-        return copy.deepcopy(items)
+            return copy.deepcopy(items)
+
+    # Concurrent callers for the same ticker, locale and limit wait for one fetch, even
+    # when it comes back empty and leaves nothing fresh in the cache to re-check.
+    try:
+        items = _NEWS_FLIGHTS.do(("news", normalized_ticker, content_locale, limit), fetch)
+    except FlightTimeout:
+        return get_cached_symbol_news(normalized_ticker, limit=limit, locale=content_locale)
+    return copy.deepcopy(items)
 
 
 def get_cached_symbol_news(
@@ -18,6 +18,7 @@ from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.models import User, UserSession
+from app.services import session_cache
 
 
 logger = logging.getLogger("stocknewsbr.official_identity")
@@ -174,6 +175,7 @@ def _revoke_identity_sessions(db: Session, user: User) -> int:
         )
         .execution_options(synchronize_session=False)
     )
+    session_cache.invalidate_sessions(db, user.id)
     return int(result.rowcount or 0)
 
 
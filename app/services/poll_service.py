@@ -23,6 +23,7 @@ from app.cache.snapshot_cache import get_snapshot_by_ticker
 from app.config import CRYPTO_SYMBOLS
 from app.core.atomic_io import interprocess_file_lock, read_json_file, write_json_file_atomic
 from app.data.us_economic_calendar_2026 import events_in_window
+from app.market.market_data_provider import get_market_data_provider
 
 logger = logging.getLogger("stocknewsbr.polls")
 
@@ -301,7 +302,7 @@ def _find_earnings_date(value: Any, source: str = "signal") -> tuple[datetime |
 
 
 def _fetch_earnings_date(symbol: str) -> datetime | None:
-    """Minimal yfinance earnings-calendar lookup with an in-process cache.
+    """Minimal provider earnings-calendar lookup with an in-process cache.
 
     Fail-quiet by design: any error (network, dependency, payload shape)
     yields None and therefore no earnings poll — never a fake date.
@@ -317,9 +318,7 @@ def _fetch_earnings_date(symbol: str) -> datetime | None:
 
     result: datetime | None = None
     try:
-        import yfinance
-
-        calendar = yfinance.Ticker(normalized).calendar or {}
+        calendar = get_market_data_provider().Ticker(normalized).calendar or {}
         raw = calendar.get("Earnings Date") if isinstance(calendar, dict) else None
         candidates = raw if isinstance(raw, (list, tuple)) else [raw]
         parsed_dates = sorted(
@@ -0,0 +1,97 @@
+# =====================================================
+# PUBLIC BUNDLE CACHE
+# =====================================================
+
+"""Generation-keyed memo for /public/market/bundle/{symbol}.
+
+Every open client polls the bundle every 3 s, and each call recomputed the insight,
+daily RSI, chart, 5m RVOL series, news, AI tools and market metrics even when none of
+the caches underneath had moved. A bundle is now stored per request key
+(symbol, interval, limit, locale, entitlement) together with a fingerprint of its
+inputs: chart cache timestamps, snapshot generation, news cache entry, on-demand
+analysis state, quote identity, and so on. The fingerprint is cheap to compute. A
+request whose fingerprint still matches gets the stored payload.
+
+Some bundle fields are derived from the wall clock (quote/news ages, market open or
+closed, TTL-based freshness). These never move a fingerprint, so an entry is also
+retired after PUBLIC_BUNDLE_CACHE_MAX_AGE_SECONDS. That bound, not the poll interval,
+sets how stale those fields can get.
+
+Concurrent requests with the same key and fingerprint are coalesced through a
+SingleFlight (app.core.single_flight). The first one computes the bundle and the
+others wait for its result, or for its exception.
+
+Stored payloads are frozen (app.cache.frozen_payload) because they are shared
+between requests.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from app.cache.frozen_payload import freeze
+from app.core.single_flight import FlightTimeout, SingleFlight
+from app.system.system_metrics import record_cache_access
+
+logger = logging.getLogger("stocknewsbr.public_bundle_cache")
+
+BUNDLE_CACHE_MAX_AGE_SECONDS = max(0.0, float(os.getenv("PUBLIC_BUNDLE_CACHE_MAX_AGE_SECONDS", "15") or 15))
+BUNDLE_CACHE_MAX_ENTRIES = max(1, int(os.getenv("PUBLIC_BUNDLE_CACHE_MAX_ENTRIES", "1024") or 1024))
+# A follower never waits longer than this for the leader; past it, it computes itself.
+_COALESCE_WAIT_SECONDS = 30.0
+
+_LOCK = threading.Lock()
+_ENTRIES: "OrderedDict[Hashable, tuple[Hashable, float, Any]]" = OrderedDict()
+_FLIGHTS = SingleFlight("public_bundle", timeout=_COALESCE_WAIT_SECONDS)
+
+
+def cached_bundle(key: Hashable, fingerprint: Hashable, compute: Callable[[], Any]) -> Any:
+    """Stored bundle for `key` while `fingerprint` holds, else one shared computation."""
+    now = time.monotonic()
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is not None and entry[0] == fingerprint and now - entry[1] < BUNDLE_CACHE_MAX_AGE_SECONDS:
+            _ENTRIES.move_to_end(key)
+            record_cache_access("public_bundle", True, "memo")
+            return entry[2]
+
+    led = False
+
+    def compute_and_store():
+        nonlocal led
+        led = True
+        with _LOCK:
+            # A flight for this fingerprint may have landed since the check above.
+            entry = _ENTRIES.get(key)
+            if entry is not None and entry[0] == fingerprint and time.monotonic() - entry[1] < BUNDLE_CACHE_MAX_AGE_SECONDS:
+                record_cache_access("public_bundle", True, "memo")
+                return entry[2]
+        record_cache_access("public_bundle", False, "compute")
+        payload = freeze(compute())
+        with _LOCK:
+            _ENTRIES[key] = (fingerprint, time.monotonic(), payload)
+            _ENTRIES.move_to_end(key)
+            while len(_ENTRIES) > BUNDLE_CACHE_MAX_ENTRIES:
+                _ENTRIES.popitem(last=False)
+        return payload
+
+    try:
+        payload = _FLIGHTS.do((key, fingerprint), compute_and_store)
+    except FlightTimeout:
+        logger.warning("Bundle computation for %s outlived the coalescing wait; computing separately", key)
+        record_cache_access("public_bundle", False, "coalesce_timeout")
+        return freeze(compute())
+    if not led:
+        record_cache_access("public_bundle", True, "coalesced")
+    return payload
+
+
+def reset_bundle_cache() -> None:
+    """Drop every stored bundle. Exists so tests are not stuck with process state."""
+    with _LOCK:
+        _ENTRIES.clear()
@@ -9,11 +9,16 @@ from pathlib import Path
 from statistics import median
 from threading import RLock
 
+import numpy as np
+
+from app.cache.shared_publication import shared_publication
 from app.engine.indicators.vector_indicator_engine import RSI_PERIOD, compute_latest_rsi
+from app.market.chart_cache_store import chart_cache_store
 from app.market.market_data_loader import (
-    get_cached_chart_data,
+    get_cached_chart_series,
     get_cached_price_snapshots,
 )
+from app.market.ohlcv import MISSING_EPOCH, OHLCVSeries
 from app.market.universe_registry import INDEX_UNIVERSE
 from app.services.symbol_registry import (
     canonical_symbol,
@@ -65,8 +70,9 @@ def _read_json_cache(path: Path) -> dict:
     BTCUSD (10 aliases, ~1.44 s) ran ~2.5x slower than PETR4 (4 aliases, ~0.57 s).
 
     The returned dict is shared, not copied: copying 18 MB per call would reintroduce the
-    very cost being removed. Consumers must copy what they hand out -- both call sites do
-    (`dict(payload)` for quotes, `[dict(row) for row in rows]` for chart rows).
+    very cost being removed. Consumers must copy what they hand out -- the quote reader
+    does (`dict(payload)`). Chart rows no longer come through here; they are read per key
+    from the chart store.
     """
     key = str(path)
     try:
@@ -158,6 +164,8 @@ def _row_as_of(row: dict | None) -> str | None:
 
 
 def public_chart_as_of(rows: list[dict] | None) -> str | None:
+    if isinstance(rows, OHLCVSeries):
+        return next((label for label in reversed(rows.labels) if label), None)
     for row in reversed(rows or []):
         as_of = _row_as_of(row)
         if as_of is not None:
@@ -213,6 +221,66 @@ def public_daily_age_sessions(
     )
 
 
+def _same_bucket_samples_from_rows(
+    rows: list[dict] | None, window_days: int
+) -> tuple[datetime, float, list[float]] | None:
+    """Latest 5m bucket plus one same-UTC-bucket volume per prior date in the window."""
+    parsed: list[tuple[datetime, float]] = []
+    for row in rows or []:
+        if not isinstance(row, dict):
+            continue
+        raw_time = _row_as_of(row)
+        volume = _finite_positive(row.get("volume"))
+        if not raw_time:
+            continue
+        try:
+            stamp = datetime.fromisoformat(str(raw_time).replace("Z", "+00:00"))
+            stamp = stamp.replace(tzinfo=timezone.utc) if stamp.tzinfo is None else stamp.astimezone(timezone.utc)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        # Keep zero-volume current buckets visible as insufficient instead of
+        # silently falling back to an earlier, completed bucket.
+        parsed.append((stamp, float(volume or 0.0)))
+
+    if not parsed:
+        return None
+
+    parsed.sort(key=lambda item: item[0])
+    current_at, current_volume = parsed[-1]
+    current_bucket = (current_at.hour, current_at.minute // 5)
+    samples_by_date: dict[object, float] = {}
+    for stamp, volume in parsed[:-1]:
+        age_days = (current_at.date() - stamp.date()).days
+        if not 1 <= age_days <= window_days:
+            continue
+        if (stamp.hour, stamp.minute // 5) != current_bucket or volume <= 0:
+            continue
+        samples_by_date[stamp.date()] = volume
+    return current_at, current_volume, list(samples_by_date.values())
+
+
+def _same_bucket_samples_from_series(
+    series: OHLCVSeries, window_days: int
+) -> tuple[datetime, float, list[float]] | None:
+    """Column form of _same_bucket_samples_from_rows(): same result, no per-bar dicts."""
+    valid = series.time != MISSING_EPOCH
+    if not valid.any():
+        return None
+    order = np.argsort(series.time[valid], kind="stable")
+    epochs = series.time[valid][order]
+    volumes = series.volume[valid][order] if "volume" in series.fields else np.zeros(len(epochs))
+    volumes = np.where(np.isfinite(volumes) & (volumes > 0), volumes, 0.0)
+
+    days = epochs // 86400
+    buckets = (epochs % 86400) // 300
+    ages = days[-1] - days[:-1]
+    mask = (ages >= 1) & (ages <= window_days) & (buckets[:-1] == buckets[-1]) & (volumes[:-1] > 0)
+    # Later bars overwrite earlier ones of the same date, as the row path does.
+    samples_by_date = dict(zip(days[:-1][mask].tolist(), volumes[:-1][mask].tolist()))
+    current_at = datetime.fromtimestamp(int(epochs[-1]), tz=timezone.utc)
+    return current_at, float(volumes[-1]), list(samples_by_date.values())
+
+
 def build_crypto_intraday_rvol_contract(
     symbol: str,
     rows: list[dict] | None,
@@ -249,28 +317,15 @@ def build_crypto_intraday_rvol_contract(
         "source": "chart_cache",
     }
 
-    parsed: list[tuple[datetime, float]] = []
-    for row in rows or []:
-        if not isinstance(row, dict):
-            continue
-        raw_time = _row_as_of(row)
-        volume = _finite_positive(row.get("volume"))
-        if not raw_time:
-            continue
-        try:
-            stamp = datetime.fromisoformat(str(raw_time).replace("Z", "+00:00"))
-            stamp = stamp.replace(tzinfo=timezone.utc) if stamp.tzinfo is None else stamp.astimezone(timezone.utc)
-        except (TypeError, ValueError, OverflowError):
-            continue
-        # Keep zero-volume current buckets visible as insufficient instead of
-        # silently falling back to an earlier, completed bucket.
-        parsed.append((stamp, float(volume or 0.0)))
-
-    if not parsed:
+    bucket = (
+        _same_bucket_samples_from_series(rows, base["window_days"])
+        if isinstance(rows, OHLCVSeries)
+        else _same_bucket_samples_from_rows(rows, base["window_days"])
+    )
+    if bucket is None:
         return base
 
-    parsed.sort(key=lambda item: item[0])
-    current_at, current_volume = parsed[-1]
+    current_at, current_volume, samples = bucket
     base.update({
         "current_volume": current_volume if current_volume > 0 else None,
         "current_bucket_volume": current_volume if current_volume > 0 else None,
@@ -281,17 +336,6 @@ def build_crypto_intraday_rvol_contract(
         base["reason"] = "current_bucket_volume_unavailable"
         return base
 
-    current_bucket = (current_at.hour, current_at.minute // 5)
-    samples_by_date: dict[object, float] = {}
-    for stamp, volume in parsed[:-1]:
-        age_days = (current_at.date() - stamp.date()).days
-        if not 1 <= age_days <= base["window_days"]:
-            continue
-        if (stamp.hour, stamp.minute // 5) != current_bucket or volume <= 0:
-            continue
-        samples_by_date[stamp.date()] = volume
-
-    samples = list(samples_by_date.values())
     base["sample_count"] = len(samples)
     if len(samples) < base["minimum_sample_count"]:
         base["reason"] = "insufficient_same_utc_bucket_samples"
@@ -317,6 +361,10 @@ def build_crypto_intraday_rvol_contract(
 
 
 def _valid_chart_closes(rows: list[dict] | None) -> list[float]:
+    if isinstance(rows, OHLCVSeries):
+        if "close" not in rows.fields:
+            return []
+        return rows.close[np.isfinite(rows.close) & (rows.close > 0)].tolist()
     closes: list[float] = []
     for row in rows or []:
         if not isinstance(row, dict):
@@ -328,6 +376,11 @@ def _valid_chart_closes(rows: list[dict] | None) -> list[float]:
 
 
 def _rsi_as_of(rows: list[dict] | None) -> str | None:
+    if isinstance(rows, OHLCVSeries):
+        if "close" not in rows.fields:
+            return None
+        valid = np.flatnonzero(np.isfinite(rows.close) & (rows.close > 0))
+        return (rows.labels[valid[-1]] or None) if len(valid) else None
     for row in reversed(rows or []):
         if not isinstance(row, dict) or _finite_positive(row.get("close")) is None:
             continue
@@ -354,6 +407,17 @@ def _candle_interval(rows: list[dict] | None) -> str | None:
     day of 5m candles, "1M" means one month of 1d candles. Publishing only the
     range makes the UI render an intraday RSI as "RSI D1".
     """
+    if isinstance(rows, OHLCVSeries):
+        labelled = np.fromiter((bool(label) for label in rows.labels), dtype=bool, count=len(rows))
+        epochs = rows.time[labelled]
+        if (epochs == MISSING_EPOCH).any():
+            return None
+        steps = np.diff(epochs)
+        deltas = np.sort(steps[steps > 0])
+        if not len(deltas):
+            return None
+        median = float(deltas[len(deltas) // 2])
+        return min(_CANDLE_INTERVAL_STEPS, key=lambda step: abs(step[0] - median))[1]
     stamps: list[float] = []
     for row in rows or []:
         raw = _row_as_of(row) if isinstance(row, dict) else None
@@ -371,6 +435,9 @@ def _candle_interval(rows: list[dict] | None) -> str | None:
 
 
 def _is_quote_fallback_chart(rows: list[dict] | None) -> bool:
+    # A columnar series only ever holds plain candles, never tagged fallback rows.
+    if isinstance(rows, OHLCVSeries):
+        return False
     return bool(rows) and all(
         isinstance(row, dict) and str(row.get("source") or "").lower().strip() == "quote_cache_fallback"
         for row in rows or []
@@ -452,7 +519,7 @@ def normalize_public_chart_zones(
     normalized_symbol = _context_symbol(symbol)
     normalized_timeframe = _context_timeframe(timeframe)
     as_of = public_chart_as_of(rows)
-    rows_stale = any(
+    rows_stale = not isinstance(rows, OHLCVSeries) and any(
         isinstance(row, dict)
         and (row.get("stale") is True or "stale" in str(row.get("source") or "").lower())
         for row in rows or []
@@ -618,10 +685,18 @@ def _payload_matches_symbol(payload: dict, symbol: str) -> bool:
     return bool(identities and allowed.intersection(identities))
 
 
+def _quote_cache_entries():
+    """Per-key view of the quote cache: the shared segment, else the parsed file."""
+    segment = shared_publication(_QUOTE_CACHE_FILE).segment()
+    if segment is not None:
+        record_cache_access("market_quotes_file", True, "shared_memory")
+        return segment
+    record_cache_access("market_quotes_file", True, "file")
+    return _read_json_cache(_QUOTE_CACHE_FILE)
+
+
 def _direct_cached_price_payloads(symbols: list[str], allow_stale: bool) -> dict:
-    raw_cache = _read_json_cache(_QUOTE_CACHE_FILE)
-    if not isinstance(raw_cache, dict):
-        return {}
+    raw_cache = _quote_cache_entries()
 
     resolved: dict = {}
     for symbol in symbols:
@@ -691,21 +766,28 @@ def _direct_cached_chart_data(alias: str, interval: str, allow_stale: bool) -> l
 
 
 def _direct_cached_chart_data_from(cache_path: Path, alias: str, interval: str, allow_stale: bool) -> list[dict]:
-    raw_cache = _read_json_cache(cache_path)
-    charts = raw_cache.get("charts") if isinstance(raw_cache, dict) else None
-    if not isinstance(charts, dict):
+    # Per-key reads from the chart store beside `cache_path`: each alias probes one
+    # primary key and decodes only that series, never the rest of the cache.
+    try:
+        store = chart_cache_store(cache_path.with_suffix(".sqlite3"), legacy_json=cache_path)
+    except Exception:
         return []
 
     for candidate in _symbol_aliases(alias):
-        entry = charts.get(f"{candidate}:{interval}") or charts.get(f"{candidate.replace('.SA', '')}:{interval}")
+        entry = None
+        for key in dict.fromkeys((f"{candidate}:{interval}", f"{candidate.replace('.SA', '')}:{interval}")):
+            try:
+                entry = store.get(key)
+            except Exception:
+                entry = None
+            if entry:
+                break
         if not isinstance(entry, dict) or not _fresh_enough(entry, allow_stale, _CHART_DIRECT_MAX_AGE_SECONDS, _CHART_RETENTION_SECONDS):
             continue
         rows = entry.get("rows")
         if isinstance(rows, list) and rows:
-            # Copied out of the memoised structure: _read_json_cache now shares its parse
-            # between callers, so handing back the live list would let one consumer's
-            # mutation corrupt every later read.
-            return [dict(row) if isinstance(row, dict) else row for row in rows]
+            # Decoded fresh for this call, so the caller owns every row it gets back.
+            return [row for row in rows if isinstance(row, dict)]
     return []
 
 
@@ -819,13 +901,18 @@ def build_public_indices_payload() -> dict:
 
 
 def load_public_chart_rows(aliases: list[str], interval: str, scope: str = "public_market_live") -> list[dict]:
+    """First cached chart among `aliases`.
+
+    Plain candles come back as the cache's shared OHLCVSeries (no per-row copy); it reads
+    like a list of row dicts. Use chart_rows_as_list() before putting it in a response.
+    """
     for alias in aliases:
         try:
-            cached = get_cached_chart_data(alias, interval)
+            cached = get_cached_chart_series(alias, interval)
             if cached:
                 record_cache_access("chart", True, scope)
                 return cached
-            stale_cached = get_cached_chart_data(alias, interval, allow_stale=True)
+            stale_cached = get_cached_chart_series(alias, interval, allow_stale=True)
             if stale_cached:
                 record_cache_access("chart_stale", True, scope)
                 return stale_cached
@@ -1,10 +1,8 @@
 import json
 import os
-import threading
-import time
 from pathlib import Path
 
-from app.core.atomic_io import write_json_file_atomic
+from app.services.push_token_registry import get_push_token_registry
 from app.system.kill_switches import alert_channel_block_reason
 from app.system.system_metrics import increment_push_sends
 
@@ -35,27 +33,21 @@ except Exception:  # pragma: no cover - optional dependency
     messaging = None
 
 
+# Store JSON legado (Mission 32). Os tokens vivem no registro indexado ao
+# lado (push_tokens.sqlite3); o JSON só é importado uma vez, como migração.
 PUSH_STORE_PATH = Path("data/push_tokens.json")
-_lock = threading.RLock()
+PUSH_MAX_TOKENS_PER_USER = 10
+# Limite do FCM para send_each_for_multicast.
+PUSH_MULTICAST_MAX_TOKENS = 500
 _firebase_app = None
 
 
-def _load_store():
-    with _lock:
-        if not PUSH_STORE_PATH.exists():
-            return {}
-
-        try:
-            return json.loads(PUSH_STORE_PATH.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-
-
-def _save_store(store):
-    with _lock:
-        # Mission 31F: escrita atômica; o write_text direto podia deixar JSON
-        # parcial em disco se o processo caísse no meio da gravação.
-        write_json_file_atomic(PUSH_STORE_PATH, store, ensure_ascii=True)
+def _registry(create: bool = True):
+    path = PUSH_STORE_PATH.with_suffix(".sqlite3")
+    # Leituras não criam o registro: sem tokens registrados nem JSON legado, não há nada a ler.
+    if not create and not path.exists() and not PUSH_STORE_PATH.exists():
+        return None
+    return get_push_token_registry(path, legacy_json=PUSH_STORE_PATH)
 
 
 def _firebase_ready():
@@ -113,48 +105,21 @@ def register_push_token(user_id: int, token: str, platform: str, app_version: st
     if not user_id or not token:
         return None
 
-    # Mission 31F: o ciclo load-modify-save precisa ser atômico; sem o lock
-    # cobrindo a operação inteira, registros concorrentes se sobrescrevem.
-    with _lock:
-        store = _load_store()
-        token = token.strip()
-        if not token:
-            return None
-        platform = (platform or "android").strip().lower()
-
-        # Mission 32: um device token pertence a um único usuário. Política
-        # explícita: re-registro atualiza o vínculo (remove o token de
-        # qualquer outro usuário antes de associá-lo ao usuário atual).
-        for other_key in list(store.keys()):
-            if other_key == str(user_id):
-                continue
-            remaining = [item for item in store.get(other_key, []) if item.get("token") != token]
-            if len(remaining) != len(store.get(other_key, [])):
-                store[other_key] = remaining
-
-        items = list(store.get(str(user_id), []))
-        items = [item for item in items if item.get("token") != token]
-        items.append(
-            {
-                "token": token,
-                "platform": platform,
-                "app_version": app_version,
-                "registered_at": int(time.time()),
-                "active": True,
-            }
-        )
-        store[str(user_id)] = items[-10:]
-        _save_store(store)
-        return {"user_id": user_id, "tokens": [_public_token_item(item) for item in store[str(user_id)]]}
+    token = token.strip()
+    if not token:
+        return None
+    platform = (platform or "android").strip().lower()
+
+    # Mission 32: um device token pertence a um único usuário. Política
+    # explícita: re-registro atualiza o vínculo. O upsert pelo índice único
+    # do token troca o dono, reativa e rotaciona numa única transação.
+    items = _registry().register(user_id, token, platform, app_version, keep=PUSH_MAX_TOKENS_PER_USER)
+    return {"user_id": user_id, "tokens": [_public_token_item(item) for item in items]}
 
 
 def unregister_push_token(user_id: int, token: str):
-    with _lock:
-        store = _load_store()
-        items = [item for item in store.get(str(user_id), []) if item.get("token") != token]
-        store[str(user_id)] = items
-        _save_store(store)
-        return {"user_id": user_id, "tokens": [_public_token_item(item) for item in items]}
+    items = _registry().unregister(user_id, token)
+    return {"user_id": user_id, "tokens": [_public_token_item(item) for item in items]}
 
 
 def deactivate_push_token(user_id: int, token: str, reason: str = "provider_invalid_token"):
@@ -163,25 +128,27 @@ def deactivate_push_token(user_id: int, token: str, reason: str = "provider_inva
     Não apaga a evidência: o registro permanece com motivo sanitizado e
     timestamp, e um novo registro do mesmo token reativa o vínculo.
     """
-    with _lock:
-        store = _load_store()
-        changed = False
-        for item in store.get(str(user_id), []):
-            if item.get("token") == token and item.get("active", True):
-                item["active"] = False
-                item["deactivated_reason"] = str(reason or "provider_invalid_token")[:80]
-                item["deactivated_at"] = int(time.time())
-                changed = True
-        if changed:
-            _save_store(store)
-        return changed
+    return deactivate_push_tokens([(user_id, token, reason)]) > 0
+
+
+def deactivate_push_tokens(entries) -> int:
+    """Desativa vários tokens `(user_id, token, reason)` numa única gravação.
+
+    Um lote multicast pode devolver dezenas de tokens inválidos; desativá-los
+    um a um relia e regravava o store inteiro por token.
+    """
+    reasons = {}
+    for user_id, token, reason in entries or []:
+        if user_id and token:
+            reasons[(int(user_id), str(token))] = str(reason or "provider_invalid_token")[:80]
+    if not reasons:
+        return 0
+    return _registry().deactivate((user_id, token, reason) for (user_id, token), reason in reasons.items())
 
 
 def list_push_tokens(user_id: int, include_inactive: bool = False):
-    items = list(_load_store().get(str(user_id), []))
-    if include_inactive:
-        return items
-    return [item for item in items if item.get("active", True)]
+    registry = _registry(create=False)
+    return registry.tokens(user_id, include_inactive=include_inactive) if registry else []
 
 
 def list_push_tokens_public(user_id: int):
@@ -190,7 +157,29 @@ def list_push_tokens_public(user_id: int):
 
 
 def get_push_token_store():
-    return _load_store()
+    """Todos os tokens no formato do antigo JSON (diagnóstico: varre o registro inteiro)."""
+    registry = _registry(create=False)
+    return registry.snapshot() if registry else {}
+
+
+def resolve_push_audience(user_ids) -> list[tuple[int, str]]:
+    """`(user_id, token)` ativos dos usuários habilitados que não desligaram os alertas push.
+
+    Uma única consulta indexada: os ids habilitados entram numa tabela
+    temporária e são cruzados com tokens ativos e preferências.
+    """
+    registry = _registry(create=False)
+    return registry.audience(user_ids) if registry else []
+
+
+def set_push_alerts_enabled(user_id: int, enabled: bool) -> dict:
+    _registry().set_alerts_enabled(user_id, enabled)
+    return get_push_preferences(user_id)
+
+
+def get_push_preferences(user_id: int) -> dict:
+    registry = _registry(create=False)
+    return {"user_id": user_id, "alerts_enabled": registry.alerts_enabled(user_id) if registry else True}
 
 
 def _classify_send_error(exc: Exception) -> str:
@@ -206,6 +195,37 @@ def _classify_send_error(exc: Exception) -> str:
     return "temporary"
 
 
+class FirebaseMulticastTransport:
+    """Envia um lote de tokens numa única chamada send_each_for_multicast.
+
+    `send_multicast` devolve, na ordem dos tokens, None (entregue) ou a
+    exceção do provider para aquele token; uma exceção levantada pela própria
+    chamada vale para o lote inteiro.
+    """
+
+    max_batch_size = PUSH_MULTICAST_MAX_TOKENS
+
+    def __init__(self, app):
+        self.app = app
+
+    def send_multicast(self, tokens, title, body, data):
+        message = messaging.MulticastMessage(
+            tokens=list(tokens),
+            notification=messaging.Notification(title=title, body=body),
+            data={str(key): str(value) for key, value in (data or {}).items()},
+        )
+        response = messaging.send_each_for_multicast(message, app=self.app)
+        return [None if item.success else item.exception for item in response.responses]
+
+
+def get_push_transport():
+    """Transport multicast do Firebase, ou None quando não configurado."""
+    app = _get_firebase_app()
+    if app is None or messaging is None:
+        return None
+    return FirebaseMulticastTransport(app)
+
+
 def send_push_notification(
     user_id: int,
     title: str,
@@ -233,45 +253,52 @@ def send_push_notification(
     if not resolved_tokens:
         return {"sent": 0, "reason": "no_registered_tokens", "tokens": 0}
 
+    token_values = [item["token"] for item in resolved_tokens]
+    errors = []
+
     if sender is None:
-        app = _get_firebase_app()
+        transport = get_push_transport()
 
-        if app is None or messaging is None:
+        if transport is None:
             return {
                 "sent": 0,
                 "reason": "firebase_not_configured",
                 "tokens": len(resolved_tokens),
             }
 
-        def sender(token, sender_title, sender_body, sender_data):
-            message = messaging.Message(
-                token=token,
-                notification=messaging.Notification(title=sender_title, body=sender_body),
-                data={str(key): str(value) for key, value in (sender_data or {}).items()},
-            )
-            messaging.send(message, app=app)
+        for start in range(0, len(token_values), transport.max_batch_size):
+            batch = token_values[start : start + transport.max_batch_size]
+            try:
+                errors.extend(transport.send_multicast(batch, title, body, data or {}))
+            except Exception as exc:
+                errors.extend([exc] * len(batch))
+    else:
+        for token in token_values:
+            try:
+                sender(token, title, body, data or {})
+                errors.append(None)
+            except Exception as exc:
+                errors.append(exc)
 
     sent = 0
     failed = 0
-    invalidated = 0
+    invalid = []
 
-    for item in resolved_tokens:
-        try:
-            sender(item["token"], title, body, data or {})
+    for token, exc in zip(token_values, errors):
+        if exc is None:
             sent += 1
-            increment_push_sends()
-        except Exception as exc:
-            if _classify_send_error(exc) == "invalid_token":
-                deactivate_push_token(user_id, item.get("token"), reason=type(exc).__name__)
-                invalidated += 1
-            else:
-                failed += 1
-            continue
+        elif _classify_send_error(exc) == "invalid_token":
+            invalid.append((user_id, token, type(exc).__name__))
+        else:
+            failed += 1
+
+    increment_push_sends(sent)
+    deactivate_push_tokens(invalid)
 
     return {
         "sent": sent,
         "failed": failed,
-        "invalidated": invalidated,
+        "invalidated": len(invalid),
         "tokens": len(resolved_tokens),
     }
 
@@ -302,8 +329,8 @@ def get_push_status():
     if not apple_ready:
         missing_apple = ["APNS_KEY_ID", "APNS_TEAM_ID", "APNS_BUNDLE_ID"]
 
-    store = _load_store()
-    total_tokens = sum(len(items) for items in store.values())
+    registry = _registry(create=False)
+    total_tokens = registry.count() if registry else 0
     push_block_reason = alert_channel_block_reason("push")
 
     return {
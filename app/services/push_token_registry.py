@@ -0,0 +1,311 @@
+# =====================================================
+# PUSH TOKEN REGISTRY
+# Indexed device-token store with a legacy JSON import
+# =====================================================
+
+"""SQLite-backed registry of push device tokens.
+
+The tokens used to live in one JSON document (data/push_tokens.json), keyed
+by user id. Every register, unregister and deactivation loaded and rewrote
+the whole file. Enforcing "one owner per token" scanned every user's list,
+and resolving a signal's audience walked the entire store. With 100k devices,
+a single registration rewrote several megabytes.
+
+The registry keeps one row per token in an embedded SQLite file next to the
+legacy JSON (push_tokens.sqlite3):
+
+* push_tokens has a unique index on token, and indexes on (user_id,
+  registered_at) and (active, user_id). A registration is one
+  INSERT ... ON CONFLICT(token) DO UPDATE. Moving the token to its new owner,
+  reactivating it and rotating it to the newest position happen in that same
+  statement. The per-user cap is then enforced on that user's rows only;
+* push_preferences holds each user's push opt-out. A user with no row
+  receives alerts;
+* audience() loads the entitled user ids (active users with app access, from
+  the users table) into a temporary table. One query then joins them with the
+  active tokens and the preferences;
+* on first open, a legacy JSON file is imported in one transaction and
+  recorded in push_registry_meta, so it is never imported twice. The JSON
+  file is left in place as a backup.
+
+Every write is its own BEGIN IMMEDIATE transaction, so the API and worker
+processes can share the file. WAL lets readers run alongside a writer.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("stocknewsbr.push_token_registry")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS push_tokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        platform TEXT NOT NULL,
+        app_version TEXT,
+        registered_at REAL NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1,
+        deactivated_reason TEXT,
+        deactivated_at INTEGER
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_push_tokens_token ON push_tokens (token)",
+    "CREATE INDEX IF NOT EXISTS ix_push_tokens_user ON push_tokens (user_id, registered_at)",
+    "CREATE INDEX IF NOT EXISTS ix_push_tokens_active_user ON push_tokens (active, user_id)",
+    """
+    CREATE TABLE IF NOT EXISTS push_preferences (
+        user_id INTEGER PRIMARY KEY,
+        alerts_enabled INTEGER NOT NULL DEFAULT 1,
+        updated_at INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS push_registry_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+)
+
+_COLUMNS = "token, user_id, platform, app_version, registered_at, active, deactivated_reason, deactivated_at"
+
+_UPSERT = """
+    INSERT INTO push_tokens (token, user_id, platform, app_version, registered_at, active)
+    VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT(token) DO UPDATE SET
+        user_id = excluded.user_id,
+        platform = excluded.platform,
+        app_version = excluded.app_version,
+        registered_at = excluded.registered_at,
+        active = 1,
+        deactivated_reason = NULL,
+        deactivated_at = NULL
+"""
+
+_AUDIENCE = """
+    SELECT t.user_id, t.token
+    FROM push_tokens AS t
+    JOIN temp.push_audience_users AS a ON a.user_id = t.user_id
+    LEFT JOIN push_preferences AS p ON p.user_id = t.user_id
+    WHERE t.active = 1 AND COALESCE(p.alerts_enabled, 1) = 1
+    ORDER BY t.user_id, t.registered_at, t.id
+"""
+
+
+def _item(row) -> dict:
+    token, user_id, platform, app_version, registered_at, active, reason, deactivated_at = row
+    item = {
+        "token": token,
+        "platform": platform,
+        "app_version": app_version,
+        "registered_at": int(registered_at),
+        "active": bool(active),
+    }
+    if not active:
+        item["deactivated_reason"] = reason
+        item["deactivated_at"] = deactivated_at
+    return item
+
+
+class PushTokenRegistry:
+    """Device tokens, one row each, indexed by token, owner and active flag."""
+
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        finally:
+            connection.close()
+        if legacy_json is not None:
+            self.import_legacy_json(legacy_json)
+
+    @contextmanager
+    def _connect(self, write: bool = True):
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if not write:
+                yield connection
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def import_legacy_json(self, path: Path) -> int:
+        """Import a push_tokens.json document once; returns the tokens imported."""
+        path = Path(path)
+        marker = f"legacy_json:{path.resolve()}"
+        with self._connect() as connection:
+            if connection.execute("SELECT 1 FROM push_registry_meta WHERE key = ?", (marker,)).fetchone():
+                return 0
+            if not path.exists():
+                return 0
+            try:
+                store = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                logger.warning("push token JSON %s is unreadable; nothing imported", path)
+                return 0
+
+            rows = []
+            deactivations = []
+            for user_key, items in dict(store or {}).items():
+                try:
+                    user_id = int(user_key)
+                except (TypeError, ValueError):
+                    continue
+                for position, item in enumerate(items or []):
+                    if isinstance(item, str):
+                        item = {"token": item}
+                    token = str((item or {}).get("token") or "").strip()
+                    if not user_id or not token:
+                        continue
+                    # Keeps each user's list order when registered_at ties.
+                    registered_at = float(item.get("registered_at") or 0) + position * 1e-6
+                    rows.append(
+                        (token, user_id, str(item.get("platform") or "android"), item.get("app_version"), registered_at)
+                    )
+                    if not item.get("active", True):
+                        deactivations.append(
+                            (item.get("deactivated_reason"), item.get("deactivated_at"), token, user_id)
+                        )
+
+            # Later rows win on a duplicated token, as the last registration did.
+            connection.executemany(_UPSERT, rows)
+            connection.executemany(
+                "UPDATE push_tokens SET active = 0, deactivated_reason = ?, deactivated_at = ? "
+                "WHERE token = ? AND user_id = ?",
+                deactivations,
+            )
+            connection.execute("INSERT INTO push_registry_meta (key, value) VALUES (?, ?)", (marker, str(int(time.time()))))
+        if rows:
+            logger.info("imported %d push tokens from %s", len(rows), path)
+        return len(rows)
+
+    def register(
+        self, user_id: int, token: str, platform: str, app_version: Optional[str] = None, keep: int = 10
+    ) -> List[dict]:
+        """Upsert the token for user_id, rebinding it if another user held it.
+
+        Only the user's keep most recent tokens are kept. Returns the user's tokens.
+        """
+        with self._connect() as connection:
+            connection.execute(_UPSERT, (token, int(user_id), platform, app_version, time.time()))
+            connection.execute(
+                """
+                DELETE FROM push_tokens WHERE user_id = ? AND id NOT IN (
+                    SELECT id FROM push_tokens WHERE user_id = ?
+                    ORDER BY registered_at DESC, id DESC LIMIT ?
+                )
+                """,
+                (int(user_id), int(user_id), max(1, int(keep))),
+            )
+            return self._tokens(connection, user_id, include_inactive=True)
+
+    def unregister(self, user_id: int, token: str) -> List[dict]:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM push_tokens WHERE user_id = ? AND token = ?", (int(user_id), str(token)))
+            return self._tokens(connection, user_id, include_inactive=True)
+
+    def deactivate(self, entries: Iterable[Tuple[int, str, str]]) -> int:
+        """Mark (user_id, token, reason) rows inactive in one transaction; returns the rows changed."""
+        now = int(time.time())
+        params = [(str(reason), now, int(user_id), str(token)) for user_id, token, reason in entries]
+        if not params:
+            return 0
+        with self._connect() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "UPDATE push_tokens SET active = 0, deactivated_reason = ?, deactivated_at = ? "
+                "WHERE user_id = ? AND token = ? AND active = 1",
+                params,
+            )
+            return connection.total_changes - before
+
+    def tokens(self, user_id: int, include_inactive: bool = False) -> List[dict]:
+        with self._connect(write=False) as connection:
+            return self._tokens(connection, user_id, include_inactive)
+
+    def _tokens(self, connection, user_id: int, include_inactive: bool) -> List[dict]:
+        active_filter = "" if include_inactive else " AND active = 1"
+        rows = connection.execute(
+            f"SELECT {_COLUMNS} FROM push_tokens WHERE user_id = ?{active_filter} ORDER BY registered_at, id",
+            (int(user_id),),
+        )
+        return [_item(row) for row in rows]
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        """Every token grouped by user id, in the legacy JSON shape (diagnostics only: full scan)."""
+        store: Dict[str, List[dict]] = {}
+        with self._connect(write=False) as connection:
+            for row in connection.execute(f"SELECT {_COLUMNS} FROM push_tokens ORDER BY user_id, registered_at, id"):
+                store.setdefault(str(row[1]), []).append(_item(row))
+        return store
+
+    def count(self) -> int:
+        with self._connect(write=False) as connection:
+            return int(connection.execute("SELECT COUNT(*) FROM push_tokens").fetchone()[0])
+
+    def set_alerts_enabled(self, user_id: int, enabled: bool) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                """
+                INSERT INTO push_preferences (user_id, alerts_enabled, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    alerts_enabled = excluded.alerts_enabled, updated_at = excluded.updated_at
+                """,
+                (int(user_id), 1 if enabled else 0, int(time.time())),
+            )
+
+    def alerts_enabled(self, user_id: int) -> bool:
+        with self._connect(write=False) as connection:
+            row = connection.execute(
+                "SELECT alerts_enabled FROM push_preferences WHERE user_id = ?", (int(user_id),)
+            ).fetchone()
+        return row is None or bool(row[0])
+
+    def audience(self, user_ids: Iterable[int]) -> List[Tuple[int, str]]:
+        """(user_id, token) for every active token of the given users who have not opted out."""
+        ids = [(int(user_id),) for user_id in set(user_ids or ()) if user_id]
+        if not ids:
+            return []
+        with self._connect(write=False) as connection:
+            connection.execute("CREATE TEMP TABLE push_audience_users (user_id INTEGER PRIMARY KEY)")
+            connection.executemany("INSERT INTO temp.push_audience_users (user_id) VALUES (?)", ids)
+            return [(int(user_id), str(token)) for user_id, token in connection.execute(_AUDIENCE)]
+
+
+_registries: Dict[Path, PushTokenRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_push_token_registry(path: Path, legacy_json: Optional[Path] = None) -> PushTokenRegistry:
+    """The process-wide registry for path; the legacy JSON is imported when it is first opened."""
+    key = Path(path).resolve()
+    registry = _registries.get(key)
+    if registry is None or not key.exists():
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None or not key.exists():
+                registry = PushTokenRegistry(key, legacy_json=legacy_json)
+                _registries[key] = registry
+    return registry
@@ -0,0 +1,322 @@
+# =====================================================
+# SESSION VALIDATION CACHE
+# =====================================================
+
+"""In-process cache of validated sessions, with revocation fan-out.
+
+resolve_token_user ran a User query and a UserSession query on every
+authenticated request, then set last_seen_at and added the session to the
+unit of work. Every read-only API call therefore ended in a write transaction.
+
+A session that passed the database checks is now remembered per
+(user id, session id) for SESSION_CACHE_TTL_SECONDS, in a bounded LRU of
+SESSION_CACHE_MAX_ENTRIES. A hit skips the UserSession query. The User row is
+still loaded on every request, because plan, role and activation changes must
+take effect at once and ORM instances cannot be shared between sessions.
+Entries also remember the engine they were validated against, so a session is
+never accepted from another database.
+
+Revocation reaches the cache three ways:
+
+* auth_session_service calls invalidate_sessions() when it revokes, replaces
+  or logs out sessions. The cached entries are dropped at once, and dropped
+  again when the caller's transaction commits, so a request that read the
+  row between the revoke and the commit cannot keep it cached;
+* the commit also rewrites a revocation-generation file
+  (SESSION_REVOCATION_FILE). Every lookup stats that file, and a process that
+  sees it change clears its whole cache. This is how API workers in other
+  processes learn of a revocation: on their next request, not at TTL expiry;
+* a row changed outside the service (a manual UPDATE, an admin script) is
+  picked up when the entry ages out, so SESSION_CACHE_TTL_SECONDS bounds it.
+
+Only valid sessions are cached; a revoked, expired or missing session always
+takes the database path and its usual error. A cached session whose
+expires_at has passed is not accepted from the cache either.
+
+last_seen_at is advisory, so it is no longer written inline. Touches are
+coalesced per session, keeping the latest timestamp, and written by a
+background thread every SESSION_LAST_SEEN_FLUSH_SECONDS as one executemany
+UPDATE per engine, plus once at exit. A failed flush is logged and dropped.
+SESSION_CACHE_TTL_SECONDS=0 disables the cache and
+SESSION_LAST_SEEN_FLUSH_SECONDS=0 restores the inline write.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.test_runtime import is_test_process, runtime_scratch_root
+from app.models import UserSession
+from app.system.system_metrics import record_cache_access
+
+logger = logging.getLogger("stocknewsbr.session_cache")
+
+SESSION_CACHE_TTL_SECONDS = max(0.0, float(os.getenv("SESSION_CACHE_TTL_SECONDS", "5") or 5))
+SESSION_CACHE_MAX_ENTRIES = max(1, int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000") or 10000))
+SESSION_LAST_SEEN_FLUSH_SECONDS = max(0.0, float(os.getenv("SESSION_LAST_SEEN_FLUSH_SECONDS", "60") or 60))
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_PENDING_INVALIDATIONS_KEY = "stocknewsbr_session_invalidations"
+
+SessionKey = Tuple[int, str]
+
+_lock = threading.Lock()
+# (user id, session id) -> (engine, expires_at, cached_at)
+_entries: "OrderedDict[SessionKey, Tuple[Engine, Optional[datetime], float]]" = OrderedDict()
+_revocation_mark: Optional[Tuple[int, int]] = None
+_pending_touches: Dict[Engine, Dict[SessionKey, datetime]] = {}
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+
+_LAST_SEEN_UPDATE = (
+    UserSession.__table__.update()
+    .where(UserSession.__table__.c.user_id == bindparam("b_user_id"))
+    .where(UserSession.__table__.c.session_id == bindparam("b_session_id"))
+    .values(last_seen_at=bindparam("b_seen_at"))
+)
+
+
+def revocation_file_path() -> Path:
+    configured = os.getenv("SESSION_REVOCATION_FILE")
+    if configured:
+        path = Path(configured)
+        return path if path.is_absolute() else _PROJECT_ROOT / path
+    if is_test_process():
+        return runtime_scratch_root("session-cache") / "session_revocations"
+    return _PROJECT_ROOT / "runtime" / "cache" / "session_revocations"
+
+
+def _engine_of(db: Any) -> Optional[Engine]:
+    get_bind = getattr(db, "get_bind", None)
+    if get_bind is None:
+        return None
+    try:
+        bind = get_bind()
+    except Exception:
+        return None
+    return bind if isinstance(bind, Engine) else None
+
+
+def _read_revocation_mark() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(revocation_file_path())
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _sync_revocations_locked() -> None:
+    global _revocation_mark
+
+    mark = _read_revocation_mark()
+    if mark != _revocation_mark:
+        if _revocation_mark is not None or mark is not None:
+            _entries.clear()
+        _revocation_mark = mark
+
+
+def publish_revocation() -> None:
+    """Rewrite the revocation-generation file so other processes clear their caches."""
+    global _revocation_mark
+
+    path = revocation_file_path()
+    with _lock:
+        # Catch up on any other process's revocation before overwriting its mark.
+        _sync_revocations_locked()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(f"{time.time_ns()} {os.getpid()}\n", encoding="utf-8")
+        # A rename gives the file a new inode, so the change is seen even where
+        # mtime granularity would hide two revocations in the same tick.
+        os.replace(temporary, path)
+    except OSError as exc:
+        logger.warning("Session revocation file not updated: %s", exc)
+        return
+    with _lock:
+        # This process already dropped what it revoked; keep the rest.
+        _revocation_mark = _read_revocation_mark()
+
+
+def lookup_session(db: Any, user_id: int, session_id: str) -> bool:
+    """True when (user_id, session_id) was validated against db's engine within the TTL."""
+    engine = _engine_of(db)
+    if engine is None or SESSION_CACHE_TTL_SECONDS <= 0:
+        return False
+    key = (int(user_id), str(session_id))
+    now = time.monotonic()
+    with _lock:
+        _sync_revocations_locked()
+        entry = _entries.get(key)
+        if entry is not None:
+            cached_engine, expires_at, cached_at = entry
+            if (
+                cached_engine is engine
+                and now - cached_at < SESSION_CACHE_TTL_SECONDS
+                and (expires_at is None or expires_at >= datetime.utcnow())
+            ):
+                _entries.move_to_end(key)
+                record_cache_access("session", True, "memo")
+                return True
+            del _entries[key]
+    record_cache_access("session", False, "memo")
+    return False
+
+
+def remember_session(db: Any, user_id: int, session_id: str, expires_at: Optional[datetime]) -> None:
+    """Cache a session that just passed the database checks."""
+    engine = _engine_of(db)
+    if engine is None or SESSION_CACHE_TTL_SECONDS <= 0:
+        return
+    key = (int(user_id), str(session_id))
+    with _lock:
+        _sync_revocations_locked()
+        _entries[key] = (engine, expires_at, time.monotonic())
+        _entries.move_to_end(key)
+        while len(_entries) > SESSION_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def _drop(keys) -> int:
+    dropped = 0
+    with _lock:
+        for user_id, session_id in keys:
+            if session_id is None:
+                stale = [key for key in _entries if key[0] == user_id]
+            else:
+                stale = [(user_id, session_id)] if (user_id, session_id) in _entries else []
+            for key in stale:
+                del _entries[key]
+            dropped += len(stale)
+    return dropped
+
+
+def invalidate_sessions(db: Any, user_id: int, session_id: Optional[str] = None) -> int:
+    """Drop the cached sessions of user_id (or only session_id) now and again at commit.
+
+    At commit the revocation-generation file is also rewritten, so other
+    processes drop theirs. Call it next to the statement that revokes.
+    """
+    key = (int(user_id), str(session_id) if session_id else None)
+    dropped = _drop([key])
+    info = getattr(db, "info", None)
+    if isinstance(info, dict):
+        info.setdefault(_PENDING_INVALIDATIONS_KEY, []).append(key)
+    else:
+        publish_revocation()
+    return dropped
+
+
+def _invalidate_after_commit(session) -> None:
+    keys = session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+    if keys:
+        _drop(keys)
+        publish_revocation()
+
+
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+
+
+_LISTENER_MARKER = "_stocknewsbr_session_cache_listeners_registered"
+if not getattr(Session, _LISTENER_MARKER, False):
+    event.listen(Session, "after_commit", _invalidate_after_commit)
+    event.listen(Session, "after_rollback", _discard_after_rollback)
+    setattr(Session, _LISTENER_MARKER, True)
+
+
+def touch_session(db: Any, user_id: int, session_id: str, seen_at: datetime) -> bool:
+    """Queue a last_seen_at update for the next batched flush.
+
+    Returns False when the touch cannot be batched (no engine bind, or batching
+    disabled); the caller then writes it on its own session.
+    """
+    engine = _engine_of(db)
+    if engine is None or SESSION_LAST_SEEN_FLUSH_SECONDS <= 0:
+        return False
+    key = (int(user_id), str(session_id))
+    with _lock:
+        touches = _pending_touches.setdefault(engine, {})
+        previous = touches.get(key)
+        if previous is None or seen_at > previous:
+            touches[key] = seen_at
+    _ensure_flusher()
+    return True
+
+
+def flush_last_seen(failure_level: int = logging.WARNING) -> int:
+    """Write every queued last_seen_at, one executemany UPDATE per engine."""
+    global _pending_touches
+
+    with _lock:
+        pending, _pending_touches = _pending_touches, {}
+    written = 0
+    for engine, touches in pending.items():
+        rows = [
+            {"b_user_id": user_id, "b_session_id": session_id, "b_seen_at": seen_at}
+            for (user_id, session_id), seen_at in touches.items()
+        ]
+        try:
+            with engine.begin() as connection:
+                connection.execute(_LAST_SEEN_UPDATE, rows)
+        except Exception as exc:
+            logger.log(
+                failure_level,
+                "Session last_seen_at flush failed | engine=%s sessions=%s | %s",
+                engine.url,
+                len(rows),
+                getattr(exc, "orig", None) or exc,
+            )
+            continue
+        written += len(rows)
+    return written
+
+
+def _flush_loop() -> None:
+    while not _flusher_stop.wait(SESSION_LAST_SEEN_FLUSH_SECONDS):
+        flush_last_seen()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="session-last-seen-flush", daemon=True)
+        _flusher.start()
+    # At exit the database may already be gone (a test engine, a shutdown).
+    atexit.register(flush_last_seen, logging.DEBUG)
+
+
+def get_session_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "entries": len(_entries),
+            "max_entries": SESSION_CACHE_MAX_ENTRIES,
+            "ttl_seconds": SESSION_CACHE_TTL_SECONDS,
+            "pending_last_seen": sum(len(touches) for touches in _pending_touches.values()),
+            "last_seen_flush_seconds": SESSION_LAST_SEEN_FLUSH_SECONDS,
+            "revocation_file": str(revocation_file_path()),
+        }
+
+
+def clear_session_cache() -> None:
+    """Forget every cached session and queued touch (tests and benchmarks)."""
+    with _lock:
+        _entries.clear()
+        _pending_touches.clear()
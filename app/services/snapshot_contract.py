@@ -719,7 +719,10 @@ def is_blocked_snapshot_row(row: Any) -> bool:
         return False
     if is_actionable_snapshot_row(row):
         return False
+    return _blocked_once_not_actionable(row)
 
+
+def _blocked_once_not_actionable(row: dict[str, Any]) -> bool:
     envelope = build_decision_envelope(row)
     if envelope.get("decision_status") in {
         DECISION_BLOCKED,
@@ -838,39 +841,58 @@ def snapshot_row_summary(row: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def summarize_snapshot_rows(rows: Iterable[Any]) -> dict[str, int]:
-    safe_rows = [row for row in rows or [] if isinstance(row, dict)]
-    actionable_rows = [row for row in safe_rows if is_actionable_snapshot_row(row)]
-    bullish_candidates = [
-        row for row in safe_rows if snapshot_row_orientation(row) == "bullish"
-    ]
-    bearish_candidates = [
-        row for row in safe_rows if snapshot_row_orientation(row) == "bearish"
-    ]
-    actionable_bullish = [
-        row for row in actionable_rows if snapshot_row_orientation(row) == "bullish"
-    ]
-    actionable_bearish = [
-        row for row in actionable_rows if snapshot_row_orientation(row) == "bearish"
-    ]
-    blocked_signals = [row for row in safe_rows if is_blocked_snapshot_row(row)]
-    watchlist_candidates = [row for row in safe_rows if is_watchlist_snapshot_row(row)]
+def classify_snapshot_row(row: Any) -> tuple[str | None, bool, bool, bool]:
+    """(orientation, actionable, blocked, watchlist) for one row.
+
+    Same answers as snapshot_row_orientation, is_actionable_snapshot_row,
+    is_blocked_snapshot_row and is_watchlist_snapshot_row, but the actionable
+    check (and the decision envelope behind it) runs once instead of once per
+    predicate.
+    """
+    if not isinstance(row, dict):
+        return None, False, False, False
+    actionable = is_actionable_snapshot_row(row)
+    blocked = not actionable and _blocked_once_not_actionable(row)
+    return snapshot_row_orientation(row), actionable, blocked, is_watchlist_snapshot_row(row)
+
+
+def summarize_classified_rows(classes: Iterable[tuple[str | None, bool, bool, bool]]) -> dict[str, int]:
+    """summarize_snapshot_rows over rows already run through classify_snapshot_row."""
+    total = bullish_candidates = bearish_candidates = actionable = 0
+    actionable_bullish = actionable_bearish = blocked_signals = watchlist_candidates = 0
+    for orientation, is_actionable, is_blocked, is_watchlist in classes:
+        total += 1
+        actionable += is_actionable
+        blocked_signals += is_blocked
+        watchlist_candidates += is_watchlist
+        if orientation == "bullish":
+            bullish_candidates += 1
+            actionable_bullish += is_actionable
+        elif orientation == "bearish":
+            bearish_candidates += 1
+            actionable_bearish += is_actionable
 
     return {
-        "total_signals": len(safe_rows),
-        "candidates": len(safe_rows),
-        "bullish_candidates": len(bullish_candidates),
-        "bearish_candidates": len(bearish_candidates),
-        "actionable": len(actionable_rows),
-        "actionable_bullish": len(actionable_bullish),
-        "actionable_bearish": len(actionable_bearish),
-        "blocked_signals": len(blocked_signals),
-        "watchlist_candidates": len(watchlist_candidates),
-        "bullish": len(actionable_bullish),
-        "bearish": len(actionable_bearish),
+        "total_signals": total,
+        "candidates": total,
+        "bullish_candidates": bullish_candidates,
+        "bearish_candidates": bearish_candidates,
+        "actionable": actionable,
+        "actionable_bullish": actionable_bullish,
+        "actionable_bearish": actionable_bearish,
+        "blocked_signals": blocked_signals,
+        "watchlist_candidates": watchlist_candidates,
+        "bullish": actionable_bullish,
+        "bearish": actionable_bearish,
     }
 
 
+def summarize_snapshot_rows(rows: Iterable[Any]) -> dict[str, int]:
+    return summarize_classified_rows(
+        classify_snapshot_row(row) for row in rows or [] if isinstance(row, dict)
+    )
+
+
 def actionable_snapshot_rows(rows: Iterable[Any], limit: int | None = None) -> list[dict[str, Any]]:
     output = [attach_decision_envelope(dict(row)) for row in rows or [] if is_actionable_snapshot_row(row)]
     return output[:limit] if limit is not None else output
@@ -3,16 +3,27 @@
 # =====================================================
 
 import os
-import threading
 import time
 from pathlib import Path
 
-from app.core.atomic_io import interprocess_file_lock, read_json_file, write_json_file_atomic
+from app.core.test_runtime import is_test_process, runtime_scratch_root
 from app.social.guardian import SocialGuardian
+from app.social.moderation_store import ModerationStore, get_moderation_store
 from app.system.system_metrics import increment_reports
 
 
-MODERATION_STORE_PATH = Path(os.getenv("MODERATION_STORE_PATH", "data/moderation_state.json"))
+def _default_store_path() -> Path:
+    # Sob testes o estado vai para um diretório temporário do processo, nunca
+    # para data/ na árvore de trabalho.
+    configured = os.getenv("MODERATION_STORE_PATH")
+    if configured:
+        return Path(configured)
+    if is_test_process():
+        return runtime_scratch_root("moderation") / "moderation_state.json"
+    return Path("data/moderation_state.json")
+
+
+MODERATION_STORE_PATH = _default_store_path()
 REPORT_THRESHOLD_AUTO_HIDE = max(2, int(os.getenv("MODERATION_REPORT_THRESHOLD", "4")))
 POST_WINDOW_SECONDS = max(30, int(os.getenv("MODERATION_POST_WINDOW_SECONDS", "60")))
 POST_WINDOW_LIMIT = max(3, int(os.getenv("MODERATION_POST_WINDOW_LIMIT", "12")))
@@ -22,62 +33,29 @@ BLOCKED_PHRASES = {
     if phrase.strip()
 }
 
-_lock = threading.RLock()
-
-
-def _default_state():
-    return {
-        "muted": {},
-        "blocked": {},
-        "reports": [],
-        "post_rate": {},
-        "shadow_banned": [],
-        "review_queue": [],
-        "reviewed_reports": [],
-        "guardian_audit": [],
-        "guardian_scores": {},
-    }
-
-
-def _load_state():
-    with _lock:
-        if not MODERATION_STORE_PATH.exists():
-            return _default_state()
-
-        data = read_json_file(MODERATION_STORE_PATH, _default_state)
 
-        base = _default_state()
-        base.update(data if isinstance(data, dict) else {})
-        return base
-
-
-def _save_state(state):
-    with _lock:
-        write_json_file_atomic(MODERATION_STORE_PATH, state, ensure_ascii=True)
+def _store(create: bool = True) -> ModerationStore | None:
+    # O estado vive em tabelas indexadas (moderation_store); o JSON legado é
+    # importado uma única vez, na primeira abertura.
+    path = MODERATION_STORE_PATH.with_suffix(".sqlite3")
+    if not create and not path.exists() and not MODERATION_STORE_PATH.exists():
+        return None
+    return get_moderation_store(path, legacy_json=MODERATION_STORE_PATH)
 
 
 def _mutate_state(mutator):
-    # Mission 31F: lock interprocesso ANTES do _lock (ordering fixo). Sem ele,
-    # read-modify-write concorrente entre processos perde atualizações; o
-    # ordering evita deadlock com quem só usa _lock (nunca o inverso).
-    with interprocess_file_lock(MODERATION_STORE_PATH.with_suffix(".json.lock")):
-        with _lock:
-            state = _load_state()
-            result = mutator(state)
-            _save_state(state)
-            return result
+    # Mission 31F: o read-modify-write continua atômico entre processos, agora
+    # como uma transação BEGIN IMMEDIATE em vez do lock de arquivo.
+    with _store().write() as tx:
+        return mutator(tx)
 
 
 def mute(user_id, target):
     if not user_id or not target:
         return False
 
-    def mutator(state):
-        muted = state.setdefault("muted", {})
-        muted.setdefault(str(user_id), [])
-
-        if target not in muted[str(user_id)]:
-            muted[str(user_id)].append(target)
+    def mutator(tx):
+        tx.add_relation("muted", user_id, target)
         return True
 
     return _mutate_state(mutator)
@@ -87,12 +65,8 @@ def block(user_id, target):
     if not user_id or not target:
         return False
 
-    def mutator(state):
-        blocked = state.setdefault("blocked", {})
-        blocked.setdefault(str(user_id), [])
-
-        if target not in blocked[str(user_id)]:
-            blocked[str(user_id)].append(target)
+    def mutator(tx):
+        tx.add_relation("blocked", user_id, target)
         return True
 
     return _mutate_state(mutator)
@@ -102,9 +76,11 @@ def get_blocked_users(user_id):
     if not user_id:
         return set()
 
-    state = _load_state()
-    blocked = state.get("blocked", {})
-    return set(blocked.get(str(user_id), []))
+    store = _store(create=False)
+    if store is None:
+        return set()
+    with store.read() as tx:
+        return tx.related("blocked", user_id)
 
 
 def _flag_reasons(text: str):
@@ -112,10 +88,8 @@ def _flag_reasons(text: str):
     return [phrase for phrase in BLOCKED_PHRASES if phrase in text]
 
 
-def _score_record(state, user_id):
-    scores = state.setdefault("guardian_scores", {})
-    key = str(user_id)
-    record = dict(scores.get(key) or {})
+def _score_record(stored, user_id):
+    record = dict(stored or {})
     record.setdefault("user_id", int(user_id))
     record.setdefault("score", SocialGuardian.TRUST_START)
     record.setdefault("label", SocialGuardian.trust_label(record.get("score")))
@@ -124,14 +98,13 @@ def _score_record(state, user_id):
     record.setdefault("reports_received", 0)
     record.setdefault("removed_posts", 0)
     record.setdefault("updated_at", int(time.time()))
-    scores[key] = record
     return record
 
 
-def _adjust_score(state, user_id, delta, *, approved_content_type=None, report=False, removed=False):
+def _adjust_score(tx, user_id, delta, *, approved_content_type=None, report=False, removed=False):
     if not user_id:
         return None
-    record = _score_record(state, user_id)
+    record = _score_record(tx.score(user_id), user_id)
     record["score"] = SocialGuardian.clamp_score(int(record.get("score") or SocialGuardian.TRUST_START) + int(delta or 0))
     record["label"] = SocialGuardian.trust_label(record["score"])
     record["updated_at"] = int(time.time())
@@ -143,12 +116,12 @@ def _adjust_score(state, user_id, delta, *, approved_content_type=None, report=F
         record["reports_received"] = int(record.get("reports_received") or 0) + 1
     if removed:
         record["removed_posts"] = int(record.get("removed_posts") or 0) + 1
+    tx.save_score(user_id, record)
     return record
 
 
-def _append_audit(state, action, *, actor_user_id=None, target_user_id=None, post_id=None, content_type=None, reason=None, details=None):
-    audit = state.setdefault("guardian_audit", [])
-    audit.append(
+def _append_audit(tx, action, *, actor_user_id=None, target_user_id=None, post_id=None, content_type=None, reason=None, details=None):
+    tx.append_audit(
         {
             "action": action,
             "actor_user_id": actor_user_id,
@@ -160,7 +133,6 @@ def _append_audit(state, action, *, actor_user_id=None, target_user_id=None, pos
             "timestamp": int(time.time()),
         }
     )
-    state["guardian_audit"] = audit[-20000:]
 
 
 def can_publish(user_id: int, text: str):
@@ -172,50 +144,40 @@ def can_publish(user_id: int, text: str):
     flagged_phrases = _flag_reasons(text)
 
     now = int(time.time())
+    store = _store()
 
-    def mutator(state):
-        if user_id in state.get("shadow_banned", []):
+    # Caminho feliz só lê: shadow ban por chave primária e janela de
+    # publicação em memória. O audit só é gravado quando há bloqueio.
+    with store.read() as tx:
+        if tx.is_shadow_banned(user_id):
             return False, "user_shadow_banned"
 
-        if not guardian_decision.allowed:
-            _append_audit(
-                state,
-                "content_blocked",
-                actor_user_id=user_id,
-                content_type="text",
-                reason=guardian_decision.reason,
-                details={
-                    "category": guardian_decision.category,
-                    "matched_terms": list(guardian_decision.matched_terms),
-                },
-            )
-            return False, guardian_decision.reason
-
-        if flagged_phrases:
-            _append_audit(
-                state,
-                "content_blocked",
-                actor_user_id=user_id,
-                content_type="text",
-                reason="blocked_phrase_detected",
-                details={"matched_terms": flagged_phrases},
-            )
-            return False, "blocked_phrase_detected"
-
-        post_rate = state.setdefault("post_rate", {})
-        timestamps = [
-            ts
-            for ts in post_rate.get(str(user_id), [])
-            if now - int(ts) <= POST_WINDOW_SECONDS
-        ]
-
-        if len(timestamps) >= POST_WINDOW_LIMIT:
+    if guardian_decision.allowed and not flagged_phrases:
+        if not store.publish_windows.allow(user_id, now, POST_WINDOW_SECONDS, POST_WINDOW_LIMIT):
             return False, "rate_limited"
-
-        timestamps.append(now)
-        post_rate[str(user_id)] = timestamps
         return True, "allowed"
 
+    if not guardian_decision.allowed:
+        reason = guardian_decision.reason
+        details = {
+            "category": guardian_decision.category,
+            "matched_terms": list(guardian_decision.matched_terms),
+        }
+    else:
+        reason = "blocked_phrase_detected"
+        details = {"matched_terms": flagged_phrases}
+
+    def mutator(tx):
+        _append_audit(
+            tx,
+            "content_blocked",
+            actor_user_id=user_id,
+            content_type="text",
+            reason=reason,
+            details=details,
+        )
+        return False, reason
+
     return _mutate_state(mutator)
 
 
@@ -224,9 +186,9 @@ def validate_attachment_url(user_id: int, image_url: str | None):
     if decision.allowed:
         return True, "allowed"
 
-    def mutator(state):
+    def mutator(tx):
         _append_audit(
-            state,
+            tx,
             "content_blocked",
             actor_user_id=user_id,
             content_type="attachment",
@@ -245,16 +207,16 @@ def record_content_approved(user_id, *, content_type: str, content_id=None, post
     if not user_id:
         return None
 
-    def mutator(state):
+    def mutator(tx):
         record = _adjust_score(
-            state,
+            tx,
             int(user_id),
             SocialGuardian.approved_delta(content_type),
             approved_content_type=content_type,
         )
         audit_action = "post_created" if content_type == "post" else f"{content_type}_created"
         _append_audit(
-            state,
+            tx,
             audit_action,
             actor_user_id=int(user_id),
             target_user_id=int(user_id),
@@ -269,16 +231,16 @@ def record_content_approved(user_id, *, content_type: str, content_id=None, post
 
 
 def record_post_removed(post_id, *, actor_user_id=None, target_user_id=None, reason: str | None = None):
-    def mutator(state):
+    def mutator(tx):
         if target_user_id:
             _adjust_score(
-                state,
+                tx,
                 int(target_user_id),
                 SocialGuardian.REMOVED_POST_DELTA,
                 removed=True,
             )
         _append_audit(
-            state,
+            tx,
             "post_removed",
             actor_user_id=actor_user_id,
             target_user_id=target_user_id,
@@ -299,10 +261,7 @@ def report(user_id, post_id, reason: str | None = None, reporter_note: str | Non
     # Mission 31F: todo o read-modify-write roda dentro de _mutate_state; o
     # padrão anterior (_load_state ... _save_state) perdia reports concorrentes
     # registrados entre a leitura e a gravação.
-    def mutator(state):
-        reports = state.setdefault("reports", [])
-        queue = state.setdefault("review_queue", [])
-
+    def mutator(tx):
         report_item = {
             "id": f"report-{int(time.time() * 1000)}-{user_id}",
             "user": user_id,
@@ -314,35 +273,29 @@ def report(user_id, post_id, reason: str | None = None, reporter_note: str | Non
             "created_at": int(time.time()),
         }
 
-        reports.append(report_item)
+        report_count = tx.add_report(report_item)
         increment_reports()
 
-        report_count = len([item for item in reports if item.get("post") == post_id])
-
-        queue_item = {
-            "post_id": post_id,
-            "reports": report_count,
-            "auto_hidden": report_count >= REPORT_THRESHOLD_AUTO_HIDE,
-            "last_reason": report_item["reason"],
-            "last_reason_label": report_item["reason_label"],
-            "target_user_id": target_user_id,
-            "updated_at": int(time.time()),
-        }
-
-        queue = [item for item in queue if item.get("post_id") != post_id]
-        queue.append(queue_item)
-
-        state["reports"] = reports[-20000:]
-        state["review_queue"] = queue[-5000:]
+        tx.put_queue_item(
+            {
+                "post_id": post_id,
+                "reports": report_count,
+                "auto_hidden": report_count >= REPORT_THRESHOLD_AUTO_HIDE,
+                "last_reason": report_item["reason"],
+                "last_reason_label": report_item["reason_label"],
+                "target_user_id": target_user_id,
+                "updated_at": int(time.time()),
+            }
+        )
         if target_user_id:
             _adjust_score(
-                state,
+                tx,
                 int(target_user_id),
                 SocialGuardian.REPORT_DELTA,
                 report=True,
             )
         _append_audit(
-            state,
+            tx,
             "post_reported",
             actor_user_id=user_id,
             target_user_id=target_user_id,
@@ -353,7 +306,7 @@ def report(user_id, post_id, reason: str | None = None, reporter_note: str | Non
         )
         if target_user_id:
             _append_audit(
-                state,
+                tx,
                 "user_reported",
                 actor_user_id=user_id,
                 target_user_id=target_user_id,
@@ -367,82 +320,45 @@ def report(user_id, post_id, reason: str | None = None, reporter_note: str | Non
 
 
 def get_review_queue(limit: int = 100):
-    state = _load_state()
-    items = list(state.get("review_queue", []))
-    return items[-max(1, min(limit, 500)) :]
+    store = _store(create=False)
+    if store is None:
+        return []
+    with store.read() as tx:
+        return tx.review_queue(max(1, min(limit, 500)))
 
 
 def is_post_hidden(post_id: int):
-    state = _load_state()
-
-    for item in reversed(state.get("reviewed_reports", [])):
-        if item.get("post_id") == post_id:
-            return item.get("action") in {"hide", "remove"}
-
-    for item in reversed(state.get("review_queue", [])):
-        if item.get("post_id") == post_id:
-            return bool(item.get("auto_hidden"))
-
-    return False
+    return post_id in get_hidden_post_ids([post_id])
 
 
 def get_hidden_post_ids(post_ids):
-    # Missão 34: versão em lote de is_post_hidden. Carrega o estado UMA vez em
-    # vez de reler/parsear o arquivo por post (N+1 de I/O em get_posts).
-    # Mesma semântica: primeiro match em reviewed_reports (reverso) decide;
-    # senão primeiro match em review_queue (reverso); senão não-oculto.
+    # Missão 34: versão em lote de is_post_hidden, agora uma consulta indexada
+    # por post. Mesma semântica: a última revisão do post decide; sem
+    # revisão, decide o auto_hidden do item na fila; senão não-oculto.
     pending = set(post_ids)
     if not pending:
         return set()
 
-    state = _load_state()
-    hidden = set()
-
-    for item in reversed(state.get("reviewed_reports", [])):
-        item_post_id = item.get("post_id")
-        if item_post_id in pending:
-            pending.discard(item_post_id)
-            if item.get("action") in {"hide", "remove"}:
-                hidden.add(item_post_id)
-            if not pending:
-                return hidden
-
-    for item in reversed(state.get("review_queue", [])):
-        item_post_id = item.get("post_id")
-        if item_post_id in pending:
-            pending.discard(item_post_id)
-            if bool(item.get("auto_hidden")):
-                hidden.add(item_post_id)
-            if not pending:
-                break
-
-    return hidden
+    store = _store(create=False)
+    if store is None:
+        return set()
+    with store.read() as tx:
+        return tx.hidden_post_ids(pending)
 
 
 def review_report(post_id: int, action: str, moderator_id: int | None = None):
     # Mission 31F: read-modify-write atômico via _mutate_state; o padrão
     # anterior podia perder atualização concorrente (novo report ou outra
     # revisão) entre a leitura e a gravação.
-    def mutator(state):
-        existing_item = next((item for item in state.get("review_queue", []) if item.get("post_id") == post_id), {})
-        queue = [item for item in state.get("review_queue", []) if item.get("post_id") != post_id]
-        reviewed = list(state.get("reviewed_reports", []))
-        reviewed.append(
-            {
-                "post_id": post_id,
-                "action": action,
-                "moderator_id": moderator_id,
-                "reviewed_at": int(time.time()),
-            }
-        )
-        state["review_queue"] = queue
-        state["reviewed_reports"] = reviewed[-5000:]
+    def mutator(tx):
+        existing_item = tx.pop_queue_item(post_id)
+        tx.record_review(post_id, action, moderator_id)
         if str(action).lower() in {"hide", "remove"}:
             target_user_id = existing_item.get("target_user_id")
             if target_user_id:
-                _adjust_score(state, int(target_user_id), SocialGuardian.REMOVED_POST_DELTA, removed=True)
+                _adjust_score(tx, int(target_user_id), SocialGuardian.REMOVED_POST_DELTA, removed=True)
             _append_audit(
-                state,
+                tx,
                 "post_removed",
                 actor_user_id=moderator_id,
                 target_user_id=target_user_id,
@@ -455,24 +371,31 @@ def review_report(post_id: int, action: str, moderator_id: int | None = None):
     return _mutate_state(mutator)
 
 
+def _public_score(record):
+    return {
+        **record,
+        "score": SocialGuardian.clamp_score(record.get("score")),
+        "label": SocialGuardian.trust_label(record.get("score")),
+    }
+
+
 def get_user_guardian_score(user_id):
     if not user_id:
         return {
             "score": SocialGuardian.TRUST_START,
             "label": SocialGuardian.trust_label(SocialGuardian.TRUST_START),
         }
-    state = _load_state()
-    record = _score_record(state, int(user_id))
-    return {
-        **record,
-        "score": SocialGuardian.clamp_score(record.get("score")),
-        "label": SocialGuardian.trust_label(record.get("score")),
-    }
+    store = _store(create=False)
+    stored = None
+    if store is not None:
+        with store.read() as tx:
+            stored = tx.score(int(user_id))
+    return _public_score(_score_record(stored, int(user_id)))
 
 
 def get_user_guardian_scores(user_ids):
-    # Missão 34: versão em lote de get_user_guardian_score. Carrega o estado
-    # UMA vez em vez de reler/parsear o arquivo por post (N+1 em get_posts).
+    # Missão 34: versão em lote de get_user_guardian_score. Uma consulta para
+    # todos os autores em vez de uma leitura por post (N+1 em get_posts).
     default_score = {
         "score": SocialGuardian.TRUST_START,
         "label": SocialGuardian.trust_label(SocialGuardian.TRUST_START),
@@ -486,36 +409,40 @@ def get_user_guardian_scores(user_ids):
             remaining.add(user_id)
 
     if remaining:
-        state = _load_state()
+        store = _store(create=False)
+        stored = {}
+        if store is not None:
+            with store.read() as tx:
+                stored = tx.scores(remaining)
         for user_id in remaining:
-            record = _score_record(state, int(user_id))
-            scores[user_id] = {
-                **record,
-                "score": SocialGuardian.clamp_score(record.get("score")),
-                "label": SocialGuardian.trust_label(record.get("score")),
-            }
+            scores[user_id] = _public_score(_score_record(stored.get(int(user_id)), int(user_id)))
 
     return scores
 
 
 def get_guardian_audit(limit: int = 100):
-    state = _load_state()
-    items = list(state.get("guardian_audit", []))
-    return items[-max(1, min(int(limit or 100), 500)) :]
+    store = _store(create=False)
+    if store is None:
+        return []
+    with store.read() as tx:
+        return tx.audit(max(1, min(int(limit or 100), 500)))
 
 
 def get_moderation_summary():
-    state = _load_state()
-    auto_hidden = sum(1 for item in state.get("review_queue", []) if item.get("auto_hidden"))
+    store = _store(create=False)
+    counts = {}
+    if store is not None:
+        with store.read() as tx:
+            counts = tx.summary_counts()
     return {
-        "reports_open": len(state.get("review_queue", [])),
-        "reports_total": len(state.get("reports", [])),
-        "auto_hidden_posts": auto_hidden,
-        "shadow_banned_users": len(state.get("shadow_banned", [])),
+        "reports_open": counts.get("reports_open", 0),
+        "reports_total": counts.get("reports_total", 0),
+        "auto_hidden_posts": counts.get("auto_hidden_posts", 0),
+        "shadow_banned_users": counts.get("shadow_banned_users", 0),
         "blocked_phrase_count": len(BLOCKED_PHRASES),
         "social_guardian": {
-            "audit_events": len(state.get("guardian_audit", [])),
-            "trusted_users": len(state.get("guardian_scores", {})),
+            "audit_events": counts.get("audit_events", 0),
+            "trusted_users": counts.get("trusted_users", 0),
             "blocked_categories": SocialGuardian.blocked_terms(),
             "report_reasons": SocialGuardian.REPORT_REASONS,
         },
@@ -0,0 +1,534 @@
+# =====================================================
+# MODERATION STORE
+# Indexed moderation tables and in-memory publish windows
+# =====================================================
+
+"""SQLite-backed moderation state.
+
+Moderation used to live in one JSON document (data/moderation_state.json).
+Every can_publish call took the interprocess file lock, then read, mutated
+and rewrote the whole file. The file also carried the report list and the
+Social Guardian audit list, capped at 20000 entries each. The feed read path
+(get_blocked_users, get_hidden_post_ids) parsed all of it on every request,
+so a publish or a feed read cost more as the audit log grew.
+
+The state now lives in indexed tables in an embedded SQLite file next to the
+legacy JSON (moderation_state.sqlite3):
+
+* moderation_relations: blocks and mutes, keyed by (kind, user_id, target);
+* moderation_reports, indexed by post; moderation_review_queue, one row per
+  reported post; moderation_reviews, the latest review of each post. These
+  three decide whether a post is hidden;
+* moderation_guardian_scores, one row per user;
+* moderation_audit, an append-only log. Rows beyond MODERATION_AUDIT_RETENTION
+  are removed by id range as new rows arrive;
+* moderation_shadow_banned;
+* moderation_post_rate, the persisted publish windows (see below).
+
+Every write is its own BEGIN IMMEDIATE transaction, which replaces the
+interprocess file lock. WAL lets the feed read alongside a writer. On first
+open, the legacy JSON is imported once and recorded in moderation_meta; the
+file is left in place as a backup.
+
+Publish rate limits are checked against PublishRateWindows: one deque of
+timestamps per user, in memory, so an allowed publish does no write.
+The windows are written to moderation_post_rate at most every
+MODERATION_RATE_PERSIST_SECONDS and at exit, and loaded when the store is
+first used. Each process counts its own publishes between those points.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.atomic_io import read_json_file
+
+logger = logging.getLogger("stocknewsbr.moderation_store")
+
+
+def _env_int(name: str, default: int, minimum: int) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+MODERATION_AUDIT_RETENTION = _env_int("MODERATION_AUDIT_RETENTION", 20000, 100)
+MODERATION_REPORT_RETENTION = _env_int("MODERATION_REPORT_RETENTION", 20000, 100)
+MODERATION_REVIEW_QUEUE_LIMIT = _env_int("MODERATION_REVIEW_QUEUE_LIMIT", 5000, 100)
+MODERATION_RATE_PERSIST_SECONDS = _env_int("MODERATION_RATE_PERSIST_SECONDS", 5, 0)
+
+# Untyped id columns keep the values' own types, as the JSON lists did.
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS moderation_relations (
+        kind TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        target NOT NULL,
+        created_at INTEGER NOT NULL,
+        PRIMARY KEY (kind, user_id, target)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS moderation_reports (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL,
+        user_id,
+        post_id,
+        reason TEXT,
+        reason_label TEXT,
+        note TEXT,
+        target_user_id,
+        created_at INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_moderation_reports_post ON moderation_reports (post_id)",
+    """
+    CREATE TABLE IF NOT EXISTS moderation_review_queue (
+        post_id PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        reports INTEGER NOT NULL DEFAULT 0,
+        auto_hidden INTEGER NOT NULL DEFAULT 0,
+        last_reason TEXT,
+        last_reason_label TEXT,
+        target_user_id,
+        updated_at INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_moderation_review_queue_seq ON moderation_review_queue (seq)",
+    """
+    CREATE TABLE IF NOT EXISTS moderation_reviews (
+        post_id PRIMARY KEY,
+        action TEXT,
+        moderator_id,
+        reviewed_at INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS moderation_guardian_scores (
+        user_id INTEGER PRIMARY KEY,
+        record TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS moderation_audit (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        action TEXT,
+        actor_user_id,
+        target_user_id,
+        post_id,
+        content_type TEXT,
+        reason TEXT,
+        details TEXT,
+        timestamp INTEGER
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS moderation_shadow_banned (user_id PRIMARY KEY)",
+    """
+    CREATE TABLE IF NOT EXISTS moderation_post_rate (
+        user_id TEXT PRIMARY KEY,
+        timestamps TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS moderation_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+)
+
+_QUEUE_COLUMNS = ("post_id", "reports", "auto_hidden", "last_reason", "last_reason_label", "target_user_id", "updated_at")
+_AUDIT_COLUMNS = ("action", "actor_user_id", "target_user_id", "post_id", "content_type", "reason", "details", "timestamp")
+
+
+def _queue_item(row) -> dict:
+    item = dict(zip(_QUEUE_COLUMNS, row))
+    item["auto_hidden"] = bool(item["auto_hidden"])
+    return item
+
+
+def _audit_item(row) -> dict:
+    item = dict(zip(_AUDIT_COLUMNS, row))
+    item["details"] = json.loads(item["details"] or "{}")
+    return item
+
+
+class ModerationTransaction:
+    """Table operations on one open connection (one transaction when writing)."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def add_relation(self, kind: str, user_id, target) -> None:
+        self.connection.execute(
+            "INSERT OR IGNORE INTO moderation_relations (kind, user_id, target, created_at) VALUES (?, ?, ?, ?)",
+            (kind, str(user_id), target, int(time.time())),
+        )
+
+    def related(self, kind: str, user_id) -> set:
+        rows = self.connection.execute(
+            "SELECT target FROM moderation_relations WHERE kind = ? AND user_id = ?", (kind, str(user_id))
+        )
+        return {row[0] for row in rows}
+
+    def is_shadow_banned(self, user_id) -> bool:
+        return bool(
+            self.connection.execute("SELECT 1 FROM moderation_shadow_banned WHERE user_id = ?", (user_id,)).fetchone()
+        )
+
+    def append_audit(self, entry: Dict[str, Any]) -> None:
+        cursor = self.connection.execute(
+            f"INSERT INTO moderation_audit ({', '.join(_AUDIT_COLUMNS)}) VALUES ({', '.join('?' * len(_AUDIT_COLUMNS))})",
+            tuple(
+                json.dumps(entry.get("details") or {}, ensure_ascii=True, default=str) if column == "details" else entry.get(column)
+                for column in _AUDIT_COLUMNS
+            ),
+        )
+        # Retention is a range delete on the rowid: at most a row or two per append.
+        self.connection.execute(
+            "DELETE FROM moderation_audit WHERE id <= ?", (cursor.lastrowid - MODERATION_AUDIT_RETENTION,)
+        )
+
+    def audit(self, limit: int) -> List[dict]:
+        rows = self.connection.execute(
+            f"SELECT {', '.join(_AUDIT_COLUMNS)} FROM moderation_audit ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [_audit_item(row) for row in reversed(rows)]
+
+    def score(self, user_id: int) -> Optional[dict]:
+        row = self.connection.execute(
+            "SELECT record FROM moderation_guardian_scores WHERE user_id = ?", (int(user_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def scores(self, user_ids: Iterable[int]) -> Dict[int, dict]:
+        ids = sorted({int(user_id) for user_id in user_ids})
+        found: Dict[int, dict] = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT user_id, record FROM moderation_guardian_scores WHERE user_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((int(user_id), json.loads(record)) for user_id, record in rows)
+        return found
+
+    def save_score(self, user_id: int, record: dict) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO moderation_guardian_scores (user_id, record) VALUES (?, ?)",
+            (int(user_id), json.dumps(record, ensure_ascii=True, default=str)),
+        )
+
+    def add_report(self, item: Dict[str, Any]) -> int:
+        """Store a report and return how many retained reports the post has."""
+        cursor = self.connection.execute(
+            "INSERT INTO moderation_reports (id, user_id, post_id, reason, reason_label, note, target_user_id, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                item["id"], item.get("user"), item.get("post"), item.get("reason"), item.get("reason_label"),
+                item.get("note"), item.get("target_user_id"), item.get("created_at"),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM moderation_reports WHERE seq <= ?", (cursor.lastrowid - MODERATION_REPORT_RETENTION,)
+        )
+        return int(
+            self.connection.execute("SELECT COUNT(*) FROM moderation_reports WHERE post_id = ?", (item.get("post"),)).fetchone()[0]
+        )
+
+    def put_queue_item(self, item: Dict[str, Any]) -> None:
+        """Insert or move the post's review item to the end of the queue."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO moderation_review_queue (seq, post_id, reports, auto_hidden, last_reason,"
+            " last_reason_label, target_user_id, updated_at)"
+            " VALUES ((SELECT COALESCE(MAX(seq), 0) + 1 FROM moderation_review_queue), ?, ?, ?, ?, ?, ?, ?)",
+            (
+                item.get("post_id"), int(item.get("reports") or 0), 1 if item.get("auto_hidden") else 0,
+                item.get("last_reason"), item.get("last_reason_label"), item.get("target_user_id"), item.get("updated_at"),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM moderation_review_queue WHERE seq <= (SELECT MAX(seq) FROM moderation_review_queue) - ?",
+            (MODERATION_REVIEW_QUEUE_LIMIT,),
+        )
+
+    def pop_queue_item(self, post_id) -> dict:
+        row = self.connection.execute(
+            f"SELECT {', '.join(_QUEUE_COLUMNS)} FROM moderation_review_queue WHERE post_id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return {}
+        self.connection.execute("DELETE FROM moderation_review_queue WHERE post_id = ?", (post_id,))
+        return _queue_item(row)
+
+    def review_queue(self, limit: int) -> List[dict]:
+        rows = self.connection.execute(
+            f"SELECT {', '.join(_QUEUE_COLUMNS)} FROM moderation_review_queue ORDER BY seq DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [_queue_item(row) for row in reversed(rows)]
+
+    def record_review(self, post_id, action, moderator_id) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO moderation_reviews (post_id, action, moderator_id, reviewed_at) VALUES (?, ?, ?, ?)",
+            (post_id, action, moderator_id, int(time.time())),
+        )
+
+    def hidden_post_ids(self, post_ids: Iterable) -> set:
+        """The latest review decides a post; without one, the queue's auto-hide flag does."""
+        ids = list({post_id for post_id in post_ids if post_id is not None})
+        hidden = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            reviewed = dict(
+                self.connection.execute(
+                    f"SELECT post_id, action FROM moderation_reviews WHERE post_id IN ({placeholders})", chunk
+                ).fetchall()
+            )
+            hidden.update(post_id for post_id, action in reviewed.items() if action in {"hide", "remove"})
+            rows = self.connection.execute(
+                f"SELECT post_id FROM moderation_review_queue WHERE auto_hidden = 1 AND post_id IN ({placeholders})", chunk
+            )
+            hidden.update(post_id for (post_id,) in rows if post_id not in reviewed)
+        return hidden
+
+    def summary_counts(self) -> Dict[str, int]:
+        def count(sql: str) -> int:
+            return int(self.connection.execute(sql).fetchone()[0])
+
+        return {
+            "reports_open": count("SELECT COUNT(*) FROM moderation_review_queue"),
+            "reports_total": count("SELECT COUNT(*) FROM moderation_reports"),
+            "auto_hidden_posts": count("SELECT COUNT(*) FROM moderation_review_queue WHERE auto_hidden = 1"),
+            "shadow_banned_users": count("SELECT COUNT(*) FROM moderation_shadow_banned"),
+            "audit_events": count("SELECT COUNT(*) FROM moderation_audit"),
+            "trusted_users": count("SELECT COUNT(*) FROM moderation_guardian_scores"),
+        }
+
+
+class PublishRateWindows:
+    """Sliding publish windows per user, kept in memory and persisted periodically."""
+
+    def __init__(self, store: "ModerationStore", persist_seconds: float = MODERATION_RATE_PERSIST_SECONDS):
+        self.store = store
+        self.persist_seconds = persist_seconds
+        self._lock = threading.Lock()
+        self._windows: Dict[str, deque] = {}
+        self._dirty: set = set()
+        self._loaded = False
+        self._next_flush = 0.0
+        self._next_sweep = 0.0
+
+    def allow(self, user_id, now: int, window_seconds: int, limit: int) -> bool:
+        """Count a publish for user_id unless `limit` already happened in the last window_seconds."""
+        key = str(user_id)
+        with self._lock:
+            if not self._loaded:
+                self._windows.update(self.store.load_post_rate())
+                self._loaded = True
+            window = self._windows.setdefault(key, deque())
+            while window and now - window[0] > window_seconds:
+                window.popleft()
+            allowed = len(window) < limit
+            if allowed:
+                window.append(now)
+                self._dirty.add(key)
+            if not window:
+                del self._windows[key]
+            if time.monotonic() >= self._next_sweep:
+                self._evict_expired(now, window_seconds)
+            due = time.monotonic() >= self._next_flush
+        if due:
+            self.flush()
+        return allowed
+
+    def _evict_expired(self, now: int, window_seconds: int) -> None:
+        # Users whose newest publish left the window no longer count; drop them
+        # from memory and from the file. Runs at the persist cadence, under _lock.
+        expired = [key for key, window in self._windows.items() if not window or now - window[-1] > window_seconds]
+        for key in expired:
+            del self._windows[key]
+        self._dirty.update(expired)
+        self._next_sweep = time.monotonic() + self.persist_seconds
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            changed = {key: list(self._windows.get(key, ())) for key in self._dirty}
+            self._dirty.clear()
+            self._next_flush = time.monotonic() + self.persist_seconds
+        try:
+            self.store.save_post_rate(changed)
+        except Exception:
+            logger.exception("publish rate windows could not be persisted")
+            with self._lock:
+                self._dirty.update(changed)
+
+
+class ModerationStore:
+    """Moderation tables in one SQLite file, shared by the API processes."""
+
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        finally:
+            connection.close()
+        if legacy_json is not None:
+            self.import_legacy_json(legacy_json)
+        self.publish_windows = PublishRateWindows(self)
+
+    @contextmanager
+    def _connect(self, write: bool = True):
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if not write:
+                yield connection
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @contextmanager
+    def write(self):
+        with self._connect() as connection:
+            yield ModerationTransaction(connection)
+
+    @contextmanager
+    def read(self):
+        with self._connect(write=False) as connection:
+            yield ModerationTransaction(connection)
+
+    def load_post_rate(self) -> Dict[str, deque]:
+        with self._connect(write=False) as connection:
+            rows = connection.execute("SELECT user_id, timestamps FROM moderation_post_rate").fetchall()
+        return {user_id: deque(json.loads(timestamps)) for user_id, timestamps in rows}
+
+    def save_post_rate(self, windows: Dict[str, List[int]]) -> None:
+        with self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM moderation_post_rate WHERE user_id = ?",
+                [(key,) for key, timestamps in windows.items() if not timestamps],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO moderation_post_rate (user_id, timestamps) VALUES (?, ?)",
+                [(key, json.dumps(timestamps)) for key, timestamps in windows.items() if timestamps],
+            )
+
+    def import_legacy_json(self, path: Path) -> int:
+        """Import a moderation_state.json document once; returns the rows imported."""
+        path = Path(path)
+        marker = f"legacy_json:{path.resolve()}"
+        with self._connect() as connection:
+            if connection.execute("SELECT 1 FROM moderation_meta WHERE key = ?", (marker,)).fetchone():
+                return 0
+            if not path.exists():
+                return 0
+            try:
+                state = read_json_file(path, dict)
+            except Exception:
+                logger.warning("moderation JSON %s is unreadable; nothing imported", path)
+                return 0
+            state = state if isinstance(state, dict) else {}
+            tx = ModerationTransaction(connection)
+            imported = 0
+
+            for kind in ("blocked", "muted"):
+                for user_id, targets in dict(state.get(kind) or {}).items():
+                    for target in targets or []:
+                        tx.add_relation(kind, user_id, target)
+                        imported += 1
+
+            for position, item in enumerate(state.get("reports") or []):
+                if isinstance(item, dict):
+                    tx.add_report({"id": item.get("id") or f"legacy-{position}", **item})
+                    imported += 1
+
+            # Later entries win, as the reversed scans of the lists did.
+            for item in state.get("review_queue") or []:
+                if isinstance(item, dict):
+                    tx.put_queue_item(item)
+                    imported += 1
+            for item in state.get("reviewed_reports") or []:
+                if isinstance(item, dict):
+                    connection.execute(
+                        "INSERT OR REPLACE INTO moderation_reviews (post_id, action, moderator_id, reviewed_at) VALUES (?, ?, ?, ?)",
+                        (item.get("post_id"), item.get("action"), item.get("moderator_id"), item.get("reviewed_at")),
+                    )
+                    imported += 1
+
+            for user_id, record in dict(state.get("guardian_scores") or {}).items():
+                try:
+                    tx.save_score(int(user_id), dict(record or {}))
+                    imported += 1
+                except (TypeError, ValueError):
+                    continue
+
+            for entry in state.get("guardian_audit") or []:
+                if isinstance(entry, dict):
+                    tx.append_audit(entry)
+                    imported += 1
+
+            connection.executemany(
+                "INSERT OR IGNORE INTO moderation_shadow_banned (user_id) VALUES (?)",
+                [(user_id,) for user_id in state.get("shadow_banned") or []],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO moderation_post_rate (user_id, timestamps) VALUES (?, ?)",
+                [
+                    (str(user_id), json.dumps([int(ts) for ts in timestamps]))
+                    for user_id, timestamps in dict(state.get("post_rate") or {}).items()
+                    if timestamps
+                ],
+            )
+            connection.execute("INSERT INTO moderation_meta (key, value) VALUES (?, ?)", (marker, str(int(time.time()))))
+        if imported:
+            logger.info("imported %d moderation rows from %s", imported, path)
+        return imported
+
+
+_stores: Dict[Path, ModerationStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_moderation_store(path: Path, legacy_json: Optional[Path] = None) -> ModerationStore:
+    """The process-wide store for path; the legacy JSON is imported when it is first opened."""
+    key = Path(path).resolve()
+    store = _stores.get(key)
+    if store is None or not key.exists():
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None or not key.exists():
+                store = ModerationStore(key, legacy_json=legacy_json)
+                _stores[key] = store
+    return store
+
+
+@atexit.register
+def flush_publish_windows() -> None:
+    for store in list(_stores.values()):
+        if store.path.exists():
+            store.publish_windows.flush()
@@ -0,0 +1,377 @@
+# =====================================================
+# MARKET DELTA STREAM
+# =====================================================
+
+"""Snapshot deltas pushed to /ws/market subscribers.
+
+/ws/market accepted sockets but nothing ever broadcast on them, so every client
+polled /market/snapshot and the bundle endpoint instead. The hub below follows the
+snapshot publications:
+
+* SnapshotCache.update() wakes it through a publish listener. A slow poll of
+  generation() also catches snapshots another process wrote to disk.
+* On a new generation it diffs `by_ticker` against the previous generation, row by
+  row and field by field. It does the same for the other top-level sections
+  ("topics": stats, go_live, ai_tools, ...). Both generations are frozen, so this
+  copies nothing.
+* Every changed row and topic is JSON-encoded once. A frame is assembled from those
+  fragments once per distinct subscription and the same text goes to every socket
+  holding that subscription.
+
+Client protocol (text frames, JSON):
+
+    {"action": "subscribe", "symbols": ["PETR4", "VALE3"], "topics": ["stats"]}
+    {"action": "unsubscribe", "symbols": ["VALE3"]}
+
+"*" as a symbol or topic means all of them. A subscribe is answered with a
+`market_sync` frame that carries the current rows/topics that were just added and
+the generation they belong to. After that the client receives `market_delta` frames
+holding only changed fields (a field that disappeared is sent as null) plus the
+symbols that left the snapshot. Frames go through the socket's bounded send queue
+(websocket_outbox), which may drop one under pressure. A client that sees a
+`previous_generation` other than the last generation it applied re-subscribes to
+resync. Anything that is not a JSON action (e.g. "ping") is ignored as a keep-alive,
+as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.cache.snapshot_cache import SnapshotCache, snapshot_cache
+from app.cache.snapshot_projection import encode_json
+from app.services.symbol_registry import canonical_symbol
+from app.system.system_metrics import record_worker_stage_duration
+from app.system.websocket_manager import manager
+
+logger = logging.getLogger("stocknewsbr.market_stream")
+
+MARKET_STREAM_POLL_SECONDS = max(0.25, float(os.getenv("MARKET_STREAM_POLL_SECONDS", "2") or 2))
+MARKET_STREAM_MAX_SYMBOLS = max(1, int(os.getenv("MARKET_STREAM_MAX_SYMBOLS", "200") or 200))
+
+ALL = "*"
+# Row collections travel per symbol; every other top-level key is a topic.
+_ROW_SECTIONS = frozenset({"signals", "by_ticker", "leaders"})
+# Restamped on every row at each publish; a row where only these moved has not changed.
+_PROVENANCE_FIELDS = frozenset({"source_snapshot_id"})
+_ENVELOPE_PROVENANCE_FIELDS = frozenset({"source_snapshot_id", "timestamp"})
+
+
+def _fragment(key: str, value: Any) -> bytes:
+    return encode_json(key) + b":" + encode_json(value)
+
+
+def _normalize_symbol(value: Any) -> str:
+    text = str(value or "").strip().upper()
+    if not text or text == ALL:
+        return text
+    return canonical_symbol(text) or text
+
+
+def _is_provenance_only(key: str, previous: Any, value: Any) -> bool:
+    if key in _PROVENANCE_FIELDS:
+        return True
+    if key != "decision_envelope" or not isinstance(previous, dict) or not isinstance(value, dict):
+        return False
+    strip = _ENVELOPE_PROVENANCE_FIELDS
+    return {k: v for k, v in previous.items() if k not in strip} == {k: v for k, v in value.items() if k not in strip}
+
+
+def _row_changes(previous: Any, row: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(row, dict):
+        return None
+    if not isinstance(previous, dict):
+        return dict(row)
+    changes = {key: value for key, value in row.items() if key not in previous or previous[key] != value}
+    changes.update({key: None for key in previous if key not in row})
+    if all(_is_provenance_only(key, previous.get(key), value) for key, value in changes.items()):
+        return None
+    return changes
+
+
+class Subscription:
+    """Symbols and topics one socket asked for."""
+
+    __slots__ = ("symbols", "topics")
+
+    def __init__(self):
+        self.symbols: set[str] = set()
+        self.topics: set[str] = set()
+
+    def signature(self) -> Tuple[frozenset, frozenset]:
+        return frozenset(self.symbols), frozenset(self.topics)
+
+
+class MarketDelta:
+    """Changes between two generations, each row/topic encoded exactly once."""
+
+    __slots__ = ("generation", "previous_generation", "symbols", "removed", "topics", "_frames")
+
+    def __init__(
+        self,
+        generation: int,
+        previous_generation: int,
+        symbols: Dict[str, bytes],
+        removed: List[str],
+        topics: Dict[str, bytes],
+    ):
+        self.generation = generation
+        self.previous_generation = previous_generation
+        self.symbols = symbols
+        self.removed = removed
+        self.topics = topics
+        self._frames: Dict[Tuple[frozenset, frozenset], Optional[str]] = {}
+
+    def is_empty(self) -> bool:
+        return not (self.symbols or self.removed or self.topics)
+
+    def frame(self, subscription: Subscription) -> Optional[str]:
+        """Encoded frame for `subscription`, or None when nothing it follows changed."""
+        signature = subscription.signature()
+        if signature in self._frames:
+            return self._frames[signature]
+        symbols, topics = signature
+        if ALL in symbols:
+            rows, removed = list(self.symbols.values()), self.removed
+        else:
+            rows = [self.symbols[symbol] for symbol in symbols if symbol in self.symbols]
+            removed = [symbol for symbol in self.removed if symbol in symbols]
+        if ALL in topics:
+            sections = list(self.topics.values())
+        else:
+            sections = [self.topics[topic] for topic in topics if topic in self.topics]
+        frame = None
+        if rows or removed or sections:
+            frame = (
+                b'{"type":"market_delta","generation":%d,"previous_generation":%d,"symbols":{'
+                % (self.generation, self.previous_generation)
+                + b",".join(rows)
+                + b'},"removed":'
+                + encode_json(removed)
+                + b',"topics":{'
+                + b",".join(sections)
+                + b"}}"
+            ).decode("utf-8")
+        self._frames[signature] = frame
+        return frame
+
+
+def build_market_delta(
+    previous_generation: int,
+    previous: Dict[str, Any],
+    generation: int,
+    current: Dict[str, Any],
+) -> MarketDelta:
+    previous_rows = previous.get("by_ticker") if isinstance(previous.get("by_ticker"), dict) else {}
+    rows = current.get("by_ticker") if isinstance(current.get("by_ticker"), dict) else {}
+
+    symbols: Dict[str, bytes] = {}
+    for ticker, row in rows.items():
+        previous_row = previous_rows.get(ticker)
+        if previous_row is row:
+            continue
+        changes = _row_changes(previous_row, row)
+        if changes:
+            symbols[ticker] = _fragment(ticker, changes)
+    removed = sorted(ticker for ticker in previous_rows if ticker not in rows)
+
+    topics: Dict[str, bytes] = {}
+    for key, value in current.items():
+        if key in _ROW_SECTIONS:
+            continue
+        if key not in previous or previous[key] != value:
+            topics[key] = _fragment(key, value)
+    for key in previous:
+        if key not in current and key not in _ROW_SECTIONS:
+            topics[key] = _fragment(key, None)
+    return MarketDelta(generation, previous_generation, symbols, removed, topics)
+
+
+def build_sync_frame(
+    generation: int,
+    payload: Dict[str, Any],
+    symbols: Iterable[str],
+    topics: Iterable[str],
+    row_fragments: Dict[str, bytes],
+) -> str:
+    """Current rows/topics for a fresh subscription; row fragments are shared per generation."""
+    rows = payload.get("by_ticker") if isinstance(payload.get("by_ticker"), dict) else {}
+    symbols = list(rows) if ALL in symbols else [symbol for symbol in symbols if symbol in rows]
+    parts = []
+    for symbol in symbols:
+        fragment = row_fragments.get(symbol)
+        if fragment is None:
+            fragment = row_fragments[symbol] = _fragment(symbol, rows[symbol])
+        parts.append(fragment)
+    if ALL in topics:
+        topic_keys = [key for key in payload if key not in _ROW_SECTIONS]
+    else:
+        topic_keys = [key for key in topics if key in payload and key not in _ROW_SECTIONS]
+    return (
+        b'{"type":"market_sync","generation":%d,"symbols":{' % generation
+        + b",".join(parts)
+        + b'},"topics":{'
+        + b",".join(_fragment(key, payload[key]) for key in topic_keys)
+        + b"}}"
+    ).decode("utf-8")
+
+
+class MarketStreamHub:
+    """Tracks subscriptions and turns each snapshot generation into delta frames."""
+
+    def __init__(
+        self,
+        cache: Optional[SnapshotCache] = None,
+        send: Optional[Callable[[Any, str], Awaitable[Any]]] = None,
+    ):
+        self._cache = cache or snapshot_cache
+        self._send = send
+        self._subscriptions: Dict[Any, Subscription] = {}
+        self._generation: Optional[int] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._row_fragments: Dict[str, bytes] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --------------------------------------------------
+    # LIFECYCLE
+    # --------------------------------------------------
+
+    def ensure_running(self) -> None:
+        """Start the publication loop on the running event loop (idempotent)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._cache.add_publish_listener(self._on_publish)
+        self._task = loop.create_task(self._run(), name="stocknewsbr-market-stream")
+
+    def _on_publish(self, generation: int) -> None:
+        # Called on the publishing (worker) thread: only hand the wakeup to the loop.
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # The loop that started the hub is gone; the next connection restarts it.
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=MARKET_STREAM_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.publish_pending()
+            except Exception as exc:
+                logger.warning("Market stream publication failed: %s", exc)
+
+    # --------------------------------------------------
+    # SUBSCRIPTIONS
+    # --------------------------------------------------
+
+    async def subscribe(self, websocket: Any, symbols: Iterable[Any] = (), topics: Iterable[Any] = ()) -> str:
+        subscription = self._subscriptions.setdefault(websocket, Subscription())
+        added_symbols = []
+        for symbol in (_normalize_symbol(value) for value in symbols):
+            if not symbol or symbol in subscription.symbols:
+                continue
+            if len(subscription.symbols) >= MARKET_STREAM_MAX_SYMBOLS:
+                break
+            subscription.symbols.add(symbol)
+            added_symbols.append(symbol)
+        added_topics = [str(topic) for topic in topics if str(topic or "") and str(topic) not in subscription.topics]
+        subscription.topics.update(added_topics)
+
+        if self._payload is None:
+            self._generation, self._payload = await asyncio.to_thread(self._cache.published)
+        return await asyncio.to_thread(
+            build_sync_frame, self._generation, self._payload, added_symbols, added_topics, self._row_fragments
+        )
+
+    def unsubscribe(self, websocket: Any, symbols: Iterable[Any] = (), topics: Iterable[Any] = ()) -> None:
+        subscription = self._subscriptions.get(websocket)
+        if subscription is None:
+            return
+        subscription.symbols.difference_update(_normalize_symbol(value) for value in symbols)
+        subscription.topics.difference_update(str(topic) for topic in topics)
+
+    def remove(self, websocket: Any) -> None:
+        self._subscriptions.pop(websocket, None)
+
+    async def handle_message(self, websocket: Any, text: str) -> Optional[str]:
+        """Apply one client message; returns the reply frame, if any."""
+        try:
+            message = json.loads(text)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(message, dict) or "action" not in message:
+            return None
+        action = str(message.get("action") or "").lower()
+        symbols = message.get("symbols") if isinstance(message.get("symbols"), list) else []
+        topics = message.get("topics") if isinstance(message.get("topics"), list) else []
+        if action == "subscribe":
+            return await self.subscribe(websocket, symbols, topics)
+        if action == "unsubscribe":
+            self.unsubscribe(websocket, symbols, topics)
+            subscription = self._subscriptions.get(websocket) or Subscription()
+            return json.dumps(
+                {"type": "market_subscription", "symbols": sorted(subscription.symbols), "topics": sorted(subscription.topics)},
+                separators=(",", ":"),
+            )
+        return json.dumps({"type": "error", "reason": "unknown_action"}, separators=(",", ":"))
+
+    # --------------------------------------------------
+    # PUBLICATION
+    # --------------------------------------------------
+
+    async def publish_pending(self) -> int:
+        """Diff the newest generation against the last one seen; returns frames sent."""
+        generation, payload = await asyncio.to_thread(self._cache.published)
+        if generation == self._generation:
+            return 0
+        previous_generation, previous = self._generation, self._payload
+        # Move the base first so a subscribe that lands meanwhile syncs to the new one.
+        self._generation, self._payload, self._row_fragments = generation, payload, {}
+        if previous is None or not self._subscriptions:
+            return 0
+
+        start = time.perf_counter()
+        delta = await asyncio.to_thread(build_market_delta, previous_generation, previous, generation, payload)
+        record_worker_stage_duration("market_stream_delta", time.perf_counter() - start)
+        if delta.is_empty():
+            return 0
+
+        send = self._send or manager.send_encoded
+        sends = []
+        for websocket, subscription in list(self._subscriptions.items()):
+            frame = delta.frame(subscription)
+            if frame is not None:
+                sends.append(send(websocket, frame))
+        if sends:
+            await asyncio.gather(*sends, return_exceptions=True)
+        return len(sends)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "generation": self._generation,
+            "running": bool(self._task is not None and not self._task.done()),
+        }
+
+
+# =====================================================
+# GLOBAL INSTANCE
+# =====================================================
+
+market_stream = MarketStreamHub()
@@ -7,12 +7,13 @@ from pathlib import Path
 
 from app.database import SessionLocal
 from app.models import User
-from app.services.push_service import get_push_token_store, send_push_notification
+from app.services.push_service import resolve_push_audience
 from app.services.score_display import attach_master_score_display_contract
 from app.services.snapshot_contract import is_actionable_snapshot_row, resolve_decision_envelope
 from app.services.symbol_registry import canonical_symbol
 from app.system.kill_switches import alert_channel_block_reason, symbol_block_reason
 from app.system.observability_engine import record_observability_event
+from app.system.push_outbox import enqueue_push_notification
 
 
 PUSH_DISPATCH_STATE_PATH = Path("data/push_dispatch_state.json")
@@ -186,6 +187,15 @@ def _eligible_signals(signals):
 
 
 def dispatch_signal_pushes(signals):
+    """Queue one push per eligible signal for every active app user's tokens.
+
+    The audience (active tokens of active users with app access who have not
+    turned push alerts off) is resolved once per cycle by one indexed query
+    in the push token registry. Delivery happens in the push outbox
+    (app.system.push_outbox): multicast batches, retries and invalid-token
+    pruning no longer run on the worker. A signal enters its cooldown once it
+    is queued.
+    """
     # Mission 32: kill switch operacional bloqueia o canal inteiro de forma
     # auditável antes de qualquer acesso a tokens ou estado.
     kill_reason = alert_channel_block_reason("push")
@@ -197,41 +207,27 @@ def dispatch_signal_pushes(signals):
             source="push_dispatcher",
             details={"reason": kill_reason, "signals": len(signals or [])},
         )
-        return {"sent": 0, "signals": 0, "blocked_by": kill_reason}
+        return {"queued": 0, "signals": 0, "blocked_by": kill_reason}
 
     candidates = _eligible_signals(signals)
 
     if not candidates:
-        return {"sent": 0, "signals": 0}
+        return {"queued": 0, "signals": 0}
 
     now = int(time.time())
     state = _load_state()
-    token_store = get_push_token_store()
-    token_user_ids = []
-
-    for key, tokens in token_store.items():
-        if not tokens:
-            continue
-        try:
-            token_user_ids.append(int(key))
-        except Exception:
-            continue
-
-    token_user_ids = sorted(set(token_user_ids))
-
-    if not token_user_ids:
-        return {"sent": 0, "signals": len(candidates)}
-
-    dispatched = 0
+    queued = 0
     db = SessionLocal()
 
     try:
-        users = (
-            db.query(User)
-            .filter(User.is_active == True, User.access_app == True)  # noqa: E712
-            .filter(User.id.in_(token_user_ids))
-            .all()
-        )
+        entitled_user_ids = [
+            row.id
+            for row in db.query(User.id).filter(User.is_active == True, User.access_app == True).all()  # noqa: E712
+        ]
+        recipients = resolve_push_audience(entitled_user_ids)
+
+        if not recipients:
+            return {"queued": 0, "signals": len(candidates)}
 
         for signal in candidates:
             ticker = canonical_symbol(signal.get("canonical_symbol") or signal.get("ticker") or signal.get("symbol"))
@@ -269,61 +265,53 @@ def dispatch_signal_pushes(signals):
             raw_master_score, raw_master_score_scale = _raw_master_score_payload(signal, display_contract)
             body = f"Score Mestre {display_score} | {signal.get('master_direction') or signal.get('trend') or 'n/a'}"
 
-            signal_sent = 0
-
-            for user in users:
-                tokens = token_store.get(str(user.id), [])
-                if not tokens:
-                    continue
-
-                result = send_push_notification(
-                    user_id=user.id,
-                    title=title,
-                    body=body,
-                    data={
-                        "ticker": ticker,
-                        "canonical_symbol": ticker,
-                        "score": str(display_score),
-                        "master_score": str(display_contract.get("master_score", "")),
-                        "master_score_raw": str(raw_master_score if raw_master_score not in (None, "") else ""),
-                        "master_score_raw_source_scale": str(raw_master_score_scale if raw_master_score_scale else ""),
-                        "master_score_source_scale": str(display_contract.get("master_score_source_scale", "")),
-                        "master_direction": str(signal.get("master_direction", "")),
-                        "master_conviction": str(signal.get("master_conviction", "")),
-                        "master_confidence": str(signal.get("master_confidence", "")),
-                        "master_risk": str(signal.get("master_risk", "")),
-                        "master_status": str(signal.get("master_status", "")),
-                        "master_summary": str(signal.get("master_summary", "")),
-                        "trend": str(signal.get("trend", "")),
-                        "price": str(signal.get("price", "")),
-                        "volume": str(signal.get("volume", "")),
-                        "data_quality": str(signal.get("data_quality", "")),
-                        "decision_status": str(decision_envelope.get("decision_status", "")),
-                        "decision_envelope": json.dumps(decision_envelope, ensure_ascii=True, default=str),
-                        "decision_state": str(signal.get("decision_state", "")),
-                        "trade_action": str(signal.get("trade_action") or signal.get("signal") or ""),
-                        "audit_status": str(signal.get("audit_status", "")),
-                        "audit_score": str(signal.get("audit_score", "")),
-                        "blocked_by_auditor": str(bool(signal.get("blocked_by_auditor") is True)).lower(),
-                        "market_data_updated_at": str(signal.get("market_data_updated_at", "")),
-                        "snapshot_id": str(signal.get("snapshot_id", "")),
-                    },
-                    tokens=tokens,
-                )
-                signal_sent += int(result.get("sent", 0) or 0)
-
-            if signal_sent > 0:
+            result = enqueue_push_notification(
+                title=title,
+                body=body,
+                data={
+                    "ticker": ticker,
+                    "canonical_symbol": ticker,
+                    "score": str(display_score),
+                    "master_score": str(display_contract.get("master_score", "")),
+                    "master_score_raw": str(raw_master_score if raw_master_score not in (None, "") else ""),
+                    "master_score_raw_source_scale": str(raw_master_score_scale if raw_master_score_scale else ""),
+                    "master_score_source_scale": str(display_contract.get("master_score_source_scale", "")),
+                    "master_direction": str(signal.get("master_direction", "")),
+                    "master_conviction": str(signal.get("master_conviction", "")),
+                    "master_confidence": str(signal.get("master_confidence", "")),
+                    "master_risk": str(signal.get("master_risk", "")),
+                    "master_status": str(signal.get("master_status", "")),
+                    "master_summary": str(signal.get("master_summary", "")),
+                    "trend": str(signal.get("trend", "")),
+                    "price": str(signal.get("price", "")),
+                    "volume": str(signal.get("volume", "")),
+                    "data_quality": str(signal.get("data_quality", "")),
+                    "decision_status": str(decision_envelope.get("decision_status", "")),
+                    "decision_envelope": json.dumps(decision_envelope, ensure_ascii=True, default=str),
+                    "decision_state": str(signal.get("decision_state", "")),
+                    "trade_action": str(signal.get("trade_action") or signal.get("signal") or ""),
+                    "audit_status": str(signal.get("audit_status", "")),
+                    "audit_score": str(signal.get("audit_score", "")),
+                    "blocked_by_auditor": str(bool(signal.get("blocked_by_auditor") is True)).lower(),
+                    "market_data_updated_at": str(signal.get("market_data_updated_at", "")),
+                    "snapshot_id": str(signal.get("snapshot_id", "")),
+                },
+                recipients=recipients,
+            )
+            signal_queued = int(result.get("queued", 0) or 0)
+
+            if signal_queued > 0:
                 state[ticker] = now
-                dispatched += signal_sent
+                queued += signal_queued
                 record_observability_event(
                     "push",
-                    "push_signal_dispatched",
+                    "push_signal_queued",
                     severity="info",
                     source="push_dispatcher",
-                    details={"ticker": ticker, "sent": signal_sent},
+                    details={"ticker": ticker, "queued": signal_queued},
                 )
 
         _save_state(state)
-        return {"sent": dispatched, "signals": len(candidates)}
+        return {"queued": queued, "signals": len(candidates)}
     finally:
         db.close()
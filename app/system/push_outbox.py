@@ -0,0 +1,458 @@
+# =====================================================
+# PUSH OUTBOX
+# Durable push queue drained by a pool of multicast senders
+# =====================================================
+
+"""Asynchronous, batched push fan-out.
+
+dispatch_signal_pushes used to call send_push_notification once per user,
+and send_push_notification sent one messaging.send() per token, serially.
+Each invalid token re-read and rewrote data/push_tokens.json. Fanning one
+signal out to a few thousand devices took minutes of serial HTTP calls, and
+a transient provider error lost the alert until the next cycle.
+
+The dispatcher now only enqueues. enqueue_push_notification() writes one
+message and one delivery row per (user, token) to a local SQLite outbox
+(PUSH_OUTBOX_FILE), in one transaction, and returns. A PushDispatcher pool of
+PUSH_DISPATCH_WORKERS threads drains the outbox:
+
+* a worker claims up to transport.max_batch_size (500, the FCM multicast
+  limit) due deliveries of one message. It claims them by pushing their
+  available_at one lease (PUSH_CLAIM_LEASE_SECONDS) ahead. A worker or
+  process that dies mid-batch therefore only delays those deliveries; the
+  next claim after the lease picks them up again (at-least-once);
+* the batch goes out in one send_multicast() call. Each token is then
+  resolved on its own:
+  - delivered: the row is deleted;
+  - invalid token (push_service._classify_send_error): the row is deleted,
+    and all of the batch's invalid tokens are deactivated in one token-store
+    write;
+  - temporary failure: the row is retried after a jittered exponential
+    backoff (PUSH_RETRY_BASE_SECONDS doubling up to PUSH_RETRY_MAX_SECONDS,
+    times 0.5-1.5) until PUSH_MAX_ATTEMPTS. A call that raises fails every
+    token in its batch this way;
+* a delivery still pending PUSH_MESSAGE_TTL_SECONDS after its message was
+  enqueued is expired instead of sent: a late trading alert is worse than
+  none. The push kill switch holds deliveries in the outbox without spending
+  attempts, so they expire the same way;
+* with no transport configured (no Firebase credentials), batches fail
+  closed as firebase_not_configured, as send_push_notification does.
+
+Deliveries by event, multicast batch sizes and latency, and the outbox depth
+are exported as push_* metrics.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.test_runtime import is_test_process, runtime_scratch_root
+from app.services.push_service import _classify_send_error, deactivate_push_tokens, get_push_transport
+from app.system.kill_switches import alert_channel_block_reason
+from app.system.system_metrics import (
+    increment_push_sends,
+    record_push_batch,
+    record_push_delivery,
+    set_push_outbox_depth,
+)
+
+logger = logging.getLogger("stocknewsbr.push_outbox")
+
+
+def _env_number(name: str, default: float, minimum: float) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+PUSH_DISPATCH_WORKERS = int(_env_number("PUSH_DISPATCH_WORKERS", 4, 1))
+PUSH_MAX_ATTEMPTS = int(_env_number("PUSH_MAX_ATTEMPTS", 5, 1))
+PUSH_RETRY_BASE_SECONDS = _env_number("PUSH_RETRY_BASE_SECONDS", 2.0, 0.0)
+PUSH_RETRY_MAX_SECONDS = _env_number("PUSH_RETRY_MAX_SECONDS", 300.0, 0.0)
+PUSH_MESSAGE_TTL_SECONDS = _env_number("PUSH_MESSAGE_TTL_SECONDS", 900.0, 1.0)
+PUSH_CLAIM_LEASE_SECONDS = _env_number("PUSH_CLAIM_LEASE_SECONDS", 120.0, 1.0)
+PUSH_IDLE_POLL_SECONDS = _env_number("PUSH_IDLE_POLL_SECONDS", 1.0, 0.01)
+PUSH_DEFAULT_BATCH_SIZE = 500
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS push_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        body TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS push_deliveries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message_id INTEGER NOT NULL REFERENCES push_messages(id),
+        user_id INTEGER NOT NULL,
+        token TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        last_error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_push_deliveries_due ON push_deliveries (available_at, message_id)",
+    "CREATE INDEX IF NOT EXISTS ix_push_deliveries_message ON push_deliveries (message_id, available_at)",
+)
+
+
+def push_outbox_path() -> Path:
+    configured = os.getenv("PUSH_OUTBOX_FILE")
+    if configured:
+        path = Path(configured)
+        return path if path.is_absolute() else _PROJECT_ROOT / path
+    if is_test_process():
+        return runtime_scratch_root("push-outbox") / "push_outbox.sqlite3"
+    return _PROJECT_ROOT / "runtime" / "cache" / "push_outbox.sqlite3"
+
+
+def retry_delay_seconds(attempts: int, rng: random.Random = random) -> float:
+    """Backoff before attempt attempts + 1: capped exponential with 0.5-1.5 jitter."""
+    exponent = min(max(0, int(attempts) - 1), 30)
+    delay = min(PUSH_RETRY_MAX_SECONDS, PUSH_RETRY_BASE_SECONDS * (2**exponent))
+    return delay * rng.uniform(0.5, 1.5)
+
+
+class PushOutbox:
+    """The SQLite-backed queue of pending token deliveries."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else push_outbox_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            # WAL lets the API process enqueue while the dispatcher pool reads.
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def enqueue(self, title: str, body: str, data: Dict[str, Any], recipients: Iterable[Tuple[int, str]]) -> int:
+        """Queue one message for every (user_id, token); returns the deliveries queued."""
+        unique = list(dict.fromkeys((int(user_id), str(token)) for user_id, token in recipients if token))
+        if not unique:
+            return 0
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO push_messages (title, body, data, created_at) VALUES (?, ?, ?, ?)",
+                (str(title), str(body), json.dumps(data or {}, ensure_ascii=True, default=str), now),
+            )
+            message_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO push_deliveries (message_id, user_id, token, available_at) VALUES (?, ?, ?, ?)",
+                [(message_id, user_id, token, now) for user_id, token in unique],
+            )
+        record_push_delivery("enqueued", len(unique))
+        return len(unique)
+
+    def claim(self, limit: int, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Lease up to `limit` due deliveries of the oldest due message."""
+        now = time.time() if now is None else now
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT message_id FROM push_deliveries WHERE available_at <= ? ORDER BY available_at, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            message_id = row[0]
+            message = connection.execute(
+                "SELECT title, body, data, created_at FROM push_messages WHERE id = ?", (message_id,)
+            ).fetchone()
+            deliveries = connection.execute(
+                "SELECT id, user_id, token, attempts FROM push_deliveries"
+                " WHERE message_id = ? AND available_at <= ? ORDER BY id LIMIT ?",
+                (message_id, now, max(1, int(limit))),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE push_deliveries SET available_at = ? WHERE id = ?",
+                [(now + PUSH_CLAIM_LEASE_SECONDS, delivery[0]) for delivery in deliveries],
+            )
+        title, body, data, created_at = message
+        return {
+            "message_id": message_id,
+            "title": title,
+            "body": body,
+            "data": json.loads(data),
+            "created_at": created_at,
+            "deliveries": [
+                {"id": delivery_id, "user_id": user_id, "token": token, "attempts": attempts}
+                for delivery_id, user_id, token, attempts in deliveries
+            ],
+        }
+
+    def settle(
+        self,
+        done: Iterable[int] = (),
+        retry: Iterable[Tuple[int, int, float, str]] = (),
+        release: Iterable[Tuple[int, float]] = (),
+    ) -> None:
+        """Delete finished deliveries, reschedule retries, release held ones.
+
+        retry items are (id, attempts, available_at, error); release items are
+        (id, available_at) and keep their attempt count.
+        """
+        done = [(delivery_id,) for delivery_id in done]
+        retry = list(retry)
+        release = [(available_at, delivery_id) for delivery_id, available_at in release]
+        with self._connect() as connection:
+            if done:
+                connection.executemany("DELETE FROM push_deliveries WHERE id = ?", done)
+            if retry:
+                connection.executemany(
+                    "UPDATE push_deliveries SET attempts = ?, available_at = ?, last_error = ? WHERE id = ?",
+                    [(attempts, available_at, error[:200], delivery_id) for delivery_id, attempts, available_at, error in retry],
+                )
+            if release:
+                connection.executemany("UPDATE push_deliveries SET available_at = ? WHERE id = ?", release)
+            connection.execute(
+                "DELETE FROM push_messages WHERE NOT EXISTS"
+                " (SELECT 1 FROM push_deliveries WHERE push_deliveries.message_id = push_messages.id)"
+            )
+
+    def depth(self) -> Tuple[int, Optional[float]]:
+        """Pending deliveries and the enqueue time of the oldest pending message."""
+        with self._connect() as connection:
+            count = connection.execute("SELECT COUNT(*) FROM push_deliveries").fetchone()[0]
+            oldest = connection.execute(
+                "SELECT MIN(m.created_at) FROM push_messages m"
+                " WHERE EXISTS (SELECT 1 FROM push_deliveries d WHERE d.message_id = m.id)"
+            ).fetchone()[0]
+        return int(count), oldest
+
+    def next_due_at(self) -> Optional[float]:
+        """When the earliest pending delivery (a retry, a held one) becomes due."""
+        with self._connect() as connection:
+            return connection.execute("SELECT MIN(available_at) FROM push_deliveries").fetchone()[0]
+
+    def pending(self) -> List[Dict[str, Any]]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, message_id, user_id, token, attempts, available_at, last_error FROM push_deliveries ORDER BY id"
+            ).fetchall()
+        keys = ("id", "message_id", "user_id", "token", "attempts", "available_at", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+
+class PushDispatcher:
+    """A pool of threads draining a PushOutbox through a multicast transport.
+
+    `transport` needs send_multicast(tokens, title, body, data) and may set
+    max_batch_size; by default the Firebase transport is resolved per batch,
+    so credentials configured after start are picked up.
+    """
+
+    def __init__(
+        self,
+        outbox: PushOutbox,
+        transport: Any = None,
+        workers: int = PUSH_DISPATCH_WORKERS,
+        transport_factory: Callable[[], Any] = get_push_transport,
+        rng: Optional[random.Random] = None,
+    ):
+        self.outbox = outbox
+        self.transport = transport
+        self.transport_factory = transport_factory
+        self.rng = rng or random.Random()
+        self._rng_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stopping = False
+        self._drain = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f"push-dispatch-{index}", daemon=True)
+            for index in range(max(1, int(workers)))
+        ]
+
+    def start(self) -> "PushDispatcher":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def notify(self) -> None:
+        with self._wake:
+            self._wake.notify_all()
+
+    def stop(self, drain: bool = True, timeout: float = 30.0) -> bool:
+        """Stop the pool; with drain, deliveries already due are sent first. True if all threads ended."""
+        with self._wake:
+            self._stopping = True
+            self._drain = drain
+            self._wake.notify_all()
+        deadline = time.monotonic() + max(0.0, timeout)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                worked = self.dispatch_once()
+            except Exception:
+                logger.exception("Push outbox dispatch error")
+                worked = False
+            idle_seconds = PUSH_IDLE_POLL_SECONDS
+            if not worked:
+                # Wake for the next retry rather than a whole poll later.
+                next_due = self.outbox.next_due_at()
+                if next_due is not None:
+                    idle_seconds = min(idle_seconds, max(0.0, next_due - time.time()))
+            with self._wake:
+                if self._stopping and (not worked or not self._drain):
+                    return
+                if not worked:
+                    self._wake.wait(idle_seconds)
+
+    def _retry_at(self, attempts: int, now: float) -> float:
+        with self._rng_lock:
+            return now + retry_delay_seconds(attempts, self.rng)
+
+    def dispatch_once(self) -> bool:
+        """Claim and send one batch; False when nothing was due."""
+        transport = self.transport if self.transport is not None else self.transport_factory()
+        limit = int(getattr(transport, "max_batch_size", PUSH_DEFAULT_BATCH_SIZE) or PUSH_DEFAULT_BATCH_SIZE)
+        batch = self.outbox.claim(limit)
+        if batch is None:
+            self._report_depth()
+            return False
+
+        deliveries = batch["deliveries"]
+        now = time.time()
+        if now - batch["created_at"] > PUSH_MESSAGE_TTL_SECONDS:
+            self.outbox.settle(done=[item["id"] for item in deliveries])
+            record_push_delivery("expired", len(deliveries))
+            self._report_depth()
+            return True
+
+        kill_reason = alert_channel_block_reason("push")
+        if kill_reason:
+            # Held, not failed: they go out if the switch is lifted before they expire.
+            self.outbox.settle(release=[(item["id"], now + PUSH_IDLE_POLL_SECONDS) for item in deliveries])
+            return False
+
+        tokens = [item["token"] for item in deliveries]
+        if transport is None:
+            self.outbox.settle(done=[item["id"] for item in deliveries])
+            record_push_delivery("failed", len(deliveries))
+            logger.warning("Push outbox dropped %s deliveries: firebase_not_configured", len(deliveries))
+            self._report_depth()
+            return True
+
+        started = time.perf_counter()
+        try:
+            errors = list(transport.send_multicast(tokens, batch["title"], batch["body"], batch["data"]))
+            if len(errors) != len(tokens):
+                raise RuntimeError(f"multicast returned {len(errors)} results for {len(tokens)} tokens")
+        except Exception as exc:
+            errors = [exc] * len(tokens)
+        record_push_batch(len(tokens), time.perf_counter() - started)
+        self._settle(deliveries, errors)
+        self._report_depth()
+        return True
+
+    def _settle(self, deliveries: List[Dict[str, Any]], errors: List[Optional[BaseException]]) -> None:
+        now = time.time()
+        done, retry, invalid = [], [], []
+        sent = failed = 0
+        for item, exc in zip(deliveries, errors):
+            if exc is None:
+                done.append(item["id"])
+                sent += 1
+            elif _classify_send_error(exc) == "invalid_token":
+                done.append(item["id"])
+                invalid.append((item["user_id"], item["token"], type(exc).__name__))
+            elif item["attempts"] + 1 >= PUSH_MAX_ATTEMPTS:
+                done.append(item["id"])
+                failed += 1
+            else:
+                attempts = item["attempts"] + 1
+                retry.append((item["id"], attempts, self._retry_at(attempts, now), f"{type(exc).__name__}: {exc}"))
+
+        if invalid:
+            deactivate_push_tokens(invalid)
+        self.outbox.settle(done=done, retry=retry)
+        increment_push_sends(sent)
+        record_push_delivery("sent", sent)
+        record_push_delivery("invalidated", len(invalid))
+        record_push_delivery("retried", len(retry))
+        record_push_delivery("failed", failed)
+        if failed or retry:
+            logger.warning(
+                "Push multicast batch | sent=%s invalidated=%s retried=%s failed=%s", sent, len(invalid), len(retry), failed
+            )
+
+    def _report_depth(self) -> None:
+        depth, oldest = self.outbox.depth()
+        set_push_outbox_depth(depth, time.time() - oldest if oldest is not None else None)
+
+
+_default_lock = threading.Lock()
+_default_outbox: Optional[PushOutbox] = None
+_default_dispatcher: Optional[PushDispatcher] = None
+
+
+def get_push_outbox() -> PushOutbox:
+    global _default_outbox
+
+    with _default_lock:
+        if _default_outbox is None or _default_outbox.path != push_outbox_path():
+            _default_outbox = PushOutbox()
+        return _default_outbox
+
+
+def enqueue_push_notification(title: str, body: str, data: Dict[str, Any], recipients: Iterable[Tuple[int, str]]) -> Dict[str, Any]:
+    """Queue one push for every (user_id, token) and wake the dispatcher pool."""
+    queued = get_push_outbox().enqueue(title, body, data, recipients)
+    dispatcher = _default_dispatcher
+    if dispatcher is not None and queued:
+        dispatcher.notify()
+    return {"queued": queued}
+
+
+def start_push_dispatcher(workers: int = PUSH_DISPATCH_WORKERS) -> PushDispatcher:
+    global _default_dispatcher
+
+    outbox = get_push_outbox()
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = PushDispatcher(outbox, workers=workers).start()
+        return _default_dispatcher
+
+
+def stop_push_dispatcher(drain: bool = True, timeout: float = 30.0) -> bool:
+    global _default_dispatcher
+
+    with _default_lock:
+        dispatcher, _default_dispatcher = _default_dispatcher, None
+    return dispatcher.stop(drain=drain, timeout=timeout) if dispatcher is not None else True
@@ -11,11 +11,19 @@ import logging
 import threading
 
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 
 from fastapi import WebSocket
 
 from app.system.system_metrics import decrement_ws_connections, increment_ws_connections
+from app.system.websocket_manager import encode_frame
+from app.system.websocket_outbox import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    WS_SEND_QUEUE_POLICY,
+    WS_SEND_QUEUE_SIZE,
+    WS_SLOW_CONSUMER_LAG_SECONDS,
+    ConnectionOutbox,
+)
 
 
 logger = logging.getLogger("stocknewsbr.room_ws_manager")
@@ -94,6 +102,11 @@ class RoomWebSocketManager:
         self._max_connections = 1000
         self._max_connections_per_room = 100
         self._lock = threading.RLock()
+        # One bounded send queue + writer task per (room, socket) (websocket_outbox).
+        self._outboxes: Dict[Tuple[str, int], ConnectionOutbox] = {}
+        self._queue_size = WS_SEND_QUEUE_SIZE
+        self._queue_policy = WS_SEND_QUEUE_POLICY
+        self._slow_consumer_lag_seconds = WS_SLOW_CONSUMER_LAG_SECONDS
 
     # --------------------------------------------------
     # CONNECT
@@ -142,9 +155,18 @@ class RoomWebSocketManager:
             await _close_websocket(websocket, 1013, "accept_failed")
             return False
 
+        outbox = ConnectionOutbox(
+            websocket,
+            room_key,
+            max_size=self._queue_size,
+            policy=self._queue_policy,
+            lag_seconds=self._slow_consumer_lag_seconds,
+            on_evict=lambda evicted, reason: self._evict(room_key, evicted, reason),
+        ).start()
         with self._lock:
             self._release_pending_locked(room_key, websocket)
             self._rooms[room_key].append(websocket)
+            self._outboxes[(room_key, id(websocket))] = outbox
 
         increment_ws_connections()
         return True
@@ -190,8 +212,14 @@ class RoomWebSocketManager:
                 removed = True
         if removed:
             decrement_ws_connections()
+            self._close_outbox_locked(room_key, websocket)
         self._release_pending_locked(room_key, websocket)
 
+    def _close_outbox_locked(self, room_key: str, websocket: Any) -> None:
+        outbox = self._outboxes.pop((room_key, id(websocket)), None)
+        if outbox is not None:
+            outbox.close()
+
     def _cleanup_room_locked(self, room_key: str) -> None:
         if room_key in self._rooms and not self._rooms[room_key]:
             self._rooms.pop(room_key, None)
@@ -211,6 +239,8 @@ class RoomWebSocketManager:
                 while websocket in connections:
                     connections.remove(websocket)
                     removed = True
+            if removed:
+                self._close_outbox_locked(room_key, websocket)
             self._release_pending_locked(room_key, websocket)
             self._cleanup_room_locked(room_key)
 
@@ -221,25 +251,47 @@ class RoomWebSocketManager:
     # BROADCAST
     # --------------------------------------------------
 
-    async def broadcast(self, room: str, message: dict):
+    async def broadcast(self, room: str, message: dict, coalesce_key: Optional[Hashable] = None):
+        """Encode `message` once and offer it to every socket's queue in `room`."""
         room_key = _normalize_room(room)
         with self._lock:
-            connections = list(self._rooms.get(room_key, ()))
+            outboxes = [
+                self._outboxes[(room_key, id(websocket))]
+                for websocket in self._rooms.get(room_key, ())
+                if (room_key, id(websocket)) in self._outboxes
+            ]
 
-        if not connections:
+        if not outboxes:
             return
 
-        await asyncio.gather(
-            *[self._safe_send(room_key, websocket, message) for websocket in connections],
-            return_exceptions=True,
-        )
+        frame = encode_frame(message)
+        for outbox in outboxes:
+            outbox.offer(frame, coalesce_key)
+        # Let the writers take their first turn before the caller moves on.
+        await asyncio.sleep(0)
 
-    async def _safe_send(self, room: str, websocket: WebSocket, message: dict):
+    async def send(self, room: str, websocket: WebSocket, message: dict) -> None:
+        """Queue `message` for one socket of `room`, behind the frames already queued for it."""
+        room_key = _normalize_room(room)
+        frame = encode_frame(message)
+        with self._lock:
+            outbox = self._outboxes.get((room_key, id(websocket)))
+        if outbox is not None:
+            outbox.offer(frame)
+            await asyncio.sleep(0)
+            return
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(frame)
         except Exception as exc:
-            logger.warning("Room websocket send failed: %s", exc)
-            self.disconnect(room, websocket)
+            logger.warning("Room WebSocket send error (room=%s): %s", room_key, exc)
+            self.disconnect(room_key, websocket)
+
+    def _evict(self, room: str, websocket: Any, reason: str) -> None:
+        self.disconnect(room, websocket)
+        if reason == "slow_consumer":
+            asyncio.get_running_loop().create_task(
+                _close_websocket(websocket, SLOW_CONSUMER_CLOSE_CODE, "slow_consumer")
+            )
 
     # --------------------------------------------------
     # STATS
@@ -248,6 +300,9 @@ class RoomWebSocketManager:
     def stats(self, room: Optional[str] = None) -> dict:
         with self._lock:
             rooms_view = {key: len(items) for key, items in self._rooms.items() if len(items) > 0}
+            queued = {}
+            for (key, _socket_id), outbox in self._outboxes.items():
+                queued[key] = queued.get(key, 0) + len(outbox)
             total = sum(rooms_view.values())
             total_pending = self._total_pending_locked()
             if room is None:
@@ -267,6 +322,9 @@ class RoomWebSocketManager:
             "limit_per_room": self._room_limit(),
             "pending_accepts": pending,
             "rooms": rooms_view,
+            "queued_frames": sum(queued.values()) if room_key is None else queued.get(room_key, 0),
+            "queue_limit": self._queue_size,
+            "queue_policy": self._queue_policy,
         }
 
 
@@ -7,6 +7,7 @@ import logging
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from app.system.market_stream import market_stream
 from app.system.websocket_manager import manager
 
 
@@ -22,20 +23,28 @@ router = APIRouter()
 
 @router.websocket("/ws/market")
 
-async def market_stream(websocket: WebSocket):
+async def market_stream_endpoint(websocket: WebSocket):
 
-    await manager.connect(websocket)
+    if not await manager.connect(websocket):
+
+        return
 
     logger.info("WebSocket client connected")
 
+    market_stream.ensure_running()
+
     try:
 
         while True:
 
             try:
 
-                # keep connection alive
-                await websocket.receive_text()
+                # subscribe/unsubscribe actions; anything else is a keep-alive
+                reply = await market_stream.handle_message(websocket, await websocket.receive_text())
+
+                if reply is not None:
+
+                    await manager.send_encoded(websocket, reply)
 
             except WebSocketDisconnect:
 
@@ -49,6 +58,8 @@ async def market_stream(websocket: WebSocket):
 
     finally:
 
+        market_stream.remove(websocket)
+
         try:
 
             manager.disconnect(websocket)
@@ -47,6 +47,7 @@ _provider_call_source: ContextVar[str] = ContextVar(
 )
 
 _HTTP_LATENCY_SAMPLE_LIMIT = 1024
+_WORKER_PROFILE_SAMPLE_LIMIT = 256
 _PROVIDER_FAILURE_LIMIT = 50
 _EXTERNAL_PROVIDER_CALLS_LIMIT = 1000
 _EXTERNAL_PROVIDER_SYMBOL_CALLS_LIMIT = 2000
@@ -57,6 +58,25 @@ _external_provider_calls = {}
 _external_provider_symbol_calls = {}
 _external_provider_failures = {}
 _worker_stage_timings = {}
+_worker_stage_profiles = {}
+_WORKER_PROFILE_FIELDS = ("wall_seconds", "cpu_seconds", "allocated_blocks", "allocated_bytes")
+_ws_queue_metrics = {}
+_WS_QUEUE_EVENTS = ("enqueued", "sent", "dropped", "coalesced", "evicted", "send_failed")
+_worker_pipeline_metrics = {}
+_WORKER_PIPELINE_EVENTS = ("offered", "delivered", "coalesced", "overflowed", "retried", "failed", "timeouts")
+_PUSH_DELIVERY_EVENTS = ("enqueued", "sent", "invalidated", "retried", "failed", "expired")
+_push_delivery_metrics = {
+    "outbox_depth": 0,
+    "max_outbox_depth": 0,
+    "oldest_pending_seconds": 0.0,
+    "batches": 0,
+    "last_batch_size": 0,
+    "max_batch_size": 0,
+    "last_batch_seconds": 0.0,
+    "max_batch_seconds": 0.0,
+    "batch_seconds_total": 0.0,
+    **{event: 0 for event in _PUSH_DELIVERY_EVENTS},
+}
 _worker_runtime_metrics = {
     "worker_generation_success": 0,
     "worker_generation_failure": 0,
@@ -64,6 +84,20 @@ _worker_runtime_metrics = {
     "snapshot_write_failure": 0,
     "updated_at": 0.0,
 }
+_engine_incremental_metrics = {
+    "cycles": 0,
+    "symbols_recomputed_total": 0,
+    "symbols_reused_total": 0,
+    "last_symbols": 0,
+    "last_recomputed": 0,
+    "last_reused": 0,
+    "last_ranked": 0,
+    "last_seconds": 0.0,
+    "updated_at": 0.0,
+}
+_snapshot_view_metrics = {}
+_single_flight_metrics = {}
+_SINGLE_FLIGHT_OUTCOMES = ("leader", "coalesced", "timeout", "error")
 _signal_quality_coverage = {}
 _institutional_auditor_metrics = {
     "approved": 0,
@@ -144,6 +178,11 @@ _telegram_alert_metrics = {
     "deduplicated": 0,
     "cooldown": 0,
     "errors": 0,
+    "queued": 0,
+    "rate_limited": 0,
+    "expired": 0,
+    "queue_depth": 0,
+    "oldest_queued_seconds": 0.0,
     "critical": 0,
     "high": 0,
     "medium": 0,
@@ -331,6 +370,24 @@ def _worker_stage_entry(stage: str):
     )
 
 
+def _ws_queue_entry(room: str):
+    entry = _ws_queue_metrics.get(room)
+    if entry is None:
+        entry = {"queue_depth": 0, "max_queue_depth": 0}
+        entry.update({event: 0 for event in _WS_QUEUE_EVENTS})
+        _ws_queue_metrics[room] = entry
+    return entry
+
+
+def _worker_pipeline_entry(stage: str):
+    entry = _worker_pipeline_metrics.get(stage)
+    if entry is None:
+        entry = {"queue_depth": 0, "max_queue_depth": 0, "last_lag_seconds": 0.0, "max_lag_seconds": 0.0}
+        entry.update({event: 0 for event in _WORKER_PIPELINE_EVENTS})
+        _worker_pipeline_metrics[stage] = entry
+    return entry
+
+
 # =====================================================
 # ENGINE FUNCTIONS
 # =====================================================
@@ -599,6 +656,59 @@ def record_worker_stage_duration(
             entry["errors"] += 1
 
 
+def record_worker_stage_profile(
+    stage: str,
+    wall_seconds: float,
+    cpu_seconds: float,
+    allocated_blocks: int = 0,
+    allocated_bytes: int | None = None,
+    success: bool = True,
+):
+    """One profiled stage run (see app.system.worker_profiler).
+
+    The last _WORKER_PROFILE_SAMPLE_LIMIT runs of each stage are kept, so the
+    quantiles follow the recent cycles instead of the whole process lifetime.
+    allocated_bytes is only known while tracemalloc is tracing.
+    """
+    with _lock:
+        entry = _worker_stage_profiles.setdefault(
+            str(stage or "unknown"),
+            {
+                "count": 0,
+                "errors": 0,
+                **{field: deque(maxlen=_WORKER_PROFILE_SAMPLE_LIMIT) for field in _WORKER_PROFILE_FIELDS},
+            },
+        )
+        entry["count"] += 1
+        if not success:
+            entry["errors"] += 1
+        entry["wall_seconds"].append(max(0.0, float(wall_seconds or 0.0)))
+        entry["cpu_seconds"].append(max(0.0, float(cpu_seconds or 0.0)))
+        entry["allocated_blocks"].append(int(allocated_blocks or 0))
+        if allocated_bytes is not None:
+            entry["allocated_bytes"].append(int(allocated_bytes))
+
+
+def get_worker_stage_profile_snapshot():
+    with _lock:
+        result = {}
+        for stage, entry in _worker_stage_profiles.items():
+            item = {"count": int(entry["count"]), "errors": int(entry["errors"])}
+            for field in _WORKER_PROFILE_FIELDS:
+                samples = sorted(entry[field])
+                if not samples:
+                    continue
+                item[field] = {
+                    "samples": len(samples),
+                    "p50": _quantile(samples, 0.50),
+                    "p90": _quantile(samples, 0.90),
+                    "p99": _quantile(samples, 0.99),
+                    "max": round(float(samples[-1]), 6),
+                }
+            result[stage] = item
+        return result
+
+
 def record_worker_generation_metric(success: bool):
     key = "worker_generation_success" if success else "worker_generation_failure"
     with _lock:
@@ -618,6 +728,97 @@ def get_worker_runtime_metrics_snapshot():
         return dict(_worker_runtime_metrics)
 
 
+def record_engine_incremental_cycle(
+    recomputed: int, reused: int, ranked: int = 0, duration_seconds: float = 0.0
+):
+    """Symbols whose compute_core row was recomputed vs reused in one engine cycle."""
+    recomputed = max(0, int(recomputed or 0))
+    reused = max(0, int(reused or 0))
+    with _lock:
+        entry = _engine_incremental_metrics
+        entry["cycles"] += 1
+        entry["symbols_recomputed_total"] += recomputed
+        entry["symbols_reused_total"] += reused
+        entry["last_symbols"] = recomputed + reused
+        entry["last_recomputed"] = recomputed
+        entry["last_reused"] = reused
+        entry["last_ranked"] = max(0, int(ranked or 0))
+        entry["last_seconds"] = max(0.0, float(duration_seconds or 0.0))
+        entry["updated_at"] = time.time()
+
+
+def get_engine_incremental_metrics_snapshot():
+    with _lock:
+        return dict(_engine_incremental_metrics)
+
+
+def record_snapshot_view_build(view: str, duration_seconds: float, generation: int = 0, success: bool = True):
+    """One build of a derived snapshot view (see app.cache.snapshot_views)."""
+    duration = max(0.0, float(duration_seconds or 0.0))
+    with _lock:
+        entry = _snapshot_view_entry(view)
+        entry["builds"] += 1
+        entry["total_seconds"] += duration
+        entry["last_seconds"] = duration
+        entry["max_seconds"] = max(float(entry["max_seconds"]), duration)
+        if success:
+            entry["last_generation"] = int(generation or 0)
+        else:
+            entry["errors"] += 1
+        entry["updated_at"] = time.time()
+
+
+def record_snapshot_view_read(view: str, hit: bool):
+    with _lock:
+        _snapshot_view_entry(view)["hits" if hit else "misses"] += 1
+
+
+def _snapshot_view_entry(view: str):
+    return _snapshot_view_metrics.setdefault(
+        str(view or "unknown"),
+        {
+            "builds": 0,
+            "errors": 0,
+            "hits": 0,
+            "misses": 0,
+            "total_seconds": 0.0,
+            "last_seconds": 0.0,
+            "max_seconds": 0.0,
+            "last_generation": 0,
+            "updated_at": 0.0,
+        },
+    )
+
+
+def get_snapshot_view_metrics_snapshot():
+    with _lock:
+        result = {}
+        for view, entry in _snapshot_view_metrics.items():
+            item = dict(entry)
+            item["avg_seconds"] = item["total_seconds"] / item["builds"] if item["builds"] else 0.0
+            result[view] = item
+        return result
+
+
+def record_single_flight(flight: str, outcome: str, wait_seconds: float = 0.0):
+    """One caller of a coalesced call (see app.core.single_flight)."""
+    waited = max(0.0, float(wait_seconds or 0.0))
+    with _lock:
+        entry = _single_flight_metrics.setdefault(
+            str(flight or "unknown"),
+            {**{name: 0 for name in _SINGLE_FLIGHT_OUTCOMES}, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0},
+        )
+        entry[outcome if outcome in _SINGLE_FLIGHT_OUTCOMES else "error"] += 1
+        if outcome in ("coalesced", "timeout"):
+            entry["wait_seconds_total"] += waited
+            entry["wait_seconds_max"] = max(float(entry["wait_seconds_max"]), waited)
+
+
+def get_single_flight_metrics_snapshot():
+    with _lock:
+        return {name: dict(entry) for name, entry in _single_flight_metrics.items()}
+
+
 def _positive_number(value) -> bool:
     try:
         numeric = float(value)
@@ -931,6 +1132,13 @@ def record_telegram_alert_metric(event: str, alert_level: str | None = None):
         _telegram_alert_metrics["updated_at"] = time.time()
 
 
+def set_telegram_queue_depth(depth: int, oldest_queued_seconds: float | None = None):
+    """Alerts waiting in the Telegram queue, and the age of the oldest one."""
+    with _lock:
+        _telegram_alert_metrics["queue_depth"] = max(0, int(depth or 0))
+        _telegram_alert_metrics["oldest_queued_seconds"] = round(max(0.0, float(oldest_queued_seconds or 0.0)), 3)
+
+
 def get_telegram_alert_metrics_snapshot():
     with _lock:
         return dict(_telegram_alert_metrics)
@@ -1247,6 +1455,13 @@ def get_performance_metrics_snapshot():
         institutional_consistency = dict(_institutional_consistency_metrics)
         institutional_metrics = _institutional_metrics_snapshot_locked()
         worker_runtime = dict(_worker_runtime_metrics)
+        engine_incremental = dict(_engine_incremental_metrics)
+        snapshot_views = get_snapshot_view_metrics_snapshot()
+        single_flights = get_single_flight_metrics_snapshot()
+        worker_stage_profile = get_worker_stage_profile_snapshot()
+        worker_pipeline = get_worker_pipeline_metrics_snapshot()
+        websocket_queues = {room: dict(entry) for room, entry in _ws_queue_metrics.items()}
+        push_delivery = dict(_push_delivery_metrics)
 
         repeated_failures = sorted(
             (
@@ -1271,7 +1486,14 @@ def get_performance_metrics_snapshot():
         "external_provider_call_total": provider_metrics,
         "external_provider_symbol_call_total": provider_symbol_metrics,
         "worker_stage_seconds": worker_metrics,
+        "worker_stage_profile": worker_stage_profile,
+        "worker_pipeline": worker_pipeline,
         "worker_runtime": worker_runtime,
+        "engine_incremental": engine_incremental,
+        "snapshot_views": snapshot_views,
+        "single_flight": single_flights,
+        "websocket_queues": websocket_queues,
+        "push_delivery": push_delivery,
         "signal_quality_coverage": signal_quality,
         "institutional_auditor": institutional_auditor,
         "master_score": master_score,
@@ -1400,6 +1622,107 @@ def format_prometheus_metrics() -> str:
             % (_label_value(stage), int(item.get("errors", 0)))
         )
 
+    for stage, item in performance.get("worker_stage_profile", {}).items():
+        for field, metric, labels in (
+            ("wall_seconds", "worker_stage_profile_seconds", ',clock="wall"'),
+            ("cpu_seconds", "worker_stage_profile_seconds", ',clock="cpu"'),
+            ("allocated_blocks", "worker_stage_profile_allocated_blocks", ""),
+            ("allocated_bytes", "worker_stage_profile_allocated_bytes", ""),
+        ):
+            summary = item.get(field)
+            if not summary:
+                continue
+            for quantile, key in (("0.50", "p50"), ("0.90", "p90"), ("0.99", "p99"), ("1", "max")):
+                lines.append(
+                    '%s{stage="%s"%s,quantile="%s"} %s'
+                    % (metric, _label_value(stage), labels, quantile, summary.get(key, 0))
+                )
+        lines.append(
+            'worker_stage_profile_runs_total{stage="%s"} %s' % (_label_value(stage), int(item.get("count", 0)))
+        )
+
+    for stage, item in performance.get("worker_pipeline", {}).items():
+        for field in ("queue_depth", "max_queue_depth"):
+            lines.append(
+                'worker_pipeline_%s{stage="%s"} %s' % (field, _label_value(stage), int(item.get(field, 0)))
+            )
+        for stat in ("last", "max"):
+            lines.append(
+                'worker_pipeline_lag_seconds{stage="%s",stat="%s"} %s'
+                % (_label_value(stage), stat, float(item.get("%s_lag_seconds" % stat, 0.0)))
+            )
+        for event in _WORKER_PIPELINE_EVENTS:
+            lines.append(
+                'worker_pipeline_events_total{stage="%s",event="%s"} %s'
+                % (_label_value(stage), event, int(item.get(event, 0)))
+            )
+
+    push_delivery = performance.get("push_delivery", {})
+    for field in ("outbox_depth", "max_outbox_depth"):
+        lines.append("push_%s %s" % (field, int(push_delivery.get(field, 0))))
+    lines.append("push_outbox_oldest_pending_seconds %s" % float(push_delivery.get("oldest_pending_seconds", 0.0)))
+    lines.append("push_multicast_batches_total %s" % int(push_delivery.get("batches", 0)))
+    lines.append("push_multicast_batch_max_size %s" % int(push_delivery.get("max_batch_size", 0)))
+    lines.append("push_multicast_batch_seconds_total %s" % float(push_delivery.get("batch_seconds_total", 0.0)))
+    lines.append("push_multicast_batch_max_seconds %s" % float(push_delivery.get("max_batch_seconds", 0.0)))
+    for event in _PUSH_DELIVERY_EVENTS:
+        lines.append('push_deliveries_total{event="%s"} %s' % (event, int(push_delivery.get(event, 0))))
+
+    for room, item in performance.get("websocket_queues", {}).items():
+        lines.append(
+            'websocket_queue_depth{room="%s"} %s'
+            % (_label_value(room), int(item.get("queue_depth", 0)))
+        )
+        lines.append(
+            'websocket_queue_max_depth{room="%s"} %s'
+            % (_label_value(room), int(item.get("max_queue_depth", 0)))
+        )
+        for event in _WS_QUEUE_EVENTS:
+            lines.append(
+                'websocket_queue_frames_total{room="%s",event="%s"} %s'
+                % (_label_value(room), event, int(item.get(event, 0)))
+            )
+
+    engine_incremental = performance.get("engine_incremental", {})
+    lines.append("engine_cycles_incremental_total %s" % int(engine_incremental.get("cycles", 0)))
+    for outcome in ("recomputed", "reused"):
+        lines.append(
+            'engine_symbols_total{outcome="%s"} %s'
+            % (outcome, int(engine_incremental.get("symbols_%s_total" % outcome, 0)))
+        )
+        lines.append(
+            'engine_last_cycle_symbols{outcome="%s"} %s'
+            % (outcome, int(engine_incremental.get("last_%s" % outcome, 0)))
+        )
+
+    for view, item in performance.get("snapshot_views", {}).items():
+        for stat in ("last", "avg", "max"):
+            lines.append(
+                'snapshot_view_build_seconds{view="%s",stat="%s"} %s'
+                % (_label_value(view), stat, float(item.get("%s_seconds" % stat, 0.0)))
+            )
+        lines.append(
+            'snapshot_view_builds_total{view="%s"} %s' % (_label_value(view), int(item.get("builds", 0)))
+        )
+        lines.append(
+            'snapshot_view_build_errors_total{view="%s"} %s' % (_label_value(view), int(item.get("errors", 0)))
+        )
+        for outcome, field in (("hit", "hits"), ("miss", "misses")):
+            lines.append(
+                'snapshot_view_reads_total{view="%s",outcome="%s"} %s'
+                % (_label_value(view), outcome, int(item.get(field, 0)))
+            )
+
+    for flight, item in performance.get("single_flight", {}).items():
+        for outcome in _SINGLE_FLIGHT_OUTCOMES:
+            lines.append(
+                'single_flight_calls_total{flight="%s",outcome="%s"} %s'
+                % (_label_value(flight), outcome, int(item.get(outcome, 0)))
+            )
+        lines.append(
+            'single_flight_wait_seconds_max{flight="%s"} %s' % (_label_value(flight), float(item.get("wait_seconds_max", 0.0)))
+        )
+
     worker_runtime = performance.get("worker_runtime", {})
     for field in (
         "worker_generation_success",
@@ -1547,11 +1870,17 @@ def format_prometheus_metrics() -> str:
         )
 
     telegram_metrics = performance.get("telegram_alerts", {})
-    for field in ("sent", "blocked", "discarded", "deduplicated", "cooldown", "errors"):
+    for field in (
+        "sent", "blocked", "discarded", "deduplicated", "cooldown", "errors", "queued", "rate_limited", "expired"
+    ):
         lines.append(
             'telegram_alert_events_total{event="%s"} %s'
             % (_label_value(field), int(telegram_metrics.get(field, 0)))
         )
+    lines.append("telegram_alert_queue_depth %s" % int(telegram_metrics.get("queue_depth", 0)))
+    lines.append(
+        "telegram_alert_queue_oldest_seconds %s" % float(telegram_metrics.get("oldest_queued_seconds", 0.0))
+    )
     for field in ("critical", "high", "medium"):
         lines.append(
             'telegram_alerts_total{level="%s"} %s'
@@ -1638,6 +1967,57 @@ def decrement_ws_connections():
         ws_connections = max(0, ws_connections - 1)
 
 
+def adjust_ws_queue_depth(room: str, delta: int):
+    """Frames waiting in the room's per-connection send queues (summed)."""
+    label = _sanitize_metric_label(room, default="unknown", max_len=32)
+    with _lock:
+        entry = _ws_queue_entry(label)
+        entry["queue_depth"] = max(0, int(entry["queue_depth"]) + int(delta))
+        entry["max_queue_depth"] = max(int(entry["max_queue_depth"]), entry["queue_depth"])
+
+
+def record_ws_queue_event(room: str, event: str, count: int = 1):
+    label = _sanitize_metric_label(room, default="unknown", max_len=32)
+    metric = str(event or "").strip().lower()
+    if metric not in _WS_QUEUE_EVENTS:
+        return
+    with _lock:
+        entry = _ws_queue_entry(label)
+        entry[metric] = int(entry.get(metric, 0)) + max(0, int(count or 0))
+
+
+def get_ws_queue_metrics_snapshot():
+    with _lock:
+        return {room: dict(entry) for room, entry in _ws_queue_metrics.items()}
+
+
+def record_worker_pipeline_event(stage: str, event: str, count: int = 1):
+    """A delivery event of one worker pipeline stage (see app.system.worker_pipeline)."""
+    metric = str(event or "").strip().lower()
+    if metric not in _WORKER_PIPELINE_EVENTS:
+        return
+    with _lock:
+        entry = _worker_pipeline_entry(str(stage or "unknown"))
+        entry[metric] = int(entry.get(metric, 0)) + max(0, int(count or 0))
+
+
+def set_worker_pipeline_queue(stage: str, depth: int, lag_seconds: float | None = None):
+    """Deliveries waiting for `stage`, and how long the last delivered one waited."""
+    with _lock:
+        entry = _worker_pipeline_entry(str(stage or "unknown"))
+        entry["queue_depth"] = max(0, int(depth or 0))
+        entry["max_queue_depth"] = max(int(entry["max_queue_depth"]), entry["queue_depth"])
+        if lag_seconds is not None:
+            lag = max(0.0, float(lag_seconds))
+            entry["last_lag_seconds"] = round(lag, 6)
+            entry["max_lag_seconds"] = round(max(float(entry["max_lag_seconds"]), lag), 6)
+
+
+def get_worker_pipeline_metrics_snapshot():
+    with _lock:
+        return {stage: dict(entry) for stage, entry in _worker_pipeline_metrics.items()}
+
+
 def increment_chat_messages():
     global chat_messages
 
@@ -1659,11 +2039,48 @@ def increment_uploads():
         uploads_completed += 1
 
 
-def increment_push_sends():
+def increment_push_sends(count: int = 1):
     global push_sends
 
     with _lock:
-        push_sends += 1
+        push_sends += max(0, int(count or 0))
+
+
+def record_push_delivery(event: str, count: int = 1):
+    """Token deliveries that reached `event` in the push outbox (see app.system.push_outbox)."""
+    metric = str(event or "").strip().lower()
+    if metric not in _PUSH_DELIVERY_EVENTS:
+        return
+    with _lock:
+        _push_delivery_metrics[metric] = int(_push_delivery_metrics[metric]) + max(0, int(count or 0))
+
+
+def record_push_batch(size: int, duration_seconds: float):
+    """One multicast request of `size` tokens and how long the provider took."""
+    size = max(0, int(size or 0))
+    duration = max(0.0, float(duration_seconds or 0.0))
+    with _lock:
+        entry = _push_delivery_metrics
+        entry["batches"] = int(entry["batches"]) + 1
+        entry["last_batch_size"] = size
+        entry["max_batch_size"] = max(int(entry["max_batch_size"]), size)
+        entry["last_batch_seconds"] = round(duration, 6)
+        entry["max_batch_seconds"] = round(max(float(entry["max_batch_seconds"]), duration), 6)
+        entry["batch_seconds_total"] = round(float(entry["batch_seconds_total"]) + duration, 6)
+
+
+def set_push_outbox_depth(depth: int, oldest_pending_seconds: float | None = None):
+    """Token deliveries waiting in the push outbox, and the age of the oldest one."""
+    with _lock:
+        entry = _push_delivery_metrics
+        entry["outbox_depth"] = max(0, int(depth or 0))
+        entry["max_outbox_depth"] = max(int(entry["max_outbox_depth"]), entry["outbox_depth"])
+        entry["oldest_pending_seconds"] = round(max(0.0, float(oldest_pending_seconds or 0.0)), 3)
+
+
+def get_push_delivery_metrics_snapshot():
+    with _lock:
+        return dict(_push_delivery_metrics)
 
 
 # =====================================================
@@ -7,14 +7,22 @@
 
 import asyncio
 import inspect
+import json
 import logging
 import threading
 
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 
 from fastapi import WebSocket
 
 from app.system.system_metrics import decrement_ws_connections, increment_ws_connections
+from app.system.websocket_outbox import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    WS_SEND_QUEUE_POLICY,
+    WS_SEND_QUEUE_SIZE,
+    WS_SLOW_CONSUMER_LAG_SECONDS,
+    ConnectionOutbox,
+)
 
 
 logger = logging.getLogger("stocknewsbr.websocket_manager")
@@ -67,6 +75,11 @@ def _is_same_connection(candidate: Any, registered: Any) -> bool:
     return candidate_fp == _connection_fingerprint(registered)
 
 
+def encode_frame(message: Any) -> str:
+    """Text of `message` exactly as WebSocket.send_json would put it on the wire."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
 async def _close_websocket(websocket: Any, code: int, reason: Optional[str] = None) -> None:
     close = getattr(websocket, "close", None)
     if close is None:
@@ -94,6 +107,12 @@ class ConnectionManager:
         self._pending_accepts = 0
         self._max_connections = 1000
         self._lock = threading.RLock()
+        # One bounded send queue + writer task per registered socket (websocket_outbox).
+        self._outboxes: Dict[int, ConnectionOutbox] = {}
+        self._room = "market"
+        self._queue_size = WS_SEND_QUEUE_SIZE
+        self._queue_policy = WS_SEND_QUEUE_POLICY
+        self._slow_consumer_lag_seconds = WS_SLOW_CONSUMER_LAG_SECONDS
 
     # --------------------------------------------------
     # CONNECT
@@ -134,9 +153,18 @@ class ConnectionManager:
             await _close_websocket(websocket, 1013, "accept_failed")
             return False
 
+        outbox = ConnectionOutbox(
+            websocket,
+            self._room,
+            max_size=self._queue_size,
+            policy=self._queue_policy,
+            lag_seconds=self._slow_consumer_lag_seconds,
+            on_evict=self._evict,
+        ).start()
         with self._lock:
             self._release_pending_locked(websocket)
             self._connections.append(websocket)
+            self._outboxes[id(websocket)] = outbox
 
         logger.info("WebSocket client connected")
         increment_ws_connections()
@@ -167,8 +195,14 @@ class ConnectionManager:
             removed = True
         if removed:
             decrement_ws_connections()
+            self._close_outbox_locked(websocket)
         self._release_pending_locked(websocket)
 
+    def _close_outbox_locked(self, websocket: Any) -> None:
+        outbox = self._outboxes.pop(id(websocket), None)
+        if outbox is not None:
+            outbox.close()
+
     # --------------------------------------------------
     # DISCONNECT (idempotent)
     # --------------------------------------------------
@@ -179,6 +213,8 @@ class ConnectionManager:
             while websocket in self._connections:
                 self._connections.remove(websocket)
                 removed = True
+            if removed:
+                self._close_outbox_locked(websocket)
             self._release_pending_locked(websocket)
 
         if removed:
@@ -189,27 +225,42 @@ class ConnectionManager:
     # BROADCAST
     # --------------------------------------------------
 
-    async def broadcast(self, message):
+    async def broadcast(self, message, coalesce_key: Optional[Hashable] = None):
+        await self.broadcast_encoded(encode_frame(message), coalesce_key)
+
+    async def broadcast_encoded(self, frame: str, coalesce_key: Optional[Hashable] = None):
+        """Offer one encoded frame to every socket's queue; never waits on a client."""
         with self._lock:
-            connections = list(self._connections)
+            outboxes = list(self._outboxes.values())
 
-        if not connections:
+        if not outboxes:
             return
 
-        tasks = [self._safe_send(connection, message) for connection in connections]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        for outbox in outboxes:
+            outbox.offer(frame, coalesce_key)
+        # Let the writers take their first turn before the caller moves on.
+        await asyncio.sleep(0)
 
-    # --------------------------------------------------
-    # SAFE SEND
-    # --------------------------------------------------
-
-    async def _safe_send(self, websocket: WebSocket, message):
+    async def send_encoded(self, websocket: WebSocket, text: str):
+        """Queue an already-encoded JSON frame (shared by many sockets) for one socket."""
+        with self._lock:
+            outbox = self._outboxes.get(id(websocket))
+        if outbox is not None:
+            outbox.offer(text)
+            return
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(text)
         except Exception as e:
             logger.warning("WebSocket send error: %s", e)
             self.disconnect(websocket)
 
+    def _evict(self, websocket: Any, reason: str) -> None:
+        self.disconnect(websocket)
+        if reason == "slow_consumer":
+            asyncio.get_running_loop().create_task(
+                _close_websocket(websocket, SLOW_CONSUMER_CLOSE_CODE, "slow_consumer")
+            )
+
     # --------------------------------------------------
     # STATS
     # --------------------------------------------------
@@ -219,12 +270,16 @@ class ConnectionManager:
             active = len(self._connections)
             pending = self._pending_accepts
             limit = self._limit()
+            queued = sum(len(outbox) for outbox in self._outboxes.values())
         return {
             "active": active,
             "connections": active,
             "total": active,
             "limit": limit,
             "pending_accepts": pending,
+            "queued_frames": queued,
+            "queue_limit": self._queue_size,
+            "queue_policy": self._queue_policy,
         }
 
 
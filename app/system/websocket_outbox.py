@@ -0,0 +1,166 @@
+# =====================================================
+# WEBSOCKET OUTBOX
+# Bounded per-connection send queues
+# =====================================================
+
+"""One bounded send queue per socket, drained by that socket's own writer task.
+
+ConnectionManager/RoomWebSocketManager used to broadcast with
+`asyncio.gather(send_json(...))` over every socket. That re-encoded the message per
+socket, and one client that stopped reading held the whole gather (and the chat
+route awaiting it) for as long as its TCP buffer stayed full. Now:
+
+* the message is encoded once and the same text frame is offered to every outbox;
+* `offer()` never awaits. When the queue is full, the policy decides what gives:
+  `drop_oldest` (default) discards the oldest frame, `drop_newest` the incoming one,
+  and `coalesce` replaces a queued frame that has the same coalescing key (falling
+  back to drop_oldest);
+* a consumer whose oldest undelivered frame (or the send in flight) is older than
+  WS_SLOW_CONSUMER_LAG_SECONDS is evicted: its manager forgets it and closes the
+  socket with 1013 "slow_consumer". A failed send evicts the same way.
+
+Queue depth and enqueued/sent/dropped/coalesced/evicted/send_failed counters are exported per
+room through system_metrics (room "market" for /ws/market).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Hashable, Optional, Tuple
+
+from app.system.system_metrics import adjust_ws_queue_depth, record_ws_queue_event
+
+logger = logging.getLogger("stocknewsbr.websocket_outbox")
+
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+WS_SEND_QUEUE_SIZE = max(1, int(os.getenv("WS_SEND_QUEUE_SIZE", "64") or 64))
+WS_SEND_QUEUE_POLICY = str(os.getenv("WS_SEND_QUEUE_POLICY", "drop_oldest") or "drop_oldest").strip().lower()
+if WS_SEND_QUEUE_POLICY not in POLICIES:
+    WS_SEND_QUEUE_POLICY = "drop_oldest"
+WS_SLOW_CONSUMER_LAG_SECONDS = max(0.5, float(os.getenv("WS_SLOW_CONSUMER_LAG_SECONDS", "15") or 15))
+
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ConnectionOutbox:
+    """Send queue and writer task of one socket."""
+
+    def __init__(
+        self,
+        websocket: Any,
+        room: str,
+        *,
+        max_size: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SEND_QUEUE_POLICY,
+        lag_seconds: float = WS_SLOW_CONSUMER_LAG_SECONDS,
+        on_evict: Optional[Callable[[Any, str], None]] = None,
+    ):
+        self.websocket = websocket
+        self.room = room
+        self.max_size = max(1, int(max_size))
+        self.policy = policy if policy in POLICIES else "drop_oldest"
+        self.lag_seconds = float(lag_seconds)
+        self._on_evict = on_evict
+        self._queue: Deque[Tuple[Optional[Hashable], str, float]] = deque()
+        self._ready = asyncio.Event()
+        self._sending_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def start(self) -> "ConnectionOutbox":
+        self._task = asyncio.get_running_loop().create_task(self._drain())
+        return self
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def lag(self, now: Optional[float] = None) -> float:
+        """Seconds the consumer is behind: oldest queued frame or the send in flight."""
+        now = time.monotonic() if now is None else now
+        starts = [t for t in (self._queue[0][2] if self._queue else None, self._sending_since) if t is not None]
+        return max(0.0, now - min(starts)) if starts else 0.0
+
+    def offer(self, frame: str, key: Optional[Hashable] = None) -> str:
+        """Queue `frame` without waiting; returns queued/coalesced/dropped/evicted/closed."""
+        if self.closed:
+            return "closed"
+        now = time.monotonic()
+        if self.lag(now) > self.lag_seconds:
+            self.evict("slow_consumer")
+            return "evicted"
+
+        if self.policy == "coalesce" and key is not None:
+            for index, (queued_key, _frame, enqueued_at) in enumerate(self._queue):
+                if queued_key == key:
+                    # Keep the original enqueue time so coalescing cannot hide lag.
+                    self._queue[index] = (key, frame, enqueued_at)
+                    record_ws_queue_event(self.room, "coalesced")
+                    return "coalesced"
+
+        if len(self._queue) >= self.max_size:
+            record_ws_queue_event(self.room, "dropped")
+            if self.policy == "drop_newest":
+                return "dropped"
+            self._queue.popleft()
+            adjust_ws_queue_depth(self.room, -1)
+
+        self._queue.append((key, frame, now))
+        adjust_ws_queue_depth(self.room, 1)
+        record_ws_queue_event(self.room, "enqueued")
+        self._ready.set()
+        return "queued"
+
+    async def _drain(self) -> None:
+        while not self.closed:
+            await self._ready.wait()
+            while self._queue and not self.closed:
+                _key, frame, _enqueued_at = self._queue.popleft()
+                adjust_ws_queue_depth(self.room, -1)
+                self._sending_since = time.monotonic()
+                try:
+                    await self.websocket.send_text(frame)
+                except Exception as exc:
+                    logger.warning("WebSocket send error (room=%s): %s", self.room, exc)
+                    self._sending_since = None
+                    self.evict("send_failed")
+                    return
+                self._sending_since = None
+                record_ws_queue_event(self.room, "sent")
+            self._ready.clear()
+
+    def close(self) -> None:
+        """Stop the writer and drop whatever is still queued (idempotent)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._queue:
+            adjust_ws_queue_depth(self.room, -len(self._queue))
+            self._queue.clear()
+        task, self._task = self._task, None
+        if task is not None and task is not _current_task():
+            task.cancel()
+        self._ready.set()
+
+    def evict(self, reason: str) -> None:
+        if self.closed:
+            return
+        logger.warning("Evicting WebSocket consumer (room=%s, reason=%s, lag=%.1fs)", self.room, reason, self.lag())
+        record_ws_queue_event(self.room, "evicted" if reason == "slow_consumer" else reason)
+        self.close()
+        if self._on_evict is not None:
+            try:
+                self._on_evict(self.websocket, reason)
+            except Exception as exc:
+                logger.warning("WebSocket eviction callback failed: %s", exc)
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
@@ -0,0 +1,337 @@
+# =====================================================
+# WORKER PIPELINE
+# Downstream worker stages on their own threads and queues
+# =====================================================
+
+"""Post-engine worker stages, decoupled from the engine cycle.
+
+worker_loop used to run paper trading, the outcome audit, push dispatch, the
+Telegram alerts and the quote/chart/news prewarms inline after each snapshot.
+A slow Telegram send or a large push fan-out pushed the next engine cycle past
+SCAN_INTERVAL.
+
+Now the engine loop only generates the snapshot and offers it to a
+WorkerPipeline. Each PipelineStage runs on its own thread, behind its own
+bounded queue, and the engine never waits for one:
+
+* a subscribed stage receives the snapshot payloads the engine offers, tagged
+  with their snapshot generation. Its delivery policy decides what a queue
+  that is still busy keeps:
+
+  - LATEST (latest-wins): one pending delivery; a newer generation replaces
+    it (counted as coalesced);
+  - ALL (at-least-once): every generation is delivered in order, and a failed
+    delivery is retried up to max_attempts times before it is given up. Up to
+    max_pending deliveries wait. Past that the newest queued delivery is
+    replaced by the one offered (counted as overflowed): the stage keeps the
+    generations ahead of it in order and then catches up on the latest
+    snapshot. The engine never waits, even on a stage that hangs. Every ALL
+    stage works from whole snapshots and keeps its own durable state (the push
+    outbox, the Telegram queue and dedup ledger, the paper-trading and outcome
+    caches), so what an overflowed generation loses is only what appeared and
+    vanished between the snapshots the stage did see;
+
+* a timer stage (interval_seconds) runs on its own cadence, first one interval
+  after start, whether or not a snapshot was offered. It always behaves as
+  LATEST.
+
+A stage run that takes longer than timeout_seconds is counted and logged, and
+status() reports the stage as stalled while it is still running. The run is
+not interrupted: a Python thread cannot be cancelled safely, and the stage's
+queue policy already bounds what piles up behind it.
+
+stop(drain=True) lets every subscribed stage finish what it has queued before
+returning, up to a deadline.
+
+The worker runs in its own service (the API has START_ENGINE_WORKER=false), so
+after every offer and at stop the per-stage status, including the generation
+each stage last delivered, is written to WORKER_PIPELINE_STATUS_FILE. A process
+with no pipeline of its own serves /system/worker/pipeline from that file. Each stage run is a profiled worker stage
+(app.system.worker_profiler); queue depth, lag and delivery events are
+recorded as worker_pipeline_* metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.atomic_io import read_json_file, write_json_file_atomic
+from app.core.test_runtime import is_test_process, runtime_scratch_root
+from app.system.system_metrics import (
+    provider_call_context,
+    record_worker_pipeline_event,
+    set_worker_pipeline_queue,
+)
+from app.system.worker_profiler import profile_stage
+
+logger = logging.getLogger("stocknewsbr.worker_pipeline")
+
+LATEST = "latest"
+ALL = "all"
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_active_lock = threading.Lock()
+_active_pipeline: Optional["WorkerPipeline"] = None
+
+
+def worker_pipeline_status_path() -> Path:
+    configured = os.getenv("WORKER_PIPELINE_STATUS_FILE")
+    if configured:
+        path = Path(configured)
+        return path if path.is_absolute() else _PROJECT_ROOT / path
+    if is_test_process():
+        return runtime_scratch_root("worker-pipeline") / "worker_pipeline.json"
+    return _PROJECT_ROOT / "runtime" / "cache" / "worker_pipeline.json"
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    """One downstream worker stage and its scheduling policy.
+
+    A subscribed stage's handler is called with the snapshot payload; a timer
+    stage's handler (interval_seconds set) is called with no arguments.
+    """
+
+    name: str
+    handler: Callable[..., Any]
+    delivery: str = LATEST
+    interval_seconds: Optional[float] = None
+    max_pending: int = 16
+    timeout_seconds: float = 60.0
+    max_attempts: int = 3
+    retry_seconds: float = 1.0
+
+
+@dataclass
+class Delivery:
+    generation: Optional[int]
+    payload: Any
+    offered_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class _StageRunner:
+    """The thread, queue and counters behind one PipelineStage."""
+
+    def __init__(self, stage: PipelineStage, source: str):
+        self.stage = stage
+        self.source = source
+        self.pending: deque = deque()
+        self.cond = threading.Condition()
+        self.stopping = False
+        self.abandon = threading.Event()
+        self.running_since: Optional[float] = None
+        self.last_generation: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self.overflowed = 0
+        self.next_tick = time.monotonic() + float(stage.interval_seconds or 0.0)
+        self.thread = threading.Thread(target=self._run, name=f"worker-pipeline-{stage.name}", daemon=True)
+
+    @property
+    def timer(self) -> bool:
+        return self.stage.interval_seconds is not None
+
+    def offer(self, delivery: Delivery) -> None:
+        with self.cond:
+            if self.stage.delivery == ALL:
+                if len(self.pending) >= max(1, self.stage.max_pending):
+                    # The newest queued generation is superseded; older ones keep their order.
+                    replaced = self.pending.pop()
+                    self.overflowed += 1
+                    record_worker_pipeline_event(self.stage.name, "overflowed")
+                    logger.warning(
+                        "Worker pipeline stage %s is full; generation %s replaces queued generation %s",
+                        self.stage.name,
+                        delivery.generation,
+                        replaced.generation,
+                    )
+            elif self.pending:
+                self.pending.clear()
+                record_worker_pipeline_event(self.stage.name, "coalesced")
+            self.pending.append(delivery)
+            record_worker_pipeline_event(self.stage.name, "offered")
+            set_worker_pipeline_queue(self.stage.name, len(self.pending))
+            self.cond.notify()
+
+    def _next(self) -> Optional[Delivery]:
+        with self.cond:
+            while True:
+                if self.pending:
+                    delivery = self.pending.popleft()
+                    set_worker_pipeline_queue(self.stage.name, len(self.pending))
+                    return delivery
+                if self.stopping:
+                    return None
+                if not self.timer:
+                    self.cond.wait()
+                    continue
+                remaining = self.next_tick - time.monotonic()
+                if remaining <= 0:
+                    self.next_tick = time.monotonic() + float(self.stage.interval_seconds)
+                    return Delivery(None, None)
+                self.cond.wait(remaining)
+
+    def _run(self) -> None:
+        while True:
+            delivery = self._next()
+            if delivery is None:
+                return
+            self._deliver(delivery)
+
+    def _deliver(self, delivery: Delivery) -> None:
+        stage = self.stage
+        while True:
+            delivery.attempts += 1
+            self.running_since = time.monotonic()
+            ok = False
+            try:
+                with provider_call_context(self.source), profile_stage(stage.name):
+                    if self.timer:
+                        stage.handler()
+                    else:
+                        stage.handler(delivery.payload)
+                ok = True
+            except Exception as exc:
+                # Handlers log their own traceback; this only ties it to the delivery.
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                logger.warning(
+                    "Worker pipeline stage %s failed | generation=%s attempt=%s | %s",
+                    stage.name,
+                    delivery.generation,
+                    delivery.attempts,
+                    self.last_error,
+                )
+            finally:
+                duration = time.monotonic() - self.running_since
+                self.running_since = None
+                if duration > stage.timeout_seconds:
+                    record_worker_pipeline_event(stage.name, "timeouts")
+                    logger.warning(
+                        "Worker pipeline stage %s took %.1fs (timeout %.1fs)", stage.name, duration, stage.timeout_seconds
+                    )
+
+            if ok:
+                self.last_generation = delivery.generation
+                record_worker_pipeline_event(stage.name, "delivered")
+                set_worker_pipeline_queue(stage.name, len(self.pending), time.monotonic() - delivery.offered_at)
+                return
+            if stage.delivery != ALL or delivery.attempts >= max(1, stage.max_attempts):
+                record_worker_pipeline_event(stage.name, "failed")
+                return
+            record_worker_pipeline_event(stage.name, "retried")
+            if self.abandon.wait(stage.retry_seconds * delivery.attempts):
+                record_worker_pipeline_event(stage.name, "failed")
+                return
+
+    def status(self) -> Dict[str, Any]:
+        running_since = self.running_since
+        running_seconds = time.monotonic() - running_since if running_since is not None else None
+        return {
+            "delivery": self.stage.delivery,
+            "interval_seconds": self.stage.interval_seconds,
+            "pending": len(self.pending),
+            "pending_generations": [delivery.generation for delivery in list(self.pending)],
+            "last_generation": self.last_generation,
+            "overflowed": self.overflowed,
+            "running_seconds": round(running_seconds, 6) if running_seconds is not None else None,
+            "stalled": running_seconds is not None and running_seconds > self.stage.timeout_seconds,
+            "last_error": self.last_error,
+            "alive": self.thread.is_alive(),
+        }
+
+
+class WorkerPipeline:
+    """Runs PipelineStages on their own threads; the engine loop only offers payloads."""
+
+    def __init__(self, stages: Iterable[PipelineStage], source: str = "worker"):
+        self._runners: Dict[str, _StageRunner] = {}
+        for stage in stages:
+            if stage.delivery not in (LATEST, ALL):
+                raise ValueError(f"unknown delivery policy for stage {stage.name}: {stage.delivery}")
+            self._runners[stage.name] = _StageRunner(stage, source)
+
+    def start(self) -> "WorkerPipeline":
+        global _active_pipeline
+
+        for runner in self._runners.values():
+            runner.thread.start()
+        with _active_lock:
+            _active_pipeline = self
+        return self
+
+    def offer(self, generation: Optional[int], payload: Any) -> None:
+        """Hand one snapshot generation to every subscribed stage without waiting."""
+        for runner in self._runners.values():
+            if not runner.timer:
+                runner.offer(Delivery(generation, payload))
+        self._publish(running=True)
+
+    def stop(self, drain: bool = True, timeout: float = 30.0) -> List[str]:
+        """Stop every stage and return the subscribed stages still running at the deadline.
+
+        With drain, queued deliveries run first; without it they are discarded and
+        retries are abandoned. Timer stages are told to stop but not waited for: a
+        prewarm in flight has nothing queued behind it to lose.
+        """
+        global _active_pipeline
+
+        for runner in self._runners.values():
+            with runner.cond:
+                runner.stopping = True
+                if not drain:
+                    runner.pending.clear()
+                    runner.abandon.set()
+                runner.cond.notify()
+        with _active_lock:
+            if _active_pipeline is self:
+                _active_pipeline = None
+        deadline = time.monotonic() + max(0.0, timeout)
+        subscribed = {name: runner for name, runner in self._runners.items() if not runner.timer}
+        for runner in subscribed.values():
+            if runner.thread.is_alive():
+                runner.thread.join(max(0.0, deadline - time.monotonic()))
+        unfinished = [name for name, runner in subscribed.items() if runner.thread.is_alive()]
+        if unfinished:
+            logger.warning("Worker pipeline stages still running at shutdown: %s", ", ".join(unfinished))
+        self._publish(running=False)
+        return unfinished
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: runner.status() for name, runner in self._runners.items()}
+
+    def _publish(self, running: bool) -> None:
+        payload = {"running": running, "stages": self.status(), "pid": os.getpid(), "published_at": time.time()}
+        try:
+            write_json_file_atomic(worker_pipeline_status_path(), payload)
+        except Exception as exc:
+            logger.warning("Worker pipeline status could not be published: %s", exc)
+
+
+def get_worker_pipeline_status() -> Dict[str, Any]:
+    """Per-stage queue and run state of the worker pipeline.
+
+    Served from this process when it runs a pipeline, otherwise from the file
+    the worker service publishes.
+    """
+    with _active_lock:
+        pipeline = _active_pipeline
+    if pipeline is not None:
+        return {"running": True, "stages": pipeline.status(), "source": "local"}
+
+    try:
+        published = read_json_file(worker_pipeline_status_path(), dict)
+    except OSError:
+        published = {}
+    if not isinstance(published, dict) or not isinstance(published.get("stages"), dict):
+        return {"running": False, "stages": {}, "source": "none"}
+    published["running"] = bool(published.get("running"))
+    published["source"] = "worker"
+    return published
@@ -0,0 +1,301 @@
+# =====================================================
+# WORKER STAGE PROFILER
+# Per-cycle stage trees with wall, CPU and allocation costs
+# =====================================================
+
+"""Stage instrumentation for the worker cycle.
+
+worker_loop runs the engine, the snapshot, paper trading, the outcome audit,
+the push and Telegram dispatch and the prewarms one after the other. Each of
+those only reported a wall time (worker_stage_seconds), so a slow cycle said
+which top-level stage was slow but not which enrichment pass or AI tool inside
+it, and not whether the time went to CPU or to waiting on I/O.
+
+profile_cycle() opens a cycle and profile_stage() opens a stage inside whatever
+cycle or stage is current in this context, so nested stages form a tree. Each
+stage records:
+
+* wall time (perf_counter) and CPU time of the running thread (thread_time);
+* net allocated blocks (sys.getallocatedblocks), and net allocated bytes while
+  tracemalloc is tracing (WORKER_PROFILE_TRACEMALLOC=1 starts it, at a real
+  cost to the cycle);
+* the worker_stage_seconds metric it replaces, and a ring-buffered histogram
+  (system_metrics.record_worker_stage_profile) exported as quantiles.
+
+The last WORKER_PROFILE_CYCLES cycle trees are kept for /system/worker/profile.
+The worker runs in its own service (the API has START_ENGINE_WORKER=false), so
+after every cycle the trees, the slowest cycle's stacks and the stage histograms
+are also written to WORKER_PROFILE_FILE; a process with no cycles of its own
+serves the profile from that file. A stage opened outside any cycle (the API
+process building a snapshot, a worker pipeline stage on its own thread) still
+records its metrics; it is just not part of a tree.
+
+WORKER_PROFILE_SAMPLING=1 also samples the worker thread's Python stack every
+WORKER_PROFILE_SAMPLE_INTERVAL_MS while a cycle runs, and keeps the folded stacks
+of the slowest retained cycle. Sampling is off by default.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.atomic_io import read_json_file, write_json_file_atomic
+from app.core.test_runtime import is_test_process, runtime_scratch_root
+from app.system.system_metrics import (
+    get_worker_stage_profile_snapshot,
+    record_worker_stage_duration,
+    record_worker_stage_profile,
+)
+
+logger = logging.getLogger("stocknewsbr.worker_profiler")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() not in {"0", "false", "no", "off"}
+
+
+WORKER_PROFILE_ENABLED = _env_flag("WORKER_PROFILE_ENABLED", "1")
+WORKER_PROFILE_SAMPLING = _env_flag("WORKER_PROFILE_SAMPLING", "0")
+WORKER_PROFILE_TRACEMALLOC = _env_flag("WORKER_PROFILE_TRACEMALLOC", "0")
+WORKER_PROFILE_CYCLES = max(1, int(os.getenv("WORKER_PROFILE_CYCLES", "20")))
+WORKER_PROFILE_SAMPLE_INTERVAL_MS = max(1.0, float(os.getenv("WORKER_PROFILE_SAMPLE_INTERVAL_MS", "5")))
+
+STACK_DEPTH_LIMIT = 64
+STACKS_PER_CYCLE = 25
+
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("worker_profile_span", default=None)
+_lock = threading.Lock()
+_cycle_ids = itertools.count(1)
+_cycles: deque = deque(maxlen=WORKER_PROFILE_CYCLES)
+_cycle_stacks: Dict[int, Dict[str, Any]] = {}
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def worker_profile_path() -> Path:
+    configured = os.getenv("WORKER_PROFILE_FILE")
+    if configured:
+        path = Path(configured)
+        return path if path.is_absolute() else _PROJECT_ROOT / path
+    if is_test_process():
+        return runtime_scratch_root("worker-profile") / "worker_profile.json"
+    return _PROJECT_ROOT / "runtime" / "cache" / "worker_profile.json"
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer thread."""
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="worker-profile-sampler", daemon=True)
+
+    def start(self) -> "_StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        return {
+            "interval_seconds": self.interval_seconds,
+            "samples": self.samples,
+            "stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in self.stacks.most_common(STACKS_PER_CYCLE)
+            ],
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and len(labels) < STACK_DEPTH_LIMIT:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.samples += 1
+                # Folded, outermost frame first, as flame graph tools read it.
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+def _allocated_bytes() -> Optional[int]:
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Time the enclosed block as stage `name` and yield its span.
+
+    The span dict is filled in when the block exits; an exception leaving the
+    block marks the stage failed and propagates.
+    """
+    span: Dict[str, Any] = {"stage": str(name), "ok": True, "children": []}
+    if not WORKER_PROFILE_ENABLED:
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span["ok"] = False
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            span["wall_seconds"] = round(wall, 6)
+            record_worker_stage_duration(name, wall, success=span["ok"])
+        return
+
+    parent = _current_span.get()
+    token = _current_span.set(span)
+    blocks = sys.getallocatedblocks()
+    traced = _allocated_bytes()
+    cpu_start = time.thread_time()
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException:
+        span["ok"] = False
+        raise
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start
+        _current_span.reset(token)
+        span["wall_seconds"] = round(wall, 6)
+        span["cpu_seconds"] = round(cpu, 6)
+        span["allocated_blocks"] = sys.getallocatedblocks() - blocks
+        traced_after = _allocated_bytes()
+        if traced is not None and traced_after is not None:
+            span["allocated_bytes"] = traced_after - traced
+        if parent is not None:
+            parent["children"].append(span)
+        record_worker_stage_duration(name, wall, success=span["ok"])
+        record_worker_stage_profile(
+            name,
+            wall,
+            cpu,
+            allocated_blocks=span["allocated_blocks"],
+            allocated_bytes=span.get("allocated_bytes"),
+            success=span["ok"],
+        )
+
+
+@contextmanager
+def profile_cycle(name: str = "cycle"):
+    """Profile one worker cycle as the root of a stage tree and keep the tree."""
+    if not WORKER_PROFILE_ENABLED:
+        with profile_stage(name) as span:
+            yield span
+        return
+
+    if WORKER_PROFILE_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    cycle_id = next(_cycle_ids)
+    started_at = time.time()
+    sampler = None
+    if WORKER_PROFILE_SAMPLING:
+        sampler = _StackSampler(threading.get_ident(), WORKER_PROFILE_SAMPLE_INTERVAL_MS / 1000.0).start()
+
+    # A cycle is always the root of its tree, even when opened inside a stage.
+    token = _current_span.set(None)
+    try:
+        with profile_stage(name) as span:
+            span["cycle"] = cycle_id
+            span["started_at"] = started_at
+            yield span
+    finally:
+        _current_span.reset(token)
+        stacks = sampler.stop() if sampler is not None else None
+        with _lock:
+            if len(_cycles) == _cycles.maxlen:
+                _cycle_stacks.pop(_cycles[0]["cycle"], None)
+            _cycles.append(span)
+            if stacks is not None:
+                _cycle_stacks[cycle_id] = stacks
+        _publish()
+        logger.debug(
+            "Worker cycle %s | %.1fms wall | %.1fms cpu | %s",
+            cycle_id,
+            span["wall_seconds"] * 1000,
+            span.get("cpu_seconds", 0.0) * 1000,
+            " ".join(f"{child['stage']}={child['wall_seconds'] * 1000:.1f}ms" for child in span["children"]),
+        )
+
+
+def _profile(cycles: List[Dict[str, Any]], stacks: Dict[int, Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Profile payload from cycle trees (oldest first) and their sampled stacks."""
+    slowest = max(cycles, key=lambda cycle: cycle["wall_seconds"], default=None)
+    slowest_stacks = dict(stacks.get(slowest["cycle"], {})) if slowest else {}
+    return {
+        "enabled": WORKER_PROFILE_ENABLED,
+        "sampling": WORKER_PROFILE_SAMPLING,
+        "tracemalloc": tracemalloc.is_tracing(),
+        "cycle_limit": WORKER_PROFILE_CYCLES,
+        "cycles": cycles[::-1][: max(0, int(limit))],
+        "slowest_cycle": (
+            {
+                "cycle": slowest["cycle"],
+                "wall_seconds": slowest["wall_seconds"],
+                "started_at": slowest.get("started_at"),
+                **slowest_stacks,
+            }
+            if slowest
+            else None
+        ),
+        "stages": get_worker_stage_profile_snapshot(),
+    }
+
+
+def _publish() -> None:
+    with _lock:
+        cycles = list(_cycles)
+        stacks = dict(_cycle_stacks)
+    payload = _profile(cycles, stacks, WORKER_PROFILE_CYCLES)
+    payload["pid"] = os.getpid()
+    payload["published_at"] = time.time()
+    try:
+        write_json_file_atomic(worker_profile_path(), payload)
+    except Exception as exc:
+        logger.warning("Worker profile could not be published: %s", exc)
+
+
+def get_worker_profile(limit: int = WORKER_PROFILE_CYCLES) -> Dict[str, Any]:
+    """The last `limit` cycle trees, newest first, with the stage histograms.
+
+    Served from this process when it ran cycles, otherwise from the file the
+    worker service publishes.
+    """
+    with _lock:
+        cycles: List[Dict[str, Any]] = list(_cycles)
+        stacks = dict(_cycle_stacks)
+    if cycles:
+        profile = _profile(cycles, stacks, limit)
+        profile["source"] = "local"
+        return profile
+
+    try:
+        published = read_json_file(worker_profile_path(), dict)
+    except OSError:
+        published = {}
+    if not isinstance(published, dict) or not published.get("cycles"):
+        profile = _profile([], {}, limit)
+        profile["source"] = "none"
+        return profile
+    published["cycles"] = list(published["cycles"])[: max(0, int(limit))]
+    published["source"] = "worker"
+    return published
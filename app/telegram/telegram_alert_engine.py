@@ -25,6 +25,18 @@ from app.system.kill_switches import alert_channel_block_reason, symbol_block_re
 from app.system.observability_engine import record_observability_event
 from app.system.system_metrics import get_telegram_alert_metrics_snapshot, record_telegram_alert_metric
 from app.telegram.telegram_alert_formatter import format_signal_alert
+from app.telegram.telegram_alert_queue import (
+    OUTCOME_EXPIRED,
+    OUTCOME_FAILED,
+    OUTCOME_SENT,
+    OUTCOME_UNKNOWN,
+    TELEGRAM_DEFAULT_RETRY_AFTER_SECONDS,
+    TelegramAlertQueue,
+    TelegramAlertSender,
+    TelegramRateLimiter,
+    TelegramRetryAfter,
+    telegram_queue_path,
+)
 
 logger = logging.getLogger("stocknewsbr.telegram")
 
@@ -39,8 +51,6 @@ BASE_URL = "https://api.telegram.org/bot"
 
 TIMEOUT = (3, 6)
 
-MIN_ALERT_INTERVAL = 1
-
 TELEGRAM_ALERT_COOLDOWN_SECONDS = max(60, int(getattr(settings, "TELEGRAM_ALERT_COOLDOWN_SECONDS", 1800) or 1800))
 MAX_ALERTS_PER_BATCH = max(1, int(getattr(settings, "TELEGRAM_MAX_ALERTS_PER_BATCH", 5) or 5))
 MAX_ALERT_HISTORY = 100
@@ -65,14 +75,16 @@ ALERT_ORDER = {
 # STATE
 # =====================================================
 
-_last_alert_time = 0.0
-
 _lock = threading.RLock()
 
-_sent_fingerprints: dict[str, float] = {}
-_cooldown_until: dict[str, float] = {}
+# Fingerprints, cooldowns e a fila de envio ficam no SQLite compartilhado
+# (telegram_alert_queue): sobrevivem a restart e valem entre processos.
 _alert_history: deque[dict[str, Any]] = deque(maxlen=MAX_ALERT_HISTORY)
 
+_limiter = TelegramRateLimiter()
+_queue: TelegramAlertQueue | None = None
+_sender: TelegramAlertSender | None = None
+
 # =====================================================
 # HTTP SESSION
 # =====================================================
@@ -82,10 +94,12 @@ _session = requests.Session()
 # Mission 32: retries limitados com backoff exponencial; jitter quando o
 # urllib3 instalado suportar (>=2.0). HTTP 400 fica fora do forcelist de
 # propósito: payload inválido é erro permanente e não deve ser re-tentado.
+# HTTP 429 também fica fora: o retry_after do Telegram é honrado pela fila
+# (TelegramRetryAfter), sem bloquear a thread com backoff do urllib3.
 _RETRY_KWARGS = dict(
     total=3,
     backoff_factor=0.5,
-    status_forcelist=[429],
+    status_forcelist=[],
     allowed_methods=["POST"],
 )
 
@@ -222,24 +236,6 @@ def _record_event(event: dict[str, Any], metric: str, alert_level: str | None =
     )
 
 
-def _prune_state(now: float, cooldown_seconds: int) -> None:
-    expired_fingerprints = [
-        key
-        for key, last_seen in _sent_fingerprints.items()
-        if now - float(last_seen or 0.0) > max(60, cooldown_seconds)
-    ]
-    for key in expired_fingerprints:
-        _sent_fingerprints.pop(key, None)
-
-    expired_cooldowns = [
-        key
-        for key, cooldown_until in _cooldown_until.items()
-        if float(cooldown_until or 0.0) <= now
-    ]
-    for key in expired_cooldowns:
-        _cooldown_until.pop(key, None)
-
-
 def telegram_alert_fingerprint(signal: dict[str, Any]) -> str:
     if not isinstance(signal, dict):
         return ""
@@ -389,24 +385,31 @@ def _scrub_secret(text: Any) -> str:
     return value
 
 
+def _retry_after_seconds(response) -> float:
+    # O Bot API informa a espera em parameters.retry_after; o header
+    # Retry-After é o fallback HTTP padrão.
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get("Retry-After"))
+    except Exception:
+        return TELEGRAM_DEFAULT_RETRY_AFTER_SECONDS
+
+
 def _send_alert_transport(message: str) -> str:
     """Envia a mensagem e devolve TRANSPORT_SENT/FAILED/UNKNOWN.
 
     UNKNOWN = a requisição pode ter chegado ao provider (ex.: read timeout);
     o chamador NÃO deve re-enviar automaticamente para evitar duplicação.
+    HTTP 429 levanta TelegramRetryAfter: o ritmo de envio é da fila, não
+    desta função (sem sleep na thread chamadora).
     """
-    global _last_alert_time
-
     if not TELEGRAM_TOKEN or not CHAT_ID:
         logger.warning("Telegram token or chat_id not configured")
         return TRANSPORT_FAILED
 
-    with _lock:
-        elapsed = time.time() - _last_alert_time
-        if elapsed < MIN_ALERT_INTERVAL:
-            time.sleep(MIN_ALERT_INTERVAL - elapsed)
-        _last_alert_time = time.time()
-
     url = f"{BASE_URL}{TELEGRAM_TOKEN}/sendMessage"
 
     # Mission 32: texto plano (sem parse_mode). O template não usa marcação e
@@ -427,6 +430,9 @@ def _send_alert_transport(message: str) -> str:
         logger.error("Telegram send error: %s", _scrub_secret(e))
         return TRANSPORT_FAILED
 
+    if r.status_code == 429:
+        raise TelegramRetryAfter(_retry_after_seconds(r))
+
     if r.status_code != 200:
         logger.warning("Telegram status %s", r.status_code)
         return TRANSPORT_FAILED
@@ -453,6 +459,73 @@ def _coerce_transport_status(value) -> str:
 # SIGNAL ALERT
 # =====================================================
 
+def _alert_queue() -> TelegramAlertQueue:
+    global _queue
+
+    with _lock:
+        if _queue is None or _queue.path != telegram_queue_path():
+            _queue = TelegramAlertQueue()
+        return _queue
+
+
+def _chat_key() -> str:
+    return str(CHAT_ID or "default")
+
+
+def _queue_transport(chat_id: str, text: str) -> str:
+    return _coerce_transport_status(send_alert(text))
+
+
+def _settled_event(message: dict[str, Any], outcome: str) -> dict[str, Any] | None:
+    """Evento auditável do desfecho de um alerta que passou pela fila."""
+    event = dict(message.get("event") or {})
+    alert_level = event.get("alert_level")
+    event["timestamp"] = time.time()
+
+    if outcome == OUTCOME_SENT:
+        event.update(status="sent", reason="contratos finais justificam alerta institucional", message=message["text"][:400])
+        _record_event(event, "sent", alert_level=alert_level)
+    elif outcome == OUTCOME_UNKNOWN:
+        # Mission 32: timeout ambíguo — a mensagem pode ter sido entregue.
+        # A fila mantém a reserva do fingerprint (sem re-envio automático que
+        # duplicaria o alerta) e o resultado fica UNKNOWN, nunca DELIVERED.
+        event.update(status="unknown", reason="telegram_send_timeout_ambiguous")
+        _record_event(event, "errors", alert_level=alert_level)
+    elif outcome == OUTCOME_FAILED:
+        # Falha definitiva: a fila libera a reserva para não mascarar futuros
+        # alertas (retry legítimo em ciclo seguinte).
+        event.update(status="error", reason="telegram_send_failed")
+        _record_event(event, "errors", alert_level=alert_level)
+    elif outcome == OUTCOME_EXPIRED:
+        event.update(status="expired", reason="telegram_alert_expired_in_queue")
+        _record_event(event, "expired", alert_level=alert_level)
+    else:
+        return None
+    return event
+
+
+def _deliver_inline(queue: TelegramAlertQueue, message_id: int) -> dict[str, Any] | None:
+    """Sem sender dedicado no processo: entrega na thread chamadora.
+
+    Os limites do token bucket e o retry_after continuam valendo; quem chama
+    de forma síncrona aceita esperar por eles. Retorna None se outro processo
+    (o sender do worker) assumiu a mensagem.
+    """
+    sender = TelegramAlertSender(queue, _queue_transport, limiter=_limiter)
+    while True:
+        message = queue.claim(message_id)
+        if message is None:
+            due_at = queue.available_at(message_id)
+            if due_at is None:
+                return None
+            time.sleep(min(1.0, max(0.01, due_at - time.time())))
+            continue
+        outcome = sender.deliver(message)
+        event = _settled_event(message, outcome) if outcome is not None else None
+        if event is not None:
+            return event
+
+
 def _dispatch_prepared_alert(
     signal: dict[str, Any],
     prepared: dict[str, Any],
@@ -467,86 +540,47 @@ def _dispatch_prepared_alert(
     fingerprint = str(prepared.get("fingerprint") or telegram_alert_fingerprint(signal))
     equivalent_key = _cooldown_key(signal, alert_level)
 
-    with _lock:
-        _prune_state(current_time, cooldown)
-        last_fingerprint = _sent_fingerprints.get(fingerprint)
-        if last_fingerprint and current_time - float(last_fingerprint or 0.0) < cooldown:
-            event = _event_payload(
-                signal=signal,
-                status="deduplicated",
-                reason="telegram_alert_fingerprint repetido em curto periodo",
-                alert_level=alert_level,
-                fingerprint=fingerprint,
-            )
-            _record_event(event, "deduplicated", alert_level=alert_level)
-            return event
-
-        cooldown_until = float(_cooldown_until.get(equivalent_key) or 0.0)
-        if cooldown_until > current_time:
-            event = _event_payload(
-                signal=signal,
-                status="cooldown",
-                reason="alerta equivalente em cooldown",
-                alert_level=alert_level,
-                fingerprint=fingerprint,
-            )
-            event["cooldown_remaining_seconds"] = int(cooldown_until - current_time)
-            _record_event(event, "cooldown", alert_level=alert_level)
-            return event
-
-        # Mission 31F: reserva o fingerprint antes de liberar o lock para que
-        # envios concorrentes do mesmo alerta sejam deduplicados de forma
-        # determinística (apenas um envia).
-        _sent_fingerprints[fingerprint] = current_time
-
     message = f"{ALERT_LABELS.get(alert_level, 'ALERTA')}\n\n{format_signal_alert(signal, regime)}"
-    transport_status = _coerce_transport_status(send_alert(message))
+    event = _event_payload(
+        signal=signal,
+        status="queued",
+        reason="alerta institucional na fila de envio do Telegram",
+        alert_level=alert_level,
+        fingerprint=fingerprint,
+    )
 
-    if transport_status == TRANSPORT_SENT:
-        with _lock:
-            _sent_fingerprints[fingerprint] = current_time
-            _cooldown_until[equivalent_key] = current_time + cooldown
-        event = _event_payload(
-            signal=signal,
-            status="sent",
-            reason="contratos finais justificam alerta institucional",
-            alert_level=alert_level,
-            fingerprint=fingerprint,
-            message=message[:400],
-        )
-        _record_event(event, "sent", alert_level=alert_level)
+    # Mission 31F: a reserva do fingerprint e o enfileiramento são uma única
+    # transação no ledger compartilhado, então envios concorrentes do mesmo
+    # alerta (inclusive de outro processo) são deduplicados: apenas um envia.
+    queue = _alert_queue()
+    reservation = queue.reserve(
+        fingerprint=fingerprint,
+        cooldown_key=equivalent_key,
+        now=current_time,
+        cooldown_seconds=cooldown,
+        chat_id=_chat_key(),
+        text=message,
+        event=event,
+    )
+
+    if reservation["status"] == "deduplicated":
+        event.update(status="deduplicated", reason="telegram_alert_fingerprint repetido em curto periodo")
+        _record_event(event, "deduplicated", alert_level=alert_level)
         return event
 
-    if transport_status == TRANSPORT_UNKNOWN:
-        # Mission 32: timeout ambíguo — a mensagem pode ter sido entregue.
-        # Mantém a reserva do fingerprint (sem re-envio automático que
-        # duplicaria o alerta) e registra o resultado como UNKNOWN, nunca
-        # como DELIVERED. O evento auditável impede perda silenciosa.
-        event = _event_payload(
-            signal=signal,
-            status="unknown",
-            reason="telegram_send_timeout_ambiguous",
-            alert_level=alert_level,
-            fingerprint=fingerprint,
-        )
-        _record_event(event, "errors", alert_level=alert_level)
+    if reservation["status"] == "cooldown":
+        event.update(status="cooldown", reason="alerta equivalente em cooldown")
+        event["cooldown_remaining_seconds"] = int(reservation["remaining_seconds"])
+        _record_event(event, "cooldown", alert_level=alert_level)
         return event
 
-    with _lock:
-        # Falha definitiva no envio: libera a reserva para não mascarar
-        # futuros alertas (retry legítimo em ciclo seguinte).
-        if _sent_fingerprints.get(fingerprint) == current_time:
-            _sent_fingerprints.pop(fingerprint, None)
+    sender = _sender
+    if sender is not None and sender.running:
+        sender.notify()
+        _record_event(event, "queued", alert_level=alert_level)
+        return event
 
-    event = _event_payload(
-        signal=signal,
-        status="error",
-        reason="telegram_send_failed",
-        alert_level=alert_level,
-        fingerprint=fingerprint,
-    )
-    _record_event(event, "errors", alert_level=alert_level)
-    return event
+    return _deliver_inline(queue, reservation["id"]) or event
 
 
 def send_signal_alert(signal: dict, regime=None, *, now: float | None = None, cooldown_seconds: int | None = None):
@@ -586,7 +620,7 @@ def send_signal_alert(signal: dict, regime=None, *, now: float | None = None, co
 def send_bulk_alert(signals, regime=None, *, now: float | None = None, cooldown_seconds: int | None = None, max_alerts: int | None = None):
 
     if not signals:
-        return {"sent": 0, "blocked": 0, "discarded": 0, "deduplicated": 0, "cooldown": 0, "errors": 0, "items": []}
+        return {"sent": 0, "queued": 0, "blocked": 0, "discarded": 0, "deduplicated": 0, "cooldown": 0, "errors": 0, "items": []}
 
     try:
         prepared_alerts: list[tuple[dict[str, Any], dict[str, Any]]] = []
@@ -638,12 +672,12 @@ def send_bulk_alert(signals, regime=None, *, now: float | None = None, cooldown_
                 )
             )
 
-        summary = {key: 0 for key in ("sent", "blocked", "discarded", "deduplicated", "cooldown", "errors")}
+        summary = {key: 0 for key in ("sent", "queued", "blocked", "discarded", "deduplicated", "cooldown", "errors")}
         for item in results:
             status = str(item.get("status") or "")
             if status in summary:
                 summary[status] += 1
-            elif status in {"error", "unknown"}:
+            elif status in {"error", "unknown", "expired"}:
                 summary["errors"] += 1
         summary["items"] = results
         return summary
@@ -653,7 +687,7 @@ def send_bulk_alert(signals, regime=None, *, now: float | None = None, cooldown_
         logger.error(f"Bulk alert error: {e}")
         event = _event_payload(signal=None, status="error", reason=str(e)[:160])
         _record_event(event, "errors")
-        return {"sent": 0, "blocked": 0, "discarded": 0, "deduplicated": 0, "cooldown": 0, "errors": 1, "items": [event]}
+        return {"sent": 0, "queued": 0, "blocked": 0, "discarded": 0, "deduplicated": 0, "cooldown": 0, "errors": 1, "items": [event]}
 
 
 def get_telegram_alert_history(limit: int = 20) -> list[dict[str, Any]]:
@@ -664,7 +698,7 @@ def get_telegram_alert_history(limit: int = 20) -> list[dict[str, Any]]:
 
 def get_telegram_health() -> dict[str, Any]:
     metrics = get_telegram_alert_metrics_snapshot()
-    activity = sum(int(metrics.get(key, 0) or 0) for key in ("sent", "blocked", "discarded", "deduplicated", "cooldown"))
+    activity = sum(int(metrics.get(key, 0) or 0) for key in ("sent", "queued", "blocked", "discarded", "deduplicated", "cooldown"))
     status = "IDLE"
     if int(metrics.get("errors", 0) or 0) > 0:
         status = "DEGRADED"
@@ -678,6 +712,11 @@ def get_telegram_health() -> dict[str, Any]:
         "deduplicated": int(metrics.get("deduplicated", 0) or 0),
         "cooldown": int(metrics.get("cooldown", 0) or 0),
         "errors": int(metrics.get("errors", 0) or 0),
+        "queued": int(metrics.get("queued", 0) or 0),
+        "rate_limited": int(metrics.get("rate_limited", 0) or 0),
+        "expired": int(metrics.get("expired", 0) or 0),
+        "queue_depth": int(metrics.get("queue_depth", 0) or 0),
+        "sender_running": bool(_sender is not None and _sender.running),
         "critical": int(metrics.get("critical", 0) or 0),
         "high": int(metrics.get("high", 0) or 0),
         "medium": int(metrics.get("medium", 0) or 0),
@@ -691,8 +730,27 @@ def get_telegram_health() -> dict[str, Any]:
     }
 
 
+def start_telegram_alert_sender() -> TelegramAlertSender:
+    """Inicia o sender dedicado: a partir daqui os alertas só são enfileirados."""
+    global _sender
+
+    queue = _alert_queue()
+    with _lock:
+        if _sender is None:
+            _sender = TelegramAlertSender(queue, _queue_transport, on_outcome=_settled_event, limiter=_limiter).start()
+        return _sender
+
+
+def stop_telegram_alert_sender(drain: bool = True, timeout: float = 30.0) -> bool:
+    global _sender
+
+    with _lock:
+        sender, _sender = _sender, None
+    return sender.stop(drain=drain, timeout=timeout) if sender is not None else True
+
+
 def reset_telegram_alert_state() -> None:
+    _alert_queue().clear()
+    _limiter.reset()
     with _lock:
-        _sent_fingerprints.clear()
-        _cooldown_until.clear()
         _alert_history.clear()
@@ -0,0 +1,509 @@
+# =====================================================
+# TELEGRAM ALERT QUEUE
+# Durable dedup ledger, alert queue and rate-limited sender
+# =====================================================
+
+"""Persistent Telegram alert queue drained by one rate-limited sender.
+
+_send_alert_transport used to enforce MIN_ALERT_INTERVAL by sleeping on the
+caller's thread, so a batch of five alerts held the worker pipeline for five
+seconds. Dedup fingerprints and cooldowns lived in process-local dicts: a
+restart forgot them, so the same alert went out again, and the API and worker
+processes each kept their own copy.
+
+Both now live in one SQLite file (TELEGRAM_ALERT_QUEUE_FILE):
+
+* telegram_ledger and telegram_cooldowns hold the fingerprint reservations
+  and equivalent-alert cooldowns. TelegramAlertQueue.reserve() checks both,
+  reserves the fingerprint and queues the message in one BEGIN IMMEDIATE
+  transaction. Concurrent dispatches of one alert, even from different
+  processes, therefore queue it once;
+* telegram_outbox holds the queued messages. A TelegramAlertSender thread
+  claims the first-queued due message by leasing it (TELEGRAM_CLAIM_LEASE_SECONDS).
+  A sender that dies mid-send only delays the message.
+
+Before each send, the sender takes a token from a global bucket
+(TELEGRAM_GLOBAL_RATE_PER_SECOND, the Bot API's per-bot limit) and from the
+chat's bucket (TELEGRAM_CHAT_RATE_PER_MINUTE with TELEGRAM_CHAT_BURST, the
+group/channel limit). When no token is available, the message is pushed back
+to the time a token will be available, and later messages wait behind it.
+Only a process with no sender running delivers on the caller's thread.
+A 429 response raises TelegramRetryAfter: the chat is paused for
+retry_after seconds and the message is rescheduled.
+
+Outcomes keep the Mission 32 rules. A sent alert starts its cooldown. An
+ambiguous timeout keeps the reservation, with no automatic resend. A failed
+send releases the reservation, so the next cycle may retry the alert.
+A message still queued TELEGRAM_ALERT_TTL_SECONDS after it was queued expires
+and releases its reservation as well.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.test_runtime import is_test_process, runtime_scratch_root
+from app.system.kill_switches import alert_channel_block_reason
+from app.system.system_metrics import record_telegram_alert_metric, set_telegram_queue_depth
+
+logger = logging.getLogger("stocknewsbr.telegram_queue")
+
+
+def _env_number(name: str, default: float, minimum: float) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+TELEGRAM_GLOBAL_RATE_PER_SECOND = _env_number("TELEGRAM_GLOBAL_RATE_PER_SECOND", 25.0, 0.1)
+TELEGRAM_CHAT_RATE_PER_MINUTE = _env_number("TELEGRAM_CHAT_RATE_PER_MINUTE", 20.0, 1.0)
+TELEGRAM_CHAT_BURST = _env_number("TELEGRAM_CHAT_BURST", 3.0, 1.0)
+TELEGRAM_ALERT_TTL_SECONDS = _env_number("TELEGRAM_ALERT_TTL_SECONDS", 600.0, 1.0)
+TELEGRAM_CLAIM_LEASE_SECONDS = _env_number("TELEGRAM_CLAIM_LEASE_SECONDS", 60.0, 1.0)
+TELEGRAM_IDLE_POLL_SECONDS = _env_number("TELEGRAM_IDLE_POLL_SECONDS", 1.0, 0.01)
+TELEGRAM_DEFAULT_RETRY_AFTER_SECONDS = _env_number("TELEGRAM_DEFAULT_RETRY_AFTER_SECONDS", 1.0, 0.0)
+
+OUTCOME_SENT = "sent"
+OUTCOME_FAILED = "failed"
+OUTCOME_UNKNOWN = "unknown"
+OUTCOME_EXPIRED = "expired"
+OUTCOME_RATE_LIMITED = "rate_limited"
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS telegram_ledger (
+        fingerprint TEXT PRIMARY KEY,
+        reserved_at REAL NOT NULL,
+        state TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_cooldowns (
+        cooldown_key TEXT PRIMARY KEY,
+        until REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id TEXT NOT NULL,
+        text TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        cooldown_key TEXT NOT NULL,
+        cooldown_seconds REAL NOT NULL,
+        reserved_at REAL NOT NULL,
+        event TEXT NOT NULL,
+        enqueued_at REAL NOT NULL,
+        available_at REAL NOT NULL,
+        rate_limited INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_telegram_outbox_due ON telegram_outbox (available_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_telegram_ledger_reserved ON telegram_ledger (reserved_at)",
+)
+
+_ROW_KEYS = (
+    "id", "chat_id", "text", "fingerprint", "cooldown_key", "cooldown_seconds",
+    "reserved_at", "event", "enqueued_at", "available_at", "rate_limited",
+)
+
+
+class TelegramRetryAfter(Exception):
+    """The Bot API answered 429: nothing may be sent to the chat for retry_after seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = max(0.0, float(retry_after))
+
+
+def telegram_queue_path() -> Path:
+    configured = os.getenv("TELEGRAM_ALERT_QUEUE_FILE")
+    if configured:
+        path = Path(configured)
+        return path if path.is_absolute() else _PROJECT_ROOT / path
+    if is_test_process():
+        return runtime_scratch_root("telegram-queue") / "telegram_alerts.sqlite3"
+    return _PROJECT_ROOT / "runtime" / "cache" / "telegram_alerts.sqlite3"
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = max(1e-9, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated_at = now
+
+    def wait_seconds(self, now: float) -> float:
+        """Seconds until one token is available (0 when one is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+    def empty(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class TelegramRateLimiter:
+    """A global token bucket, one bucket per chat and retry_after pauses per chat."""
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE_PER_SECOND,
+        chat_rate_per_minute: float = TELEGRAM_CHAT_RATE_PER_MINUTE,
+        chat_burst: float = TELEGRAM_CHAT_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate_per_minute / 60.0
+        self.chat_burst = chat_burst
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            now = self.clock()
+            self._global = TokenBucket(self.global_rate, max(1.0, self.global_rate), now)
+            self._chats: Dict[str, TokenBucket] = {}
+            self._paused_until: Dict[str, float] = {}
+
+    def acquire(self, chat_id: str) -> float:
+        """Take a token for chat_id and return 0, or return the seconds to wait (taking nothing)."""
+        chat_id = str(chat_id)
+        with self._lock:
+            now = self.clock()
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+            wait = max(
+                self._paused_until.get(chat_id, 0.0) - now,
+                chat.wait_seconds(now),
+                self._global.wait_seconds(now),
+            )
+            if wait > 0:
+                return wait
+            chat.take()
+            self._global.take()
+            return 0.0
+
+    def pause(self, chat_id: str, seconds: float) -> None:
+        """Honour a 429: no sends to chat_id for `seconds`, then a refilling (not full) bucket."""
+        chat_id = str(chat_id)
+        with self._lock:
+            now = self.clock()
+            self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0.0), now + max(0.0, seconds))
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+            chat.empty()
+
+
+class TelegramAlertQueue:
+    """The SQLite dedup ledger and queue of alerts waiting for the sender."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else telegram_queue_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _connect(self, write: bool = True):
+        connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if not write:
+                yield connection
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def reserve(
+        self,
+        *,
+        fingerprint: str,
+        cooldown_key: str,
+        now: float,
+        cooldown_seconds: float,
+        chat_id: str,
+        text: str,
+        event: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Queue the alert unless its fingerprint or equivalent alert is still held.
+
+        Returns {"status": "queued", "id"}, {"status": "deduplicated"} or
+        {"status": "cooldown", "remaining_seconds"}. `now` is the caller's
+        clock (the engine accepts an explicit one). Queue timing uses time.time().
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM telegram_ledger WHERE state != 'reserved' AND reserved_at < ?",
+                (now - max(60.0, cooldown_seconds),),
+            )
+            connection.execute("DELETE FROM telegram_cooldowns WHERE until <= ?", (now,))
+
+            held = connection.execute(
+                "SELECT reserved_at, state FROM telegram_ledger WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            # A queued alert holds its fingerprint until it is settled, however long that takes.
+            if held and (held[1] == "reserved" or now - held[0] < cooldown_seconds):
+                return {"status": "deduplicated"}
+
+            cooling = connection.execute(
+                "SELECT until FROM telegram_cooldowns WHERE cooldown_key = ?", (cooldown_key,)
+            ).fetchone()
+            if cooling and cooling[0] > now:
+                return {"status": "cooldown", "remaining_seconds": cooling[0] - now}
+
+            connection.execute(
+                "INSERT OR REPLACE INTO telegram_ledger (fingerprint, reserved_at, state) VALUES (?, ?, 'reserved')",
+                (fingerprint, now),
+            )
+            queued_at = time.time()
+            cursor = connection.execute(
+                "INSERT INTO telegram_outbox (chat_id, text, fingerprint, cooldown_key, cooldown_seconds,"
+                " reserved_at, event, enqueued_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(chat_id),
+                    text,
+                    fingerprint,
+                    cooldown_key,
+                    float(cooldown_seconds),
+                    now,
+                    json.dumps(event, ensure_ascii=True, default=str),
+                    queued_at,
+                    queued_at,
+                ),
+            )
+            return {"status": "queued", "id": cursor.lastrowid}
+
+    def claim(self, message_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Lease the first-queued due message (or message_id, if it is due)."""
+        now = time.time()
+        with self._connect() as connection:
+            if message_id is None:
+                row = connection.execute(
+                    "SELECT * FROM telegram_outbox WHERE available_at <= ? ORDER BY id LIMIT 1", (now,)
+                ).fetchone()
+            else:
+                row = connection.execute(
+                    "SELECT * FROM telegram_outbox WHERE id = ? AND available_at <= ?", (message_id, now)
+                ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE telegram_outbox SET available_at = ? WHERE id = ?", (now + TELEGRAM_CLAIM_LEASE_SECONDS, row[0])
+            )
+        message = dict(zip(_ROW_KEYS, row))
+        message["event"] = json.loads(message["event"])
+        return message
+
+    def defer(self, message: Dict[str, Any], seconds: float, rate_limited: bool = False) -> None:
+        """Hand a claimed message back, due again in `seconds`."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE telegram_outbox SET available_at = ?, rate_limited = rate_limited + ? WHERE id = ?",
+                (time.time() + max(0.0, seconds), 1 if rate_limited else 0, message["id"]),
+            )
+
+    def settle(self, message: Dict[str, Any], outcome: str) -> None:
+        """Remove a sent, ambiguous, failed or expired message and update the ledger."""
+        fingerprint, reserved_at = message["fingerprint"], message["reserved_at"]
+        with self._connect() as connection:
+            connection.execute("DELETE FROM telegram_outbox WHERE id = ?", (message["id"],))
+            if outcome == OUTCOME_SENT:
+                connection.execute(
+                    "UPDATE telegram_ledger SET state = 'sent' WHERE fingerprint = ? AND reserved_at = ?",
+                    (fingerprint, reserved_at),
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO telegram_cooldowns (cooldown_key, until) VALUES (?, ?)",
+                    (message["cooldown_key"], reserved_at + message["cooldown_seconds"]),
+                )
+            elif outcome == OUTCOME_UNKNOWN:
+                # It may have been delivered: keep the fingerprint for its window.
+                connection.execute(
+                    "UPDATE telegram_ledger SET state = 'unknown' WHERE fingerprint = ? AND reserved_at = ?",
+                    (fingerprint, reserved_at),
+                )
+            else:
+                connection.execute(
+                    "DELETE FROM telegram_ledger WHERE fingerprint = ? AND reserved_at = ?", (fingerprint, reserved_at)
+                )
+
+    def depth(self) -> Tuple[int, Optional[float]]:
+        """Queued messages and the enqueue time of the oldest one."""
+        with self._connect(write=False) as connection:
+            count, oldest = connection.execute("SELECT COUNT(*), MIN(enqueued_at) FROM telegram_outbox").fetchone()
+        return int(count), oldest
+
+    def available_at(self, message_id: int) -> Optional[float]:
+        """When message_id is due (or its lease ends); None once it is settled."""
+        with self._connect(write=False) as connection:
+            row = connection.execute("SELECT available_at FROM telegram_outbox WHERE id = ?", (message_id,)).fetchone()
+        return row[0] if row else None
+
+    def next_due_at(self) -> Optional[float]:
+        with self._connect(write=False) as connection:
+            return connection.execute("SELECT MIN(available_at) FROM telegram_outbox").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            for table in ("telegram_outbox", "telegram_ledger", "telegram_cooldowns"):
+                connection.execute(f"DELETE FROM {table}")
+
+
+class TelegramAlertSender:
+    """Drains a TelegramAlertQueue on one thread, within the rate limits.
+
+    `transport(chat_id, text)` returns OUTCOME_SENT, OUTCOME_FAILED or
+    OUTCOME_UNKNOWN, or raises TelegramRetryAfter. `on_outcome(message,
+    outcome)` is called after each settled or rate-limited message.
+    """
+
+    def __init__(
+        self,
+        queue: TelegramAlertQueue,
+        transport: Callable[[str, str], str],
+        on_outcome: Optional[Callable[[Dict[str, Any], str], Any]] = None,
+        limiter: Optional[TelegramRateLimiter] = None,
+    ):
+        self.queue = queue
+        self.transport = transport
+        self.on_outcome = on_outcome
+        self.limiter = limiter or TelegramRateLimiter()
+        self._wake = threading.Condition()
+        self._stopping = False
+        self._drain = True
+        # Monotonic time before which the limiter (or a 429) allows no send.
+        self._not_before = 0.0
+        self._thread = threading.Thread(target=self._run, name="telegram-alert-sender", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stopping
+
+    def start(self) -> "TelegramAlertSender":
+        self._thread.start()
+        return self
+
+    def notify(self) -> None:
+        with self._wake:
+            self._wake.notify_all()
+
+    def stop(self, drain: bool = True, timeout: float = 30.0) -> bool:
+        """Stop the thread; with drain, messages already due (and allowed by the limiter) go out first."""
+        with self._wake:
+            self._stopping = True
+            self._drain = drain
+            self._wake.notify_all()
+        if self._thread.ident is not None:
+            self._thread.join(max(0.0, timeout))
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                worked = self.dispatch_once()
+            except Exception:
+                logger.exception("Telegram alert queue dispatch error")
+                worked = False
+            idle_seconds = TELEGRAM_IDLE_POLL_SECONDS
+            if not worked:
+                held_seconds = max(0.0, self._not_before - time.monotonic())
+                next_due = self.queue.next_due_at()
+                if next_due is not None:
+                    idle_seconds = min(idle_seconds, max(held_seconds, next_due - time.time()))
+            with self._wake:
+                if self._stopping and (not worked or not self._drain):
+                    return
+                if not worked:
+                    self._wake.wait(idle_seconds)
+
+    def dispatch_once(self) -> bool:
+        """Send the oldest due message; False when nothing could be sent now."""
+        if alert_channel_block_reason("telegram"):
+            # Held, not failed: sent if the switch is lifted before the message expires.
+            return False
+        if time.monotonic() < self._not_before:
+            # Messages keep their queue order: none overtakes one the limiter deferred.
+            return False
+        message = self.queue.claim()
+        if message is None:
+            self._report_depth()
+            return False
+        return self.deliver(message) is not None
+
+    def deliver(self, message: Dict[str, Any]) -> Optional[str]:
+        """Send a claimed message; None when the limiter deferred it."""
+        if time.time() - message["enqueued_at"] > TELEGRAM_ALERT_TTL_SECONDS:
+            return self._settle(message, OUTCOME_EXPIRED)
+
+        wait = self.limiter.acquire(message["chat_id"])
+        if wait > 0:
+            self._not_before = time.monotonic() + wait
+            self.queue.defer(message, wait)
+            return None
+
+        try:
+            outcome = self.transport(message["chat_id"], message["text"])
+        except TelegramRetryAfter as exc:
+            retry_after = exc.retry_after or TELEGRAM_DEFAULT_RETRY_AFTER_SECONDS
+            self.limiter.pause(message["chat_id"], retry_after)
+            self._not_before = time.monotonic() + retry_after
+            self.queue.defer(message, retry_after, rate_limited=True)
+            record_telegram_alert_metric(OUTCOME_RATE_LIMITED)
+            logger.warning("Telegram 429 | retry_after=%ss | message=%s", retry_after, message["id"])
+            self._report_depth()
+            return self._notify_outcome(message, OUTCOME_RATE_LIMITED)
+        except Exception:
+            logger.exception("Telegram transport error")
+            outcome = OUTCOME_FAILED
+        if outcome not in (OUTCOME_SENT, OUTCOME_UNKNOWN):
+            outcome = OUTCOME_FAILED
+        return self._settle(message, outcome)
+
+    def _settle(self, message: Dict[str, Any], outcome: str) -> str:
+        self.queue.settle(message, outcome)
+        self._report_depth()
+        return self._notify_outcome(message, outcome)
+
+    def _notify_outcome(self, message: Dict[str, Any], outcome: str) -> str:
+        if self.on_outcome is not None:
+            try:
+                self.on_outcome(message, outcome)
+            except Exception:
+                logger.exception("Telegram alert outcome callback error")
+        return outcome
+
+    def _report_depth(self) -> None:
+        depth, oldest = self.queue.depth()
+        set_telegram_queue_depth(depth, time.time() - oldest if oldest is not None else None)
@@ -8,6 +8,7 @@ import logging
 from app.dependencies import require_channel_access
 from app.engine.chart_signal_adapter import build_chart_signal_payload
 from app.market.market_data_loader import get_cached_chart_data
+from app.market.ohlcv import chart_rows_as_list
 from app.cache.snapshot_cache import get_snapshot_signals
 from app.services.chart_overlay_service import build_chart_overlays
 from app.services.snapshot_contract import snapshot_surface_row
@@ -38,7 +39,7 @@ def get_chart(ticker: str, interval: str = "1D"):
     try:
 
         ticker = canonical_symbol(ticker)
-        ohlc = get_cached_chart_data(ticker, interval=interval) or load_chart_data_cache_first(ticker, interval) or []
+        ohlc = get_cached_chart_data(ticker, interval=interval) or chart_rows_as_list(load_chart_data_cache_first(ticker, interval))
         record_cache_access("chart", bool(ohlc), "web_chart")
 
         if not ohlc:
@@ -10,6 +10,7 @@ from app.ai.final_decision import ensure_final_decision_rows
 from app.ai.institutional_priority import ensure_institutional_priority_rows
 from app.ai.institutional_radar import ensure_institutional_radar_rows, institutional_radar_items
 from app.cache.snapshot_cache import get_snapshot_signals
+from app.cache.snapshot_views import get_snapshot_view, register_snapshot_view
 from app.dependencies import require_channel_access
 from app.services.score_display import attach_master_score_display_contract
 from app.services.snapshot_contract import is_actionable_snapshot_row, snapshot_surface_row
@@ -40,6 +41,56 @@ def _radar_sort_score(item: dict) -> float:
 # EVENT RADAR
 # =====================================================
 
+def _radar_view(signals):
+
+    radar = []
+
+    enriched_signals = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(signals)))
+    for s in institutional_radar_items(enriched_signals, limit=50):
+
+        try:
+
+            if is_actionable_snapshot_row(s):
+
+                item = attach_master_score_display_contract(snapshot_surface_row(s))
+                master_score = item.get("master_score")
+                if master_score is None or isinstance(master_score, bool):
+                    numeric_master_score = None
+                else:
+                    try:
+                        numeric_master_score = float(master_score)
+                    except (TypeError, ValueError):
+                        numeric_master_score = None
+                item["score"] = (
+                    numeric_master_score
+                    if numeric_master_score is not None
+                    and math.isfinite(numeric_master_score)
+                    and 0.0 <= numeric_master_score <= 10.0
+                    else None
+                )
+                radar.append(item)
+
+        except Exception:
+            continue
+
+    deduped = {}
+    for item in radar:
+        symbol = item.get("canonical_symbol") or item.get("ticker") or item.get("symbol")
+        if not symbol:
+            continue
+        current = deduped.get(symbol)
+        if current is None or _radar_sort_score(item) > _radar_sort_score(current):
+            deduped[symbol] = item
+
+    output = list(deduped.values())
+    output.sort(key=_radar_sort_score, reverse=True)
+
+    return output[:20]
+
+
+register_snapshot_view("web_radar_top20", _radar_view)
+
+
 @router.get("/radar")
 def get_radar():
 
@@ -50,49 +101,7 @@ def get_radar():
         if not signals:
             return []
 
-        radar = []
-
-        enriched_signals = ensure_final_decision_rows(ensure_institutional_priority_rows(ensure_institutional_radar_rows(signals)))
-        for s in institutional_radar_items(enriched_signals, limit=50):
-
-            try:
-
-                if is_actionable_snapshot_row(s):
-
-                    item = attach_master_score_display_contract(snapshot_surface_row(s))
-                    master_score = item.get("master_score")
-                    if master_score is None or isinstance(master_score, bool):
-                        numeric_master_score = None
-                    else:
-                        try:
-                            numeric_master_score = float(master_score)
-                        except (TypeError, ValueError):
-                            numeric_master_score = None
-                    item["score"] = (
-                        numeric_master_score
-                        if numeric_master_score is not None
-                        and math.isfinite(numeric_master_score)
-                        and 0.0 <= numeric_master_score <= 10.0
-                        else None
-                    )
-                    radar.append(item)
-
-            except Exception:
-                continue
-
-        deduped = {}
-        for item in radar:
-            symbol = item.get("canonical_symbol") or item.get("ticker") or item.get("symbol")
-            if not symbol:
-                continue
-            current = deduped.get(symbol)
-            if current is None or _radar_sort_score(item) > _radar_sort_score(current):
-                deduped[symbol] = item
-
-        output = list(deduped.values())
-        output.sort(key=_radar_sort_score, reverse=True)
-
-        return output[:20]
+        return get_snapshot_view("web_radar_top20", signals)
 
     except Exception as e:
 
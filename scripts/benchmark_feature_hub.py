@@ -0,0 +1,157 @@
+"""Benchmark the feature hub cross-section stage: per-row ranks vs column-wise ranks.
+
+Builds feature rows with build_asset_features() for a synthetic universe and times
+the cross-sectional stage in two modes:
+
+* ``scalar``     -- the previous implementation: every row re-sorts and linearly
+  counts four full value lists (O(n^2 log n));
+* ``vectorized`` -- feature_hub._add_cross_section_features: one sort per column.
+
+It also times the whole build_feature_hub() call and checks both modes agree.
+
+Usage:
+    python scripts/benchmark_feature_hub.py --rows 100 500 2000 --reps 20
+
+No network, fixed seed, JSON output on stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.ai.feature_hub import (  # noqa: E402
+    _add_cross_section_features,
+    build_asset_features,
+    build_feature_hub,
+    clamp,
+    safe_float,
+)
+
+
+def _rank_pct(value, values):
+    if not values:
+        return 50.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return 50.0
+    if ordered[0] == ordered[-1]:
+        return 50.0
+    below_or_equal = sum(1 for item in ordered if item <= value)
+    return clamp(((below_or_equal - 1) / (len(ordered) - 1)) * 100.0)
+
+
+def scalar_cross_section(rows):
+    """The row-by-row implementation the vectorized stage replaced."""
+    changes = [safe_float(row.get("change_pct")) for row in rows]
+    momentums = [safe_float(row.get("momentum")) for row in rows]
+    rel_volumes = [safe_float(row.get("rel_volume")) for row in rows]
+    source_scores = [safe_float(row.get("source_score")) for row in rows]
+
+    enriched = []
+    for row in rows:
+        change = safe_float(row.get("change_pct"))
+        momentum = safe_float(row.get("momentum"))
+        rel_volume = safe_float(row.get("rel_volume"))
+        source_score = safe_float(row.get("source_score"))
+        source_rank = _rank_pct(source_score, source_scores)
+        relative_strength = (
+            _rank_pct(change, changes) * 0.30
+            + _rank_pct(momentum, momentums) * 0.22
+            + _rank_pct(rel_volume, rel_volumes) * 0.20
+            + source_rank * 0.28
+        )
+        enriched.append(
+            {
+                **row,
+                "relative_strength_score": round(clamp(relative_strength), 4),
+                "relative_weakness_score": round(clamp(100.0 - relative_strength), 4),
+                "source_score_rank": round(source_rank, 4),
+                "market_relative_change": round(change - (sum(changes) / max(1, len(changes))), 4),
+                "abnormal_move_score": round(
+                    clamp(
+                        abs(change) * 14.0
+                        + abs(momentum) * 10.0
+                        + max(rel_volume - 1.0, 0.0) * 24.0
+                        + abs(source_score - 50.0) * 0.20
+                    ),
+                    4,
+                ),
+            }
+        )
+    return enriched
+
+
+def make_rows(count: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        price = round(rng.uniform(5, 300), 2)
+        rows.append(
+            {
+                "ticker": f"T{index:04d}",
+                "price": price,
+                "prev_close": round(price * rng.uniform(0.95, 1.05), 2),
+                "high": round(price * 1.02, 2),
+                "low": round(price * 0.98, 2),
+                "vwap": round(price * rng.uniform(0.99, 1.01), 2),
+                "change_pct": round(rng.gauss(0, 2), 3),
+                "momentum": round(rng.gauss(0, 1), 3),
+                "rel_volume": round(rng.uniform(0.3, 4.0), 3),
+                "volume": rng.randint(10_000, 5_000_000),
+                "rsi": round(rng.uniform(10, 90), 2),
+                "adx": round(rng.uniform(8, 40), 2),
+                "score": rng.randint(20, 99),
+                "data_quality": "priced",
+            }
+        )
+    return rows
+
+
+def _median_ms(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1e3, 3)
+
+
+def run(sizes: list[int], reps: int) -> dict:
+    results = {}
+    for size in sizes:
+        raw = make_rows(size)
+        features = [build_asset_features(row) for row in raw]
+        scalar_reps = max(1, reps // 4) if size >= 2000 else reps
+        scalar_ms = _median_ms(lambda: scalar_cross_section(features), scalar_reps)
+        vectorized_ms = _median_ms(lambda: _add_cross_section_features(features), reps)
+        results[str(size)] = {
+            "cross_section_scalar_ms": scalar_ms,
+            "cross_section_vectorized_ms": vectorized_ms,
+            "speedup": round(scalar_ms / (vectorized_ms or 0.001), 1),
+            "build_feature_hub_ms": _median_ms(lambda: build_feature_hub(raw, []), reps),
+            "identical": scalar_cross_section(features) == _add_cross_section_features(features),
+        }
+    return {"reps": reps, "python": platform.python_version(), "results": results}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--reps", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.reps), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
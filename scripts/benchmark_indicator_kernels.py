@@ -0,0 +1,114 @@
+"""Benchmark the indicator kernels against the per-ticker pandas paths they replace.
+
+Builds a synthetic universe of 80-bar OHLCV frames and times, at each size:
+
+* ``seed``   -- feature_seed.compute_feature_seed per ticker (pandas) vs
+  feature_seed.compute_feature_seeds (one kernel pass over the universe);
+* ``engine`` -- engine_orchestrator._market_fields_from_frame per frame vs
+  engine_orchestrator._market_fields_batch.
+
+It also checks both sides of each pair return identical results.
+
+Usage:
+    python scripts/benchmark_indicator_kernels.py --tickers 100 500 2000 --reps 5
+
+No network, fixed seed, JSON output on stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine import engine_orchestrator, feature_seed  # noqa: E402
+from app.engine.indicators import indicator_kernels  # noqa: E402
+
+
+def make_frames(count: int, seed: int = 7) -> list[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2026-05-04 13:00", periods=80, freq="5min", tz="UTC")
+    frames = []
+    for _ in range(count):
+        close = rng.uniform(5, 300) * np.exp(np.cumsum(rng.normal(0.0, 0.002, len(index))))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "Open": close * rng.uniform(0.998, 1.002, len(index)),
+                    "High": close * 1.003,
+                    "Low": close * 0.997,
+                    "Close": close,
+                    "Volume": rng.integers(1_000, 500_000, len(index)).astype(float),
+                },
+                index=index,
+            )
+        )
+    return frames
+
+
+def _median_ms(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1e3, 3)
+
+
+def run(sizes: list[int], reps: int) -> dict:
+    results = {}
+    for size in sizes:
+        frames = make_frames(size)
+        packed = [feature_seed.pack_frame(f"T{number:04d}.SA", frame) for number, frame in enumerate(frames)]
+        pandas_reps = max(1, reps // 5) if size >= 2000 else reps
+
+        seed_pandas_ms = _median_ms(lambda: [feature_seed.compute_feature_seed(*job) for job in packed], pandas_reps)
+        seed_kernel_ms = _median_ms(lambda: feature_seed.compute_feature_seeds(packed), reps)
+        engine_pandas_ms = _median_ms(
+            lambda: [engine_orchestrator._market_fields_from_frame(frame) for frame in frames], pandas_reps
+        )
+        engine_kernel_ms = _median_ms(lambda: engine_orchestrator._market_fields_batch(frames), reps)
+
+        batch = engine_orchestrator._market_fields_batch(frames)
+        results[str(size)] = {
+            "seed_pandas_ms": seed_pandas_ms,
+            "seed_kernel_ms": seed_kernel_ms,
+            "seed_speedup": round(seed_pandas_ms / (seed_kernel_ms or 0.001), 1),
+            "seed_identical": feature_seed.compute_feature_seeds(packed)
+            == [feature_seed.compute_feature_seed(*job) for job in packed],
+            "engine_pandas_ms": engine_pandas_ms,
+            "engine_kernel_ms": engine_kernel_ms,
+            "engine_speedup": round(engine_pandas_ms / (engine_kernel_ms or 0.001), 1),
+            "engine_identical": all(
+                batch[id(frame)][1] == engine_orchestrator._market_fields_from_frame(frame) for frame in frames
+            ),
+        }
+    return {
+        "reps": reps,
+        "numba": indicator_kernels.NUMBA_ENABLED,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--reps", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tickers, args.reps), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
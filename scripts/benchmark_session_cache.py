@@ -0,0 +1,131 @@
+"""Benchmark authenticated request overhead: per-request session row vs session cache.
+
+Creates a file-backed SQLite database with --users users, one session each, and
+resolves their tokens round-robin the way get_current_user does (a fresh ORM
+session per request, committed and closed). Two modes:
+
+* ``inline`` -- what every request used to do: load the User and the UserSession
+  row and write last_seen_at in the request's own transaction
+  (SESSION_CACHE_TTL_SECONDS=0, SESSION_LAST_SEEN_FLUSH_SECONDS=0);
+* ``cached`` -- the current path: the UserSession lookup is served from the
+  session cache and last_seen_at is queued for one batched flush, whose cost
+  is reported separately.
+
+Usage:
+    python scripts/benchmark_session_cache.py --users 200 --requests 5000
+
+No network, JSON output on stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="session-cache-bench-"))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-session-cache-0123456789")
+os.environ.setdefault("SESSION_REVOCATION_FILE", str(_WORKDIR / "session_revocations"))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import security  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services import session_cache  # noqa: E402
+from app.services.auth_session_service import create_user_session  # noqa: E402
+
+
+def _setup(users: int):
+    engine = create_engine(f"sqlite:///{_WORKDIR / 'bench.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+    tokens = []
+    with SessionLocal() as db:
+        for index in range(users):
+            user = User(email=f"bench{index}@example.com", password_hash="x", referral_code=f"SNBB{index:06d}")
+            db.add(user)
+            db.flush()
+            session = create_user_session(db, user, channel="web")
+            tokens.append(security.create_access_token({"sub": user.id, "sid": session.session_id}))
+        db.commit()
+    return engine, SessionLocal, tokens
+
+
+def _run_mode(engine, SessionLocal, tokens, requests: int, cached: bool) -> dict:
+    session_cache.clear_session_cache()
+    session_cache.SESSION_CACHE_TTL_SECONDS = 5.0 if cached else 0.0
+    # Batched, but never by the background thread while measuring.
+    session_cache.SESSION_LAST_SEEN_FLUSH_SECONDS = 3600.0 if cached else 0.0
+    statements = {"SELECT": 0, "UPDATE": 0}
+
+    def count(_conn, _cursor, statement, *_args):
+        verb = statement.split()[0]
+        if verb in statements:
+            statements[verb] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    times = []
+    try:
+        for index in range(requests):
+            token = tokens[index % len(tokens)]
+            start = time.perf_counter()
+            with SessionLocal() as db:
+                security.resolve_token_user(token, db)
+                db.commit()
+            times.append(time.perf_counter() - start)
+        flush_start = time.perf_counter()
+        flushed = session_cache.flush_last_seen()
+        flush_seconds = time.perf_counter() - flush_start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    return {
+        "median_us": round(statistics.median(times) * 1e6, 1),
+        "p95_us": round(sorted(times)[int(len(times) * 0.95) - 1] * 1e6, 1),
+        "total_seconds": round(sum(times), 4),
+        "selects_per_request": round(statements["SELECT"] / requests, 2),
+        "updates_per_request": round(statements["UPDATE"] / requests, 3),
+        "flushed_sessions": flushed,
+        "flush_ms": round(flush_seconds * 1000, 2),
+    }
+
+
+def run(users: int, requests: int) -> dict:
+    engine, SessionLocal, tokens = _setup(users)
+    try:
+        inline = _run_mode(engine, SessionLocal, tokens, requests, cached=False)
+        cached = _run_mode(engine, SessionLocal, tokens, requests, cached=True)
+    finally:
+        engine.dispose()
+    return {
+        "users": users,
+        "requests": requests,
+        "python": platform.python_version(),
+        "results": {"inline": inline, "cached": cached},
+        "speedup": round(inline["median_us"] / (cached["median_us"] or 0.01), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.requests), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+"""Benchmark the snapshot enrichment stage: serial vs the feature seed process pool.
+
+Builds a synthetic market pool of 80-bar frames and times
+market_snapshot_engine._enrich_signal_rows() in two modes:
+
+* ``serial``  -- every ticker enriched on the calling thread;
+* ``pool``    -- the persistent FeatureSeedPool, already started (the one-off
+  process start-up is reported separately as ``pool_cold_start_ms``).
+
+Besides wall time it reports the CPU time spent in the calling process, which is
+the time the stage holds the GIL the API and background threads share. It also
+checks both modes return identical rows.
+
+Usage:
+    python scripts/benchmark_snapshot_enrichment.py --tickers 100 500 2000 --processes 4 --reps 3
+
+No network, fixed seed, JSON output on stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine import market_snapshot_engine  # noqa: E402
+from app.engine.feature_seed import FeatureSeedPool  # noqa: E402
+
+
+def make_universe(count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2026-05-04 13:00", periods=80, freq="5min", tz="UTC")
+    pool = {}
+    for number in range(count):
+        close = rng.uniform(5, 300) * np.exp(np.cumsum(rng.normal(0.0, 0.002, len(index))))
+        pool[f"T{number:04d}.SA"] = pd.DataFrame(
+            {
+                "Open": close * rng.uniform(0.998, 1.002, len(index)),
+                "High": close * 1.003,
+                "Low": close * 0.997,
+                "Close": close,
+                "Volume": rng.integers(1_000, 500_000, len(index)).astype(float),
+            },
+            index=index,
+        )
+    signals = [{"ticker": ticker, "score": 50} for ticker in pool]
+    return pool, signals
+
+
+def _median_ms(fn, reps: int) -> tuple[float, float]:
+    """Median wall time and median CPU time of this process, in milliseconds."""
+    wall, cpu = [], []
+    for _ in range(reps):
+        start, start_cpu = time.perf_counter(), time.process_time()
+        fn()
+        wall.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - start_cpu)
+    return round(statistics.median(wall) * 1e3, 3), round(statistics.median(cpu) * 1e3, 3)
+
+
+def run(sizes: list[int], processes: int, reps: int) -> dict:
+    serial_pool = FeatureSeedPool(processes=0)
+    process_pool = FeatureSeedPool(processes=processes, min_tickers=1)
+    enrich = market_snapshot_engine._enrich_signal_rows
+
+    start = time.perf_counter()
+    market_snapshot_engine.feature_seed_pool = process_pool
+    market_snapshot_engine.get_market_pool = lambda: make_universe(processes * 4)[0]
+    enrich(make_universe(processes * 4)[1])
+    cold_start_ms = round((time.perf_counter() - start) * 1e3, 1)
+
+    results = {}
+    try:
+        for size in sizes:
+            pool, signals = make_universe(size)
+            market_snapshot_engine.get_market_pool = lambda: pool
+
+            market_snapshot_engine.feature_seed_pool = serial_pool
+            serial_rows = enrich(signals)
+            serial_ms, serial_cpu_ms = _median_ms(lambda: enrich(signals), reps)
+
+            market_snapshot_engine.feature_seed_pool = process_pool
+            pool_rows = enrich(signals)
+            pool_ms, pool_cpu_ms = _median_ms(lambda: enrich(signals), reps)
+
+            results[str(size)] = {
+                "serial_ms": serial_ms,
+                "pool_ms": pool_ms,
+                "serial_parent_cpu_ms": serial_cpu_ms,
+                "pool_parent_cpu_ms": pool_cpu_ms,
+                "speedup": round(serial_ms / (pool_ms or 0.001), 2),
+                "identical": serial_rows == pool_rows,
+            }
+    finally:
+        process_pool.shutdown()
+    return {
+        "processes": processes,
+        "cpus": os.cpu_count(),
+        "reps": reps,
+        "python": platform.python_version(),
+        "pool_cold_start_ms": cold_start_ms,
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--processes", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    parser.add_argument("--reps", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tickers, args.processes, args.reps), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Benchmark SnapshotCache reads: per-read deepcopy vs shared frozen generation.
+
+Builds a realistic snapshot (500 enriched rows plus AI tool sections), publishes it
+through SnapshotCache.update() and measures get(), get_signals(), get_by_ticker() and
+info() in two modes:
+
+* ``copy``   -- what every read used to do: a full ``deepcopy`` of the referenced part;
+* ``frozen`` -- the current read path, which hands out the published reference.
+
+Usage:
+    python scripts/benchmark_snapshot_reads.py --rows 500 --reps 200
+
+No network, fixed seed, JSON output on stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from copy import deepcopy
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault(
+    "SNAPSHOT_CACHE_FILE", str(Path(tempfile.mkdtemp(prefix="snapshot-bench-")) / "snapshot.json")
+)
+
+from app.cache.snapshot_cache import SnapshotCache  # noqa: E402
+
+
+def make_snapshot(rows: int, seed: int = 3) -> dict:
+    rng = random.Random(seed)
+    signals = []
+    for index in range(rows):
+        ticker = f"T{index:04d}"
+        price = round(rng.uniform(5, 300), 2)
+        signals.append(
+            {
+                "ticker": ticker,
+                "price": price,
+                "change_pct": round(rng.gauss(0, 2), 3),
+                "score": rng.randint(20, 99),
+                "master_score": round(rng.uniform(1, 10), 2),
+                "signal": rng.choice(["BUY", "SELL", "NEUTRAL"]),
+                "confidence": rng.randint(30, 95),
+                "volume": rng.randint(10_000, 5_000_000),
+                "rsi": round(rng.uniform(10, 90), 2),
+                "atr": round(price * 0.02, 4),
+                "trend": rng.choice(["up", "down", "sideways"]),
+                "setup": rng.choice(["breakout", "pullback", "reversal"]),
+                "reasons": [f"reason_{k}" for k in range(rng.randint(2, 6))],
+                "events": [
+                    {"type": rng.choice(["BUY", "SELL"]), "price": price, "time": f"2026-03-02T1{k}:00:00Z"}
+                    for k in range(rng.randint(1, 4))
+                ],
+                "indicators": {
+                    "ema9": price * 0.99,
+                    "ema21": price * 0.98,
+                    "ema50": price * 0.95,
+                    "macd": {"line": 0.4, "signal": 0.3, "hist": 0.1},
+                    "levels": [price * (1 + k / 100) for k in range(-3, 4)],
+                },
+                "institutional": {
+                    "conviction_score": rng.randint(0, 100),
+                    "priority_level": rng.choice(["critical", "high", "normal"]),
+                    "blocks": [],
+                },
+            }
+        )
+    sections = {
+        name: {"items": [{"ticker": row["ticker"], "score": row["score"]} for row in signals[:50]], "generated": 50}
+        for name in ("radar", "heatmap", "spotlight", "pulse", "narrative", "ranking")
+    }
+    return {"source": "engine", "stale": False, "signals": signals, "ai_tools": sections}
+
+
+def _measure(read, reps: int) -> dict:
+    times: list[float] = []
+    for _ in range(reps):
+        start = time.perf_counter()
+        read()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    read()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_us": round(statistics.median(times) * 1e6, 2),
+        "p95_us": round(sorted(times)[int(len(times) * 0.95) - 1] * 1e6, 2),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def run(rows: int, reps: int) -> dict:
+    cache = SnapshotCache()
+    cache.update(make_snapshot(rows))
+
+    # (frozen read, the same read plus the deepcopy it used to pay for)
+    readers = {
+        "get": (cache.get, lambda: deepcopy(cache.get())),
+        "get_signals": (cache.get_signals, lambda: deepcopy(cache.get_signals())),
+        "get_by_ticker": (cache.get_by_ticker, lambda: deepcopy(cache.get_by_ticker())),
+        # info() used to clone the whole payload before summarising it.
+        "info": (cache.info, lambda: (deepcopy(cache.get()), cache.info())),
+    }
+    results = {}
+    for name, (frozen_read, copy_read) in readers.items():
+        results[name] = {
+            "copy": _measure(copy_read, reps),
+            "frozen": _measure(frozen_read, reps),
+        }
+        copy_us = results[name]["copy"]["median_us"]
+        frozen_us = results[name]["frozen"]["median_us"] or 0.01
+        results[name]["speedup"] = round(copy_us / frozen_us, 1)
+    return {
+        "rows": rows,
+        "reps": reps,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--reps", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.reps), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
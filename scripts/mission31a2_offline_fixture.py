@@ -262,11 +262,11 @@ def _clear() -> dict:
     """Remove every quote, candle and persisted hydration state owned here."""
     from app.market.market_data_loader import (
         _CHART_DATA_CACHE,
-        _CHART_CACHE_FILE,
         _PRICE_SNAPSHOT_CACHE,
         _PRICE_CACHE_FILE,
         _cache_key,
         _chart_cache_key,
+        _chart_store,
     )
 
     quote_keys = {
@@ -280,7 +280,7 @@ def _clear() -> dict:
         for interval in (INTERVAL_DAILY, *INTERVALS_INTRADAY)
     }
     removed_quotes = _remove_cache_keys(_PRICE_CACHE_FILE, None, quote_keys)
-    removed_candles = _remove_cache_keys(_CHART_CACHE_FILE, "charts", candle_keys)
+    removed_candles = _chart_store().delete(candle_keys)
     
     # Also remove from snapshot.json
     snapshot_path = REPO_ROOT / "runtime" / "cache" / "snapshot.json"
@@ -420,8 +420,8 @@ def refresh(generation: str) -> int:
         _cache_key,
         _cache_price_payload,
         _chart_cache_key,
-        _load_chart_cache_once,
         _load_price_cache_once,
+        _resident_chart_entry,
         _persist_chart_cache,
         _persist_price_cache,
     )
@@ -429,14 +429,13 @@ def refresh(generation: str) -> int:
     now = time.time()
     anchor = datetime.now(timezone.utc).replace(microsecond=0)
     stamp = anchor.isoformat()
-    _load_chart_cache_once(force=True)
     _load_price_cache_once(include_stale=True, force=True)
     refreshed = 0
     for symbol in SYMBOLS:
         daily = _candles(symbol, DAILY_ROWS, timedelta(days=1), anchor)
         intraday = _candles(symbol, INTRADAY_ROWS, timedelta(minutes=5), anchor)
         for interval, rows in ((INTERVAL_DAILY, daily), *((value, intraday) for value in INTERVALS_INTRADAY)):
-            if _chart_cache_key(symbol, interval) not in _CHART_DATA_CACHE:
+            if _resident_chart_entry(_chart_cache_key(symbol, interval)) is None:
                 _cache_chart_data(symbol, interval, rows, persist=False)
         last = intraday[-1]
         owned = 0
@@ -473,21 +472,21 @@ def refresh(generation: str) -> int:
 
 def residual_entries() -> int:
     from app.market.market_data_loader import (
-        _CHART_CACHE_FILE,
         _PRICE_CACHE_FILE,
         _cache_key,
         _chart_cache_key,
+        _chart_store,
     )
 
     try:
         quotes = json.loads(_PRICE_CACHE_FILE.read_text(encoding="utf-8"))
     except (FileNotFoundError, json.JSONDecodeError, OSError):
         quotes = {}
-    try:
-        chart_payload = json.loads(_CHART_CACHE_FILE.read_text(encoding="utf-8"))
-        charts = chart_payload.get("charts", {}) if isinstance(chart_payload, dict) else {}
-    except (FileNotFoundError, json.JSONDecodeError, OSError):
-        charts = {}
+    charts = _chart_store().timestamps(
+        _chart_cache_key(symbol, interval)
+        for symbol in SYMBOLS
+        for interval in (INTERVAL_DAILY, *INTERVALS_INTRADAY)
+    )
     total = sum(
         1 for symbol in SYMBOLS
         if _cache_key(symbol) in quotes
@@ -16,3 +16,14 @@ def isolated_market_data_cache(monkeypatch):
     monkeypatch.setattr(hydration_module, '_CACHE', {})
 
     yield provider_stub
+
+
+@pytest.fixture(autouse=True)
+def _fresh_public_bundle_cache():
+    # Tests patch the bundle's builders without touching the caches it fingerprints,
+    # so a bundle memoized by a previous test would otherwise be served back.
+    from app.services.public_bundle_cache import reset_bundle_cache
+
+    reset_bundle_cache()
+    yield
+    reset_bundle_cache()
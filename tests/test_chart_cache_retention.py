@@ -1,33 +1,33 @@
-"""Retention policy for runtime/cache/market_charts.json.
+"""Retention policy for the persisted chart cache.
 
 _persist_chart_cache() merged disk into memory and never pruned, so the file only ever
 grew -- 18.2 MB when this was written, 20.1 MB a few hours later. Every forced reparse
 paid for that size, which is what pushed /public/market/bundle past the fixture's client
-timeout. Retention is what stops the file growing back.
+timeout. Retention is what stops the cache growing back; the per-key store now applies
+it incrementally on each write.
 
-Every case here runs against a temporary file. The real cache is never the subject.
+Every case here runs against a temporary store. The real cache is never the subject.
 """
 
 import json
 import time
-from pathlib import Path
 
 import pytest
 
 from app.market import market_data_loader
+from app.market.chart_cache_store import reset_chart_cache_stores
 
 
 @pytest.fixture
 def isolated_chart_cache(tmp_path, monkeypatch):
     cache_file = tmp_path / "market_charts.json"
     monkeypatch.setattr(market_data_loader, "_CHART_CACHE_FILE", cache_file)
-    monkeypatch.setattr(market_data_loader, "_CHART_CACHE_LOADED", False)
-    monkeypatch.setattr(market_data_loader, "_CHART_CACHE_MTIME", 0.0)
     with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
         market_data_loader._CHART_DATA_CACHE.clear()
     yield cache_file
     with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
         market_data_loader._CHART_DATA_CACHE.clear()
+    reset_chart_cache_stores()
 
 
 def _entry(age_seconds: float, rows: int = 2) -> dict:
@@ -100,7 +100,7 @@ def test_pruning_is_idempotent(isolated_chart_cache):
     assert once == twice
 
 
-def test_persist_applies_retention_and_writes_atomically(isolated_chart_cache):
+def test_legacy_json_is_imported_once_and_persist_applies_retention(isolated_chart_cache):
     stale_age = market_data_loader._CHART_CACHE_RETENTION_SECONDS + 3600
     isolated_chart_cache.write_text(
         json.dumps({"charts": {"OLD:1D": _entry(stale_age), "KEEP:1D": _entry(30)}}),
@@ -111,27 +111,44 @@ def test_persist_applies_retention_and_writes_atomically(isolated_chart_cache):
 
     market_data_loader._persist_chart_cache()
 
-    written = json.loads(isolated_chart_cache.read_text(encoding="utf-8"))["charts"]
+    store = market_data_loader._chart_store()
+    written = set(store.keys())
     assert "NEW:1D" in written
     assert "KEEP:1D" in written
     assert "OLD:1D" not in written
-    # No temporary file left behind by the atomic replace.
-    assert not list(Path(isolated_chart_cache).parent.glob("*.tmp"))
+    # The legacy file is only a migration source; a later edit is not re-imported.
+    isolated_chart_cache.write_text(json.dumps({"charts": {"LATE:1D": _entry(1)}}), encoding="utf-8")
+    market_data_loader._persist_chart_cache()
+    assert "LATE:1D" not in store.keys()
 
 
-def test_file_stops_growing_across_repeated_persists(isolated_chart_cache, monkeypatch):
+def test_store_stops_growing_across_repeated_persists(isolated_chart_cache, monkeypatch):
     monkeypatch.setattr(market_data_loader, "_CHART_CACHE_MAX_ENTRIES", 25)
-    sizes = []
+    counts = []
     for round_index in range(6):
         with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
             market_data_loader._CHART_DATA_CACHE.clear()
             for i in range(20):
                 market_data_loader._CHART_DATA_CACHE[f"R{round_index}S{i}:1D"] = _entry(1, rows=5)
         market_data_loader._persist_chart_cache()
-        sizes.append(isolated_chart_cache.stat().st_size)
+        counts.append(market_data_loader._chart_store().count())
+
+    # Live keys are never evicted, so the bound is the cap plus one live round at most.
+    assert max(counts) <= 25 + 20, f"cache still growing without bound: {counts}"
+    assert counts[-1] <= 25
+
+
+def test_single_write_touches_only_its_own_key(isolated_chart_cache):
+    with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
+        market_data_loader._CHART_DATA_CACHE["MSFT:1D"] = _entry(1)
+    market_data_loader._persist_chart_cache()
+    store = market_data_loader._chart_store()
+    before = store.get("MSFT:1D")
+
+    market_data_loader._cache_chart_data("AAPL", "1D", [{"time": "t0", "close": 2.0, "volume": 1}])
 
-    # Unbounded growth would make the last size a multiple of the first.
-    assert sizes[-1] < sizes[0] * 3, f"cache still growing without bound: {sizes}"
+    assert store.get("MSFT:1D") == before
+    assert store.get(market_data_loader._chart_cache_key("AAPL", "1D"))["rows"][0]["close"] == 2.0
 
 
 def test_reading_after_pruning_still_returns_valid_rows(isolated_chart_cache):
@@ -141,8 +158,6 @@ def test_reading_after_pruning_still_returns_valid_rows(isolated_chart_cache):
 
     with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
         market_data_loader._CHART_DATA_CACHE.clear()
-    market_data_loader._CHART_CACHE_LOADED = False
-    market_data_loader._CHART_CACHE_MTIME = 0.0
 
     rows = market_data_loader.get_cached_chart_data("AAPL", "1D", allow_stale=True)
     assert rows and rows[0]["close"] == 1.0
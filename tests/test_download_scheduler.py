@@ -0,0 +1,257 @@
+"""Chunked provider downloads over a 3,000-symbol universe with a fake provider.
+
+The fake stands in for yfinance: it injects latency, fails whole chunks on demand and
+silently drops symbols from otherwise good responses.
+"""
+
+import importlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data import warm_data_pool
+from app.engine.store.market_memory_store import MarketMemoryStore
+from app.market.download_scheduler import DownloadScheduler
+from app.system import system_metrics
+
+market_data_cache = importlib.import_module("app.cache.market_data_cache")
+
+UNIVERSE = [f"S{index:04d}.SA" for index in range(3000)]
+INDEX = pd.date_range("2026-05-14 10:00", periods=60, freq="5min", tz="UTC")
+
+
+@pytest.fixture(autouse=True)
+def reset_provider_metrics():
+    # Thousands of per-symbol provider calls would fill the bounded metric tables.
+    yield
+    with system_metrics._lock:
+        system_metrics._external_provider_calls.clear()
+        system_metrics._external_provider_symbol_calls.clear()
+        system_metrics._external_provider_failures.clear()
+
+
+class FakeProvider:
+    def __init__(self, latency=0.01, failing=(), dropped=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.dropped = set(dropped)
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def download(self, tickers, **_kwargs):
+        tickers = list(tickers)
+        with self._lock:
+            self.calls.append(tuple(tickers))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            if self.failing.intersection(tickers):
+                raise TimeoutError("chunk timed out")
+            served = [ticker for ticker in tickers if ticker not in self.dropped]
+            closes = np.linspace(10.0, 11.0, len(INDEX))
+            block = np.tile(np.column_stack([closes, closes, closes, closes, np.full(len(INDEX), 1000.0)]), len(served))
+            columns = pd.MultiIndex.from_product([served, ["Open", "High", "Low", "Close", "Volume"]])
+            return pd.DataFrame(block, index=INDEX, columns=columns)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _scheduler(clock, **kwargs):
+    options = {"chunk_size": 100, "max_workers": 4, "chunk_cooldown": 30, "symbol_cooldown": 60, "max_cooldown": 600}
+    options.update(kwargs)
+    return DownloadScheduler(clock=lambda: clock[0], **options)
+
+
+def _run(scheduler, provider, symbols=UNIVERSE, on_chunk=None):
+    return scheduler.run(symbols, provider.download, market_data_cache._present_symbols, on_chunk)
+
+
+def test_universe_is_downloaded_in_bounded_concurrent_chunks():
+    provider = FakeProvider(latency=0.02)
+    scheduler = _scheduler([1000.0])
+    arrived = []
+
+    downloaded = _run(scheduler, provider, on_chunk=lambda symbols, data: arrived.append(len(symbols)))
+
+    assert len(provider.calls) == 30
+    assert all(len(call) == 100 for call in provider.calls)
+    assert 1 < provider.peak <= 4
+    assert arrived == [100] * 30
+    merged = market_data_cache._merge_chunks(downloaded.frames)
+    assert list(dict.fromkeys(merged.columns.get_level_values(0))) == UNIVERSE
+    assert downloaded.as_dict()["failed_chunks"] == 0
+
+
+def test_a_failed_chunk_cools_down_alone_and_backs_off():
+    clock = [1000.0]
+    provider = FakeProvider(failing={"S0150.SA"})
+    scheduler = _scheduler(clock)
+
+    first = _run(scheduler, provider)
+    assert first.failed_chunks == 1 and not first.all_failed
+    assert sum(len(request) for request, _data in first.frames) == 2900
+    assert scheduler.chunk_in_cooldown(tuple(UNIVERSE[100:200]))
+
+    provider.calls.clear()
+    second = _run(scheduler, provider)
+    assert second.skipped_chunks == 1
+    assert len(provider.calls) == 29
+    assert tuple(UNIVERSE[100:200]) not in provider.calls
+
+    # Past the first cooldown the chunk is retried; failing again doubles its cooldown.
+    clock[0] += 31
+    _run(scheduler, provider)
+    clock[0] += 31
+    assert scheduler.chunk_in_cooldown(tuple(UNIVERSE[100:200]))
+    clock[0] += 30
+    provider.failing.clear()
+    provider.calls.clear()
+    third = _run(scheduler, provider)
+    assert third.failed_chunks == 0 and len(provider.calls) == 30
+    assert not scheduler.chunk_in_cooldown(tuple(UNIVERSE[100:200]))
+
+
+def test_symbols_missing_from_good_chunks_back_off_individually():
+    clock = [1000.0]
+    provider = FakeProvider(dropped={"S0042.SA", "S2500.SA"})
+    scheduler = _scheduler(clock, symbol_misses=2)
+
+    _run(scheduler, provider)
+    # One miss is retried straight away: a partial response never poisons a symbol.
+    assert not scheduler.symbol_in_cooldown("S0042.SA")
+    _run(scheduler, provider)
+    assert scheduler.symbol_in_cooldown("S0042.SA")
+    assert scheduler.symbol_in_cooldown("S2500.SA")
+
+    provider.calls.clear()
+    downloaded = _run(scheduler, provider)
+    requested = {symbol for call in provider.calls for symbol in call}
+    assert "S0042.SA" not in requested and "S0041.SA" in requested
+    assert downloaded.cooled_symbols == 2
+
+    clock[0] += 61
+    provider.dropped.clear()
+    _run(scheduler, provider)
+    assert not scheduler.symbol_in_cooldown("S0042.SA")
+
+
+def test_get_market_data_keeps_the_provider_open_unless_every_chunk_fails(monkeypatch):
+    provider = FakeProvider(latency=0.005, failing={"S0000.SA"})
+    scheduler = _scheduler([1000.0])
+    monkeypatch.setattr(market_data_cache, "download_scheduler", scheduler)
+    monkeypatch.setattr(market_data_cache, "_get_yfinance", lambda: provider)
+    monkeypatch.setattr(market_data_cache, "_normalize_tickers", lambda tickers: tuple(tickers))
+    market_data_cache.market_data_cache.clear()
+
+    try:
+        data = market_data_cache.get_market_data(UNIVERSE[:1000])
+        assert set(data.columns.get_level_values(0)) == set(UNIVERSE[100:1000])
+        assert not market_data_cache._provider_in_cooldown(time.time())
+
+        provider.failing = set(UNIVERSE[1000:1300:100])
+        assert market_data_cache.get_market_data(UNIVERSE[1000:1300]) is None
+        assert market_data_cache._provider_in_cooldown(time.time())
+    finally:
+        market_data_cache.market_data_cache.clear()
+
+
+def test_warm_pool_publishes_chunks_as_they_arrive(monkeypatch):
+    provider = FakeProvider(latency=0.01, failing={"S0300.SA"})
+    scheduler = _scheduler([1000.0], chunk_size=250)
+    store = MarketMemoryStore(window=64, capacity=64)
+    seen_while_downloading = []
+    original_download = provider.download
+
+    def download(tickers, **kwargs):
+        seen_while_downloading.append(len(warm_data_pool._pool))
+        return original_download(tickers, **kwargs)
+
+    provider.download = download
+    monkeypatch.setattr(market_data_cache, "download_scheduler", scheduler)
+    monkeypatch.setattr(market_data_cache, "_get_yfinance", lambda: provider)
+    monkeypatch.setattr(market_data_cache, "_normalize_tickers", lambda tickers: tuple(tickers))
+    monkeypatch.setattr(scheduler, "max_workers", 1)
+    monkeypatch.setattr(warm_data_pool, "market_memory_store", store)
+    monkeypatch.setattr(warm_data_pool, "_pool", {})
+    monkeypatch.setattr(warm_data_pool, "_last_update", 0.0)
+    monkeypatch.setattr(warm_data_pool, "get_all_tickers", lambda: UNIVERSE)
+    monkeypatch.setattr(warm_data_pool, "get_cached_chart_data", lambda symbol, interval: None)
+    monkeypatch.setattr(warm_data_pool.market_store, "update", lambda pool: None)
+    market_data_cache.market_data_cache.clear()
+
+    try:
+        pool = warm_data_pool.update_pool(force_refresh=True)
+    finally:
+        market_data_cache.market_data_cache.clear()
+
+    assert len(pool) == 2750
+    assert "S0250.SA" not in pool and "S0249.SA" in pool
+    # Each chunk found the previous ones already published.
+    assert seen_while_downloading == [0, 250, 250, 500, 750, 1000, 1250, 1500, 1750, 2000, 2250, 2500]
+    assert len(store.symbols()) == 2750
+
+
+def test_concurrent_chunks_through_the_real_yfinance_provider_keep_their_own_symbols(monkeypatch):
+    yfinance_multi = pytest.importorskip("yfinance.multi")
+    from app.market.market_data_provider import YFinanceProvider
+
+    class OfflineTicker:
+        """Stands in for the network in yfinance's own download(); a slow per-symbol history."""
+
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, **_kwargs):
+            time.sleep(0.05)
+            close = float(int(self.ticker[1:5]))
+            return pd.DataFrame(
+                {"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000.0},
+                index=INDEX[:5],
+            )
+
+    monkeypatch.setattr(yfinance_multi, "Ticker", OfflineTicker)
+    provider = YFinanceProvider()
+    scheduler = _scheduler([1000.0], chunk_size=3, max_workers=4)
+    symbols = UNIVERSE[:12]
+
+    downloaded = scheduler.run(
+        symbols,
+        lambda chunk: provider.download(list(chunk), period="1d", interval="5m", group_by="ticker", threads=False, progress=False),
+        market_data_cache._present_symbols,
+    )
+
+    # yf.download keeps its results in module globals that every call resets, so
+    # overlapping calls would lose (or swap) each other's symbols.
+    assert downloaded.failed_chunks == 0 and downloaded.missing_symbols == 0
+    merged = market_data_cache._merge_chunks(downloaded.frames)
+    assert sorted(merged.columns.get_level_values(0)) == sorted(symbols * 5)
+    for symbol in symbols:
+        assert merged[symbol]["Close"].iloc[-1] == float(int(symbol[1:5]))
+
+
+def test_a_full_universe_round_is_cached_whole(monkeypatch):
+    provider = FakeProvider(latency=0.0)
+    monkeypatch.setattr(market_data_cache, "download_scheduler", _scheduler([1000.0]))
+    monkeypatch.setattr(market_data_cache, "_get_yfinance", lambda: provider)
+    monkeypatch.setattr(market_data_cache, "_normalize_tickers", lambda tickers: tuple(tickers))
+    monkeypatch.setattr(market_data_cache, "MAX_CACHE_SYMBOLS", None)
+    monkeypatch.setattr(market_data_cache, "get_all_tickers", lambda: UNIVERSE)
+    market_data_cache.market_data_cache.clear()
+
+    try:
+        market_data_cache.get_market_data(UNIVERSE)
+        calls = len(provider.calls)
+        again = market_data_cache.get_market_data(UNIVERSE)
+    finally:
+        market_data_cache.market_data_cache.clear()
+
+    # The cap follows the universe, so the second call is served from the cache.
+    assert len(provider.calls) == calls == 30
+    assert len(set(again.columns.get_level_values(0))) == len(UNIVERSE)
@@ -0,0 +1,131 @@
+"""The incremental engine cycle recomputes only symbols whose bars changed.
+
+Every cycle must rank exactly like a full engine_v36.run_engine() rebuild, while
+unchanged symbols (even when the warm pool hands out fresh DataFrame copies) reuse
+their resident compute_core rows and enriched market fields.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.engine import engine_orchestrator
+from app.engine.core.engine_v36 import run_engine
+from app.engine.core.incremental_scanner import IncrementalEngine, frame_fingerprint
+from app.system.system_metrics import format_prometheus_metrics, get_engine_incremental_metrics_snapshot
+
+
+def _frame(seed: int, periods: int = 160) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    closes = 20.0 * np.cumprod(1.0 + rng.normal(0.002, 0.01, periods))
+    volumes = rng.integers(50_000, 150_000, periods).astype(float)
+    if seed % 3 == 0:
+        volumes[-1] *= 6.0
+    if seed % 7 == 0:
+        closes[-40] = np.nan
+    return pd.DataFrame(
+        {
+            "Open": closes * 0.998,
+            "High": closes * 1.01,
+            "Low": closes * 0.99,
+            "Close": closes,
+            "Volume": volumes,
+        },
+        index=pd.date_range("2026-05-14 10:00", periods=periods, freq="5min", tz="UTC"),
+    )
+
+
+def _pool(count: int = 60) -> dict:
+    pool = {f"T{index:03d}.SA": _frame(index) for index in range(count)}
+    pool["SHORT3.SA"] = _frame(999, periods=50)
+    return pool
+
+
+def _append_bar(frame: pd.DataFrame, jump: float) -> pd.DataFrame:
+    last = frame.iloc[[-1]].copy()
+    last.index = last.index + pd.Timedelta(minutes=5)
+    last[["Open", "High", "Low", "Close"]] *= jump
+    return pd.concat([frame.iloc[1:], last])
+
+
+def test_incremental_ranking_matches_a_full_rebuild_every_cycle():
+    engine = IncrementalEngine()
+    pool = _pool()
+
+    first = engine.rank(pool)
+    assert first == run_engine(pool)
+    assert engine.last_cycle == {
+        "symbols": 61, "recomputed": 60, "reused": 0, "skipped": 1, "ranked": len(first),
+    }
+
+    moved = dict(pool)
+    moved["T004.SA"] = _append_bar(pool["T004.SA"], 1.2)
+    moved["T011.SA"] = _append_bar(pool["T011.SA"], 0.8)
+    changed = pool["T020.SA"].copy()
+    changed.iloc[-1, changed.columns.get_loc("Close")] *= 1.05
+    moved["T020.SA"] = changed
+    del moved["T030.SA"]
+
+    second = engine.rank(moved)
+    assert second == run_engine(moved)
+    assert engine.last_cycle["recomputed"] == 3
+    assert engine.last_cycle["reused"] == 56
+    assert second != first
+
+
+def test_fresh_copies_of_unchanged_frames_are_reused():
+    engine = IncrementalEngine()
+    pool = _pool(20)
+    engine.rank(pool)
+
+    copies = {ticker: frame.copy() for ticker, frame in pool.items()}
+    assert frame_fingerprint(copies["T001.SA"]) == frame_fingerprint(pool["T001.SA"])
+
+    ranked = engine.rank(copies)
+
+    assert ranked == run_engine(copies)
+    assert engine.last_cycle["recomputed"] == 0
+    assert engine.last_cycle["reused"] == 20
+    # Rows handed out are copies; downstream annotation cannot corrupt the resident row.
+    ranked[0]["events"] = ["mutated"]
+    assert "events" not in engine.rank(copies)[0]
+
+
+def test_enrichment_reuses_market_fields_until_the_frame_changes():
+    engine = IncrementalEngine()
+    pool = _pool(12)
+    calls = []
+
+    def compute(frame):
+        calls.append(frame)
+        return engine_orchestrator._market_fields_from_frame(frame)
+
+    def enrich(current):
+        ranked = engine.rank(current)
+        return engine_orchestrator._enrich_ranked_with_market_data(
+            ranked, current, lambda frame: engine.market_fields(frame, compute)
+        )
+
+    first = enrich(pool)
+    assert first == engine_orchestrator._enrich_ranked_with_market_data(run_engine(pool), pool)
+    computed = len(calls)
+    assert computed == len(first)
+
+    moved = {ticker: frame.copy() for ticker, frame in pool.items()}
+    moved["T003.SA"] = _append_bar(pool["T003.SA"], 1.3)
+    second = enrich(moved)
+
+    assert second == engine_orchestrator._enrich_ranked_with_market_data(run_engine(moved), moved)
+    assert len(calls) - computed <= 1
+
+
+def test_cycle_counters_reach_system_metrics():
+    engine = IncrementalEngine()
+    pool = _pool(10)
+    engine.rank(pool)
+    engine.rank(pool)
+
+    metrics = get_engine_incremental_metrics_snapshot()
+    assert metrics["last_recomputed"] == 0
+    assert metrics["last_reused"] == 10
+    assert metrics["symbols_reused_total"] >= 10
+    assert 'engine_last_cycle_symbols{outcome="reused"} 10' in format_prometheus_metrics()
@@ -97,7 +97,7 @@ class EngineOrchestratorSignalEnrichmentTests(unittest.TestCase):
             "update_signals",
         ) as update_signals, patch.object(
             engine_orchestrator,
-            "record_worker_stage_duration",
+            "profile_stage",
         ), patch.object(
             engine_orchestrator,
             "record_cycle",
@@ -0,0 +1,94 @@
+"""The column-wise cross-section stage matches the per-row ranking it replaced exactly."""
+
+import random
+
+import pytest
+
+from app.ai.feature_hub import _add_cross_section_features, build_asset_features, build_feature_hub, clamp, safe_float
+
+
+def _rank_pct(value, values):
+    ordered = sorted(values)
+    if len(ordered) <= 1 or ordered[0] == ordered[-1]:
+        return 50.0
+    below_or_equal = sum(1 for item in ordered if item <= value)
+    return clamp(((below_or_equal - 1) / (len(ordered) - 1)) * 100.0)
+
+
+def _scalar_cross_section(rows):
+    columns = {key: [safe_float(row.get(key)) for row in rows] for key in ("change_pct", "momentum", "rel_volume", "source_score")}
+    mean_change = sum(columns["change_pct"]) / max(1, len(rows))
+    enriched = []
+    for row in rows:
+        change, momentum, rel_volume, source_score = (safe_float(row.get(key)) for key in columns)
+        source_rank = _rank_pct(source_score, columns["source_score"])
+        strength = (
+            _rank_pct(change, columns["change_pct"]) * 0.30
+            + _rank_pct(momentum, columns["momentum"]) * 0.22
+            + _rank_pct(rel_volume, columns["rel_volume"]) * 0.20
+            + source_rank * 0.28
+        )
+        abnormal = clamp(
+            abs(change) * 14.0 + abs(momentum) * 10.0 + max(rel_volume - 1.0, 0.0) * 24.0 + abs(source_score - 50.0) * 0.20
+        )
+        enriched.append(
+            {
+                **row,
+                "relative_strength_score": round(clamp(strength), 4),
+                "relative_weakness_score": round(clamp(100.0 - strength), 4),
+                "source_score_rank": round(source_rank, 4),
+                "market_relative_change": round(change - mean_change, 4),
+                "abnormal_move_score": round(abnormal, 4),
+            }
+        )
+    return enriched
+
+
+def _rows(count, seed=11):
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        rows.append(
+            {
+                "ticker": f"T{index:04d}",
+                "price": rng.choice([round(rng.uniform(1, 200), 2), 0, None]),
+                "volume": rng.choice([rng.randint(0, 9_000_000), None]),
+                # Coarse values so ties are common.
+                "change_pct": rng.choice([round(rng.uniform(-6, 6), 1), 0.0, 1.5, "n/a"]),
+                "momentum": rng.choice([round(rng.uniform(-3, 3), 1), 0.0]),
+                "rel_volume": rng.choice([round(rng.uniform(0, 5), 1), 1.0, None]),
+                "score": rng.choice([rng.randint(0, 100), rng.uniform(0, 10), None]),
+            }
+        )
+    return rows
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 150, 600])
+def test_cross_section_matches_the_scalar_ranking(count):
+    features = [build_asset_features(row) for row in _rows(count)]
+
+    assert _add_cross_section_features(features) == _scalar_cross_section(features)
+
+
+def test_flat_columns_rank_at_fifty():
+    rows = [{"ticker": f"S{index}", "change_pct": 1.0, "momentum": 2.0, "rel_volume": 1.0, "source_score": 40.0} for index in range(5)]
+
+    result = _add_cross_section_features(rows)
+
+    assert result == _scalar_cross_section(rows)
+    assert {row["source_score_rank"] for row in result} == {50.0}
+    assert {row["relative_strength_score"] for row in result} == {50.0}
+
+
+def test_build_feature_hub_keeps_row_shape():
+    hub = build_feature_hub(_rows(40), _rows(10, seed=5))
+
+    assert len(hub) == 40
+    assert list(hub[0])[-5:] == [
+        "relative_strength_score",
+        "relative_weakness_score",
+        "source_score_rank",
+        "market_relative_change",
+        "abnormal_move_score",
+    ]
+    assert all(isinstance(row["relative_strength_score"], float) for row in hub)
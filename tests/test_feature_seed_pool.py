@@ -0,0 +1,88 @@
+"""Snapshot enrichment on the feature seed process pool matches the serial path."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import feature_seed, market_snapshot_engine
+from app.engine.feature_seed import FeatureSeedPool
+
+
+def _frame(index, rng):
+    bars = int(rng.integers(12, 120))
+    close = 20.0 + np.cumsum(rng.normal(0.0, 0.2, bars))
+    frame = pd.DataFrame(
+        {
+            "Open": close + rng.normal(0.0, 0.05, bars),
+            "High": close + 0.1,
+            "Low": close - 0.1,
+            "Close": close,
+            "Volume": rng.integers(0, 5000, bars).astype(float),
+        },
+        index=pd.date_range("2026-05-04 13:00", periods=bars, freq="5min", tz="UTC"),
+    )
+    if index % 7 == 0:
+        frame.iloc[rng.integers(0, bars, 4), 3] = np.nan
+    if index % 11 == 0:
+        frame.iloc[rng.integers(0, bars, 3), :] = np.nan
+    return frame
+
+
+@pytest.fixture(scope="module")
+def universe():
+    rng = np.random.default_rng(11)
+    pool = {f"T{index:03d}.SA": _frame(index, rng) for index in range(72)}
+    pool["T005.SA"] = pool["T005.SA"].drop(columns=["Volume"])
+    signals = [{"ticker": f"T{index:03d}.SA", "score": 40 + index % 50} for index in range(80)]
+    signals[3]["trend"] = "up"
+    return pool, signals
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    pool = FeatureSeedPool(processes=2, min_tickers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_results_match_the_serial_path(universe, process_pool, monkeypatch):
+    pool, signals = universe
+    monkeypatch.setattr(market_snapshot_engine, "get_market_pool", lambda: pool)
+
+    monkeypatch.setattr(market_snapshot_engine, "feature_seed_pool", FeatureSeedPool(processes=0))
+    serial = market_snapshot_engine._enrich_signal_rows(signals)
+    monkeypatch.setattr(market_snapshot_engine, "feature_seed_pool", process_pool)
+    parallel = market_snapshot_engine._enrich_signal_rows(signals)
+
+    assert parallel == serial
+    assert [row["ticker"] for row in parallel] == [row["ticker"] for row in signals]
+    assert sum(1 for row in parallel if "rsi" in row) > 60
+    assert parallel[3]["trend"] == "up"
+    # Tickers without a frame pass through untouched.
+    assert "rsi" not in parallel[-1]
+
+
+def test_batches_come_back_in_job_order(universe, process_pool):
+    pool, _signals = universe
+    packed = [feature_seed.pack_frame(ticker, frame) for ticker, frame in pool.items()]
+
+    results = process_pool.compute(packed)
+
+    assert [features["ticker"] for features, _error in results if features] == [
+        ticker for ticker, _index, values in packed if feature_seed.compute_feature_seed(ticker, _index, values)
+    ]
+
+
+def test_a_failing_pool_falls_back_to_serial_enrichment(universe, monkeypatch):
+    pool, signals = universe
+
+    class BrokenPool(FeatureSeedPool):
+        def compute(self, packed):
+            raise RuntimeError("worker died")
+
+    monkeypatch.setattr(market_snapshot_engine, "get_market_pool", lambda: pool)
+    monkeypatch.setattr(market_snapshot_engine, "feature_seed_pool", FeatureSeedPool(processes=0))
+    serial = market_snapshot_engine._enrich_signal_rows(signals)
+    monkeypatch.setattr(market_snapshot_engine, "feature_seed_pool", BrokenPool(processes=2, min_tickers=1))
+
+    assert market_snapshot_engine._enrich_signal_rows(signals) == serial
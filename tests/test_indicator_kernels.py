@@ -0,0 +1,164 @@
+"""Indicator kernels reproduce the per-ticker pandas implementations they replace."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import engine_orchestrator, feature_seed, market_snapshot_engine
+from app.engine.indicators import indicator_kernels as kernels
+from app.engine.indicators.vector_indicator_engine import _wilder_rma, compute_rsi
+from app.engine.store.market_memory_store import MarketMemoryStore
+
+
+def _closes(count=120, seed=3):
+    rng = np.random.default_rng(seed)
+    return [20.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, int(rng.integers(16, 90))))) for _ in range(count)]
+
+
+def _frame(rng, bars, index_start="2026-05-04 13:00"):
+    close = 20.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, bars)))
+    return pd.DataFrame(
+        {
+            "Open": close * (1 + rng.normal(0.0, 0.002, bars)),
+            "High": close * 1.003,
+            "Low": close * 0.997,
+            "Close": close,
+            "Volume": rng.integers(0, 5000, bars).astype(float),
+        },
+        index=pd.date_range(index_start, periods=bars, freq="5min", tz="UTC"),
+    )
+
+
+@pytest.fixture(scope="module")
+def ragged():
+    rows = _closes()
+    return rows, kernels.stack_right_aligned(rows, 90)
+
+
+def test_recursive_kernels_match_pandas_bit_for_bit(ragged):
+    rows, matrix = ragged
+    ema20 = kernels.ema(matrix, 20)
+    rsi = kernels.rsi(matrix)
+    macd_line, signal_line, _histogram = kernels.macd(matrix)
+    rma = kernels.wilder_rma(matrix, 14)
+
+    for position, row in enumerate(rows):
+        series = pd.Series(row)
+        bars = len(row)
+        expected_macd = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+        np.testing.assert_array_equal(ema20[position, -bars:], series.ewm(span=20, adjust=False).mean().to_numpy())
+        np.testing.assert_array_equal(rsi[position, -bars:], compute_rsi(series).to_numpy())
+        np.testing.assert_array_equal(macd_line[position, -bars:], expected_macd.to_numpy())
+        np.testing.assert_array_equal(
+            signal_line[position, -bars:], expected_macd.ewm(span=9, adjust=False).mean().to_numpy()
+        )
+        np.testing.assert_array_equal(rma[position, -bars:], _wilder_rma(series, 14).to_numpy())
+        # Left padding stays empty.
+        assert np.isnan(ema20[position, :-bars]).all()
+
+
+def test_window_kernels_match_pandas(ragged):
+    rows, close = ragged
+    high, low = close * 1.01, close * 0.99
+    volume = np.where(np.isnan(close), np.nan, np.round(close * 100.0))
+    atr = kernels.atr(high, low, close, 14)
+    std = kernels.tail_std(close, 20)
+    vwap = kernels.vwap(high, low, close, volume, 20)
+    last, average, ratio = kernels.relative_volume(volume, 20)
+
+    for position, row in enumerate(rows):
+        series = pd.Series(row)
+        prev = series.shift(1).fillna(series)
+        true_range = pd.concat([(series * 1.01 - series * 0.99).abs(), (series * 1.01 - prev).abs(), (series * 0.99 - prev).abs()], axis=1).max(axis=1)
+        volumes = np.round(series * 100.0).tail(20)
+        typical = (series.tail(20) * 1.01 + series.tail(20) * 0.99 + series.tail(20)) / 3.0
+        # Full windows are bit-identical; a row shorter than the window may differ in the last bit.
+        assert atr[position] == pytest.approx(true_range.tail(14).mean(), rel=1e-14)
+        assert std[position] == pytest.approx(series.tail(20).std(), rel=1e-12)
+        assert vwap[position] == pytest.approx((typical * volumes).sum() / volumes.sum(), rel=1e-14)
+        assert average[position] == pytest.approx(volumes.mean(), rel=1e-14)
+        assert ratio[position] == pytest.approx(volumes.iloc[-1] / volumes.mean(), rel=1e-14)
+        assert last[position] == volumes.iloc[-1]
+        if len(row) >= 20:
+            assert std[position] == series.tail(20).std()
+
+
+def test_numba_loop_matches_the_numpy_path(ragged):
+    _rows, matrix = ragged
+    alpha = 2.0 / 13.0
+    looped = kernels._ewm_rows(matrix[:20], alpha, np.empty_like(matrix[:20]))
+    np.testing.assert_array_equal(looped, kernels._ewm_columns(matrix[:20], alpha))
+
+
+def test_vectorised_feature_seeds_match_the_pandas_seed():
+    rng = np.random.default_rng(21)
+    packed = []
+    for index in range(160):
+        frame = _frame(rng, int(rng.integers(10, 100)))
+        bars = len(frame)
+        if index % 5 == 0:
+            frame.iloc[rng.integers(0, bars, 3), 4] = np.nan
+        if index % 7 == 0:
+            frame.iloc[rng.integers(0, bars, 2), :] = np.nan
+        if index % 9 == 0:
+            frame.iloc[rng.integers(0, bars, 1), 3] = np.nan
+        packed.append(feature_seed.pack_frame(f"T{index:03d}.SA", frame))
+
+    vectorised = feature_seed.compute_feature_seeds(packed)
+
+    assert vectorised == [feature_seed.compute_feature_seed(*job) for job in packed]
+    assert sum(seed is not None for seed in vectorised) > 120
+
+
+def test_engine_market_fields_batch_matches_the_per_frame_path():
+    rng = np.random.default_rng(8)
+    frames = []
+    for index in range(120):
+        frame = _frame(rng, int(rng.integers(2, 80)))
+        if index % 6 == 0:
+            frame.iloc[-1, 4] = 0.0
+        if index % 8 == 0:
+            frame.iloc[rng.integers(0, len(frame), 1), 0] = np.nan
+        if index % 10 == 0:
+            frame.attrs["market_data_source"] = "persistent_chart_cache"
+        frames.append(frame)
+
+    batch = engine_orchestrator._market_fields_batch(frames)
+
+    assert len(batch) > 80
+    for frame in frames:
+        if id(frame) in batch:
+            expected = engine_orchestrator._market_fields_from_frame(frame)
+            assert batch[id(frame)][1] == expected
+            assert list(batch[id(frame)][1] or ()) == list(expected or ())
+
+    pool = {f"T{index:03d}.SA": frame for index, frame in enumerate(frames)}
+    ranked = [{"ticker": ticker, "score": 50.0} for ticker in pool]
+    per_frame = engine_orchestrator._enrich_ranked_with_market_data(
+        ranked, pool, engine_orchestrator._market_fields_from_frame
+    )
+    assert engine_orchestrator._enrich_ranked_with_market_data(ranked, pool) == per_frame
+
+
+def test_engine_stages_read_linked_frames_from_the_store(monkeypatch):
+    rng = np.random.default_rng(13)
+    store = MarketMemoryStore(window=128, capacity=8)
+    pool = {}
+    for index in range(80):
+        frame = _frame(rng, int(rng.integers(2, 200)))
+        if index % 6 == 0:
+            frame.iloc[-1, 4] = 0.0
+        pool[f"T{index:03d}.SA"] = frame
+        store.ingest_frame(f"T{index:03d}.SA", frame)
+    ranked = [{"ticker": ticker, "score": 50.0} for ticker in pool]
+
+    assert engine_orchestrator._enrich_ranked_with_market_data(
+        ranked, pool, store=store
+    ) == engine_orchestrator._enrich_ranked_with_market_data(ranked, pool)
+
+    jobs = [(ticker, frame, {"ticker": ticker}) for ticker, frame in pool.items()]
+    expected = market_snapshot_engine._build_feature_seeds(jobs)
+    monkeypatch.setattr(market_snapshot_engine, "market_memory_store", store)
+    symbols = {id(frame): ticker for ticker, frame in pool.items()}
+    assert market_snapshot_engine._build_feature_seeds(jobs, symbols) == expected
+    assert sum(seed is not None for seed in expected) > 40
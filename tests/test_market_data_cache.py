@@ -25,6 +25,7 @@ class MarketDataCacheTests(unittest.TestCase):
         market_data_cache_module._last_update = 0.0
         market_data_cache_module._provider_cooldown_until = 0.0
         market_data_cache_module._last_provider_failure_log = 0.0
+        market_data_cache_module.download_scheduler.reset()
         for symbol in ("DOGEUSD", "DOGE-USD", "ADAUSD", "ADA-USD", "PETR4.SA", "TSLA"):
             symbol_sanitizer.clear_symbol_cooldown(symbol)
 
@@ -38,8 +39,9 @@ class MarketDataCacheTests(unittest.TestCase):
             patch.object(market_data_cache_module, "record_external_provider_call"), \
             patch.object(market_data_cache_module, "record_worker_stage_duration") as record_stage, \
             patch.object(market_data_cache_module.logger, "warning"):
-            self.assertIsNone(market_data_cache_module.fetch_market_data(("PETR4.SA",)))
-            self.assertIsNone(market_data_cache_module.fetch_market_data(("VALE3.SA",)))
+            # Every chunk of the round failed, so the provider itself cools down.
+            self.assertIsNone(market_data_cache_module.get_market_data(["PETR4.SA"]))
+            self.assertIsNone(market_data_cache_module.get_market_data(["VALE3.SA"]))
 
         self.assertEqual(fake_yf.calls, 1)
         record_stage.assert_any_call("market_download_cooldown", 0.0, success=False)
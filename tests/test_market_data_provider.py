@@ -0,0 +1,171 @@
+"""Replay provider: fixtures, replay clock, latency, and a full offline engine cycle."""
+
+import importlib
+import json
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from app.api import market_routes
+from app.data import warm_data_pool
+from app.engine import engine_orchestrator
+from app.engine.market_snapshot_engine import build_snapshot_payload
+from app.engine.store.market_memory_store import MarketMemoryStore
+from app.market import market_data_loader
+from app.market.download_scheduler import DownloadScheduler
+from app.market.market_data_provider import (
+    MarketDataProvider,
+    ReplayProvider,
+    YFinanceProvider,
+    get_market_data_provider,
+    set_market_data_provider,
+)
+from app.services import poll_service
+from app.system.system_metrics import provider_call_context
+
+market_data_cache = importlib.import_module("app.cache.market_data_cache")
+
+SESSION = datetime(2026, 1, 30, 13, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def replay():
+    provider = ReplayProvider(speed=0)
+    previous = set_market_data_provider(provider)
+    yield provider
+    set_market_data_provider(previous)
+
+
+def _write_fixture(directory, symbol, bars=72):
+    index = pd.date_range(SESSION, periods=bars, freq="5min")
+    closes = [20.0 + step * 0.1 for step in range(bars)]
+    pd.DataFrame(
+        {
+            "time": index.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "open": closes,
+            "high": [value + 0.05 for value in closes],
+            "low": [value - 0.05 for value in closes],
+            "close": closes,
+            "volume": [1000] * bars,
+        }
+    ).to_csv(directory / f"{symbol}.csv", index=False)
+
+
+def test_both_providers_satisfy_the_protocol():
+    assert isinstance(YFinanceProvider(), MarketDataProvider)
+    assert isinstance(ReplayProvider(), MarketDataProvider)
+
+
+def test_environment_selects_the_replay_provider(monkeypatch, tmp_path):
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "replay")
+    monkeypatch.setenv("MARKET_REPLAY_DIR", str(tmp_path))
+    monkeypatch.setenv("MARKET_REPLAY_SPEED", "0")
+    previous = set_market_data_provider(None)
+    try:
+        provider = get_market_data_provider()
+        assert isinstance(provider, ReplayProvider)
+        assert provider.directory == tmp_path and provider.speed == 0
+    finally:
+        set_market_data_provider(previous)
+
+
+def test_fixture_bars_follow_the_replay_clock(tmp_path):
+    _write_fixture(tmp_path, "PETR4.SA")
+    clock = [1000.0]
+    provider = ReplayProvider(
+        directory=tmp_path,
+        start=SESSION + pd.Timedelta(minutes=5 * 59),
+        speed=60.0,
+        synthetic=False,
+        clock=lambda: clock[0],
+    )
+
+    data = provider.download(["PETR4.SA", "MISSING.SA"], period="1d", interval="5m", group_by="ticker")
+    assert list(dict.fromkeys(data.columns.get_level_values(0))) == ["PETR4.SA"]
+    assert len(data) == 60
+    assert data["PETR4.SA"]["Close"].iloc[-1] == pytest.approx(25.9)
+    # Shifted by whole days: the replayed session reads as today, at its own time of day.
+    assert data.index[-1].date() == datetime.now(timezone.utc).date()
+    assert (data.index[-1].hour, data.index[-1].minute) == (17, 55)
+
+    # Ten wall-clock seconds at 60x are two more five-minute bars.
+    clock[0] += 10
+    assert len(provider.download("PETR4.SA", period="1d", interval="5m")) == 62
+    hourly = provider.download("PETR4.SA", period="1d", interval="1h")
+    assert len(hourly) == 6 and hourly["Volume"].sum() == 62 * 1000
+
+
+def test_synthetic_series_are_deterministic_and_never_look_ahead():
+    first = ReplayProvider(speed=0)
+    second = ReplayProvider(speed=0)
+
+    bars = first.download(["VALE3.SA", "ITUB4.SA"], period="5d", interval="5m", group_by="ticker")
+    assert bars.equals(second.download(["VALE3.SA", "ITUB4.SA"], period="5d", interval="5m", group_by="ticker"))
+    assert not bars["VALE3.SA"]["Close"].equals(bars["ITUB4.SA"]["Close"])
+
+    daily = first.download("VALE3.SA", period="1y", interval="1d")
+    today = bars["VALE3.SA"].loc[bars.index.normalize() == bars.index[-1].normalize()]
+    # Today's daily bar only aggregates the bars already replayed.
+    assert len(daily) == 260
+    assert daily["Close"].iloc[-1] == pytest.approx(today["Close"].iloc[-1])
+    assert daily["Volume"].iloc[-1] == pytest.approx(today["Volume"].sum())
+
+    by_field = first.download(["VALE3.SA", "ITUB4.SA"], period="1y", interval="1d")
+    assert list(by_field["Close"].columns) == ["VALE3.SA", "ITUB4.SA"]
+
+
+def test_latency_is_applied_per_call():
+    provider = ReplayProvider(speed=0, latency=0.05)
+    start = time.perf_counter()
+    provider.download(["PETR4.SA"], period="1d", interval="5m", group_by="ticker")
+    provider.Ticker("PETR4.SA")
+    assert time.perf_counter() - start >= 0.1
+    assert provider.calls == {"download": 1, "ticker": 1}
+
+
+def test_quotes_and_calendar_go_through_the_configured_provider(replay, tmp_path):
+    replay.directory = tmp_path
+    (tmp_path / "calendar.json").write_text(json.dumps({"VALE3": {"Earnings Date": ["2026-02-12"]}}))
+    poll_service._earnings_cache.clear()
+
+    with provider_call_context("worker"):
+        quote = market_data_loader._price_payload_from_fast_info("PETR4.SA")
+    visible = replay.download("PETR4.SA", period="1d", interval="5m")
+
+    assert quote["price"] == pytest.approx(visible["Close"].iloc[-1], abs=1e-4)
+    assert quote["volume"] == pytest.approx(visible["Volume"].sum())
+    assert quote["market_state"] == "REGULAR"
+    assert poll_service._fetch_earnings_date("VALE3").date().isoformat() == "2026-02-12"
+    poll_service._earnings_cache.clear()
+
+
+def test_engine_cycle_and_api_run_end_to_end_on_replay(replay, monkeypatch):
+    universe = [f"R{index:03d}.SA" for index in range(40)]
+    monkeypatch.setattr(market_data_cache, "download_scheduler", DownloadScheduler(chunk_size=15, max_workers=3))
+    monkeypatch.setattr(market_data_cache, "_normalize_tickers", lambda tickers: tuple(tickers))
+    monkeypatch.setattr(warm_data_pool, "market_memory_store", MarketMemoryStore(window=64, capacity=64))
+    monkeypatch.setattr(warm_data_pool, "_pool", {})
+    monkeypatch.setattr(warm_data_pool, "_last_update", 0.0)
+    monkeypatch.setattr(warm_data_pool, "get_all_tickers", lambda: universe)
+    monkeypatch.setattr(warm_data_pool, "get_cached_chart_data", lambda symbol, interval: None)
+    monkeypatch.setattr(warm_data_pool.market_store, "get", lambda: None)
+    monkeypatch.setattr(warm_data_pool.market_store, "update", lambda pool: None)
+    monkeypatch.setattr(engine_orchestrator, "update_signals", lambda rows: None)
+    market_data_cache.market_data_cache.clear()
+
+    try:
+        with provider_call_context("worker"):
+            ranked = engine_orchestrator.run_engine()
+    finally:
+        market_data_cache.market_data_cache.clear()
+
+    assert ranked and replay.calls["download"] == 3
+    assert {row["price_source"] for row in ranked} == {"warm_market_pool"}
+    assert all(row["ticker"] in universe and row["market_data_points"] == 60 for row in ranked)
+
+    signals = build_snapshot_payload(ranked)["signals"]
+    monkeypatch.setattr(market_routes, "get_snapshot_signals", lambda: signals)
+    movers = market_routes.get_top_movers(current_user=None)
+    assert movers["count"] > 0
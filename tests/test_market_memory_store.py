@@ -0,0 +1,221 @@
+"""Resident OHLCV ring buffers: appends, revisions, zero-copy views and pool wiring."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data import warm_data_pool
+from app.engine.core.engine_v36 import run_engine
+from app.engine.core.incremental_scanner import IncrementalEngine
+from app.engine.store.market_memory_store import MarketMemoryStore
+
+
+def _frame(periods: int, seed: int = 1, start: str = "2026-05-14 10:00") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    closes = 20.0 * np.cumprod(1.0 + rng.normal(0.002, 0.01, periods))
+    return pd.DataFrame(
+        {
+            "Open": closes * 0.998,
+            "High": closes * 1.01,
+            "Low": closes * 0.99,
+            "Close": closes,
+            "Volume": rng.integers(50_000, 150_000, periods).astype(float),
+        },
+        index=pd.date_range(start, periods=periods, freq="5min", tz="UTC"),
+    )
+
+
+def test_appends_only_new_bars_and_revises_the_last_one_in_place():
+    store = MarketMemoryStore(window=16, capacity=2)
+    frame = _frame(40)
+
+    assert store.ingest_frame("PETR4", frame.iloc[:30]) == 16
+    first_version = store.version("PETR4")
+    assert store.ingest_frame("PETR4", frame.iloc[:30]) == 0
+    assert store.version("PETR4") == first_version
+
+    # Overlapping download: only the 10 newer bars are written.
+    assert store.ingest_frame("PETR4", frame) == 10
+    np.testing.assert_array_equal(store.view("PETR4"), frame["Close"].values[-16:])
+    np.testing.assert_array_equal(store.view("PETR4", "Volume", bars=4), frame["Volume"].values[-4:])
+
+    revised = frame.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] = 99.0
+    assert store.ingest_frame("PETR4", revised) == 1
+    assert store.view("PETR4", bars=1)[0] == 99.0
+    assert store.version("PETR4") > first_version
+    assert store.stamps("PETR4", bars=1)[0] == frame.index[-1].value
+
+
+def test_revisions_to_older_bars_are_rewritten_and_backfills_reseed_the_row():
+    store = MarketMemoryStore(window=16, capacity=2)
+    frame = _frame(40)
+    store.ingest_frame("PETR4", frame.iloc[:30])
+    version = store.version("PETR4")
+
+    # A 2:1 split adjusts every historical bar; the stamps stay the same.
+    adjusted = frame.iloc[:32].copy()
+    adjusted[["Open", "High", "Low", "Close"]] /= 2.0
+    assert store.ingest_frame("PETR4", adjusted) == 16 + 2
+    np.testing.assert_array_equal(store.view("PETR4"), adjusted["Close"].values[-16:])
+    np.testing.assert_array_equal(store.bars("PETR4")[1], adjusted["High"].values[-16:])
+    assert store.version("PETR4") > version
+
+    # A corrected print in the middle of the window rewrites just that bar, in both ring copies.
+    corrected = adjusted.copy()
+    corrected.iloc[-8, corrected.columns.get_loc("Volume")] = 1.0
+    assert store.ingest_frame("PETR4", corrected) == 1
+    np.testing.assert_array_equal(store.view("PETR4", "Volume"), corrected["Volume"].values[-16:])
+    newer = pd.concat([corrected, frame.iloc[32:40]])
+    assert store.ingest_frame("PETR4", newer) == 8
+    np.testing.assert_array_equal(store.view("PETR4", "Volume"), newer["Volume"].values[-16:])
+
+    # Backfill into a short row, and a bar the provider dropped: the row is rebuilt.
+    short = MarketMemoryStore(window=16, capacity=1)
+    short.ingest_frame("VALE3", frame.iloc[5:10])
+    assert short.ingest_frame("VALE3", frame.iloc[:10]) == 10
+    np.testing.assert_array_equal(short.stamps("VALE3"), frame.index[:10].asi8)
+    gapped = frame.iloc[:12].drop(frame.index[6])
+    short.ingest_frame("VALE3", gapped)
+    np.testing.assert_array_equal(short.stamps("VALE3"), gapped.index.asi8)
+    np.testing.assert_array_equal(short.view("VALE3"), gapped["Close"].values)
+
+
+def test_views_are_zero_copy_read_only_and_survive_growth_and_wraparound():
+    store = MarketMemoryStore(window=32, capacity=1)
+    for seed in range(5):
+        store.ingest_frame(f"S{seed}", _frame(20, seed))
+
+    assert store.stats()["capacity"] == 8
+    view = store.view("S3")
+    assert np.shares_memory(view, store._bars)
+    with pytest.raises(ValueError):
+        view[0] = 0.0
+
+    full = _frame(200, 7)
+    for end in range(10, 201, 13):
+        store.ingest_frame("WRAP", full.iloc[:end])
+        expected = full["Close"].values[:end][-32:]
+        np.testing.assert_array_equal(store.view("WRAP"), expected)
+        np.testing.assert_array_equal(store.bars("WRAP")[3], expected)
+
+    before = {symbol: store.view(symbol) for symbol in ("S0", "S4")}
+    assert store.remove(["S0", "S1", "GONE"]) == 2
+    assert store.symbols() == ["S2", "S3", "S4", "WRAP"]
+    assert store.stats()["capacity"] == 4
+    np.testing.assert_array_equal(store.view("S4"), _frame(20, 4)["Close"].values)
+    # Views taken before the removal keep their own symbol's bars, also once rows are reused.
+    store.ingest_frame("NEW", _frame(20, 9))
+    np.testing.assert_array_equal(before["S0"], _frame(20, 0)["Close"].values)
+    np.testing.assert_array_equal(before["S4"], _frame(20, 4)["Close"].values)
+    store.clear()
+    np.testing.assert_array_equal(before["S4"], _frame(20, 4)["Close"].values)
+    assert store.symbols() == [] and store.view("S4") is None
+
+
+def test_linked_frames_read_their_bars_from_the_store_until_the_row_moves():
+    store = MarketMemoryStore(window=64, capacity=2)
+    frame = _frame(80)
+    store.ingest_frame("PETR4", frame)
+
+    bars = store.frame_bars("PETR4", frame, 24)
+    np.testing.assert_array_equal(bars, frame.to_numpy().T[:, -24:])
+    assert np.shares_memory(bars, store._bars) and not bars.flags.writeable
+    # Only the linked frame itself qualifies: slices and copies take the pandas path.
+    assert store.frame_bars("PETR4", frame.copy()) is None
+    assert store.frame_bars("PETR4", frame.iloc[-30:]) is None
+    # A frame longer than the window has no complete view.
+    assert store.frame_bars("PETR4", frame) is None
+
+    short = frame.iloc[:40]
+    store.ingest_frame("VALE3", short)
+    np.testing.assert_array_equal(store.frame_bars("VALE3", short), short.to_numpy().T)
+    store.ingest_frame("VALE3", frame.iloc[:41])
+    assert store.frame_bars("VALE3", short) is None
+
+    gapped = _frame(30, 2)
+    gapped.iloc[5] = np.nan
+    store.ingest_frame("ITUB4", gapped)
+    assert store.frame_bars("ITUB4", gapped) is None
+
+
+def test_downloads_are_appended_like_the_frames_built_from_them():
+    frames = {"PETR4.SA": _frame(50, 1), "VALE3.SA": _frame(50, 2)}
+    frames["VALE3.SA"].iloc[-3:] = np.nan
+    download = pd.concat(frames, axis=1)
+    from_download, from_frames = MarketMemoryStore(window=32), MarketMemoryStore(window=32)
+
+    assert from_download.ingest_download(download, [*frames, "MISSING.SA"]) == {"PETR4.SA": 32, "VALE3.SA": 32}
+    from_frames.ingest_pool({symbol: frame.dropna(how="all") for symbol, frame in frames.items()})
+    for symbol in frames:
+        np.testing.assert_array_equal(from_download.bars(symbol), from_frames.bars(symbol))
+        np.testing.assert_array_equal(from_download.stamps(symbol), from_frames.stamps(symbol))
+
+    single = MarketMemoryStore(window=32)
+    assert single.ingest_download(frames["PETR4.SA"], ["PETR4.SA"]) == {"PETR4.SA": 32}
+    np.testing.assert_array_equal(single.bars("PETR4.SA"), from_frames.bars("PETR4.SA"))
+
+
+def test_warm_pool_refresh_appends_into_the_store_and_shares_the_pool(monkeypatch):
+    store = MarketMemoryStore(window=256, capacity=4)
+    frames = {"PETR4.SA": _frame(150, 1), "VALE3.SA": _frame(150, 2)}
+    download = pd.concat(frames, axis=1)
+    monkeypatch.setattr(warm_data_pool, "market_memory_store", store)
+    monkeypatch.setattr(warm_data_pool, "_pool", {})
+    monkeypatch.setattr(warm_data_pool, "_last_update", 0.0)
+    monkeypatch.setattr(warm_data_pool, "get_all_tickers", lambda: list(frames))
+    monkeypatch.setattr(warm_data_pool, "get_market_data", lambda _tickers, on_chunk=None: download)
+    monkeypatch.setattr(warm_data_pool, "get_cached_chart_data", lambda symbol, interval: None)
+    monkeypatch.setattr(warm_data_pool.market_store, "update", lambda pool: None)
+
+    pool = warm_data_pool.update_pool(force_refresh=True)
+
+    assert set(store.symbols()) == set(frames)
+    np.testing.assert_array_equal(store.view("VALE3.SA"), frames["VALE3.SA"]["Close"].values)
+    assert warm_data_pool.get_market_pool()["PETR4.SA"] is pool["PETR4.SA"]
+    assert warm_data_pool._published(warm_data_pool._pool).keys() == pool.keys()
+    # Published frames are linked, so the engine reads their bars from the store.
+    np.testing.assert_array_equal(store.frame_bars("PETR4.SA", pool["PETR4.SA"]), frames["PETR4.SA"].to_numpy().T)
+
+    # VALE3 leaves the universe: its row is given back on the next refresh.
+    monkeypatch.setattr(warm_data_pool, "get_all_tickers", lambda: ["PETR4.SA"])
+    warm_data_pool.update_pool(force_refresh=True)
+    assert store.symbols() == ["PETR4.SA"]
+    np.testing.assert_array_equal(store.view("PETR4.SA"), frames["PETR4.SA"]["Close"].values)
+
+
+def test_persistent_chart_frames_are_rebuilt_only_when_rows_move(monkeypatch):
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    rows = [
+        {"time": start + pd.Timedelta(days=day), "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.0 + day, "volume": 1000}
+        for day in range(56)
+    ]
+    monkeypatch.setattr(warm_data_pool, "_chart_frames", {})
+    monkeypatch.setattr(warm_data_pool, "get_cached_chart_data", lambda symbol, interval: list(rows))
+
+    first = warm_data_pool._build_persistent_chart_pool(["ITUB4.SA"])["ITUB4.SA"]
+    assert warm_data_pool._build_persistent_chart_pool(["ITUB4.SA"])["ITUB4.SA"] is first
+
+    rows.append({**rows[-1], "time": rows[-1]["time"] + pd.Timedelta(days=1), "close": 55.0})
+    moved = warm_data_pool._build_persistent_chart_pool(["ITUB4.SA"])["ITUB4.SA"]
+    assert moved is not first
+    assert float(moved["Close"].iloc[-1]) == 55.0
+
+
+def test_incremental_engine_reads_resident_symbols_from_the_store():
+    store = MarketMemoryStore(window=256, capacity=8)
+    full = {f"T{seed}.SA": _frame(170, seed) for seed in range(6)}
+    pool = {ticker: frame.iloc[:160] for ticker, frame in full.items()}
+    store.ingest_pool(pool)
+    engine = IncrementalEngine(store=store)
+
+    assert engine.rank(pool) == run_engine(pool)
+    assert engine.last_cycle["recomputed"] == 6
+
+    moved = dict(pool)
+    moved["T2.SA"] = full["T2.SA"]
+    store.ingest_pool(moved)
+
+    assert engine.rank(moved) == run_engine(moved)
+    assert engine.last_cycle["recomputed"] == 1
+    assert engine.last_cycle["reused"] == 5
@@ -0,0 +1,155 @@
+"""/ws/market pushes per-ticker snapshot deltas to subscribers.
+
+Each publication is diffed once against the previous generation, every changed row is
+encoded once, and sockets sharing a subscription receive the very same frame text.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache.snapshot_cache import SnapshotCache, snapshot_cache
+from app.system import stream_router
+from app.system.market_stream import MarketStreamHub, Subscription, build_market_delta
+
+
+def _rows(prices: dict) -> list:
+    return [{"ticker": ticker, "price": price, "master_score": 50} for ticker, price in prices.items()]
+
+
+def _publish(cache: SnapshotCache, prices: dict, **extra) -> None:
+    cache.update({"source": "engine", "stale": False, "signals": _rows(prices), "generated_at": time.time(), **extra})
+
+
+class FakeSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshot.json"))
+    instance = SnapshotCache()
+    _publish(instance, {"PETR4": 38.0, "VALE3": 61.0, "ITUB4": 33.0})
+    return instance
+
+
+def _hub(cache):
+    sent = []
+
+    async def send(websocket, frame):
+        sent.append((websocket, frame))
+        await websocket.send_text(frame)
+
+    return MarketStreamHub(cache, send=send), sent
+
+
+def test_delta_carries_only_changed_fields_and_removed_symbols(cache):
+    previous_generation, previous = cache.published()
+    _publish(cache, {"PETR4": 38.5, "VALE3": 61.0})
+    generation, current = cache.published()
+
+    delta = build_market_delta(previous_generation, previous, generation, current)
+
+    # VALE3 was only restamped with the new snapshot id, which is not a change.
+    assert set(delta.symbols) == {"PETR4"}
+    assert delta.removed == ["ITUB4"]
+    changes = json.loads(b"{" + delta.symbols["PETR4"] + b"}")["PETR4"]
+    assert changes["price"] == 38.5
+    assert "master_score" not in changes
+    assert "stats" in delta.topics
+
+
+def test_frames_are_encoded_once_per_subscription_signature(cache):
+    previous_generation, previous = cache.published()
+    _publish(cache, {"PETR4": 39.0, "VALE3": 62.0, "ITUB4": 33.0})
+    delta = build_market_delta(previous_generation, previous, *cache.published())
+
+    first, second, other = Subscription(), Subscription(), Subscription()
+    first.symbols.add("PETR4")
+    second.symbols.add("PETR4")
+    other.symbols.add("ITUB4")
+
+    frame = delta.frame(first)
+    assert delta.frame(second) is frame
+    assert delta.frame(other) is None
+    body = json.loads(frame)
+    assert body["type"] == "market_delta"
+    assert list(body["symbols"]) == ["PETR4"]
+    assert body["previous_generation"] == previous_generation
+
+
+def test_hub_syncs_subscribers_and_fans_out_deltas(cache):
+    hub, sent = _hub(cache)
+    petr, vale, everything = FakeSocket(), FakeSocket(), FakeSocket()
+
+    async def scenario():
+        sync = json.loads(await hub.subscribe(petr, ["petr4"]))
+        await hub.subscribe(vale, ["VALE3"])
+        await hub.subscribe(everything, ["*"], ["stats", "generated_at"])
+        _publish(cache, {"PETR4": 40.0, "VALE3": 61.0, "ITUB4": 33.0})
+        delivered = await hub.publish_pending()
+        assert await hub.publish_pending() == 0
+        return sync, delivered
+
+    sync, delivered = asyncio.run(scenario())
+
+    assert sync["type"] == "market_sync"
+    assert sync["symbols"]["PETR4"]["price"] == 38.0
+    assert delivered == 2
+    assert vale.frames == []
+    petr_frame = json.loads(petr.frames[0])
+    assert list(petr_frame["symbols"]) == ["PETR4"]
+    assert petr_frame["symbols"]["PETR4"]["price"] == 40.0
+    everything_frame = json.loads(everything.frames[0])
+    assert "PETR4" in everything_frame["symbols"]
+    # Only topics that moved travel; the stats summary did not.
+    assert list(everything_frame["topics"]) == ["generated_at"]
+    assert {frame for _socket, frame in sent} == {petr.frames[0], everything.frames[0]}
+
+
+def test_unsubscribe_and_keepalive_messages(cache):
+    hub, _sent = _hub(cache)
+    socket = FakeSocket()
+
+    async def scenario():
+        assert await hub.handle_message(socket, "ping") is None
+        await hub.handle_message(socket, json.dumps({"action": "subscribe", "symbols": ["PETR4", "VALE3"]}))
+        reply = await hub.handle_message(socket, json.dumps({"action": "unsubscribe", "symbols": ["VALE3"]}))
+        unknown = await hub.handle_message(socket, json.dumps({"action": "dance"}))
+        _publish(cache, {"PETR4": 38.0, "VALE3": 70.0, "ITUB4": 33.0})
+        return json.loads(reply), json.loads(unknown), await hub.publish_pending()
+
+    reply, unknown, delivered = asyncio.run(scenario())
+
+    assert reply == {"type": "market_subscription", "symbols": ["PETR4"], "topics": []}
+    assert unknown["reason"] == "unknown_action"
+    assert delivered == 0
+    assert socket.frames == []
+
+
+def test_ws_market_streams_a_published_snapshot():
+    app = FastAPI()
+    app.include_router(stream_router.router)
+    snapshot_cache.clear()
+    _publish(snapshot_cache, {"PETR4": 38.0, "VALE3": 61.0})
+    try:
+        with TestClient(app) as client, client.websocket_connect("/ws/market") as websocket:
+            websocket.send_text(json.dumps({"action": "subscribe", "symbols": ["PETR4"]}))
+            sync = websocket.receive_json()
+            assert sync["symbols"]["PETR4"]["price"] == 38.0
+
+            _publish(snapshot_cache, {"PETR4": 38.9, "VALE3": 61.0})
+            delta = websocket.receive_json()
+            assert delta["type"] == "market_delta"
+            assert delta["symbols"]["PETR4"]["price"] == 38.9
+            assert delta["generation"] > sync["generation"]
+    finally:
+        snapshot_cache.clear()
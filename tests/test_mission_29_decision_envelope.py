@@ -159,17 +159,17 @@ class Mission29DecisionEnvelopeTests(unittest.TestCase):
             def close(self):
                 return None
 
-        with patch.object(push_dispatcher, "get_push_token_store", return_value={"7": ["token"]}), patch.object(
+        with patch.object(push_dispatcher, "resolve_push_audience", return_value=[(7, "token")]), patch.object(
             push_dispatcher,
             "SessionLocal",
             return_value=FakeDb(),
         ), patch.object(push_dispatcher, "_load_state", return_value={}), patch.object(
             push_dispatcher,
             "_save_state",
-        ), patch.object(push_dispatcher, "send_push_notification", return_value={"sent": 1}) as send_push:
+        ), patch.object(push_dispatcher, "enqueue_push_notification", return_value={"queued": 1}) as send_push:
             result = push_dispatcher.dispatch_signal_pushes([_ready_row()])
 
-        self.assertEqual(result["sent"], 1)
+        self.assertEqual(result["queued"], 1)
         data = send_push.call_args.kwargs["data"]
         self.assertEqual(data["decision_status"], DECISION_READY)
         self.assertIn('"decision_status": "READY"', data["decision_envelope"])
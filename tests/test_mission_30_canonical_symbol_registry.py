@@ -184,18 +184,18 @@ class Mission30CanonicalSymbolRegistryTests(unittest.TestCase):
             def close(self):
                 return None
 
-        def fake_send_push_notification(**kwargs):
+        def fake_enqueue_push_notification(**kwargs):
             captured.update(kwargs)
-            return {"sent": 1}
+            return {"queued": 1}
 
         with tempfile.TemporaryDirectory() as tempdir, patch.object(
             push_dispatcher, "PUSH_DISPATCH_STATE_PATH", Path(tempdir) / "push_state.json"
         ), patch.object(push_dispatcher, "SessionLocal", return_value=FakeDb()), patch.object(
-            push_dispatcher, "get_push_token_store", return_value={"1": ["token"]}
-        ), patch.object(push_dispatcher, "send_push_notification", side_effect=fake_send_push_notification):
+            push_dispatcher, "resolve_push_audience", return_value=[(1, "token")]
+        ), patch.object(push_dispatcher, "enqueue_push_notification", side_effect=fake_enqueue_push_notification):
             result = push_dispatcher.dispatch_signal_pushes([signal])
 
-        self.assertEqual(result["sent"], 1)
+        self.assertEqual(result["queued"], 1)
         self.assertEqual(captured["data"]["ticker"], "PETR4")
         self.assertEqual(captured["data"]["canonical_symbol"], "PETR4")
 
@@ -674,20 +674,21 @@ class Mission31CCriticalCleanupTests(unittest.TestCase):
             def close(self):
                 return None
 
-        def fake_send_push_notification(**kwargs):
+        def fake_enqueue_push_notification(**kwargs):
             captured.update(kwargs)
-            return {"sent": 1}
+            return {"queued": 1}
 
         with tempfile.TemporaryDirectory() as tempdir, patch.object(
             push_dispatcher, "PUSH_DISPATCH_STATE_PATH", Path(tempdir) / "push_state.json"
         ), patch.object(push_dispatcher, "SessionLocal", return_value=FakeDb()), patch.object(
-            push_dispatcher, "get_push_token_store", return_value={"7": ["token"]}
+            push_dispatcher, "resolve_push_audience", return_value=[(7, "token")]
         ), patch.object(
-            push_dispatcher, "send_push_notification", side_effect=fake_send_push_notification
+            push_dispatcher, "enqueue_push_notification", side_effect=fake_enqueue_push_notification
         ):
             result = push_dispatcher.dispatch_signal_pushes([signal])
 
-        self.assertEqual(result["sent"], 1)
+        self.assertEqual(result["queued"], 1)
+        self.assertEqual(captured["recipients"], [(7, "token")])
         self.assertIn("Score Mestre 8.7", captured["body"])
         self.assertEqual(captured["data"]["score"], "8.7")
         self.assertEqual(captured["data"]["master_score"], "8.7")
@@ -712,11 +713,11 @@ class Mission31CCriticalCleanupTests(unittest.TestCase):
         with tempfile.TemporaryDirectory() as tempdir, patch.object(
             push_dispatcher, "PUSH_DISPATCH_STATE_PATH", Path(tempdir) / "push_state.json"
         ), patch.object(push_dispatcher, "SessionLocal", return_value=FakeDb()), patch.object(
-            push_dispatcher, "get_push_token_store", return_value={"7": ["token"]}
-        ), patch.object(push_dispatcher, "send_push_notification") as blocked_send:
+            push_dispatcher, "resolve_push_audience", return_value=[(7, "token")]
+        ), patch.object(push_dispatcher, "enqueue_push_notification") as blocked_send:
             blocked_result = push_dispatcher.dispatch_signal_pushes([invalid_signal])
 
-        self.assertEqual(blocked_result["sent"], 0)
+        self.assertEqual(blocked_result["queued"], 0)
         blocked_send.assert_not_called()
 
     def test_push_threshold_env_is_safe_and_legacy_compatible(self):
@@ -169,7 +169,8 @@ class Mission31FCacheConcurrencyRealtimeTests(unittest.TestCase):
         payload["signals"][0]["nested"]["levels"].append(99)
 
         first = cache.get()
-        first["signals"][0]["nested"]["levels"].append(100)
+        with self.assertRaises(TypeError):
+            first["signals"][0]["nested"]["levels"].append(100)
         second = cache.get()
 
         self.assertEqual(second["signals"][0]["nested"]["levels"], [1, 2])
@@ -385,9 +386,7 @@ class Mission31FCacheConcurrencyRealtimeTests(unittest.TestCase):
         with tempfile.TemporaryDirectory() as tmp:
             target = Path(tmp) / "push_tokens.json"
             original_path = push_service.PUSH_STORE_PATH
-            original_lock = push_service._lock
             push_service.PUSH_STORE_PATH = target
-            push_service._lock = threading.RLock()
             try:
                 with ThreadPoolExecutor(max_workers=2) as executor:
                     futures = [
@@ -397,10 +396,9 @@ class Mission31FCacheConcurrencyRealtimeTests(unittest.TestCase):
                     for future in futures:
                         future.result()
 
-                persisted = json.loads(target.read_text(encoding="utf-8"))
+                persisted = push_service.get_push_token_store()
             finally:
                 push_service.PUSH_STORE_PATH = original_path
-                push_service._lock = original_lock
 
         self.assertEqual(len(persisted["7"]), 2)
         self.assertEqual({item["token"] for item in persisted["7"]}, {"token-0", "token-1"})
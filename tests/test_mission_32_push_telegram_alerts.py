@@ -403,7 +403,7 @@ class PushDispatcherTests(_EnvCleanMixin):
         for patcher in (
             patch.object(pd_mod, "PUSH_DISPATCH_STATE_PATH", state_path),
             patch.object(pd_mod, "SessionLocal", lambda: _FakeSession([_FakeUser(1)])),
-            patch.object(pd_mod, "get_push_token_store", lambda: {"1": [{"token": TOKEN_A, "active": True}]}),
+            patch.object(pd_mod, "resolve_push_audience", lambda user_ids: [(1, TOKEN_A)]),
             patch.object(pd_mod, "resolve_decision_envelope", lambda signal: {"decision_status": "READY"}),
             patch.object(
                 pd_mod,
@@ -424,9 +424,9 @@ class PushDispatcherTests(_EnvCleanMixin):
     def test_kill_switch_blocks_dispatch_before_any_send(self):
         os.environ["DISABLE_PUSH_ALERTS"] = "1"
         sends = []
-        with patch.object(pd_mod, "send_push_notification", lambda **kw: sends.append(kw) or {"sent": 1}):
+        with patch.object(pd_mod, "enqueue_push_notification", lambda **kw: sends.append(kw) or {"queued": 1}):
             result = pd_mod.dispatch_signal_pushes([self.signal])
-        self.assertEqual(result["sent"], 0)
+        self.assertEqual(result["queued"], 0)
         self.assertEqual(result["blocked_by"], "kill_switch=DISABLE_PUSH_ALERTS")
         self.assertEqual(sends, [])
 
@@ -441,37 +441,37 @@ class PushDispatcherTests(_EnvCleanMixin):
         sends = []
         with patch.object(
             pd_mod,
-            "send_push_notification",
-            lambda **kw: sends.append(kw.get("data", {}).get("ticker")) or {"sent": 1},
+            "enqueue_push_notification",
+            lambda **kw: sends.append(kw.get("data", {}).get("ticker")) or {"queued": 1},
         ):
             result = pd_mod.dispatch_signal_pushes([{"ticker": "PETR4"}, {"ticker": "VALE3"}])
         self.assertNotIn("PETR4", sends)
         self.assertIn("VALE3", sends)
-        self.assertEqual(result["sent"], 1)
+        self.assertEqual(result["queued"], 1)
 
     def test_cooldown_blocks_resend_and_state_persists(self):
         self._patch_eligible()
         sends = []
-        with patch.object(pd_mod, "send_push_notification", lambda **kw: sends.append(1) or {"sent": 1}):
+        with patch.object(pd_mod, "enqueue_push_notification", lambda **kw: sends.append(1) or {"queued": 1}):
             first = pd_mod.dispatch_signal_pushes([self.signal])
             second = pd_mod.dispatch_signal_pushes([self.signal])
-        self.assertEqual(first["sent"], 1)
-        self.assertEqual(second["sent"], 0)
+        self.assertEqual(first["queued"], 1)
+        self.assertEqual(second["queued"], 0)
         self.assertEqual(len(sends), 1)
         state = json.loads(self.state_path.read_text(encoding="utf-8"))
         self.assertIn("PETR4", state)
 
-    def test_failed_send_does_not_mark_cooldown(self):
-        # Alerta que falhou não pode ser "perdido": sem cooldown gravado,
-        # o ciclo seguinte re-tenta.
+    def test_unqueued_push_does_not_mark_cooldown(self):
+        # Alerta que não entrou na fila não pode ser "perdido": sem cooldown
+        # gravado, o ciclo seguinte re-tenta.
         self._patch_eligible()
-        results = iter([{"sent": 0}, {"sent": 1}])
+        results = iter([{"queued": 0}, {"queued": 1}])
         calls = []
-        with patch.object(pd_mod, "send_push_notification", lambda **kw: calls.append(1) or next(results)):
+        with patch.object(pd_mod, "enqueue_push_notification", lambda **kw: calls.append(1) or next(results)):
             first = pd_mod.dispatch_signal_pushes([self.signal])
             second = pd_mod.dispatch_signal_pushes([self.signal])
-        self.assertEqual(first["sent"], 0)
-        self.assertEqual(second["sent"], 1)
+        self.assertEqual(first["queued"], 0)
+        self.assertEqual(second["queued"], 1)
         self.assertEqual(len(calls), 2)
 
     def test_kill_switch_does_not_alter_historical_state(self):
@@ -742,7 +742,6 @@ class TelegramTransportTests(_EnvCleanMixin):
         ):
             patcher.start()
             self.addCleanup(patcher.stop)
-        eng._last_alert_time = 0.0
 
     def test_not_configured_fails_closed(self):
         with patch.object(eng, "TELEGRAM_TOKEN", ""):
@@ -816,7 +815,8 @@ class TelegramTransportTests(_EnvCleanMixin):
     def test_retry_policy_limited_with_backoff_and_no_400(self):
         self.assertEqual(eng.retry.total, 3)
         self.assertGreater(eng.retry.backoff_factor, 0)
-        self.assertIn(429, eng.retry.status_forcelist)
+        # 429 é tratado pela fila via retry_after, não pelo backoff do urllib3.
+        self.assertNotIn(429, eng.retry.status_forcelist)
         for status_code in (500, 502, 503, 504):
             self.assertNotIn(status_code, eng.retry.status_forcelist)
         self.assertIn("POST", eng.retry.allowed_methods)
@@ -4,7 +4,8 @@ Cobre o fix do N+1 de I/O em get_posts (2N leituras+parses do
 moderation_state.json por request -> 2 por request):
 - equivalencia EXATA entre is_post_hidden e get_hidden_post_ids;
 - equivalencia EXATA entre get_user_guardian_score e get_user_guardian_scores;
-- contagem de leituras do estado (helpers em lote leem 1 vez).
+- contagem de leituras do estado: o JSON legado e importado uma vez para o
+  store indexado e as leituras seguintes nao o parseiam mais.
 """
 
 from __future__ import annotations
@@ -16,7 +17,7 @@ import time
 import unittest
 from pathlib import Path
 
-from app.social import moderation
+from app.social import moderation, moderation_store
 
 
 REVIEW_ACTIONS = ["hide", "remove", "approve", "dismiss", "warn", ""]
@@ -27,6 +28,9 @@ def _write_state(state: dict) -> None:
     moderation.MODERATION_STORE_PATH.write_text(
         json.dumps(state), encoding="utf-8"
     )
+    # Um store novo reimporta o JSON legado na proxima leitura.
+    for suffix in (".sqlite3", ".sqlite3-wal", ".sqlite3-shm"):
+        moderation.MODERATION_STORE_PATH.with_suffix(suffix).unlink(missing_ok=True)
 
 
 def _random_state(rng: random.Random, post_ids: list) -> dict:
@@ -100,37 +104,32 @@ class Mission34ModerationBatchTest(unittest.TestCase):
             )
 
     # ------------------------------------------------------------------
-    # Contagem de I/O: lote le o estado UMA vez (o proprio N+1)
+    # Contagem de I/O: o JSON e parseado UMA vez (importacao), nunca por leitura
     # ------------------------------------------------------------------
 
     def test_batch_helpers_read_state_once(self):
         _write_state(_random_state(random.Random(3402), list(range(1, 201))))
         calls = {"n": 0}
-        original_read = moderation.read_json_file
+        original_read = moderation_store.read_json_file
 
         def counting_read(*args, **kwargs):
             calls["n"] += 1
             return original_read(*args, **kwargs)
 
-        moderation.read_json_file = counting_read
+        moderation_store.read_json_file = counting_read
         try:
             calls["n"] = 0
             moderation.get_hidden_post_ids(list(range(1, 201)))
-            self.assertEqual(calls["n"], 1, "get_hidden_post_ids deve ler 1 vez")
+            self.assertEqual(calls["n"], 1, "a primeira leitura importa o JSON legado")
 
             calls["n"] = 0
             moderation.get_user_guardian_scores(list(range(1, 201)))
-            self.assertEqual(
-                calls["n"], 1, "get_user_guardian_scores deve ler 1 vez"
-            )
-
-            # comportamento por chamada (o bug original): 3 chamadas = 3 leituras
-            calls["n"] = 0
+            moderation.get_hidden_post_ids(list(range(1, 201)))
             for post_id in (1, 2, 3):
                 moderation.is_post_hidden(post_id)
-            self.assertEqual(calls["n"], 3)
+            self.assertEqual(calls["n"], 0, "leituras seguintes usam as tabelas indexadas")
         finally:
-            moderation.read_json_file = original_read
+            moderation_store.read_json_file = original_read
 
     def test_batch_timing_evidence(self):
         _write_state(_random_state(random.Random(3403), list(range(1, 301))))
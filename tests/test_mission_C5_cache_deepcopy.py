@@ -1,5 +1,9 @@
 import threading
 import time
+from copy import deepcopy
+
+import pytest
+
 from app.cache.snapshot_cache import snapshot_cache
 from app.cache.signal_cache_layer import signal_cache_layer
 from app.cache.paper_trading_cache import paper_trading_cache
@@ -16,11 +20,14 @@ def test_snapshot_cache_no_aliasing():
     res1 = snapshot_cache.get()
     res2 = snapshot_cache.get()
 
-    assert res1 is not res2
-    assert res1["signals"] is not res2["signals"]
+    # Readers share one frozen generation; nobody can mutate it in place.
+    assert res1 is res2
+    with pytest.raises(TypeError):
+        res1["signals"][0]["master_score"] = 99
 
-    # Mutating res1 should not affect res2 or the cache
-    res1["signals"][0]["master_score"] = 99
+    # An explicit copy is mutable and does not affect the cache.
+    copied = deepcopy(res1)
+    copied["signals"][0]["master_score"] = 99
     assert res2["signals"][0]["master_score"] == 9.0
     assert snapshot_cache.get()["signals"][0]["master_score"] == 9.0
 
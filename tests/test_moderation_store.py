@@ -0,0 +1,150 @@
+"""Moderation state lives in indexed tables; publish windows are in memory and persisted."""
+
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.social import moderation, moderation_store
+
+ALLOWED_TEXT = "Compra interessante com suporte."
+BLOCKED_TEXT = "isso parece scam total"
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(moderation, "MODERATION_STORE_PATH", tmp_path / "moderation_state.json")
+    return moderation.MODERATION_STORE_PATH
+
+
+def test_legacy_json_is_imported_once_with_list_semantics(store_path):
+    now = int(time.time())
+    store_path.write_text(
+        json.dumps(
+            {
+                "blocked": {"1": [2, 3]},
+                "muted": {"1": [4]},
+                "reports": [{"id": f"r{n}", "user": n, "post": 10, "reason": "spam"} for n in range(3)],
+                "review_queue": [
+                    {"post_id": 10, "reports": 3, "auto_hidden": False},
+                    {"post_id": 11, "reports": 5, "auto_hidden": True},
+                    {"post_id": 12, "reports": 5, "auto_hidden": True},
+                    {"post_id": 10, "reports": 4, "auto_hidden": True},
+                ],
+                "reviewed_reports": [
+                    {"post_id": 12, "action": "hide"},
+                    {"post_id": 12, "action": "approve"},
+                    {"post_id": 13, "action": "remove"},
+                ],
+                "guardian_scores": {"9": {"user_id": 9, "score": 42, "approved_posts": 7}},
+                "guardian_audit": [{"action": "post_created", "post_id": n, "timestamp": n} for n in range(30)],
+                "shadow_banned": [7],
+                "post_rate": {"5": [now] * moderation.POST_WINDOW_LIMIT},
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    assert moderation.get_blocked_users(1) == {2, 3}
+    # The latest review decides; without one, the latest queue item does.
+    assert moderation.get_hidden_post_ids([10, 11, 12, 13, 14]) == {10, 11, 13}
+    assert [item["post_id"] for item in moderation.get_review_queue()] == [11, 12, 10]
+    assert moderation.get_user_guardian_score(9)["approved_posts"] == 7
+    assert [item["post_id"] for item in moderation.get_guardian_audit(limit=3)] == [27, 28, 29]
+    assert moderation.can_publish(7, ALLOWED_TEXT) == (False, "user_shadow_banned")
+    assert moderation.can_publish(5, ALLOWED_TEXT) == (False, "rate_limited")
+
+    summary = moderation.get_moderation_summary()
+    assert (summary["reports_total"], summary["reports_open"], summary["auto_hidden_posts"]) == (3, 3, 3)
+
+    # The JSON stays as a backup, but a later edit of it is never re-imported.
+    store_path.write_text(json.dumps({"blocked": {"1": [99]}}), encoding="utf-8")
+    store = moderation._store()
+    assert store.import_legacy_json(store_path) == 0
+    moderation.block(1, 5)
+    assert moderation.get_blocked_users(1) == {2, 3, 5}
+
+
+def _publish_latencies(user_ids, calls_per_user=8, threads=8):
+    def publish(user_id):
+        samples = []
+        for _ in range(calls_per_user):
+            started = time.perf_counter()
+            allowed, reason = moderation.can_publish(user_id, ALLOWED_TEXT)
+            samples.append(time.perf_counter() - started)
+            assert allowed, reason
+        return samples
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = [sample for batch in executor.map(publish, user_ids) for sample in batch]
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def test_can_publish_latency_stays_flat_as_the_audit_log_grows(store_path, monkeypatch):
+    monkeypatch.setattr(moderation_store, "MODERATION_AUDIT_RETENTION", 50_000)
+    moderation.record_content_approved(1, content_type="post", post_id=1)
+    small_median, small_p95 = _publish_latencies(range(100, 132))
+
+    # Grow the audit log (and reports) to the old JSON caps and beyond.
+    path = store_path.with_suffix(".sqlite3")
+    with sqlite3.connect(str(path)) as connection:
+        connection.executemany(
+            "INSERT INTO moderation_audit (action, actor_user_id, post_id, content_type, reason, details, timestamp)"
+            " VALUES ('post_created', ?, ?, 'post', 'approved', '{}', ?)",
+            [(n % 500, n, n) for n in range(60_000)],
+        )
+        connection.executemany(
+            "INSERT INTO moderation_reports (id, user_id, post_id, reason, created_at) VALUES (?, ?, ?, 'spam', ?)",
+            [(f"r{n}", n % 500, n % 3000, n) for n in range(20_000)],
+        )
+
+    # A blocked publish is audited; its append enforces the retention in one range delete.
+    assert moderation.can_publish(1, BLOCKED_TEXT) == (False, "blocked_phrase_detected")
+    assert moderation.get_moderation_summary()["social_guardian"]["audit_events"] == 50_000
+    large_median, large_p95 = _publish_latencies(range(200, 232))
+
+    print(
+        f"\n[moderation] can_publish p50/p95 small audit={small_median * 1e3:.2f}/{small_p95 * 1e3:.2f}ms"
+        f" | 50k audit={large_median * 1e3:.2f}/{large_p95 * 1e3:.2f}ms"
+    )
+    assert large_median <= small_median * 3 + 0.002
+    assert large_p95 <= small_p95 * 3 + 0.005
+    assert large_median < 0.02
+
+
+def test_publish_windows_count_concurrent_publishes_and_survive_a_restart(store_path, monkeypatch):
+    barrier = threading.Barrier(8)
+
+    def publish(_):
+        barrier.wait(timeout=5)
+        return [moderation.can_publish(42, ALLOWED_TEXT)[0] for _ in range(4)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = [allowed for batch in executor.map(publish, range(8)) for allowed in batch]
+    assert results.count(True) == moderation.POST_WINDOW_LIMIT
+
+    # The windows reach the file on the periodic flush; a restarted process loads them.
+    moderation._store().publish_windows.flush()
+    monkeypatch.setattr(moderation_store, "_stores", {})
+    assert moderation.can_publish(42, ALLOWED_TEXT) == (False, "rate_limited")
+    assert moderation.can_publish(43, ALLOWED_TEXT) == (True, "allowed")
+
+
+def test_publish_windows_evict_users_whose_window_expired(store_path):
+    store = moderation._store()
+    windows = moderation_store.PublishRateWindows(store, persist_seconds=0)
+    for user_id in range(50):
+        assert windows.allow(user_id, now=1000, window_seconds=60, limit=3)
+    windows.flush()
+    assert len(store.load_post_rate()) == 50
+
+    # One check after the window has passed drops every idle user, in memory and on file.
+    assert windows.allow(99, now=1100, window_seconds=60, limit=3)
+    windows.flush()
+    assert set(windows._windows) == {"99"}
+    assert set(store.load_post_rate()) == {"99"}
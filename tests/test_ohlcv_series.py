@@ -0,0 +1,163 @@
+"""Columnar chart rows: OHLCVSeries must be a drop-in for the old list of candle dicts.
+
+Every consumer that grew a column fast path is checked against the row path it
+replaced, on the same candles, so the representation change is invisible in output.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.engine.trend_breakout_signal_engine import _build_ohlc_frame
+from app.market import market_data_loader
+from app.market.chart_cache_store import ChartCacheStore, reset_chart_cache_stores
+from app.market.ohlcv import OHLCVSeries, chart_rows_as_list
+from app.services import public_market_data_service as service
+from app.services.chart_overlay_service import build_chart_overlays
+
+
+def _candles(count: int = 60, step_minutes: int = 5, start: datetime | None = None) -> list[dict]:
+    start = start or datetime(2026, 3, 2, 13, 0, tzinfo=timezone.utc)
+    rows = []
+    for index in range(count):
+        close = 100.0 + np.sin(index / 4.0) * 3 + index * 0.05
+        rows.append(
+            {
+                "time": (start + timedelta(minutes=step_minutes * index)).isoformat(),
+                "open": close - 0.4,
+                "high": close + 0.8,
+                "low": close - 0.9,
+                "close": close,
+                "volume": 1000.0 + (index % 7) * 150,
+            }
+        )
+    return rows
+
+
+@pytest.fixture
+def isolated_chart_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_data_loader, "_CHART_CACHE_FILE", tmp_path / "market_charts.json")
+    with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
+        market_data_loader._CHART_DATA_CACHE.clear()
+    yield
+    with market_data_loader._PRICE_SNAPSHOT_CACHE_LOCK:
+        market_data_loader._CHART_DATA_CACHE.clear()
+    reset_chart_cache_stores()
+
+
+def test_series_round_trips_rows_and_columns():
+    rows = _candles(10)
+    series = OHLCVSeries.from_rows(rows)
+
+    assert series is not None
+    assert len(series) == 10
+    assert series == rows
+    assert series[-1] == rows[-1]
+    assert list(reversed(series)) == rows[::-1]
+    assert OHLCVSeries.from_columns(series.to_columns()) == rows
+    assert series.close.flags.writeable is False
+
+
+def test_integer_volume_stays_int_through_rows_slices_and_columns():
+    rows = [{"time": f"2026-01-0{n}", "close": 10.0 + n, "volume": 1200 + n} for n in range(1, 4)]
+    series = OHLCVSeries.from_rows(rows)
+
+    assert series.to_rows() == rows
+    assert type(series[0]["volume"]) is int and type(series[0]["close"]) is float
+    assert type(series[1:][0]["volume"]) is int
+    payload = json.loads(json.dumps(series.to_columns()))
+    assert payload["volume"] == [1201, 1202, 1203]
+    assert type(OHLCVSeries.from_columns(payload)[-1]["volume"]) is int
+    # Any float in the column keeps the whole field float.
+    mixed = OHLCVSeries.from_rows([{"time": "t0", "close": 1.0, "volume": 3}, {"time": "t1", "close": 2.0, "volume": 3.5}])
+    assert [row["volume"] for row in mixed] == [3.0, 3.5] and type(mixed[0]["volume"]) is float
+
+
+def test_slices_are_views_over_the_same_buffers():
+    series = OHLCVSeries.from_rows(_candles(20))
+    tail = series[-5:]
+
+    assert isinstance(tail, OHLCVSeries)
+    assert tail == _candles(20)[-5:]
+    assert np.shares_memory(tail.close, series.close)
+
+
+def test_rows_that_do_not_fit_stay_lists():
+    assert OHLCVSeries.from_rows([]) is None
+    assert OHLCVSeries.from_rows([{"time": "t0", "close": 1.0, "source": "quote_cache_fallback"}]) is None
+    assert OHLCVSeries.from_rows([{"time": "t0", "close": 1.0}, {"time": "t1", "close": 2.0, "volume": 3.0}]) is None
+    assert OHLCVSeries.from_rows([{"time": "t0", "close": "1.0"}]) is None
+
+
+def test_store_keeps_series_columnar(tmp_path):
+    store = ChartCacheStore(tmp_path / "charts.sqlite3")
+    rows = _candles(8)
+    store.put("AAPL:1D", 1.0, OHLCVSeries.from_rows(rows))
+    store.put("QUOTE:1D", 1.0, [{"time": "t0", "close": 1.0, "source": "quote_cache_fallback"}])
+
+    raw = store._connection().execute("SELECT rows FROM charts WHERE key = 'AAPL:1D'").fetchone()[0]
+    assert raw.startswith("{")
+    assert isinstance(store.get("AAPL:1D")["rows"], OHLCVSeries)
+    assert store.get("AAPL:1D")["rows"] == rows
+    assert store.get("QUOTE:1D")["rows"][0]["source"] == "quote_cache_fallback"
+    store.close()
+
+
+def test_cached_series_is_shared_and_list_view_is_a_copy(isolated_chart_cache):
+    rows = _candles(30)
+    market_data_loader._cache_chart_data("AAPL", "1D", rows)
+
+    first = market_data_loader.get_cached_chart_series("AAPL", "1D")
+    second = market_data_loader.get_cached_chart_series("AAPL", "1D")
+    listed = market_data_loader.get_cached_chart_data("AAPL", "1D")
+
+    assert isinstance(first, OHLCVSeries)
+    assert first is second
+    assert listed == rows
+    listed[0]["close"] = -1.0
+    assert market_data_loader.get_cached_chart_data("AAPL", "1D") == rows
+
+
+def test_indicator_fast_paths_match_row_paths():
+    rows = _candles(80)
+    series = OHLCVSeries.from_rows(rows)
+
+    assert service.public_chart_as_of(series) == service.public_chart_as_of(rows)
+    assert service._valid_chart_closes(series) == service._valid_chart_closes(rows)
+    assert service._rsi_as_of(series) == service._rsi_as_of(rows)
+    assert service._candle_interval(series) == service._candle_interval(rows)
+    assert service.build_public_rsi_contract("AAPL", "1D", series) == service.build_public_rsi_contract("AAPL", "1D", rows)
+
+
+def test_crypto_rvol_fast_path_matches_row_path():
+    rows = []
+    start = datetime(2026, 2, 1, 0, 0, tzinfo=timezone.utc)
+    for day in range(25):
+        rows.extend(_candles(12, start=start + timedelta(days=day)))
+    series = OHLCVSeries.from_rows(rows)
+
+    assert service.build_crypto_intraday_rvol_contract("BTCUSD", series) == service.build_crypto_intraday_rvol_contract(
+        "BTCUSD", rows
+    )
+
+
+def test_overlays_and_signal_frame_match_row_paths():
+    rows = _candles(120)
+    series = OHLCVSeries.from_rows(rows)
+
+    assert build_chart_overlays("PETR4", series, []) == build_chart_overlays("PETR4", rows, [])
+    assert _build_ohlc_frame(series).equals(_build_ohlc_frame(rows))
+
+    partial = [{"time": row["time"], "close": row["close"]} for row in rows[:20]]
+    partial_series = OHLCVSeries.from_rows(partial)
+    assert build_chart_overlays("PETR4", partial_series, []) == build_chart_overlays("PETR4", partial, [])
+    assert _build_ohlc_frame(partial_series).equals(_build_ohlc_frame(partial))
+
+
+def test_chart_rows_as_list_accepts_either_representation():
+    rows = _candles(3)
+    assert chart_rows_as_list(OHLCVSeries.from_rows(rows)) == rows
+    assert chart_rows_as_list(rows) == rows
+    assert chart_rows_as_list(None) == []
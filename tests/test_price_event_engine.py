@@ -1,8 +1,11 @@
 import unittest
+from types import MappingProxyType
 
+import numpy as np
 import pandas as pd
 
 from app.engine.events.price_event_engine import detect_price_events
+from app.engine.store.market_memory_store import MarketMemoryStore
 
 
 def _make_frame(start: str, closes: list[float]):
@@ -53,6 +56,34 @@ class PriceEventEngineTests(unittest.TestCase):
         self.assertTrue(events)
         self.assertEqual(sorted({event["ticker"] for event in events}), ["PETR4"])
 
+    def test_accepts_the_read_only_pool_mapping(self):
+        closes = [10.0] * 20 + [10.05, 10.08, 10.12, 10.18, 10.45, 10.70]
+        pool = MappingProxyType({"PETR4.SA": _make_frame("2026-04-13 13:00:00+00:00", closes)})
+        ranked = [{"ticker": "PETR4", "score": 84, "trend": "Alta"}]
+
+        self.assertEqual(detect_price_events(pool, ranked), detect_price_events(dict(pool), ranked))
+        self.assertTrue(detect_price_events(pool, ranked))
+
+    def test_store_linked_frames_yield_the_same_events_as_the_frame_path(self):
+        rng = np.random.default_rng(5)
+        store = MarketMemoryStore(window=128, capacity=8)
+        pool = {}
+        for index in range(60):
+            bars = int(rng.integers(20, 160))
+            closes = 10.0 * np.cumprod(1.0 + rng.normal(0.001, 0.01, bars))
+            frame = _make_frame("2026-04-13 13:00:00+00:00", list(closes))
+            frame["Volume"] = rng.integers(0, 3000, bars).astype(float)
+            if index % 4 == 0:
+                frame.iloc[int(rng.integers(0, bars)), 1] = np.nan
+            pool[f"T{index:02d}.SA"] = frame
+            store.ingest_frame(f"T{index:02d}.SA", frame)
+        ranked = [{"ticker": ticker[:-3], "score": float(rng.integers(0, 100))} for ticker in pool]
+
+        expected = detect_price_events(pool, ranked, max_symbols=0)
+
+        self.assertGreater(len(expected), 10)
+        self.assertEqual(detect_price_events(pool, ranked, max_symbols=0, store=store), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
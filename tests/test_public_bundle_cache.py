@@ -0,0 +1,183 @@
+"""/public/market/bundle/{symbol} is built once per input generation.
+
+Polling clients must get the stored bundle while none of its inputs moved, a rebuild
+as soon as one does (snapshot, chart, quote, conclusion), separate entries per
+entitlement/locale, and one computation for a burst of identical concurrent requests.
+"""
+
+import threading
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import pytest
+
+from app.ai import conclusion_generator
+from app.api import routes_public_market_live
+from app.cache.snapshot_cache import snapshot_cache
+from app.market import market_data_loader
+from app.services import public_bundle_cache
+from app.services.public_bundle_cache import cached_bundle
+
+
+@pytest.fixture
+def bundle():
+    """Bundle route with cache-backed inputs stubbed and the expensive build counted."""
+    quote = {"symbol": "PETR4", "price": 42.4, "quote_time": "2026-07-21T12:00:00Z"}
+    state = {"quote": quote, "chart": ()}
+    builds = []
+
+    def counting_insight(*args, **kwargs):
+        builds.append(1)
+        return {"symbol": "PETR4", "rsi": 61.0, "master_score": 7.1, "strategic_panel": {"symbol": "PETR4"}}
+
+    with ExitStack() as stack:
+        for name, value in (
+            ("request_symbol_hydration", None),
+            ("cached_price_payloads", {"PETR4": quote}),
+            ("get_symbol_analysis", {}),
+            ("hydration_status", {}),
+            ("_load_chart_data_fast", []),
+            ("load_public_chart_rows", []),
+            ("public_market_chart", {"ticker": "PETR4", "ohlc": [], "zones": [], "summary": {}}),
+            ("build_public_news_payload", {"items": [], "data_status": "READY"}),
+            ("build_public_ai_tools_payload", {"tools": {"risk": []}, "status": "READY"}),
+            ("get_news_cache_info", {"status": "fresh", "timestamp": 1.0, "items": 0}),
+        ):
+            stack.enter_context(patch.object(routes_public_market_live, name, return_value=value))
+        stack.enter_context(
+            patch.object(routes_public_market_live, "_resolve_cached_quote", side_effect=lambda *_: state["quote"])
+        )
+        stack.enter_context(
+            patch.object(routes_public_market_live, "chart_cache_generation", side_effect=lambda *_: state["chart"])
+        )
+        stack.enter_context(patch.object(routes_public_market_live, "public_market_insight", counting_insight))
+
+        def call(**kwargs):
+            options = {"interval": "1D", "limit": 6, "locale": "pt-BR", "is_premium": True, **kwargs}
+            return routes_public_market_live.public_market_bundle("PETR4", **options)
+
+        yield call, builds, state
+
+
+def test_unchanged_inputs_serve_the_stored_bundle(bundle):
+    call, builds, _state = bundle
+    first = call()
+    second = call()
+
+    assert len(builds) == 1
+    assert second is first
+    assert first["source"] == "cache_snapshot_bundle"
+    with pytest.raises(TypeError):
+        first["quote"]["price"] = 0
+
+
+@pytest.mark.parametrize("move", ["snapshot", "chart", "quote", "conclusion"])
+def test_any_input_generation_moving_rebuilds(bundle, move):
+    call, builds, state = bundle
+    call()
+
+    if move == "snapshot":
+        snapshot_cache.clear()
+    elif move == "chart":
+        state["chart"] = (("PETR4:1D", time.time(), None),)
+    elif move == "quote":
+        state["quote"] = {**state["quote"], "price": 42.9}
+    else:
+        conclusion_generator._cache_put(("PETR4", "bundle-test"), "texto")
+        conclusion_generator._CACHE.pop(("PETR4", "bundle-test"), None)
+
+    payload = call()
+    assert len(builds) == 2
+    if move == "quote":
+        assert payload["quote"]["price"] == 42.9
+    call()
+    assert len(builds) == 2
+
+
+def test_entitlement_and_locale_have_separate_entries(bundle, monkeypatch):
+    call, builds, _state = bundle
+    monkeypatch.setattr(routes_public_market_live, "_PREMIUM_GATING_ENABLED", True)
+    premium = call(is_premium=True)
+    basic = call(is_premium=False)
+    call(locale="en-US")
+
+    assert len(builds) == 3
+    assert basic["premium_locked"] is True
+    assert "premium_locked" not in premium
+    assert call(is_premium=False) is basic
+
+
+def test_entries_expire_after_the_max_age(bundle, monkeypatch):
+    call, builds, _state = bundle
+    call()
+    monkeypatch.setattr(public_bundle_cache, "BUNDLE_CACHE_MAX_AGE_SECONDS", 0.0)
+    call()
+    assert len(builds) == 2
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    computed = []
+    release = threading.Event()
+    barrier = threading.Barrier(24)
+    results = []
+
+    def compute():
+        computed.append(1)
+        release.wait(5)
+        return {"value": [1, 2, 3]}
+
+    def request():
+        barrier.wait()
+        results.append(cached_bundle(("PETR4", "1D"), "gen-1", compute))
+
+    threads = [threading.Thread(target=request) for _ in range(24)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(computed) == 1
+    assert len(results) == 24
+    assert len({id(result) for result in results}) == 1
+
+
+def test_a_failed_computation_reaches_every_waiter_and_is_not_stored():
+    release = threading.Event()
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError("provider down")
+
+    def request():
+        barrier.wait()
+        try:
+            cached_bundle(("VALE3", "1D"), "gen-1", compute)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert errors == ["provider down"] * 8
+    assert cached_bundle(("VALE3", "1D"), "gen-1", lambda: {"ok": True}) == {"ok": True}
+
+
+def test_chart_cache_generation_moves_when_a_chart_is_rewritten(monkeypatch):
+    monkeypatch.setattr(market_data_loader, "_CHART_DATA_CACHE", {})
+    before = market_data_loader.chart_cache_generation(["ZZZT3"], ["1D"])
+    market_data_loader._CHART_DATA_CACHE[market_data_loader._chart_cache_key("ZZZT3", "1D")] = {
+        "timestamp": time.time(),
+        "rows": [],
+    }
+    after = market_data_loader.chart_cache_generation(["ZZZT3"], ["1D"])
+    assert before != after
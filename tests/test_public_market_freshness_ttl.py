@@ -33,9 +33,7 @@ def isolated_market_caches(monkeypatch, tmp_path):
     monkeypatch.setattr(market_data_loader, "_PRICE_SNAPSHOT_CACHE", {})
     monkeypatch.setattr(market_data_loader, "_CHART_DATA_CACHE", {})
     monkeypatch.setattr(market_data_loader, "_PRICE_CACHE_LOADED", False)
-    monkeypatch.setattr(market_data_loader, "_CHART_CACHE_LOADED", False)
     monkeypatch.setattr(market_data_loader, "_PRICE_CACHE_MTIME", 0.0)
-    monkeypatch.setattr(market_data_loader, "_CHART_CACHE_MTIME", 0.0)
 
 def _dt(days_ago=0, seconds_ago=0):
     return datetime.now(timezone.utc) - timedelta(days=days_ago, seconds=seconds_ago)
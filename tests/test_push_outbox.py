@@ -0,0 +1,201 @@
+"""The push outbox fans out in multicast batches, retries, prunes and survives crashes."""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+from app.services import push_service as ps
+from app.system import push_outbox
+from app.system.system_metrics import get_push_delivery_metrics_snapshot
+
+
+class UnregisteredError(Exception):
+    """Named like the Firebase Admin error for a token that no longer exists."""
+
+
+class FakeFCM:
+    """In-process stand-in for send_each_for_multicast."""
+
+    max_batch_size = 500
+
+    def __init__(self, latency=0.0, invalid=(), flaky=None, failing_calls=0):
+        self.latency = latency
+        self.invalid = set(invalid)
+        self.flaky = dict(flaky or {})
+        self.failing_calls = failing_calls
+        self.batches = []
+        self.delivered = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send_multicast(self, tokens, title, body, data):
+        with self._lock:
+            self.batches.append(list(tokens))
+            call = len(self.batches)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if call <= self.failing_calls:
+                raise ps.PushSendError("HTTP 503 provider unavailable")
+            results = []
+            with self._lock:
+                for token in tokens:
+                    if token in self.invalid:
+                        results.append(UnregisteredError(token))
+                    elif self.flaky.get(token, 0) != 0:
+                        self.flaky[token] -= 1
+                        results.append(ps.PushSendError("quota exceeded"))
+                    else:
+                        self.delivered[token] += 1
+                        results.append(None)
+            return results
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ps, "PUSH_STORE_PATH", tmp_path / "push_tokens.json")
+    monkeypatch.delenv("DISABLE_PUSH_ALERTS", raising=False)
+    monkeypatch.delenv("READ_ONLY_MODE", raising=False)
+
+    def write(tokens_by_user):
+        ps.PUSH_STORE_PATH.write_text(
+            json.dumps(
+                {str(user): [{"token": token, "active": True} for token in tokens] for user, tokens in tokens_by_user.items()}
+            ),
+            encoding="utf-8",
+        )
+
+    return push_outbox.PushOutbox(tmp_path / "outbox.sqlite3"), write
+
+
+def _drain(outbox, transport, workers=4, timeout=10.0):
+    dispatcher = push_outbox.PushDispatcher(outbox, transport, workers=workers).start()
+    deadline = time.monotonic() + timeout
+    while outbox.depth()[0] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dispatcher.stop(timeout=5)
+
+
+def test_fan_out_uses_multicast_batches_and_prunes_invalid_tokens_in_one_write(store):
+    outbox, write = store
+    tokens = {user: [f"tok-{user}-{n}" for n in range(3)] for user in range(1, 401)}
+    write(tokens)
+    invalid = {f"tok-{user}-0" for user in range(1, 401, 20)}
+    recipients = [(user, token) for user, items in tokens.items() for token in items]
+    before = get_push_delivery_metrics_snapshot()
+
+    assert outbox.enqueue("Alerta SNBR: PETR4", "Score Mestre 9.0", {"ticker": "PETR4"}, recipients) == 1200
+    fcm = FakeFCM(latency=0.01, invalid=invalid)
+    with patch.object(push_outbox, "deactivate_push_tokens", wraps=ps.deactivate_push_tokens) as saves:
+        _drain(outbox, fcm)
+
+    assert sorted(len(batch) for batch in fcm.batches) == [200, 500, 500]
+    assert set(fcm.delivered) == {token for _, token in recipients} - invalid
+    assert set(fcm.delivered.values()) == {1}
+    # One token-store write per batch that had invalid tokens, not one per token.
+    assert 1 <= saves.call_count <= 3
+    stored = ps.get_push_token_store()
+    inactive = {item["token"] for items in stored.values() for item in items if not item["active"]}
+    assert inactive == invalid
+    assert outbox.depth() == (0, None)
+
+    after = get_push_delivery_metrics_snapshot()
+    assert after["enqueued"] - before["enqueued"] == 1200
+    assert after["sent"] - before["sent"] == 1200 - len(invalid)
+    assert after["invalidated"] - before["invalidated"] == len(invalid)
+    assert after["batches"] - before["batches"] == 3
+    assert after["max_batch_size"] >= 500
+
+
+def test_temporary_failures_are_retried_with_jittered_backoff(store, monkeypatch):
+    outbox, write = store
+    monkeypatch.setattr(push_outbox, "PUSH_RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(push_outbox, "PUSH_MAX_ATTEMPTS", 4)
+    write({1: ["ok", "flaky", "down"]})
+    outbox.enqueue("t", "b", {}, [(1, "ok"), (1, "flaky"), (1, "down")])
+    before = get_push_delivery_metrics_snapshot()
+
+    # The first call fails as a whole; "flaky" then fails twice more; "down" never recovers.
+    fcm = FakeFCM(failing_calls=1, flaky={"flaky": 2, "down": -1})
+    _drain(outbox, fcm, workers=1)
+
+    assert fcm.delivered == Counter({"ok": 1, "flaky": 1})
+    assert sum(batch.count("down") for batch in fcm.batches) == 4
+    after = get_push_delivery_metrics_snapshot()
+    assert after["sent"] - before["sent"] == 2
+    assert after["failed"] - before["failed"] == 1
+    assert after["retried"] - before["retried"] == 3 + 2 + 2
+    # The token is still registered: a temporary failure is not an invalid token.
+    assert [item["token"] for item in ps.list_push_tokens(1)] == ["ok", "flaky", "down"]
+
+    rng = random.Random(7)
+    delays = [push_outbox.retry_delay_seconds(attempt, rng) for attempt in (1, 1, 1, 2, 3)]
+    assert all(0.005 <= delay <= 0.015 for delay in delays[:3]) and len(set(delays[:3])) == 3
+    assert 0.01 <= delays[3] <= 0.03 and 0.02 <= delays[4] <= 0.06
+
+
+def test_deliveries_claimed_by_a_crashed_worker_are_sent_after_their_lease(store, monkeypatch):
+    outbox, write = store
+    monkeypatch.setattr(push_outbox, "PUSH_CLAIM_LEASE_SECONDS", 0.1)
+    write({1: ["a", "b"]})
+    outbox.enqueue("t", "b", {}, [(1, "a"), (1, "b")])
+
+    # A worker claims the batch and dies before sending it.
+    assert len(outbox.claim(500)["deliveries"]) == 2
+    assert outbox.claim(500) is None
+
+    # After a restart, the same file still holds the deliveries.
+    reopened = push_outbox.PushOutbox(outbox.path)
+    assert reopened.depth()[0] == 2
+    fcm = FakeFCM()
+    time.sleep(0.15)
+    _drain(reopened, fcm)
+    assert fcm.delivered == Counter({"a": 1, "b": 1})
+
+
+def test_dispatcher_pool_sends_batches_of_different_messages_concurrently(store):
+    outbox, write = store
+    write({1: [f"t{n}" for n in range(8)]})
+    for n in range(8):
+        outbox.enqueue(f"m{n}", "b", {}, [(1, f"t{n}")])
+    fcm = FakeFCM(latency=0.2)
+
+    started = time.perf_counter()
+    _drain(outbox, fcm, workers=4)
+
+    assert len(fcm.batches) == 8
+    assert fcm.max_in_flight >= 2
+    assert time.perf_counter() - started < 1.6
+
+
+def test_kill_switch_holds_deliveries_until_they_expire(store, monkeypatch):
+    outbox, write = store
+    write({1: ["a"]})
+    outbox.enqueue("t", "b", {}, [(1, "a")])
+    fcm = FakeFCM()
+    dispatcher = push_outbox.PushDispatcher(outbox, fcm, workers=1)
+    monkeypatch.setattr(push_outbox, "PUSH_IDLE_POLL_SECONDS", 0.0)
+
+    monkeypatch.setenv("DISABLE_PUSH_ALERTS", "1")
+    assert dispatcher.dispatch_once() is False
+    assert fcm.batches == []
+    assert outbox.pending()[0]["attempts"] == 0
+
+    before = get_push_delivery_metrics_snapshot()
+    monkeypatch.setattr(push_outbox, "PUSH_MESSAGE_TTL_SECONDS", 0.01)
+    monkeypatch.delenv("DISABLE_PUSH_ALERTS")
+    time.sleep(0.02)
+    assert dispatcher.dispatch_once() is True
+    assert fcm.batches == []
+    assert outbox.depth() == (0, None)
+    assert get_push_delivery_metrics_snapshot()["expired"] - before["expired"] == 1
@@ -0,0 +1,142 @@
+"""Push tokens live in an indexed registry: O(1) upserts, one audience query, JSON migration."""
+
+import json
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User
+from app.services import push_service as ps
+from app.system import push_dispatcher as pd_mod
+
+USERS = 25_000
+TOKENS_PER_USER = 4
+
+
+def _token(user_id, n):
+    return f"fcm-{user_id:06d}-{n}-{'x' * 24}"
+
+
+@pytest.fixture
+def legacy_store(tmp_path, monkeypatch):
+    """A 100k-token data/push_tokens.json as Mission 32 left it."""
+    monkeypatch.setattr(ps, "PUSH_STORE_PATH", tmp_path / "push_tokens.json")
+    store = {
+        str(user_id): [
+            {
+                "token": _token(user_id, n),
+                "platform": "android",
+                "app_version": "1.0",
+                "registered_at": 1_700_000_000,
+                "active": True,
+            }
+            for n in range(TOKENS_PER_USER)
+        ]
+        for user_id in range(1, USERS + 1)
+    }
+    store["9"][0].update(active=False, deactivated_reason="UnregisteredError", deactivated_at=1_700_000_100)
+    ps.PUSH_STORE_PATH.write_text(json.dumps(store), encoding="utf-8")
+    return store
+
+
+def _plan(sql, params=()):
+    with sqlite3.connect(str(ps.PUSH_STORE_PATH.with_suffix(".sqlite3"))) as connection:
+        return " ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_legacy_json_is_migrated_once_with_order_and_deactivations(legacy_store):
+    started = time.perf_counter()
+    assert ps.get_push_status()["registered_tokens"] == USERS * TOKENS_PER_USER
+    assert time.perf_counter() - started < 15
+
+    assert [item["token"] for item in ps.list_push_tokens(42)] == [_token(42, n) for n in range(TOKENS_PER_USER)]
+    archived = ps.list_push_tokens(9, include_inactive=True)[0]
+    assert (archived["active"], archived["deactivated_reason"]) == (False, "UnregisteredError")
+    assert len(ps.list_push_tokens(9)) == TOKENS_PER_USER - 1
+
+    # The JSON stays as a backup, but a later edit of it is never re-imported.
+    ps.register_push_token(42, "fresh-device-token-000000", "ios")
+    ps.PUSH_STORE_PATH.write_text(json.dumps({"1": [{"token": "stale-json-token-0000", "active": True}]}), "utf-8")
+    reopened = ps.get_push_token_registry(ps.PUSH_STORE_PATH.with_suffix(".sqlite3"), legacy_json=ps.PUSH_STORE_PATH)
+    assert reopened.import_legacy_json(ps.PUSH_STORE_PATH) == 0
+    assert ps.get_push_status()["registered_tokens"] == USERS * TOKENS_PER_USER + 1
+
+
+def test_registration_is_an_indexed_upsert_at_100k_tokens(legacy_store):
+    ps.list_push_tokens(1)
+
+    # Rebinding, reactivation and rotation are one upsert resolved on the unique token index.
+    assert "ux_push_tokens_token" in _plan("SELECT id FROM push_tokens WHERE token = ?", ("t",))
+    assert "ix_push_tokens_user" in _plan("SELECT token FROM push_tokens WHERE user_id = ? ORDER BY registered_at", (1,))
+
+    started = time.perf_counter()
+    for n in range(500):
+        ps.register_push_token(USERS + 1 + n, f"new-device-token-{n:06d}", "android")
+    per_registration = (time.perf_counter() - started) / 500
+    assert per_registration < 0.02
+
+    # A device moving to another account leaves exactly one owner.
+    moved = _token(7, 2)
+    ps.register_push_token(8, moved, "android", app_version="2.0")
+    assert moved not in {item["token"] for item in ps.list_push_tokens(7, include_inactive=True)}
+    assert [item["token"] for item in ps.list_push_tokens(8)][-1] == moved
+    # Re-registering the deactivated token reactivates it; the cap keeps the newest ten.
+    ps.register_push_token(9, _token(9, 0), "android")
+    assert len(ps.list_push_tokens(9)) == TOKENS_PER_USER
+    for n in range(12):
+        ps.register_push_token(10, f"rotating-device-{n:02d}-xxxxxxxx", "android")
+    assert [item["token"] for item in ps.list_push_tokens(10)][-1] == "rotating-device-11-xxxxxxxx"
+    assert len(ps.list_push_tokens(10)) == 10
+
+
+def test_audience_is_one_query_joined_with_entitlements_and_preferences(legacy_store, tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    inactive_users = set(range(1, USERS + 1, 10))
+    no_app_access = set(range(2, USERS + 1, 10))
+    opted_out = set(range(3, USERS + 1, 100))
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User.__table__),
+            [
+                {
+                    "id": user_id,
+                    "email": f"u{user_id}@example.com",
+                    "password_hash": "x",
+                    "referral_code": f"SNBP{user_id:06d}",
+                    "is_active": user_id not in inactive_users,
+                    "access_app": user_id not in no_app_access,
+                }
+                for user_id in range(1, USERS + 1)
+            ],
+        )
+    for user_id in opted_out:
+        ps.set_push_alerts_enabled(user_id, False)
+    assert ps.get_push_preferences(3) == {"user_id": 3, "alerts_enabled": False}
+
+    entitled = set(range(1, USERS + 1)) - inactive_users - no_app_access - opted_out
+    expected = {
+        (user_id, _token(user_id, n)) for user_id in entitled for n in range(TOKENS_PER_USER)
+    } - {(9, _token(9, 0))}
+
+    queued = []
+    with patch.object(pd_mod, "SessionLocal", sessionmaker(bind=engine)), patch.object(
+        pd_mod, "PUSH_DISPATCH_STATE_PATH", tmp_path / "push_dispatch_state.json"
+    ), patch.object(pd_mod, "_eligible_signals", lambda signals: list(signals)), patch.object(
+        pd_mod, "enqueue_push_notification", lambda **kw: queued.append(kw["recipients"]) or {"queued": 1}
+    ):
+        started = time.perf_counter()
+        result = pd_mod.dispatch_signal_pushes([{"ticker": "PETR4", "master_score": 9.0}, {"ticker": "VALE3"}])
+        elapsed = time.perf_counter() - started
+
+    assert result["queued"] == 2
+    assert len(queued) == 2 and queued[0] == queued[1]
+    assert set(queued[0]) == expected and len(queued[0]) == len(expected)
+    assert elapsed < 5
+    engine.dispose()
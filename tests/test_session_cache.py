@@ -0,0 +1,139 @@
+"""Validated sessions are cached, revocations reach every process, last_seen_at is batched."""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("SECRET_KEY", "unit-test-secret-key-session-cache-0123456789")
+
+from app import security  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import User, UserSession  # noqa: E402
+from app.services import session_cache  # noqa: E402
+from app.services.auth_session_service import create_user_session, revoke_session  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("SESSION_REVOCATION_FILE", str(tmp_path / "session_revocations"))
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool, future=True
+    )
+    Base.metadata.create_all(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2].split()[0]))
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+    session_cache.clear_session_cache()
+    yield engine, SessionLocal, statements
+    session_cache.clear_session_cache()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def _login(SessionLocal, channel="web"):
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == "cache@example.com").first()
+        if user is None:
+            user = User(email="cache@example.com", password_hash="x", referral_code="SNBCACHE")
+            db.add(user)
+            db.flush()
+        session = create_user_session(db, user, channel=channel)
+        db.commit()
+        token = security.create_access_token({"sub": user.id, "sid": session.session_id})
+        return user.id, session.session_id, token
+
+
+def _resolve(SessionLocal, token):
+    with SessionLocal() as db:
+        return security.resolve_token_user(token, db)
+
+
+def test_cached_session_skips_its_row_lookup_and_batches_last_seen(store):
+    engine, SessionLocal, statements = store
+    user_id, session_id, token = _login(SessionLocal)
+
+    statements.clear()
+    assert _resolve(SessionLocal, token).id == user_id
+    assert statements == ["SELECT", "SELECT"]
+
+    statements.clear()
+    for _ in range(5):
+        _resolve(SessionLocal, token)
+    # Only the User row is loaded, and nothing is written per request.
+    assert statements == ["SELECT"] * 5
+
+    with SessionLocal() as db:
+        seen_before = db.query(UserSession.last_seen_at).filter(UserSession.session_id == session_id).scalar()
+    statements.clear()
+    assert session_cache.flush_last_seen() == 1
+    assert statements == ["UPDATE"]
+    with SessionLocal() as db:
+        seen_after = db.query(UserSession.last_seen_at).filter(UserSession.session_id == session_id).scalar()
+    assert seen_after > seen_before
+    assert session_cache.flush_last_seen() == 0
+
+
+def test_service_revocation_and_replacement_are_rejected_on_the_next_request(store):
+    _engine, SessionLocal, _statements = store
+    user_id, session_id, token = _login(SessionLocal)
+    _resolve(SessionLocal, token)
+
+    with SessionLocal() as db:
+        revoke_session(db, user_id, session_id)
+        db.commit()
+    with pytest.raises(HTTPException) as rejected:
+        _resolve(SessionLocal, token)
+    assert rejected.value.status_code == 401
+
+    _user_id, _session_id, replaced_token = _login(SessionLocal, channel="app")
+    _resolve(SessionLocal, replaced_token)
+    _login(SessionLocal, channel="app")
+    with pytest.raises(HTTPException) as replaced:
+        _resolve(SessionLocal, replaced_token)
+    assert replaced.value.detail == security.SESSION_REPLACED_DETAIL
+
+
+def test_revocation_committed_by_another_process_clears_this_cache(store):
+    engine, SessionLocal, _statements = store
+    user_id, session_id, token = _login(SessionLocal)
+    _resolve(SessionLocal, token)
+
+    # The other process revokes in the shared database and bumps the revocation file.
+    with engine.begin() as connection:
+        connection.execute(update(UserSession).values(revoked_at=UserSession.issued_at, revoked_reason="logout"))
+    subprocess.run(
+        [sys.executable, "-c", "from app.services.session_cache import publish_revocation; publish_revocation()"],
+        cwd=ROOT,
+        env={**os.environ, "STOCKNEWSBR_TEST_MODE": "1"},
+        check=True,
+        timeout=60,
+    )
+
+    with pytest.raises(HTTPException):
+        _resolve(SessionLocal, token)
+
+
+def test_out_of_band_revocation_is_rejected_within_the_ttl(store, monkeypatch):
+    engine, SessionLocal, _statements = store
+    monkeypatch.setattr(session_cache, "SESSION_CACHE_TTL_SECONDS", 0.2)
+    _user_id, _session_id, token = _login(SessionLocal)
+    _resolve(SessionLocal, token)
+
+    # A manual UPDATE bypasses the service and the revocation file.
+    with engine.begin() as connection:
+        connection.execute(update(UserSession).values(revoked_at=UserSession.issued_at, revoked_reason="manual"))
+    _resolve(SessionLocal, token)
+
+    time.sleep(0.25)
+    with pytest.raises(HTTPException):
+        _resolve(SessionLocal, token)
@@ -0,0 +1,154 @@
+"""Cross-process publication: per-key decoding, file fallback and reader latency."""
+
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app.cache import snapshot_cache as snapshot_cache_module
+from app.cache.shared_publication import SharedPublication
+from app.cache.snapshot_cache import SnapshotCache
+from app.services import public_market_data_service as service
+
+
+@pytest.fixture
+def shm_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "shm"
+    monkeypatch.setenv("SHARED_PUBLICATION_DIR", str(directory))
+    return directory
+
+
+def _quotes(count, price=10.0):
+    now = time.time()
+    return {
+        f"S{index:04d}.SA": {"timestamp": now, "payload": {"symbol": f"S{index:04d}.SA", "price": price + index}}
+        for index in range(count)
+    }
+
+
+def _write(path, document):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(document), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _reader(source, shm, after_generation, keys, results):
+    os.environ["SHARED_PUBLICATION_DIR"] = shm
+    publication = SharedPublication(source)
+    deadline = time.time() + 10.0
+    while time.time() < deadline:
+        segment = publication.segment()
+        if segment is not None and segment.generation > after_generation:
+            seen = time.time()
+            values = {key: segment.get(key)["payload"]["price"] for key in keys}
+            results.put((seen - segment.published_at, values))
+            return
+        time.sleep(0.0005)
+    results.put((None, {}))
+
+
+def test_readers_in_other_processes_see_a_publish_promptly(tmp_path, shm_dir):
+    try:
+        context = multiprocessing.get_context("fork")
+    except ValueError:
+        pytest.skip("fork start method unavailable")
+    source = tmp_path / "market_quotes.json"
+    publication = SharedPublication(source)
+    first = _quotes(3000)
+    _write(source, first)
+    assert publication.publish(first)
+    generation = publication.segment().generation
+
+    keys = ["S0007.SA", "S1500.SA", "S2999.SA"]
+    results = context.Queue()
+    readers = [
+        context.Process(target=_reader, args=(source, str(shm_dir), generation, keys, results)) for _ in range(3)
+    ]
+    for process in readers:
+        process.start()
+    time.sleep(0.2)
+
+    second = _quotes(3000, price=20.0)
+    _write(source, second)
+    assert publication.publish(second)
+
+    outcomes = [results.get(timeout=15) for _ in readers]
+    for process in readers:
+        process.join(timeout=5)
+
+    latencies = [latency for latency, _values in outcomes]
+    assert None not in latencies
+    assert all(values == {"S0007.SA": 27.0, "S1500.SA": 1520.0, "S2999.SA": 3019.0} for _lat, values in outcomes)
+    assert max(latencies) < 1.0
+
+    # Three keys out of the mapped segment vs one full parse of the file.
+    segment = publication.segment()
+    start = time.perf_counter()
+    for _ in range(20):
+        [segment.get(key) for key in keys]
+    per_key = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(20):
+        json.loads(source.read_text(encoding="utf-8"))
+    full_parse = time.perf_counter() - start
+    assert per_key * 10 < full_parse
+
+
+def test_segment_is_ignored_once_the_file_moves_without_it(tmp_path, shm_dir):
+    source = tmp_path / "market_quotes.json"
+    publication = SharedPublication(source)
+    _write(source, _quotes(3))
+    assert publication.publish(_quotes(3))
+    assert publication.segment() is not None
+
+    _write(source, _quotes(5, price=50.0))
+
+    assert publication.segment() is None
+
+
+def test_without_shared_memory_publish_is_a_no_op(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHARED_PUBLICATION_DIR", "off")
+    source = tmp_path / "market_quotes.json"
+    _write(source, _quotes(2))
+    publication = SharedPublication(source)
+
+    assert publication.publish(_quotes(2)) is False
+    assert publication.segment() is None
+
+
+def test_quote_reads_use_the_segment_and_fall_back_to_the_file(tmp_path, shm_dir, monkeypatch):
+    source = tmp_path / "market_quotes.json"
+    monkeypatch.setattr(service, "_QUOTE_CACHE_FILE", source)
+    service._reset_json_cache()
+    quotes = _quotes(4)
+    _write(source, quotes)
+
+    parses = []
+    real_read = service._read_json_cache
+    monkeypatch.setattr(service, "_read_json_cache", lambda path: parses.append(path) or real_read(path))
+
+    assert service._direct_cached_price_payloads(["S0002.SA"], allow_stale=True)["S0002.SA"]["price"] == 12.0
+    assert len(parses) == 1
+
+    service.shared_publication(source).publish(quotes)
+    assert service._direct_cached_price_payloads(["S0003.SA"], allow_stale=True)["S0003.SA"]["price"] == 13.0
+    assert len(parses) == 1
+    service._reset_json_cache()
+
+
+def test_snapshot_reader_loads_the_published_segment_without_parsing_the_file(tmp_path, shm_dir, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshot.json"))
+    writer = SnapshotCache()
+    reader = SnapshotCache()
+    writer.update({"signals": [{"ticker": "VALE3", "score": 91.0}], "source": "signal_cache", "stale": False})
+
+    def no_file_parse(*_args, **_kwargs):
+        raise AssertionError("reader parsed snapshot.json")
+
+    monkeypatch.setattr(snapshot_cache_module, "read_json_file_consistent", no_file_parse)
+
+    assert reader.get()["signals"][0]["ticker"] == "VALE3"
+    assert reader.get_last_good()["signals"][0]["ticker"] == "VALE3"
+    assert reader.generation() == 1
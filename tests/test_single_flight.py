@@ -0,0 +1,154 @@
+"""Single-flight coalescing: one provider call per key however many callers miss at once."""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from app.core.single_flight import FlightTimeout, SingleFlight, flight_key
+from app.market import market_data_loader
+from app.services import news_service
+from app.system import system_metrics
+
+
+def _stampede(callers, target):
+    """Run target(index) on `callers` threads released together by a barrier."""
+    barrier = threading.Barrier(callers)
+
+    def run(index):
+        barrier.wait()
+        return target(index)
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        return list(executor.map(run, range(callers)))
+
+
+def test_two_hundred_callers_make_one_call_per_key():
+    flights = SingleFlight("test_stampede")
+    keys = [flight_key("quote", symbol) for symbol in ("petr4", "VALE3", "ITUB4", "BBDC4")]
+    calls = Counter()
+    lock = threading.Lock()
+
+    def fetch(key):
+        with lock:
+            calls[key] += 1
+        time.sleep(0.2)
+        return {"symbol": key[1]}
+
+    results = _stampede(200, lambda index: flights.do(keys[index % 4], lambda: fetch(keys[index % 4])))
+
+    assert calls == {key: 1 for key in keys}
+    assert [result["symbol"] for result in results[:4]] == ["PETR4", "VALE3", "ITUB4", "BBDC4"]
+    assert flights.in_flight() == 0
+    counted = system_metrics.get_single_flight_metrics_snapshot()["test_stampede"]
+    assert counted["leader"] == 4 and counted["coalesced"] == 196
+
+
+def test_leader_error_reaches_every_waiter_and_frees_the_key():
+    flights = SingleFlight("test_error")
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("provider down")
+
+    def call(_index):
+        try:
+            return flights.do("key", fail)
+        except RuntimeError as exc:
+            return str(exc)
+
+    assert _stampede(20, call) == ["provider down"] * 20
+    assert flights.do("key", lambda: "recovered") == "recovered"
+    assert system_metrics.get_single_flight_metrics_snapshot()["test_error"]["error"] == 1
+
+
+def test_waiter_gives_up_after_the_timeout():
+    flights = SingleFlight("test_timeout", timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=("slow", release.wait))
+    leader.start()
+    while not flights.in_flight():
+        time.sleep(0.001)
+
+    with pytest.raises(FlightTimeout):
+        flights.do("slow", lambda: "never runs")
+    release.set()
+    leader.join()
+
+    assert system_metrics.get_single_flight_metrics_snapshot()["test_timeout"]["timeout"] == 1
+    exposition = system_metrics.format_prometheus_metrics()
+    assert 'single_flight_calls_total{flight="test_timeout",outcome="timeout"} 1' in exposition
+
+
+def test_concurrent_chart_misses_share_one_download(monkeypatch):
+    frame = pd.DataFrame(
+        {"Open": 10.0, "High": 11.0, "Low": 9.0, "Close": 10.5, "Volume": 1000.0},
+        index=pd.date_range("2026-07-01 13:00", periods=80, freq="5min", tz="UTC"),
+    )
+    downloads = []
+
+    def get_ticker_frame(symbol, **kwargs):
+        downloads.append((symbol, kwargs["period"], kwargs["interval"]))
+        time.sleep(0.2)
+        return frame
+
+    monkeypatch.setattr(market_data_loader, "_network_provider_allowed", lambda: True)
+    monkeypatch.setattr(market_data_loader, "get_cached_chart_data", lambda *args, **kwargs: None)
+    monkeypatch.setattr(market_data_loader, "get_ticker_frame", get_ticker_frame)
+    monkeypatch.setattr(market_data_loader, "_persist_chart_entries", lambda entries: None)
+
+    results = _stampede(
+        40,
+        lambda index: (market_data_loader.get_chart_data if index % 2 else market_data_loader._get_chart_data_no_persist)("PETR4", "1D"),
+    )
+
+    assert downloads == [("PETR4", "5d", "5m")]
+    assert all(len(rows) == 80 for rows in results)
+    results[0][0]["close"] = -1.0
+    assert results[1][0]["close"] == 10.5
+
+
+def test_concurrent_quote_misses_download_each_symbol_once(monkeypatch):
+    refreshed = Counter()
+    lock = threading.Lock()
+
+    def refresh(symbols):
+        with lock:
+            refreshed.update(symbols)
+        time.sleep(0.2)
+        return {symbol: {"symbol": symbol, "price": 10.0, "volume": 100.0} for symbol in symbols}
+
+    monkeypatch.setattr(market_data_loader, "_network_provider_allowed", lambda: True)
+    monkeypatch.setattr(market_data_loader, "get_cached_price_snapshots", lambda symbols, allow_stale=False: {})
+    monkeypatch.setattr(market_data_loader, "_refresh_price_snapshots", refresh)
+    baskets = [["PETR4", "VALE3"], ["VALE3", "ITUB4"], ["ITUB4", "PETR4", "BBDC4"]]
+
+    results = _stampede(60, lambda index: market_data_loader.get_price_snapshots(baskets[index % 3]))
+
+    assert refreshed == {"PETR4": 1, "VALE3": 1, "ITUB4": 1, "BBDC4": 1}
+    for index, payloads in enumerate(results):
+        assert set(payloads) == set(baskets[index % 3])
+
+
+def test_concurrent_news_misses_share_one_fetch_even_when_empty(monkeypatch):
+    fetched = []
+
+    def fetch_news(candidate):
+        fetched.append(candidate)
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(news_service, "_NEWS_CACHE", {})
+    monkeypatch.setattr(news_service, "_NEWS_PROVIDER_STATUS", {})
+    monkeypatch.setattr(news_service, "_load_news_cache_once", lambda: None)
+    monkeypatch.setattr(news_service, "_persist_news_cache", lambda: None)
+    monkeypatch.setattr(news_service, "_fetch_yfinance_news", fetch_news)
+
+    results = _stampede(30, lambda _index: news_service.get_symbol_news("PETR4"))
+
+    # One pass over the candidate tickers, not one per caller.
+    assert fetched == news_service._news_ticker_candidates("PETR4")
+    assert results == [[]] * 30
@@ -278,7 +278,7 @@ class SingleSnapshotSourceTests(unittest.TestCase):
 
         row = _actionable_row("PETR4")
 
-        with patch.object(push_dispatcher, "get_push_token_store", return_value={"7": ["token"]}), patch.object(
+        with patch.object(push_dispatcher, "resolve_push_audience", return_value=[(7, "token")]), patch.object(
             push_dispatcher,
             "SessionLocal",
             return_value=FakeDb(),
@@ -291,12 +291,12 @@ class SingleSnapshotSourceTests(unittest.TestCase):
             "_save_state",
         ), patch.object(
             push_dispatcher,
-            "send_push_notification",
-            return_value={"sent": 1},
+            "enqueue_push_notification",
+            return_value={"queued": 1},
         ) as send_push:
             result = push_dispatcher.dispatch_signal_pushes([row])
 
-        self.assertEqual(result["sent"], 1)
+        self.assertEqual(result["queued"], 1)
         data = send_push.call_args.kwargs["data"]
         self.assertEqual(data["price"], str(row["price"]))
         self.assertEqual(data["volume"], str(row["volume"]))
@@ -0,0 +1,144 @@
+"""SnapshotCache publishes a frozen generation and readers share it without copying.
+
+Every read used to deepcopy the snapshot; for a 500-row snapshot that was tens of
+milliseconds and megabytes per public request. These cases pin the replacement
+contract: reads are the same object until the next publish, the shared payload cannot
+be mutated in place, and an explicit copy is always available to callers that edit.
+"""
+
+import json
+import pickle
+import time
+import tracemalloc
+from copy import deepcopy
+
+import pytest
+
+from app.cache.frozen_payload import FrozenDict, FrozenList, freeze, thaw
+from app.cache.snapshot_cache import SnapshotCache
+
+
+def _payload(rows: int = 500) -> dict:
+    return {
+        "source": "engine",
+        "stale": False,
+        "signals": [
+            {
+                "ticker": f"T{index:04d}",
+                "master_score": 50 + index % 40,
+                "events": [{"type": "BUY", "price": 10.0 + index}],
+                "indicators": {"levels": [1.0, 2.0, 3.0]},
+            }
+            for index in range(rows)
+        ],
+        "ai_tools": {"radar": {"items": [{"ticker": "T0000"}]}},
+    }
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshot.json"))
+    instance = SnapshotCache()
+    instance.update(_payload())
+    return instance
+
+
+def test_reads_share_one_generation_until_the_next_publish(cache):
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.get_signals() is first["signals"]
+    assert cache.get_by_ticker() is first["by_ticker"]
+    assert cache.get_first_by_ticker(["T0001"]) is first["by_ticker"]["T0001"]
+
+    cache.update({**_payload(3), "generated_at": time.time() + 1})
+
+    second = cache.get()
+    assert second is not first
+    assert len(second["signals"]) == 3
+    # The old generation is untouched for whoever still holds it.
+    assert len(first["signals"]) == 500
+
+
+def test_shared_payload_rejects_in_place_mutation(cache):
+    payload = cache.get()
+    row = payload["signals"][0]
+
+    with pytest.raises(TypeError):
+        payload["source"] = "tampered"
+    with pytest.raises(TypeError):
+        payload["signals"].append({})
+    with pytest.raises(TypeError):
+        row["events"][0]["price"] = 0
+    with pytest.raises(TypeError):
+        row.setdefault("new", 1)
+    with pytest.raises(TypeError):
+        row["indicators"]["levels"].sort()
+
+    assert cache.get()["source"] == "engine"
+
+
+def test_explicit_copies_are_mutable(cache):
+    row = dict(cache.get_signals()[0])
+    row["master_score"] = 0
+    assert type(row) is dict
+
+    limited = cache.get_signals(limit=5)
+    limited.append({})
+    assert len(cache.get_signals()) == 500
+
+    thawed = thaw(cache.get())
+    thawed["by_ticker"]["T0000"]["events"][0]["price"] = 0
+    copied = deepcopy(cache.get())
+    copied["by_ticker"]["T0000"]["indicators"]["levels"].append(4.0)
+    assert type(copied["signals"]) is list
+
+    original = cache.get()["by_ticker"]["T0000"]
+    assert original["events"][0]["price"] == 10.0
+    assert original["indicators"]["levels"] == [1.0, 2.0, 3.0]
+
+
+def test_publishing_detaches_from_the_callers_data(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshot.json"))
+    cache = SnapshotCache()
+    source = _payload(2)
+    cache.update(source)
+
+    source["ai_tools"]["radar"]["items"].append({"ticker": "LATE"})
+
+    assert cache.get()["ai_tools"]["radar"]["items"] == [{"ticker": "T0000"}]
+
+
+def test_frozen_payload_serializes_like_plain_containers(cache):
+    payload = cache.get()
+    assert json.loads(json.dumps(payload, default=str))["by_ticker"]["T0000"]["master_score"] == 5.0
+    restored = pickle.loads(pickle.dumps(payload["signals"][:2]))
+    assert restored == payload["signals"][:2]
+    assert isinstance(restored[0], FrozenDict)
+    assert isinstance(payload["signals"], list) and isinstance(payload, dict)
+
+
+def test_last_good_is_frozen_with_a_mutable_top_level(cache):
+    last_good = cache.get_last_good()
+    assert last_good["last_good_timestamp"]
+    assert isinstance(last_good["signals"], FrozenList)
+    with pytest.raises(TypeError):
+        last_good["signals"][0]["master_score"] = 0
+
+
+def test_freeze_reuses_frozen_containers():
+    frozen = freeze({"a": [{"b": 1}]})
+    assert freeze(frozen) is frozen
+    assert thaw(frozen) == {"a": [{"b": 1}]}
+
+
+def test_reads_do_not_allocate_per_row(cache):
+    cache.get()
+    tracemalloc.start()
+    for _ in range(10):
+        cache.get()
+        cache.get_signals()
+        cache.get_by_ticker()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # A deepcopy of this snapshot peaks in the megabytes; sharing stays in the noise.
+    assert peak < 64 * 1024
@@ -0,0 +1,125 @@
+"""The fused snapshot enrichment pipeline matches the copying passes it replaced."""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+from app.ai.ai_market_pulse import market_pulse
+from app.engine import snapshot_pipeline
+from app.services.snapshot_contract import (
+    is_actionable_snapshot_row,
+    is_blocked_snapshot_row,
+    is_watchlist_snapshot_row,
+    snapshot_row_orientation,
+    summarize_snapshot_rows,
+)
+from app.system.system_metrics import get_performance_metrics_snapshot
+
+
+def _rows(count=90, seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for number in range(count):
+        ticker = f"T{number:03d}"
+        action = rng.choice(["BUY", "BUY", "SELL", "HOLD", "WATCH", "NO_TRADE"])
+        status = rng.choice(["APPROVED", "APPROVED", "CAUTION", "BLOCKED"])
+        row = {
+            "ticker": ticker,
+            "symbol": ticker,
+            "score": round(rng.uniform(10.0, 95.0), 2),
+            "signal": action,
+            "trade_action": action,
+            "decision_ready": action in {"BUY", "SELL"},
+            "decision_state": f"{action}_READY" if action in {"BUY", "SELL"} else "WATCH",
+            "data_quality": rng.choice(["cached", "cached", "stale"]),
+            "price": rng.choice([0.0, round(rng.uniform(5.0, 90.0), 2)]),
+            "volume": rng.randint(0, 2_000_000),
+            "audit_status": status,
+            "audit_score": round(rng.uniform(20.0, 95.0), 1),
+            "master_direction": rng.choice(["BULLISH", "BEARISH", "NEUTRAL", ""]),
+            "master_status": status,
+            "master_risk": rng.choice(["Baixo", "Moderado", "Alto"]),
+            "timestamp": "2026-05-04T13:00:00+00:00",
+            "market_data_updated_at": "2026-05-04T13:00:00+00:00",
+            "updated_at": "2026-05-04T13:00:00+00:00",
+        }
+        if number % 7 == 0:
+            row["blocked_reasons"] = ["provider_failed"]
+        rows.append(row)
+    return rows
+
+
+def _without_clock(value):
+    # Market pulses stamp the time they were computed.
+    if isinstance(value, dict):
+        return {key: _without_clock(item) for key, item in value.items() if key != "timestamp"}
+    if isinstance(value, list):
+        return [_without_clock(item) for item in value]
+    return value
+
+
+def _run(rows, **kwargs):
+    working_set = snapshot_pipeline.SnapshotWorkingSet(
+        [dict(row) for row in rows],
+        snapshot_context={"source": "test", "stale": False},
+        in_place=kwargs.pop("in_place", True),
+    )
+    with patch("app.ai.historical_confidence.get_history", return_value=[]):
+        return snapshot_pipeline.run_snapshot_stages(working_set, **kwargs)
+
+
+def test_in_place_run_matches_the_copying_run_and_copies_once():
+    rows = _rows()
+    copied = _run(rows, in_place=False)
+    fused = _run(rows)
+
+    assert _without_clock(fused.rows) == _without_clock(copied.rows)
+    assert _without_clock(fused.master_score_rows) == _without_clock(copied.master_score_rows)
+    assert _without_clock(fused.strategic_panel_rows) == _without_clock(copied.strategic_panel_rows)
+    assert fused.metrics == copied.metrics
+    assert fused.market_pulse.keys() == copied.market_pulse.keys()
+
+    copies = {entry["stage"]: entry["row_copies"] for entry in fused.profile}
+    assert copies.pop("audit") == len(rows)
+    assert set(copies.values()) == {0}
+    assert [entry["stage"] for entry in fused.profile] == [stage.name for stage in snapshot_pipeline.SNAPSHOT_STAGES]
+    stages = get_performance_metrics_snapshot()["worker_stage_seconds"]
+    assert stages["snapshot_final_decision"]["count"] >= 2
+
+
+def test_stages_write_only_the_fields_they_declare():
+    _run(_rows(seed=11), check_writes=True)
+
+    def sneaky(working_set):
+        working_set.rows[0]["radar_score"] = -1.0
+
+    with pytest.raises(ValueError, match="radar_score"):
+        _run(_rows(4), stages=(snapshot_pipeline.EnrichmentStage("sneaky", sneaky),), check_writes=True)
+
+
+def test_stages_only_read_fields_written_upstream():
+    for position, stage in enumerate(snapshot_pipeline.SNAPSHOT_STAGES):
+        if stage.reads == snapshot_pipeline.WHOLE_ROW:
+            continue
+        later = set().union(*(later.writes for later in snapshot_pipeline.SNAPSHOT_STAGES[position:]))
+        assert not stage.reads & later, stage.name
+
+
+def test_market_pulse_classifies_each_row_like_the_individual_predicates():
+    rows = _rows(160, seed=2)
+    pulse = market_pulse(rows)
+    stats = summarize_snapshot_rows(rows)
+
+    bullish = [row for row in rows if snapshot_row_orientation(row) == "bullish"]
+    assert stats["bullish_candidates"] == len(bullish)
+    assert stats["actionable"] == sum(is_actionable_snapshot_row(row) for row in rows)
+    assert stats["blocked_signals"] == sum(is_blocked_snapshot_row(row) for row in rows)
+    assert stats["watchlist_candidates"] == sum(is_watchlist_snapshot_row(row) for row in rows)
+    assert pulse["blocked_signals"] == stats["blocked_signals"]
+    assert [item["ticker"] for item in pulse["signal_groups"]["bullish_candidates"]] == [
+        row["ticker"] for row in bullish[:25]
+    ]
+    assert [item["ticker"] for item in pulse["signal_groups"]["blocked_signals"]] == [
+        row["ticker"] for row in rows if is_blocked_snapshot_row(row)
+    ][:25]
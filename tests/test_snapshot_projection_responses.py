@@ -0,0 +1,124 @@
+"""/market/snapshot and /signals serve bytes encoded once per snapshot generation.
+
+The bodies must be exactly what FastAPI rendered before, the ETag must only move when
+the snapshot does, and a matching If-None-Match must short-circuit to 304.
+"""
+
+import gzip
+import json
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes_signals, routes_snapshot
+from app.cache import snapshot_projection
+from app.cache.snapshot_cache import SnapshotCache, snapshot_cache
+from app.cache.snapshot_projection import encode_json, signals_tail
+
+
+def _rows(count: int = 50) -> list:
+    return [{"ticker": f"T{index:03d}", "master_score": 40 + index % 50, "events": ["momentum"]} for index in range(count)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    for router in (routes_snapshot.router, routes_signals.router):
+        app.include_router(router)
+        for dependency in router.dependencies:
+            app.dependency_overrides[dependency.dependency] = lambda: None
+    snapshot_cache.clear()
+    snapshot_cache.update({"source": "engine", "stale": False, "signals": _rows()})
+    yield TestClient(app)
+    snapshot_cache.clear()
+
+
+def test_snapshot_body_matches_the_json_response_it_replaces(client):
+    plain = client.get("/market/snapshot", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/market/snapshot", headers={"Accept-Encoding": "gzip"})
+
+    expected = encode_json(snapshot_cache.get())
+    assert plain.status_code == 200
+    assert plain.content == expected
+    assert plain.headers["content-type"] == "application/json"
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.json() == json.loads(expected)
+    assert plain.headers["etag"] == zipped.headers["etag"]
+
+
+def test_signals_body_keeps_the_previous_shape_with_a_live_age(client):
+    response = client.get("/signals")
+    body = response.json()
+
+    info = snapshot_cache.info()
+    assert body["status"] == "ok"
+    assert body["signals"] == json.loads(encode_json(snapshot_cache.get_signals()))
+    assert body["meta"]["total_signals"] == info["signals"]
+    assert body["meta"]["last_update"] == info["timestamp"]
+    assert abs(body["meta"]["cache_age_seconds"] - info["age_seconds"]) <= 1
+    assert response.headers["etag"].startswith('W/"')
+
+
+def test_signals_tail_tracks_wall_clock_without_rebuilding(client):
+    projection = snapshot_cache.projection("signals")
+    later = projection.timestamp + 125
+
+    assert signals_tail(projection, now=later) == b"125}}"
+    body = gzip.decompress(projection.gzip_body(signals_tail(projection, now=later)))
+    assert json.loads(body)["meta"]["cache_age_seconds"] == 125
+    assert snapshot_cache.projection("signals") is projection
+
+
+def test_if_none_match_returns_304_until_the_next_generation(client):
+    first = client.get("/market/snapshot")
+    etag = first.headers["etag"]
+
+    cached = client.get("/market/snapshot", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert client.get("/signals", headers={"If-None-Match": client.get("/signals").headers["etag"]}).status_code == 304
+
+    snapshot_cache.update({"source": "engine", "stale": False, "signals": _rows(3), "generated_at": time.time() + 1})
+
+    fresh = client.get("/market/snapshot", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert len(fresh.json()["signals"]) == 3
+
+
+def test_projection_is_encoded_once_per_generation(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshot.json"))
+    cache = SnapshotCache()
+    cache.update({"source": "engine", "stale": False, "signals": _rows(200)})
+
+    builds = []
+    original = snapshot_projection.PROJECTIONS["snapshot"]
+
+    def counting(*args):
+        builds.append(1)
+        time.sleep(0.05)
+        return original(*args)
+
+    monkeypatch.setitem(snapshot_projection.PROJECTIONS, "snapshot", counting)
+    barrier = threading.Barrier(16)
+    seen = []
+
+    def reader():
+        barrier.wait()
+        seen.append(cache.projection("snapshot"))
+
+    threads = [threading.Thread(target=reader) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(builds) == 1
+    assert len({id(projection) for projection in seen}) == 1
+
+    cache.update({"source": "engine", "stale": False, "signals": _rows(5), "generated_at": time.time() + 1})
+    cache.projection("snapshot")
+    assert len(builds) == 2
@@ -0,0 +1,114 @@
+"""Derived snapshot views are built once per generation and shared by every reader."""
+
+import threading
+import time
+
+import pytest
+
+from app.api import market_routes, routes_heatmap, routes_radar
+from app.cache.frozen_payload import FrozenList
+from app.cache.snapshot_views import SnapshotViewRegistry, get_snapshot_view
+from app.system.system_metrics import format_prometheus_metrics, get_snapshot_view_metrics_snapshot
+
+
+class _Generation:
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+
+def _rows(count, offset=0):
+    return [
+        {"ticker": f"T{index:03d}", "change_pct": float((index * 7) % 11 - 5 + offset), "score": index % 100}
+        for index in range(count)
+    ]
+
+
+def test_concurrent_readers_build_each_generation_exactly_once():
+    generation = _Generation()
+    registry = SnapshotViewRegistry(generation)
+    builds = []
+
+    def build(signals):
+        builds.append(generation.value)
+        time.sleep(0.02)
+        return sorted((row["ticker"] for row in signals), reverse=True)[:5]
+
+    registry.register("top5", build)
+    sources = {1: _rows(50), 2: _rows(80)}
+    results = []
+    barrier = threading.Barrier(24)
+
+    def reader():
+        barrier.wait()
+        results.append(registry.get("top5", sources[generation.value]))
+
+    for current in (1, 2):
+        generation.value = current
+        threads = [threading.Thread(target=reader) for _ in range(24)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert builds == [1, 2]
+    assert len(results) == 48
+    assert all(result is results[0] for result in results[:24])
+    assert all(result is results[24] for result in results[24:])
+    assert results[24] == ["T079", "T078", "T077", "T076", "T075"]
+    assert isinstance(results[0], FrozenList)
+
+    metrics = get_snapshot_view_metrics_snapshot()["top5"]
+    assert metrics["last_generation"] == 2
+    assert metrics["misses"] >= 2 and metrics["hits"] >= 46
+    assert 'snapshot_view_builds_total{view="top5"}' in format_prometheus_metrics()
+
+
+def test_another_source_in_the_same_generation_is_not_served_from_cache():
+    registry = SnapshotViewRegistry(lambda: 7)
+    registry.register("count", len)
+    first, second = _rows(3), _rows(4)
+
+    assert registry.get("count", first) == 3
+    assert registry.get("count", second) == 4
+    assert registry.get("count", second) == 4
+
+
+def test_failed_builds_are_not_cached_and_are_counted():
+    registry = SnapshotViewRegistry(lambda: 3)
+    calls = []
+
+    def build(signals):
+        calls.append(signals)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    registry.register("flaky", build)
+    rows = _rows(2)
+    with pytest.raises(RuntimeError):
+        registry.get("flaky", rows)
+
+    assert registry.get("flaky", rows) == {"ok": True}
+    assert registry.get("flaky", rows) == {"ok": True}
+    assert len(calls) == 2
+    assert get_snapshot_view_metrics_snapshot()["flaky"]["errors"] >= 1
+
+
+def test_market_routes_share_one_build_per_published_signals(monkeypatch):
+    rows = _rows(40)
+    monkeypatch.setattr(market_routes, "get_snapshot_signals", lambda: rows)
+    monkeypatch.setattr(routes_heatmap, "get_snapshot_signals", lambda: rows)
+    monkeypatch.setattr(routes_radar, "get_snapshot_signals", lambda: rows)
+
+    movers = market_routes.get_top_movers(current_user=None)
+    assert market_routes.get_top_movers(current_user=None) is movers
+    assert movers == market_routes._top_movers_view(rows)
+    assert movers["count"] == 20
+
+    heatmap = routes_heatmap.market_heatmap()
+    assert routes_heatmap.market_heatmap() is heatmap
+    assert routes_radar.radar() is routes_radar.radar()
+    assert get_snapshot_view("market_top_movers", rows) is movers
@@ -0,0 +1,218 @@
+"""Telegram alerts go through a durable queue: token buckets, retry_after, shared dedup ledger."""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from app.system.system_metrics import get_telegram_alert_metrics_snapshot
+from app.telegram import telegram_alert_engine as eng
+from app.telegram.telegram_alert_queue import TelegramAlertQueue, TelegramRateLimiter
+
+FAKE_TOKEN = "0000000000:FAKE-synthetic-token-for-tests-only"
+FAKE_CHAT = "-1000000000000"
+TICKERS = ("PETR4", "VALE3", "ITUB4", "BBDC4", "ABEV3", "WEGE3")
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    """Local sendMessage endpoint that answers 429 with retry_after to the first `throttle` requests."""
+
+    def __init__(self, throttle=0, retry_after=1):
+        super().__init__(("127.0.0.1", 0), _BotHandler)
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests = []
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/bot"
+
+
+class _BotHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path, payload))
+            throttled = len(server.requests) <= server.throttle
+            if not throttled:
+                server.delivered.append((time.monotonic(), payload["text"]))
+        if throttled:
+            body = {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {server.retry_after}",
+                "parameters": {"retry_after": server.retry_after},
+            }
+            status = 429
+        else:
+            body = {"ok": True, "result": {"message_id": len(server.delivered)}}
+            status = 200
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bot_api(tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_ALERT_QUEUE_FILE", str(tmp_path / "telegram_alerts.sqlite3"))
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    monkeypatch.delenv("DISABLE_TELEGRAM_ALERTS", raising=False)
+    monkeypatch.delenv("READ_ONLY_MODE", raising=False)
+    monkeypatch.setattr(eng, "TELEGRAM_TOKEN", FAKE_TOKEN)
+    monkeypatch.setattr(eng, "CHAT_ID", FAKE_CHAT)
+    monkeypatch.setattr(eng, "_limiter", TelegramRateLimiter())
+    eng.reset_telegram_alert_state()
+
+    servers = []
+
+    def start(**kwargs):
+        server = FakeBotAPI(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setattr(eng, "BASE_URL", server.base_url)
+        servers.append(server)
+        return server
+
+    yield start
+    eng.stop_telegram_alert_sender(drain=False, timeout=5)
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    eng.reset_telegram_alert_state()
+
+
+def _dispatch(ticker="PETR4", fingerprint=None, now=1000.0):
+    return eng._dispatch_prepared_alert(
+        {"ticker": ticker},
+        {"alert_level": eng.ALERT_HIGH, "fingerprint": fingerprint or f"FP-{ticker}"},
+        now=now,
+        cooldown_seconds=60,
+    )
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_sender_honours_retry_after_and_delivers_exactly_once(bot_api):
+    server = bot_api(throttle=1, retry_after=1)
+    before = get_telegram_alert_metrics_snapshot()
+    eng.start_telegram_alert_sender()
+
+    started = time.perf_counter()
+    first = _dispatch()
+    assert time.perf_counter() - started < 0.5
+    assert first["status"] == "queued"
+
+    assert _wait_for(lambda: len(server.delivered) == 1)
+    (throttled_at, path, payload), (retried_at, _, _) = server.requests
+    assert path == f"/bot{FAKE_TOKEN}/sendMessage" and payload["chat_id"] == FAKE_CHAT
+    assert retried_at - throttled_at >= 0.95
+
+    # The queued fingerprint, then the sent one, keep the alert from going out twice.
+    assert _dispatch(now=1010.0)["status"] == "deduplicated"
+    assert eng.stop_telegram_alert_sender(drain=True, timeout=5)
+    assert len(server.requests) == 2 and len(server.delivered) == 1
+
+    after = get_telegram_alert_metrics_snapshot()
+    assert after["rate_limited"] - before["rate_limited"] == 1
+    assert after["sent"] - before["sent"] == 1
+    assert after["queue_depth"] == 0
+    assert {item["status"] for item in eng.get_telegram_alert_history(limit=2)} == {"deduplicated", "sent"}
+
+
+def test_batches_are_queued_without_blocking_and_sent_at_the_chat_rate(bot_api, monkeypatch):
+    server = bot_api()
+    # 2 messages per second to the chat, after a burst of 2.
+    monkeypatch.setattr(eng, "_limiter", TelegramRateLimiter(global_rate=30, chat_rate_per_minute=120, chat_burst=2))
+    eng.start_telegram_alert_sender()
+
+    started = time.perf_counter()
+    statuses = [_dispatch(ticker)["status"] for ticker in TICKERS]
+    assert time.perf_counter() - started < 1.0
+    assert statuses == ["queued"] * len(TICKERS)
+
+    assert _wait_for(lambda: len(server.delivered) == len(TICKERS))
+    sent_at = [at for at, _ in server.delivered]
+    assert sent_at[-1] - sent_at[0] >= (len(TICKERS) - 2) / 2 - 0.1
+    assert [next(t for t in TICKERS if t in text) for _, text in server.delivered] == list(TICKERS)
+    assert len(server.requests) == len(TICKERS)
+
+
+def test_inline_delivery_without_a_sender_still_honours_retry_after(bot_api):
+    server = bot_api(throttle=1, retry_after=1)
+
+    started = time.perf_counter()
+    result = _dispatch()
+    assert result["status"] == "sent"
+    assert time.perf_counter() - started >= 0.95
+    assert len(server.requests) == 2 and len(server.delivered) == 1
+
+
+def test_rate_limiter_enforces_global_and_per_chat_buckets():
+    clock = [100.0]
+    limiter = TelegramRateLimiter(global_rate=2, chat_rate_per_minute=60, chat_burst=2, clock=lambda: clock[0])
+
+    assert limiter.acquire("a") == 0 and limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(1.0)
+    # "b" has its own chat bucket, but the global bucket (2/s) is empty.
+    assert limiter.acquire("b") == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert limiter.acquire("b") == 0
+
+    limiter.pause("b", 5)
+    clock[0] += 2
+    assert limiter.acquire("b") == pytest.approx(3.0)
+    assert limiter.acquire("a") == 0
+
+
+_OTHER_PROCESS = """
+import sys
+from app.telegram.telegram_alert_queue import TelegramAlertQueue
+
+queue = TelegramAlertQueue(sys.argv[1])
+print(queue.reserve(fingerprint="FP-PETR4", cooldown_key="PETR4|HIGH", now=1000.0, cooldown_seconds=60,
+                    chat_id=sys.argv[2], text="PETR4 from the api process", event={"alert_level": "high"})["status"])
+"""
+
+
+def test_ledger_and_queue_are_shared_across_processes_and_restarts(bot_api, tmp_path):
+    server = bot_api()
+    path = tmp_path / "telegram_alerts.sqlite3"
+
+    other = subprocess.run(
+        [sys.executable, "-c", _OTHER_PROCESS, str(path), FAKE_CHAT],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert other.returncode == 0, other.stderr
+    assert other.stdout.strip() == "queued"
+
+    # This process sees the other one's reservation and its equivalent-alert cooldown key.
+    assert _dispatch(now=1005.0)["status"] == "deduplicated"
+    assert TelegramAlertQueue(path).depth()[0] == 1
+
+    # A sender started later (e.g. after a restart) delivers what was left in the file.
+    eng.start_telegram_alert_sender()
+    assert _wait_for(lambda: len(server.delivered) == 1)
+    assert server.delivered[0][1] == "PETR4 from the api process"
+    assert _wait_for(lambda: TelegramAlertQueue(path).depth() == (0, None))
+    assert _dispatch(fingerprint="FP-PETR4-changed", now=1010.0)["status"] == "cooldown"
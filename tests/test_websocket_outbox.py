@@ -0,0 +1,184 @@
+"""Broadcasts are encoded once and never wait on a slow client.
+
+Each socket owns a bounded queue drained by its own writer task; overflow follows the
+configured policy, consumers stuck behind the lag threshold are evicted with 1013, and
+the per-room depth/drop/eviction counters reach system_metrics.
+"""
+
+import asyncio
+import json
+import time
+
+from app.system.room_websocket_manager import RoomWebSocketManager
+from app.system.system_metrics import format_prometheus_metrics, get_ws_queue_metrics_snapshot
+from app.system.websocket_manager import ConnectionManager
+from app.system.websocket_outbox import ConnectionOutbox
+
+
+class FakeSocket:
+    def __init__(self, *, stuck: bool = False, fail: bool = False):
+        self.frames = []
+        self.closed = None
+        self.stuck = stuck
+        self.fail = fail
+        self._release = None
+
+    async def accept(self):
+        return None
+
+    async def close(self, code=None, reason=None):
+        self.closed = {"code": code, "reason": reason}
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("dead_client")
+        if self.stuck:
+            # A client whose TCP window stays full: the send never completes.
+            self._release = asyncio.Event()
+            await self._release.wait()
+        self.frames.append(text)
+
+
+def _counters(room: str) -> dict:
+    return dict(get_ws_queue_metrics_snapshot().get(room) or {})
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_broadcast_encodes_once_and_skips_a_stuck_client():
+    async def scenario():
+        manager = ConnectionManager()
+        fast = [FakeSocket() for _ in range(5)]
+        stuck = FakeSocket(stuck=True)
+        for websocket in (*fast, stuck):
+            assert await manager.connect(websocket)
+
+        started = time.perf_counter()
+        for index in range(3):
+            await manager.broadcast({"type": "tick", "seq": index, "texto": "ação"})
+        elapsed = time.perf_counter() - started
+        await _settle()
+        return fast, stuck, elapsed, manager.stats()
+
+    fast, stuck, elapsed, stats = asyncio.run(scenario())
+
+    assert elapsed < 0.5
+    assert all(len(websocket.frames) == 3 for websocket in fast)
+    # One encoding per message, shared by every socket.
+    assert all(websocket.frames[0] is fast[0].frames[0] for websocket in fast)
+    assert fast[0].frames[0] == '{"type":"tick","seq":0,"texto":"ação"}'
+    assert stuck.frames == []
+    assert stats["active"] == 6
+    assert stats["queued_frames"] == 2
+
+
+def test_overflow_policies_bound_the_queue():
+    async def scenario():
+        stuck = FakeSocket(stuck=True)
+        results = {}
+        for policy in ("drop_oldest", "drop_newest", "coalesce"):
+            outbox = ConnectionOutbox(stuck, f"policy-{policy}", max_size=3, policy=policy, lag_seconds=60).start()
+            await _settle()
+            key = "quote" if policy == "coalesce" else None
+            outbox.offer("f0", key=key)
+            await _settle()
+            offers = [outbox.offer(f"f{index}", key=key) for index in range(1, 8)]
+            results[policy] = (offers, [frame for _key, frame, _at in outbox._queue])
+            outbox.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    # The writer holds f0 in flight; the queue behind it keeps at most three frames.
+    assert results["drop_oldest"][1] == ["f5", "f6", "f7"]
+    assert results["drop_newest"][1] == ["f1", "f2", "f3"]
+    assert results["drop_newest"][0][-1] == "dropped"
+    assert results["coalesce"][1] == ["f7"]
+    assert results["coalesce"][0].count("coalesced") == 6
+    assert results["drop_oldest"][0].count("queued") == 7
+    assert _counters("policy-drop_oldest")["dropped"] >= 4
+    assert _counters("policy-coalesce")["coalesced"] >= 6
+
+
+def test_lagging_consumer_is_evicted_with_1013():
+    async def scenario():
+        manager = ConnectionManager()
+        manager._slow_consumer_lag_seconds = 0.05
+        manager._room = "evict-market"
+        healthy, stuck = FakeSocket(), FakeSocket(stuck=True)
+        await manager.connect(healthy)
+        await manager.connect(stuck)
+
+        await manager.broadcast({"seq": 1})
+        await asyncio.sleep(0.1)
+        await manager.broadcast({"seq": 2})
+        await _settle()
+        return healthy, stuck, manager.stats()
+
+    healthy, stuck, stats = asyncio.run(scenario())
+
+    assert stuck.closed == {"code": 1013, "reason": "slow_consumer"}
+    assert stats["active"] == 1
+    assert len(healthy.frames) == 2
+    counters = _counters("evict-market")
+    assert counters["evicted"] == 1
+    assert counters["queue_depth"] == 0
+
+
+def test_room_broadcast_uses_per_room_queues_and_metrics():
+    async def scenario():
+        manager = RoomWebSocketManager()
+        manager._queue_size = 2
+        readers = [FakeSocket() for _ in range(3)]
+        stuck, dead = FakeSocket(stuck=True), FakeSocket(fail=True)
+        for websocket in (*readers, stuck, dead):
+            assert await manager.connect("qroom", websocket)
+        other = FakeSocket()
+        await manager.connect("qother", other)
+
+        for index in range(6):
+            await manager.broadcast("qroom", {"type": "message", "seq": index})
+        await _settle()
+        return readers, other, manager.stats("QROOM")
+
+    readers, other, stats = asyncio.run(scenario())
+
+    assert all(len(websocket.frames) == 6 for websocket in readers)
+    assert other.frames == []
+    # The dead socket is gone; the stuck one stays, capped at two queued frames.
+    assert stats["active"] == 4
+    assert stats["queued_frames"] == 2
+    counters = _counters("QROOM")
+    assert counters["dropped"] == 3
+    assert counters["send_failed"] == 1
+    assert counters["max_queue_depth"] >= 2
+    assert 'websocket_queue_frames_total{room="QROOM",event="dropped"} 3' in format_prometheus_metrics()
+
+
+def test_room_replies_share_the_socket_queue_with_broadcasts():
+    async def scenario():
+        manager = RoomWebSocketManager()
+        client, stuck = FakeSocket(), FakeSocket(stuck=True)
+        for websocket in (client, stuck):
+            assert await manager.connect("reply-room", websocket)
+
+        await manager.send("reply-room", client, {"type": "history", "items": []})
+        await manager.broadcast("reply-room", {"type": "message", "seq": 1})
+        await manager.send("reply-room", client, {"type": "pong"})
+        started = time.perf_counter()
+        await manager.send("reply-room", stuck, {"type": "pong"})
+        await manager.send("reply-room", stuck, {"type": "error", "detail": "chat_message_failed"})
+        elapsed = time.perf_counter() - started
+        await _settle()
+        return client.frames, elapsed, manager.stats("reply-room")
+
+    frames, elapsed, stats = asyncio.run(scenario())
+
+    assert [json.loads(frame)["type"] for frame in frames] == ["history", "message", "pong"]
+    # Replies to a stuck client wait in its queue instead of blocking the handler.
+    assert elapsed < 0.5
+    # The broadcast is the stuck socket's send in flight; both replies wait behind it.
+    assert stats["queued_frames"] == 2
@@ -0,0 +1,193 @@
+"""Downstream worker stages run off the engine loop and keep their own delivery policies."""
+
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import worker
+from app.api import routes_system
+from app.system.system_metrics import get_worker_pipeline_metrics_snapshot
+from app.system.worker_pipeline import ALL, LATEST, PipelineStage, WorkerPipeline, get_worker_pipeline_status
+
+
+class CyclesStopEvent:
+    """Lets worker_loop run `cycles` engine cycles without sleeping between them."""
+
+    def __init__(self, cycles):
+        self.cycles = cycles
+        self.waits = 0
+
+    def is_set(self):
+        return self.waits >= self.cycles
+
+    def wait(self, timeout):
+        self.waits += 1
+        return self.is_set()
+
+
+def _blocking_handler(calls, release, first_only=True):
+    def handler(payload=None):
+        calls.append(payload)
+        if not first_only or len(calls) == 1:
+            release.wait(5)
+
+    return handler
+
+
+def test_engine_cadence_is_kept_while_downstream_stages_are_slow():
+    engine_runs, alerts, pushes, papers = [], [], [], []
+    generations = itertools.count(1)
+
+    def engine():
+        engine_runs.append(time.perf_counter())
+        time.sleep(0.02)
+        return [{"ticker": "PETR4", "score": 80.0}]
+
+    def snapshot(signals, **_kwargs):
+        return {"signals": list(signals), "cycle": len(engine_runs)}
+
+    def slow(calls, seconds):
+        def handler(arg):
+            time.sleep(seconds)
+            calls.append(arg)
+
+        return handler
+
+    with patch.object(worker, "run_engine", side_effect=engine), patch.object(
+        worker, "generate_market_snapshot", side_effect=snapshot
+    ), patch.object(worker, "get_snapshot_generation", side_effect=lambda: next(generations)), patch.object(
+        worker, "update_paper_trading_from_snapshot", side_effect=slow(papers, 0.05)
+    ), patch.object(worker, "update_signal_outcome_audit_from_snapshot"), patch.object(
+        worker, "dispatch_signal_pushes", side_effect=slow(pushes, 0.2)
+    ), patch.object(worker, "send_bulk_alert", side_effect=slow(alerts, 0.5)), patch.object(
+        worker, "_prewarm_public_quotes", side_effect=lambda: time.sleep(1.0)
+    ) as quote_prewarm, patch.object(worker, "_prewarm_public_charts"), patch.object(
+        worker, "_prewarm_public_news"
+    ), patch.object(worker, "PREWARM_CHECK_SECONDS", 0.01), patch.object(worker, "set_workers"):
+        started = time.perf_counter()
+        worker.worker_loop(CyclesStopEvent(6))
+
+    # Six engine cycles finish before the first Telegram batch would have, with a prewarm stuck in flight.
+    assert len(engine_runs) == 6
+    assert engine_runs[-1] - started < 0.4
+    assert quote_prewarm.call_count == 1
+    # The drained pipeline still delivered every generation, in order, to the at-least-once stages.
+    assert [payload["cycle"] for payload in papers] == [1, 2, 3, 4, 5, 6]
+    assert len(alerts) == len(pushes) == 6
+    metrics = get_worker_pipeline_metrics_snapshot()["telegram_dispatch"]
+    assert metrics["max_queue_depth"] >= 4
+    assert metrics["max_lag_seconds"] >= 0.5
+
+
+def test_latest_wins_stage_coalesces_generations_queued_while_busy():
+    calls, release = [], threading.Event()
+    pipeline = WorkerPipeline([PipelineStage("test_latest", _blocking_handler(calls, release), delivery=LATEST)]).start()
+
+    pipeline.offer(1, "g1")
+    deadline = time.monotonic() + 2
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    for generation in range(2, 7):
+        pipeline.offer(generation, f"g{generation}")
+    assert get_worker_pipeline_status()["stages"]["test_latest"]["pending_generations"] == [6]
+
+    release.set()
+    assert pipeline.stop(drain=True, timeout=2) == []
+    assert calls == ["g1", "g6"]
+    assert get_worker_pipeline_metrics_snapshot()["test_latest"]["coalesced"] == 4
+    assert get_worker_pipeline_status()["running"] is False
+
+
+def test_at_least_once_stage_retries_failures_and_never_blocks_the_engine():
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        if attempts.count(payload) == 1 and payload == "g1":
+            raise RuntimeError("transient")
+
+    pipeline = WorkerPipeline(
+        [PipelineStage("test_retry", flaky, delivery=ALL, retry_seconds=0.01)]
+    ).start()
+    pipeline.offer(1, "g1")
+    pipeline.offer(2, "g2")
+    assert pipeline.stop(drain=True, timeout=2) == []
+    assert attempts == ["g1", "g1", "g2"]
+    metrics = get_worker_pipeline_metrics_snapshot()["test_retry"]
+    assert (metrics["retried"], metrics["delivered"], metrics["failed"]) == (1, 2, 0)
+
+    calls, release = [], threading.Event()
+    pipeline = WorkerPipeline(
+        [PipelineStage("test_bounded", _blocking_handler(calls, release), delivery=ALL, max_pending=2)]
+    ).start()
+    pipeline.offer(1, "g1")
+    deadline = time.monotonic() + 2
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    started = time.perf_counter()
+    for generation in range(2, 7):
+        pipeline.offer(generation, f"g{generation}")
+    # A stuck stage never holds up the engine: the full queue keeps g2 and lets the latest replace its tail.
+    assert time.perf_counter() - started < 0.1
+    status = get_worker_pipeline_status()["stages"]["test_bounded"]
+    assert (status["pending_generations"], status["overflowed"]) == ([2, 6], 3)
+    release.set()
+    assert pipeline.stop(drain=True, timeout=2) == []
+    assert calls == ["g1", "g2", "g6"]
+    assert get_worker_pipeline_metrics_snapshot()["test_bounded"]["overflowed"] == 3
+
+
+def test_slow_stage_is_reported_stalled_and_timer_stages_keep_their_cadence():
+    calls, release, ticks = [], threading.Event(), []
+    pipeline = WorkerPipeline(
+        [
+            PipelineStage("test_stalled", _blocking_handler(calls, release), delivery=ALL, timeout_seconds=0.05),
+            PipelineStage("test_timer", lambda: ticks.append(time.monotonic()), interval_seconds=0.02),
+        ]
+    ).start()
+    pipeline.offer(1, "g1")
+    time.sleep(0.2)
+
+    status = pipeline.status()
+    assert status["test_stalled"]["stalled"] is True
+    assert status["test_timer"]["stalled"] is False
+    # The timer kept ticking while the other stage was stuck.
+    assert len(ticks) >= 4
+
+    release.set()
+    pipeline.stop(drain=True, timeout=2)
+    assert get_worker_pipeline_metrics_snapshot()["test_stalled"]["timeouts"] == 1
+
+
+_WORKER_PROCESS = """
+from app.system.worker_pipeline import ALL, PipelineStage, WorkerPipeline
+
+pipeline = WorkerPipeline([PipelineStage("paper_trading", lambda payload: None, delivery=ALL)]).start()
+pipeline.offer(7, {"signals": []})
+pipeline.stop(drain=True, timeout=5)
+"""
+
+
+def test_the_api_process_serves_the_pipeline_status_published_by_the_worker(tmp_path, monkeypatch):
+    path = tmp_path / "worker_pipeline.json"
+    monkeypatch.setenv("WORKER_PIPELINE_STATUS_FILE", str(path))
+    assert routes_system.worker_pipeline_status() == {"running": False, "stages": {}, "source": "none"}
+
+    other = subprocess.run(
+        [sys.executable, "-c", _WORKER_PROCESS],
+        cwd=Path(__file__).resolve().parents[1],
+        env={**os.environ, "WORKER_PIPELINE_STATUS_FILE": str(path)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert other.returncode == 0, other.stderr
+
+    status = routes_system.worker_pipeline_status()
+    assert (status["source"], status["running"]) == ("worker", False)
+    assert status["stages"]["paper_trading"]["last_generation"] == 7
@@ -0,0 +1,141 @@
+"""The worker profiler builds per-cycle stage trees, histograms and stack samples."""
+
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import worker
+from app.api import routes_system
+from app.system import worker_profiler
+from app.system.system_metrics import format_prometheus_metrics, get_performance_metrics_snapshot
+
+
+class SingleCycleStopEvent:
+    def __init__(self):
+        self.wait_calls = 0
+
+    def is_set(self):
+        return self.wait_calls > 0
+
+    def wait(self, timeout):
+        self.wait_calls += 1
+        return True
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(200))
+
+
+def _snapshot(signals, **_kwargs):
+    with worker_profiler.profile_stage("snapshot_test_pass"):
+        _spin(0.01)
+    return {"signals": [{"ticker": "PETR4", "score": 70.0}], "source": "engine", "stale": False}
+
+
+def _failing_engine():
+    with worker_profiler.profile_stage("engine_test_pass") as stage:
+        stage["ok"] = False
+    return [{"ticker": "PETR4"}]
+
+
+def test_worker_cycle_is_kept_as_a_stage_tree():
+    with patch.object(worker, "run_engine", side_effect=_failing_engine), patch.object(
+        worker, "generate_market_snapshot", side_effect=_snapshot
+    ), patch.object(worker, "update_paper_trading_from_snapshot"), patch.object(
+        worker, "update_signal_outcome_audit_from_snapshot"
+    ), patch.object(worker, "dispatch_signal_pushes"), patch.object(worker, "send_bulk_alert"), patch.object(
+        worker, "_prewarm_public_quotes"
+    ), patch.object(worker, "_prewarm_public_charts"), patch.object(worker, "_prewarm_public_news"), patch.object(
+        worker, "set_workers"
+    ):
+        worker.worker_loop(SingleCycleStopEvent())
+
+    cycle = routes_system.worker_profile(limit=1)["cycles"][0]
+    children = {child["stage"]: child for child in cycle["children"]}
+
+    assert cycle["stage"] == "cycle"
+    # Paper trading, alerts and prewarms run on the worker pipeline, outside the cycle.
+    assert list(children) == ["engine", "snapshot"]
+    assert [child["stage"] for child in children["engine"]["children"]] == ["engine_test_pass"]
+    assert children["engine"]["children"][0]["ok"] is False
+    assert [child["stage"] for child in children["snapshot"]["children"]] == ["snapshot_test_pass"]
+    assert children["snapshot"]["children"][0]["cpu_seconds"] > 0
+    assert cycle["wall_seconds"] >= children["snapshot"]["wall_seconds"] >= 0.01
+
+
+def test_stage_histograms_reach_the_metrics_exposition():
+    with pytest.raises(ValueError):
+        with worker_profiler.profile_cycle("profile_test_cycle"):
+            with worker_profiler.profile_stage("profile_test_stage") as stage:
+                stage["ok"] = False
+            with worker_profiler.profile_stage("profile_test_raises"):
+                raise ValueError("boom")
+
+    profile = get_performance_metrics_snapshot()["worker_stage_profile"]
+    assert profile["profile_test_stage"]["errors"] == 1
+    assert profile["profile_test_raises"]["errors"] == 1
+    assert profile["profile_test_cycle"]["wall_seconds"]["samples"] >= 1
+    assert get_performance_metrics_snapshot()["worker_stage_seconds"]["profile_test_stage"]["errors"] == 1
+
+    exposition = format_prometheus_metrics()
+    assert 'worker_stage_profile_seconds{stage="profile_test_stage",clock="cpu",quantile="0.99"}' in exposition
+    assert 'worker_stage_profile_allocated_blocks{stage="profile_test_stage",quantile="0.50"}' in exposition
+    assert 'worker_stage_profile_runs_total{stage="profile_test_raises"} 1' in exposition
+
+
+def test_sampling_keeps_the_stacks_of_the_slowest_cycle(monkeypatch):
+    monkeypatch.setattr(worker_profiler, "WORKER_PROFILE_SAMPLING", True)
+    monkeypatch.setattr(worker_profiler, "WORKER_PROFILE_SAMPLE_INTERVAL_MS", 1.0)
+    monkeypatch.setattr(worker_profiler, "_cycles", deque(maxlen=3))
+    monkeypatch.setattr(worker_profiler, "_cycle_stacks", {})
+    for seconds in (0.01, 0.2, 0.01, 0.01):
+        with worker_profiler.profile_cycle("sampled_test_cycle"):
+            _spin(seconds)
+
+    profile = worker_profiler.get_worker_profile()
+    slowest = profile["slowest_cycle"]
+
+    assert len(profile["cycles"]) == 3
+    assert len(worker_profiler._cycle_stacks) == 3
+    assert slowest["wall_seconds"] == max(cycle["wall_seconds"] for cycle in profile["cycles"]) >= 0.2
+    assert slowest["samples"] > 10
+    assert any(item["stack"].endswith("test_worker_profiler:_spin") for item in slowest["stacks"])
+
+
+_WORKER_PROCESS = """
+from app.system.worker_profiler import profile_cycle, profile_stage
+
+with profile_cycle("cycle"):
+    with profile_stage("engine"):
+        sum(range(10000))
+"""
+
+
+def test_the_api_process_serves_the_profile_published_by_the_worker(tmp_path, monkeypatch):
+    path = tmp_path / "worker_profile.json"
+    monkeypatch.setenv("WORKER_PROFILE_FILE", str(path))
+    monkeypatch.setattr(worker_profiler, "_cycles", deque(maxlen=3))
+    assert routes_system.worker_profile(limit=5)["source"] == "none"
+
+    other = subprocess.run(
+        [sys.executable, "-c", _WORKER_PROCESS],
+        cwd=Path(__file__).resolve().parents[1],
+        env={**os.environ, "WORKER_PROFILE_FILE": str(path)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert other.returncode == 0, other.stderr
+
+    profile = routes_system.worker_profile(limit=5)
+    assert profile["source"] == "worker"
+    assert [child["stage"] for child in profile["cycles"][0]["children"]] == ["engine"]
+    assert profile["stages"]["engine"]["count"] == 1
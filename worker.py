@@ -10,29 +10,37 @@ from app.core.settings import settings
 from app.engine.engine_orchestrator import run_engine
 from app.engine.market_snapshot_engine import generate_market_snapshot
 from app.system.push_dispatcher import dispatch_signal_pushes
+from app.system.push_outbox import start_push_dispatcher, stop_push_dispatcher
 from app.system.news_warmup import warm_news_once
 from app.system.chart_warmup import warm_charts_once
 from app.system.paper_trading import update_paper_trading_from_snapshot
 from app.system.quote_warmup import warm_quotes_once
 from app.system.signal_outcome_audit import update_signal_outcome_audit_from_snapshot
-from app.telegram.telegram_alert_engine import send_bulk_alert
+from app.telegram.telegram_alert_engine import send_bulk_alert, start_telegram_alert_sender, stop_telegram_alert_sender
+from app.cache.snapshot_cache import get_snapshot_generation
 from app.system.system_metrics import (
     increment_engine_cycles,
     provider_call_context,
     record_worker_generation_metric,
-    record_worker_stage_duration,
     set_assets_scanned,
     set_scan_time,
     set_signals_generated,
     set_workers,
 )
+from app.system.worker_pipeline import ALL, PipelineStage, WorkerPipeline
+from app.system.worker_profiler import profile_cycle, profile_stage
 
 logger = logging.getLogger("stocknewsbr.worker")
 
 SCAN_INTERVAL = max(5, int(getattr(settings, "SCAN_INTERVAL", 20)))
 MAX_SIGNALS = 500
 CRASH_SLEEP = 5
-QUOTE_PREWARM_INTERVAL = 3
+PIPELINE_DRAIN_SECONDS = 30
+PUSH_DRAIN_SECONDS = 10
+TELEGRAM_DRAIN_SECONDS = 10
+STATE_STAGE_TIMEOUT_SECONDS = 60
+ALERT_STAGE_TIMEOUT_SECONDS = 30
+PREWARM_CHECK_SECONDS = SCAN_INTERVAL
 QUOTE_PREWARM_TTL_SECONDS = 120
 QUOTE_PREWARM_LIMIT = 120
 CHART_PREWARM_TTL_SECONDS = 240
@@ -47,36 +55,34 @@ _last_news_prewarm = 0.0
 
 
 def safe_run_engine():
-    start = time.perf_counter()
-    success = False
+    with profile_stage("engine") as stage:
+        start = time.perf_counter()
 
-    try:
-        signals = run_engine() or []
-        duration = time.perf_counter() - start
+        try:
+            signals = run_engine() or []
+            duration = time.perf_counter() - start
+
+            set_scan_time(duration)
+            increment_engine_cycles()
+
+            if not signals:
+                set_signals_generated(0)
+                set_assets_scanned(0)
+                return []
+
+            signals = signals[:MAX_SIGNALS]
 
-        set_scan_time(duration)
-        increment_engine_cycles()
-        success = True
+            set_signals_generated(len(signals))
+            set_assets_scanned(len(signals))
 
-        if not signals:
+            return signals
+
+        except Exception:
+            logger.exception("Engine execution error")
+            stage["ok"] = False
             set_signals_generated(0)
             set_assets_scanned(0)
             return []
-
-        signals = signals[:MAX_SIGNALS]
-
-        set_signals_generated(len(signals))
-        set_assets_scanned(len(signals))
-
-        return signals
-
-    except Exception:
-        logger.exception("Engine execution error")
-        set_signals_generated(0)
-        set_assets_scanned(0)
-        return []
-    finally:
-        record_worker_stage_duration("engine", time.perf_counter() - start, success=success)
 
 
 def _prewarm_public_quotes():
@@ -121,73 +127,104 @@ def _prewarm_public_news():
         logger.exception("News prewarm error")
 
 
+def _snapshot_signals(snapshot_payload):
+    return snapshot_payload.get("signals", []) if isinstance(snapshot_payload, dict) else []
+
+
+def _update_paper_trading(snapshot_payload):
+    try:
+        update_paper_trading_from_snapshot(snapshot_payload)
+    except Exception:
+        logger.exception("Paper trading update error")
+        raise
+
+
+def _update_signal_outcome_audit(snapshot_payload):
+    try:
+        update_signal_outcome_audit_from_snapshot(snapshot_payload)
+    except Exception:
+        logger.exception("Signal outcome audit update error")
+        raise
+
+
+def _dispatch_snapshot_pushes(snapshot_payload):
+    snapshot_signals = _snapshot_signals(snapshot_payload)
+    if not snapshot_signals:
+        return
+    try:
+        dispatch_signal_pushes(snapshot_signals)
+    except Exception:
+        logger.exception("Push dispatch error")
+        raise
+
+
+def _send_snapshot_alerts(snapshot_payload):
+    snapshot_signals = _snapshot_signals(snapshot_payload)
+    if not snapshot_signals:
+        return
+    try:
+        send_bulk_alert(snapshot_signals)
+    except Exception:
+        logger.exception("Telegram dispatch error")
+        raise
+
+
+def build_worker_pipeline() -> WorkerPipeline:
+    """Everything the worker does after a snapshot, off the engine loop.
+
+    State updates and alerts see every snapshot generation (at-least-once, with
+    retries; both keep their own cooldown/dedup state, so a retry does not
+    resend; one that falls max_pending generations behind skips ahead to the
+    latest snapshot instead of holding up the engine). Prewarms are latest-wins
+    timers that still honour their TTLs.
+    """
+    return WorkerPipeline(
+        [
+            PipelineStage("paper_trading", _update_paper_trading, delivery=ALL, timeout_seconds=STATE_STAGE_TIMEOUT_SECONDS),
+            PipelineStage(
+                "signal_outcome_audit", _update_signal_outcome_audit, delivery=ALL, timeout_seconds=STATE_STAGE_TIMEOUT_SECONDS
+            ),
+            PipelineStage("push_dispatch", _dispatch_snapshot_pushes, delivery=ALL, timeout_seconds=ALERT_STAGE_TIMEOUT_SECONDS),
+            PipelineStage("telegram_dispatch", _send_snapshot_alerts, delivery=ALL, timeout_seconds=ALERT_STAGE_TIMEOUT_SECONDS),
+            PipelineStage("prewarm_quotes", _prewarm_public_quotes, interval_seconds=PREWARM_CHECK_SECONDS),
+            PipelineStage("prewarm_charts", _prewarm_public_charts, interval_seconds=PREWARM_CHECK_SECONDS),
+            PipelineStage("prewarm_news", _prewarm_public_news, interval_seconds=PREWARM_CHECK_SECONDS),
+        ]
+    )
+
+
 def worker_loop(stop_event: threading.Event):
     logger.info("Worker started | interval=%ss", SCAN_INTERVAL)
     set_workers(1)
+    pipeline = build_worker_pipeline().start()
+    # Pushes queued by the push_dispatch stage are sent by this pool.
+    start_push_dispatcher()
+    # Telegram alerts are queued by the alerts stage and sent, rate-limited, by this thread.
+    start_telegram_alert_sender()
 
     try:
         while not stop_event.is_set():
-            cycle_start = time.perf_counter()
-
             try:
-                with provider_call_context("worker"):
+                with profile_cycle() as cycle, provider_call_context("worker"):
                     signals = safe_run_engine()
 
-                    snapshot_start = time.perf_counter()
                     snapshot_payload = {}
                     try:
-                        snapshot_payload = generate_market_snapshot(signals, reuse_last_good_on_empty=True) or {}
-                        snapshot_payload = snapshot_payload if isinstance(snapshot_payload, dict) else {}
-                        snapshot_signals = snapshot_payload.get("signals", [])
-                        snapshot_runtime = snapshot_payload.get("snapshot_runtime") if isinstance(snapshot_payload.get("snapshot_runtime"), dict) else {}
-                        snapshot_status = str(snapshot_runtime.get("status") or snapshot_payload.get("snapshot_runtime_status", "")).upper()
-                        generation_success = bool(snapshot_signals) and snapshot_status != "CRITICAL"
-                        record_worker_generation_metric(generation_success)
-                        record_worker_stage_duration("snapshot", time.perf_counter() - snapshot_start, success=True)
+                        with profile_stage("snapshot"):
+                            snapshot_payload = generate_market_snapshot(signals, reuse_last_good_on_empty=True) or {}
+                            snapshot_payload = snapshot_payload if isinstance(snapshot_payload, dict) else {}
+                            snapshot_signals = snapshot_payload.get("signals", [])
+                            snapshot_runtime = snapshot_payload.get("snapshot_runtime") if isinstance(snapshot_payload.get("snapshot_runtime"), dict) else {}
+                            snapshot_status = str(snapshot_runtime.get("status") or snapshot_payload.get("snapshot_runtime_status", "")).upper()
+                            generation_success = bool(snapshot_signals) and snapshot_status != "CRITICAL"
+                            record_worker_generation_metric(generation_success)
                     except Exception:
                         record_worker_generation_metric(False)
-                        record_worker_stage_duration("snapshot", time.perf_counter() - snapshot_start, success=False)
                         logger.exception("Snapshot update error")
 
-                    snapshot_signals = snapshot_payload.get("signals", []) if isinstance(snapshot_payload, dict) else []
+                    # Downstream stages run on the pipeline's threads; the engine never waits for them.
                     if isinstance(snapshot_payload, dict) and snapshot_payload:
-                        paper_start = time.perf_counter()
-                        try:
-                            update_paper_trading_from_snapshot(snapshot_payload)
-                            record_worker_stage_duration("paper_trading", time.perf_counter() - paper_start, success=True)
-                        except Exception:
-                            record_worker_stage_duration("paper_trading", time.perf_counter() - paper_start, success=False)
-                            logger.exception("Paper trading update error")
-
-                        outcome_start = time.perf_counter()
-                        try:
-                            update_signal_outcome_audit_from_snapshot(snapshot_payload)
-                            record_worker_stage_duration("signal_outcome_audit", time.perf_counter() - outcome_start, success=True)
-                        except Exception:
-                            record_worker_stage_duration("signal_outcome_audit", time.perf_counter() - outcome_start, success=False)
-                            logger.exception("Signal outcome audit update error")
-
-                    if snapshot_signals:
-                        push_start = time.perf_counter()
-                        try:
-                            dispatch_signal_pushes(snapshot_signals)
-                            record_worker_stage_duration("push_dispatch", time.perf_counter() - push_start, success=True)
-                        except Exception:
-                            record_worker_stage_duration("push_dispatch", time.perf_counter() - push_start, success=False)
-                            logger.exception("Push dispatch error")
-
-                        telegram_start = time.perf_counter()
-                        try:
-                            send_bulk_alert(snapshot_signals)
-                            record_worker_stage_duration("telegram_dispatch", time.perf_counter() - telegram_start, success=True)
-                        except Exception:
-                            record_worker_stage_duration("telegram_dispatch", time.perf_counter() - telegram_start, success=False)
-                            logger.exception("Telegram dispatch error")
-
-                    if int(time.time()) % QUOTE_PREWARM_INTERVAL == 0:
-                        _prewarm_public_quotes()
-                    _prewarm_public_charts()
-                    _prewarm_public_news()
+                        pipeline.offer(get_snapshot_generation(), snapshot_payload)
 
             except Exception:
                 logger.exception("Worker failure")
@@ -197,13 +234,14 @@ def worker_loop(stop_event: threading.Event):
 
                 continue
 
-            cycle_time = time.perf_counter() - cycle_start
-            record_worker_stage_duration("cycle", cycle_time, success=True)
-            sleep_time = max(1, SCAN_INTERVAL - cycle_time)
+            sleep_time = max(1, SCAN_INTERVAL - cycle["wall_seconds"])
 
             if stop_event.wait(sleep_time):
                 break
     finally:
+        pipeline.stop(drain=True, timeout=PIPELINE_DRAIN_SECONDS)
+        stop_push_dispatcher(drain=True, timeout=PUSH_DRAIN_SECONDS)
+        stop_telegram_alert_sender(drain=True, timeout=TELEGRAM_DRAIN_SECONDS)
         set_workers(0)
 
 